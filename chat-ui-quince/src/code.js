@@ -1,4 +1,4 @@
-import { fetchStats, updateStats, clearStats } from './stats.js';
+import { fetchStats, streamStats, stopStats, updateStats, clearStats } from './stats.js';
 
 ///////////////////////////////////////////////////
 // Classes
@@ -101,7 +101,7 @@ async function handleGoogleSignIn(response) {
         console.log('User verified:', result);
         updateUI(true);
         appendToChat("Hi there! I’m your personal assistant, here to help you manage your crypto transactions with ease. Here’s what I can do for you: <br> 💸 Transfer Funds – Send money securely to other accounts.<br> 🔄 Swap Tokens – Exchange ERC-20 tokens instantly.<br> 📈 Stake Crypto – Grow your assets by staking your tokens.<br><br>Just type what you need, and I’ll guide you through it! If you ever need help, just ask. 😊\n If you don't already have a wallet, you could start by asking for one.", false);
-        fetchStats(apiClient.token);
+        streamStats(apiClient.token);
 
     } catch (error) {
         console.error('Sign-in failed:', error);
@@ -301,6 +301,7 @@ window.addEventListener('load', function() {
     if (logoutBtn) {
         logoutBtn.onclick = async function() {
             try {
+                stopStats();
                 await apiClient.logout();
                 console.log('Logged out successfully');
                 updateUI(false);
@@ -42,6 +42,59 @@ export async function fetchStats(token) {
   }
 }
 
+// Follow the server-sent balance stream; the server pushes only on change
+let statsStream = null;
+
+export async function streamStats(token) {
+  if (!token) {
+    console.error('No token available, please sign in');
+    return;
+  }
+  stopStats();
+  const controller = new AbortController();
+  statsStream = controller;
+
+  try {
+    const response = await fetch(`${API_BASE_URL}/stats/stream`, {
+      method: 'GET',
+      headers: {
+        'Authorization': `Bearer ${token}`,
+        'Accept': 'text/event-stream',
+      },
+      signal: controller.signal,
+    });
+
+    if (!response.ok) {
+      throw new Error(`HTTP error! Status: ${response.status}`);
+    }
+
+    const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+    let buffer = '';
+    while (true) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += value;
+      const events = buffer.split('\n\n');
+      buffer = events.pop();
+      for (const event of events) {
+        const data = event.split('\n').find(line => line.startsWith('data: '));
+        if (data) updateStats(JSON.parse(data.slice(6)));
+      }
+    }
+  } catch (error) {
+    if (error.name === 'AbortError') return;
+    console.error('Stats stream failed, falling back to a single fetch:', error);
+    fetchStats(token);
+  }
+}
+
+export function stopStats() {
+  if (statsStream) {
+    statsStream.abort();
+    statsStream = null;
+  }
+}
+
 // Update stats in sidebar
 export function updateStats(balances) {
   Object.keys(statsFields).forEach(token => {
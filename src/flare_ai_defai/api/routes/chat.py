@@ -4,13 +4,17 @@ Chat Router Module
 This module implements the main chat routing system for the AI Agent API with Google Sign-In authentication.
 """
 
+import asyncio
 import json
 import secrets
 import datetime
+from dataclasses import asdict
+from decimal import Decimal
 import structlog
 import logging
-from fastapi import APIRouter, HTTPException, Depends, Header
+from fastapi import APIRouter, HTTPException, Depends, Header, Query
 from fastapi.security import OAuth2PasswordBearer
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 from web3 import Web3
 from web3.exceptions import Web3RPCError
@@ -25,9 +29,11 @@ from flare_ai_defai.prompts import PromptService, SemanticRouterResponse
 from flare_ai_defai.settings import settings
 from flare_ai_defai.blockchain import KineticMarket
 from flare_ai_defai.blockchain import SparkDEX
+from flare_ai_defai.blockchain.amounts import TokenAmount, format_amounts
 from flare_ai_defai.models import UserInfo
 
 from flare_ai_defai.storage.fake_storage import WalletStore
+from flare_ai_defai.storage.history_store import MAX_PAGE_SIZE, HistoryStore
 
 # Configure logging
 structlog.configure(
@@ -48,6 +54,11 @@ logger = structlog.get_logger(__name__)
 
 
 
+# Seconds between balance checks of an open stats stream; checks are served
+# from the balance cache, which only goes to the chain after a block touches
+# the wallet.
+STATS_STREAM_INTERVAL = 1.0
+
 # Session storage (use Redis or database in production)
 sessions: dict[str, dict] = {}
 
@@ -95,7 +106,8 @@ class ChatRouter:
         prompts: PromptService,
         kinetic_market: KineticMarket,
         sparkdex: SparkDEX,
-        wallet_store: WalletStore
+        wallet_store: WalletStore,
+        history: HistoryStore | None = None
     ) -> None:
         self._router = APIRouter()
         self.ai = ai
@@ -109,6 +121,7 @@ class ChatRouter:
         self.kinetic_market = kinetic_market
         self.sparkdex = sparkdex
         self.wallet_store = wallet_store
+        self.history = history
 
 
     def _setup_routes(self) -> None:
@@ -147,7 +160,7 @@ class ChatRouter:
 
         @self._router.get("/stats")
         async def stats(user: UserInfo = Depends(get_current_user)) -> dict[str, float]:
-            """Return balances of FLR, WFLR, USDC, USDT, JOULE, and WETH for the user."""
+            """Return balances of FLR, WFLR, USDC, USDT, JOULE, and WETH for the user, with USD values."""
             try:
                 self.logger.debug("Fetching stats", user_id=user.user_id)
                 balances = await self.get_token_balances(user)
@@ -157,6 +170,47 @@ class ChatRouter:
                 raise HTTPException(status_code=500, detail=f"Failed to fetch balances: {str(e)}")
 
 
+        @self._router.get("/history")
+        async def history(
+            limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+            cursor: str | None = None,
+            user: UserInfo = Depends(get_current_user)
+        ) -> dict:
+            """Return the user's indexed transactions, newest first, one page at a time."""
+            address = self.wallet_store.get_address(user)
+            if self.history is None or address is None:
+                raise HTTPException(status_code=404, detail="No history for this user")
+            try:
+                events = self.history.page(Web3.to_checksum_address(address), limit, cursor)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            return {
+                "events": [asdict(event) for event in events],
+                "next_cursor": events[-1].cursor if len(events) == limit else None,
+            }
+
+        @self._router.get("/stats/stream")
+        async def stats_stream(user: UserInfo = Depends(get_current_user)) -> StreamingResponse:
+            """Push the user's balances as server-sent events whenever they change."""
+            async def events():
+                last = None
+                while True:
+                    try:
+                        balances = await self.get_token_balances(user)
+                    except Exception as e:
+                        self.logger.error("Failed to fetch stats", error=str(e))
+                        balances = last
+                    if balances != last:
+                        last = balances
+                        yield f"data: {json.dumps(balances)}\n\n"
+                    await asyncio.sleep(STATS_STREAM_INTERVAL)
+
+            return StreamingResponse(
+                events(),
+                media_type="text/event-stream",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+            )
+
         @self._router.post("/")
         async def chat(
             message: ChatMessage,
@@ -208,7 +262,7 @@ class ChatRouter:
 
                 if self.attestation.attestation_requested:
                     try:
-                        resp = self.attestation.get_token([message.message])
+                        resp = await self.attestation.get_token_async([message.message])
                         self.attestation.attestation_requested = False
                         return {"response": resp}
                     except VtpmAttestationError as e:
@@ -425,13 +479,38 @@ class ChatRouter:
         self.logger.debug("send_token_tx", tx=tx)
         txs = [tx]
         self.blockchain.add_tx_to_queue(msg=message, txs=txs)
+        amount = TokenAmount(tx.get("value", 0))
+        value = self.blockchain.prices.value("flr", amount)
         formatted_preview = (
             "Transaction Preview: "
-            + f"Sending {Web3.from_wei(tx.get('value', 0), 'ether')} "
-            + f"FLR to {tx.get('to')}\nType CONFIRM to proceed."
+            + f"Sending {amount} FLR"
+            + (f" (${value:,.2f})" if value is not None else "")
+            + f" to {tx.get('to')}\nType CONFIRM to proceed."
         )
-        return {"response": formatted_preview}
+        return {"response": await self.preflight_preview(formatted_preview)}
+
 
+    async def preflight_preview(self, preview: str) -> str:
+        """
+        Finish a transaction preview with the queued bundle's simulation.
+
+        The simulation starts when the bundle is queued, so by the time the
+        preview is built it has usually finished. A bundle that would revert
+        is dropped from the queue and its revert reason shown instead.
+
+        Args:
+            preview: Preview text for the queued bundle
+
+        Returns:
+            str: Preview with the estimated gas, or the failure message
+        """
+        simulation = await asyncio.to_thread(self.blockchain.preflight)
+        if simulation is None:
+            return preview
+        if not simulation.ok:
+            self.blockchain.tx_queue.pop()
+            return f"This transaction would fail, so it was not queued ({simulation.revert_reason})."
+        return f"{preview}\nSimulated successfully, estimated gas: {simulation.gas_used:,}"
 
     async def getDeFiJson(self, message: str, prompt_str: str) -> dict:
         prompt, mime_type, schema = self.prompts.get_formatted_prompt(
@@ -443,7 +522,8 @@ class ChatRouter:
         
         send_token_json = json.loads("{}")
         try:
-            send_token_json = json.loads(send_token_response.text)
+            # Amounts stay exact Decimals until they become TokenAmounts
+            send_token_json = json.loads(send_token_response.text, parse_float=Decimal)
         except:
             self.logger.debug("We probably did not get valid json back from Gemini. See below.")
                 
@@ -472,18 +552,19 @@ class ChatRouter:
         ):
             prompt, _, _ = self.prompts.get_formatted_prompt("follow_up_token_swap")
             follow_up_response = self.ai.generate(prompt)
-            return {"response": follow_up_response.text + " \n " + json.dumps(response_json)}
+            return {"response": follow_up_response.text + " \n " + json.dumps(response_json, default=str)}
         
-        if response_json['from_token'].lower() not in ("flr","wflr", "joule", "usdc", "usdt", "weth"):
+        # Any listed token can be routed to any other, directly or via multi-hop
+        if response_json['from_token'].lower() not in ("flr", *self.sparkdex.TOKEN_ADDRESSES):
             return {"response": "Sorry, we cannot make a swap from that token."}
         
-        if response_json['to_token'].lower() not in ("wflr", "joule", "usdc", "usdt", "weth"):
+        if response_json['to_token'].lower() not in self.sparkdex.TOKEN_ADDRESSES:
             return {"response": "Sorry, we cannot make a swap to that token."}
 
 
         formatted_preview = self.sparkdex.add_swap_txs_to_queue(user, response_json["from_token"], response_json["to_token"], response_json["amount"])
         
-        return {"response": formatted_preview}
+        return {"response": await self.preflight_preview(formatted_preview)}
 
     
     
@@ -509,7 +590,7 @@ class ChatRouter:
         ):
             prompt, _, _ = self.prompts.get_formatted_prompt("follow_up_token_stake")
             follow_up_response = self.ai.generate(prompt)
-            return {"response": follow_up_response.text + " \n " + json.dumps(response_json)}
+            return {"response": follow_up_response.text + " \n " + json.dumps(response_json, default=str)}
         
         txs = self.kinetic_market.swapFLRtoSFLR(user, response_json["amount"])
   
@@ -519,43 +600,40 @@ class ChatRouter:
             + f"Staking {response_json["amount"]} FLR"
             + f"<br>Type CONFIRM to proceed."
         )
-        return {"response": formatted_preview}
+        return {"response": await self.preflight_preview(formatted_preview)}
         
     
     
     async def handle_borrow(self, message: str, user: UserInfo) -> dict[str, str]:
         self.logger.debug("In handle_borrow()")
-        
-        prompt, mime_type, schema = self.prompts.get_formatted_prompt("token_borrow", user_input=message)
-        ai_response = self.ai.generate(prompt=prompt, response_mime_type=mime_type, response_schema=schema)
+        response_json = await self.getDeFiJson(message, "token_borrow")
 
         expected_json_len = 3
-        ai_response_json = json.loads("{}")
-        for i in range(1,5):
-            
-            try:
-                ai_response_json = json.loads(ai_response.text)
-            except:
-                self.logger.debug("We probably did not get valid json back from Gemini. See below.")
-        
-            self.logger.debug(message=message)
-            self.logger.debug(prompt=prompt)
-            self.logger.debug(mime_type=mime_type)
-            self.logger.debug(schema=schema)
-            self.logger.debug(ai_response=ai_response)
-            self.logger.debug(ai_response_json=ai_response_json)
-            self.logger.debug(len_ai_response_json=len(ai_response_json))
-
-            len_ai_response_json = len(ai_response_json)
-            if (len_ai_response_json != expected_json_len):
-                prompt, _, _ = self.prompts.get_formatted_prompt("follow_up_token_borrow")
-                ai_response = self.ai.generate(f"The response you gave me ({ai_response}) what incorrect, because it had {len_ai_response_json} and I was expecting {expected_json_len}")
-              
-            print ("Round ", i)    
-        if (ai_response_json.get("amount") == 0.0):
-            return {"response": "Sorry, amount must be more than 0.0 \n " + json.dumps(ai_response_json)}
-        
-        return {"response": "Sorry, not implemented yet"}
+        if (
+            len(response_json) != expected_json_len
+            or not response_json.get("borrow_amount")
+        ):
+            prompt, _, _ = self.prompts.get_formatted_prompt("follow_up_token_borrow")
+            follow_up_response = self.ai.generate(prompt)
+            return {"response": follow_up_response.text + " \n " + json.dumps(response_json, default=str)}
+
+        token = response_json["borrow_token"]
+        collateral = response_json["collateral_token"]
+        amount = response_json["borrow_amount"]
+        try:
+            risk = self.kinetic_market.previewBorrow(user, token, amount, collateral)
+            txs = self.kinetic_market.borrowTx(user, token, amount, collateral, risk=risk)
+        except ValueError as e:
+            return {"response": f"Sorry, {e}"}
+
+        self.blockchain.add_tx_to_queue(msg=message, txs=txs)
+        formatted_preview = (
+            "Transaction Preview: "
+            + f"Borrowing {amount} {token} against {collateral} collateral"
+            + f"<br>Health factor after borrowing: {risk.health_factor:.2f}"
+            + f"<br>Type CONFIRM to proceed."
+        )
+        return {"response": await self.preflight_preview(formatted_preview)}
         
     
     
@@ -570,7 +648,7 @@ class ChatRouter:
         ):
             prompt, _, _ = self.prompts.get_formatted_prompt("follow_up_token_supply")
             follow_up_response = self.ai.generate(prompt)
-            return {"response": follow_up_response.text + " \n " + json.dumps(response_json)}
+            return {"response": follow_up_response.text + " \n " + json.dumps(response_json, default=str)}
         
         #if response_json["token"].lower() == "sflr" and response_json["token"] == False:
         tx = self.kinetic_market.supplySFLR(user, response_json["amount"])
@@ -581,7 +659,7 @@ class ChatRouter:
             + f"Supplying {response_json["amount"]} sFLR"
             + f"<br>Type CONFIRM to proceed."
         )
-        return {"response": formatted_preview}
+        return {"response": await self.preflight_preview(formatted_preview)}
         
         # Return stringified JSON
         #return {"response": "Sorry, we don't support that yet.<br>" + json.dumps(response_json)}
@@ -590,57 +668,28 @@ class ChatRouter:
     
     async def get_token_balances(self, user: UserInfo) -> dict[str, float]:
         """Fetch balances of FLR and ERC-20 tokens for the user."""
-        # ERC-20 ABI with balanceOf and decimals
-        ERC20_ABI = [
-            {
-                "inputs": [{"internalType": "address", "name": "account", "type": "address"}],
-                "name": "balanceOf",
-                "outputs": [{"internalType": "uint256", "name": "", "type": "uint256"}],
-                "stateMutability": "view",
-                "type": "function"
-            },
-            {
-                "inputs": [],
-                "name": "decimals",
-                "outputs": [{"internalType": "uint8", "name": "", "type": "uint8"}],
-                "stateMutability": "view",
-                "type": "function"
-            }
-        ]
-
-        # Token addresses from your provided data
-        token_addresses = {
-            "wflr": "0x1D80c49BbBCd1C0911346656B529DF9E5c2F783d",
-            "joule": "0xE6505f92583103AF7ed9974DEC451A7Af4e3A3bE",
-            "usdc": "0xFbDa5F676cB37624f28265A144A48B0d6e87d3b6",
-            "usdt": "0x0B38e83B86d491735fEaa0a791F65c2B99535396",
-            "weth": "0x1502FA4be69d526124D453619276FacCab275d3D",
-            "ksflr": "0x1812C40b5785AeD831EC4a0d675f30c5461Fd42E",
-            "sflr": "0x12e605bc104e93B45e1aD99F9e555f659051c2BB"
-        }
+        # Cache misses and epoch changes read the chain, so keep them off the event loop
+        return await asyncio.to_thread(self._token_balances, user)
 
+    def _token_balances(self, user: UserInfo) -> dict[str, float]:
+        balance_cache = self.blockchain.balances
         user_address = self.wallet_store.get_address(user)
-        balances = {}
-
-        # Fetch FLR balance (native token)
-        try:
-            flr_balance_wei = self.blockchain.w3.eth.get_balance(user_address)
-            balances["flr"] = float(self.blockchain.w3.from_wei(flr_balance_wei, "ether"))
-        except Exception as e:
-            self.logger.error("Failed to fetch FLR balance", error=str(e))
-            balances["flr"] = 0.0
-
-        # Fetch ERC-20 token balances
-        for token, address in token_addresses.items():
-            try:
-                contract = self.blockchain.w3.eth.contract(address=address, abi=ERC20_ABI)
-                decimals = contract.functions.decimals().call()
-                balance_wei = contract.functions.balanceOf(user_address).call()
-                balance = balance_wei / (10 ** decimals)
-                balances[token] = float(balance)
-            except Exception as e:
-                self.logger.error(f"Failed to fetch {token} balance", error=str(e))
-                balances[token] = 0.0
-
-        self.logger.debug("Fetched balances", balances=balances, user_id=user.user_id)
+        if user_address:
+            # Served from memory until a block touches the wallet
+            amounts = balance_cache.balances(user_address)
+        else:
+            amounts = {token: TokenAmount(0) for token in ["flr", *balance_cache.tokens]}
+
+        # Amounts stay exact until this single conversion for the JSON response
+        balances = {token: float(amount) for token, amount in amounts.items()}
+        # Prices are cached per FTSO voting epoch, so valuing costs no RPC
+        total_usd = Decimal(0)
+        for token, amount in amounts.items():
+            value = self.blockchain.prices.value(token, amount)
+            if value is not None:
+                balances[f"{token}_usd"] = float(value)
+                total_usd += value
+        balances["total_usd"] = float(total_usd)
+        table = dict(zip(amounts, format_amounts(list(amounts.values())), strict=True))
+        self.logger.debug("Fetched balances", balances=table, user_id=user.user_id)
         return balances
\ No newline at end of file
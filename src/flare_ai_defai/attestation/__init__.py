@@ -1,19 +1,27 @@
+from .fake_teeserver import FakeTeeServer
 from .vtpm_attestation import (
+    UnixHTTPConnection,
     Vtpm,
     VtpmAttestationError,
 )
 from .vtpm_validation import (
+    BatchValidationReport,
     CertificateParsingError,
     InvalidCertificateChainError,
     SignatureValidationError,
+    TokenValidationResult,
     VtpmValidation,
     VtpmValidationError,
 )
 
 __all__ = [
+    "BatchValidationReport",
     "CertificateParsingError",
+    "FakeTeeServer",
     "InvalidCertificateChainError",
     "SignatureValidationError",
+    "TokenValidationResult",
+    "UnixHTTPConnection",
     "Vtpm",
     "VtpmAttestationError",
     "VtpmValidation",
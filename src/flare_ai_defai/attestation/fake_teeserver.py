@@ -0,0 +1,130 @@
+"""
+Stand-in for the Confidential Space teeserver socket.
+
+Serves `POST /v1/token` over a Unix domain socket with HTTP/1.1 keep-alive, the
+same way the container launcher does, and answers with an unsigned JWT carrying
+the requested audience and nonces. Meant for tests and local development where
+`/run/container_launcher/teeserver.sock` does not exist.
+"""
+
+import json
+import socketserver
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+from pathlib import Path
+from types import TracebackType
+from typing import Self
+
+import jwt
+
+# Tokens are not meant to validate against Google's keys, only to be decodable.
+FAKE_SIGNING_KEY = "fake-teeserver-signing-key-not-secret"
+
+
+class _TokenHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "_UnixHTTPServer"
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        fake = self.server.fake
+        with fake.lock:
+            fake.requests.append(request)
+        if fake.delay:
+            time.sleep(fake.delay)
+
+        if fake.status != 200:  # noqa: PLR2004
+            body = b"error"
+            self.send_response(fake.status)
+        else:
+            now = int(time.time())
+            claims = {
+                "aud": request.get("audience"),
+                "eat_nonce": request.get("nonces"),
+                "iat": now,
+                "exp": now + fake.token_lifetime,
+                "iss": "https://confidentialcomputing.googleapis.com",
+                "n": len(fake.requests),
+            }
+            body = jwt.encode(claims, FAKE_SIGNING_KEY, algorithm="HS256").encode()
+            self.send_response(200)
+        self.send_header("Content-Type", "text/plain")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: object) -> None:  # noqa: A002
+        pass
+
+
+class _UnixHTTPServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: str, fake: "FakeTeeServer") -> None:
+        self.fake = fake
+        super().__init__(path, _TokenHandler)
+
+    def get_request(self) -> tuple:
+        request, _ = super().get_request()
+        with self.fake.lock:
+            self.fake.connections += 1
+        # BaseHTTPRequestHandler expects a (host, port) style client address.
+        return request, ("teeserver", 0)
+
+
+class FakeTeeServer:
+    """
+    Fake teeserver listening on a temporary Unix socket.
+
+    Attributes:
+        socket_path (str): Path clients should connect to
+        requests (list[dict]): Decoded token requests received so far
+        connections (int): Number of client connections accepted
+        token_lifetime (int): Seconds until issued tokens expire
+        delay (float): Artificial latency added to each response
+        status (int): HTTP status to answer with
+
+    Usage:
+        with FakeTeeServer() as tee:
+            vtpm = Vtpm(unix_socket_path=tee.socket_path)
+            vtpm.get_token(["0123456789"])
+    """
+
+    def __init__(
+        self, token_lifetime: int = 3600, delay: float = 0, status: int = 200
+    ) -> None:
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.socket_path = str(Path(self._tmpdir.name) / "teeserver.sock")
+        self.token_lifetime = token_lifetime
+        self.delay = delay
+        self.status = status
+        self.requests: list[dict] = []
+        self.connections = 0
+        self.lock = threading.Lock()
+        self._server = _UnixHTTPServer(self.socket_path, self)
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, args=(0.05,), daemon=True
+        )
+
+    def start(self) -> Self:
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        self._tmpdir.cleanup()
+
+    def __enter__(self) -> Self:
+        return self.start()
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        self.stop()
@@ -0,0 +1,81 @@
+"""
+Command line entry point for batch validation of vTPM attestation tokens.
+
+Reads JWTs (one per line) from files or stdin, validates them with
+`VtpmValidation.validate_many` and prints a JSON report with per-token
+results and throughput.
+
+Usage:
+    validate-attestation tokens.txt --workers 8
+    cat tokens.txt | validate-attestation -
+"""
+
+import argparse
+import json
+import sys
+from collections.abc import Sequence
+from pathlib import Path
+
+from flare_ai_defai.attestation.vtpm_validation import VtpmValidation
+
+
+def _read_tokens(sources: Sequence[str]) -> list[str]:
+    lines: list[str] = []
+    for source in sources:
+        text = sys.stdin.read() if source == "-" else Path(source).read_text()
+        lines.extend(text.splitlines())
+    return [line.strip() for line in lines if line.strip()]
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Validate Confidential Space attestation tokens in bulk."
+    )
+    parser.add_argument(
+        "sources", nargs="*", default=["-"], help="Token files, '-' for stdin"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Worker processes for signature checks (0 = in-process)",
+    )
+    parser.add_argument(
+        "--issuer",
+        default="https://confidentialcomputing.googleapis.com",
+        help="Expected token issuer",
+    )
+    parser.add_argument(
+        "--claims", action="store_true", help="Include validated claims in output"
+    )
+    args = parser.parse_args(argv)
+
+    tokens = _read_tokens(args.sources)
+    report = VtpmValidation(expected_issuer=args.issuer).validate_many(
+        tokens, max_workers=args.workers
+    )
+    output = {
+        "tokens": len(report.results),
+        "valid": report.valid_count,
+        "invalid": report.invalid_count,
+        "unique_groups": report.unique_groups,
+        "elapsed_seconds": round(report.elapsed_seconds, 4),
+        "tokens_per_second": round(report.tokens_per_second, 1),
+        "results": [
+            {
+                "index": result.index,
+                "valid": result.valid,
+                "group": result.group,
+                "error": result.error,
+                **({"claims": result.claims} if args.claims else {}),
+            }
+            for result in report.results
+        ],
+    }
+    json.dump(output, sys.stdout, indent=2, default=str)
+    sys.stdout.write("\n")
+    return 0 if report.invalid_count == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,16 +5,27 @@ This module provides a client to request attestation tokens from a local Unix do
 socket endpoint. It extends HTTPConnection to handle Unix socket communication and
 implements token request functionality with nonce validation.
 
+The client keeps one keep-alive connection to the teeserver (reconnecting when
+it drops), caches issued tokens until shortly before they expire, and coalesces
+concurrent requests for the same token into a single teeserver call.
+
 Classes:
     VtpmAttestationError: Exception for attestation service communication errors
-    VtpmAttestation: Client for requesting attestation tokens
+    UnixHTTPConnection: HTTPConnection over a Unix domain socket
+    Vtpm: Client for requesting attestation tokens
 """
 
+import asyncio
 import json
 import socket
-from http.client import HTTPConnection
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from http.client import HTTPConnection, HTTPException
 from pathlib import Path
 
+import jwt
 import structlog
 
 logger = structlog.get_logger(__name__)
@@ -27,6 +38,8 @@ def get_simulated_token() -> str:
 
 
 SIM_TOKEN = get_simulated_token()
+# Tokens kept at most; nonces are often per request, so keys rarely repeat.
+MAX_CACHED_TOKENS = 256
 
 
 class VtpmAttestationError(Exception):
@@ -38,6 +51,27 @@ class VtpmAttestationError(Exception):
     """
 
 
+class UnixHTTPConnection(HTTPConnection):
+    """HTTPConnection that connects to a Unix domain socket instead of TCP."""
+
+    def __init__(self, unix_socket_path: str, timeout: float = 10) -> None:
+        super().__init__("localhost", timeout=timeout)
+        self.unix_socket_path = unix_socket_path
+
+    def connect(self) -> None:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.settimeout(self.timeout)
+            sock.connect(self.unix_socket_path)
+        except OSError:
+            sock.close()
+            raise
+        self.sock = sock
+
+
+type TokenKey = tuple[str, str, frozenset[str]]
+
+
 class Vtpm:
     """
     Client for requesting attestation tokens via Unix domain socket."""
@@ -47,11 +81,31 @@ class Vtpm:
         url: str = "http://localhost/v1/token",
         unix_socket_path: str = "/run/container_launcher/teeserver.sock",
         simulate: bool = False,  # noqa: FBT001, FBT002
+        expiry_margin: float = 60,
+        max_cached: int = MAX_CACHED_TOKENS,
     ) -> None:
+        """
+        Args:
+            url: Token endpoint on the teeserver
+            unix_socket_path: Path of the teeserver Unix socket
+            simulate: Return the bundled simulated token instead
+            expiry_margin: Seconds before expiry at which a cached token is
+                considered stale
+            max_cached: Tokens kept, least recently used dropped first
+        """
         self.url = url
         self.unix_socket_path = unix_socket_path
         self.simulate = simulate
+        self.expiry_margin = expiry_margin
+        self.max_cached = max_cached
         self.attestation_requested: bool = False
+        self._conn: UnixHTTPConnection | None = None
+        self._conn_lock = threading.Lock()
+        # (token, expires_at) per (audience, token_type, nonce set)
+        self._token_cache: OrderedDict[TokenKey, tuple[str, float]] = OrderedDict()
+        # Requests currently waiting on the teeserver, shared by identical callers
+        self._in_flight: dict[TokenKey, Future[str]] = {}
+        self._cache_lock = threading.Lock()
         self.logger = logger.bind(router="vtpm")
         self.logger.debug(
             "vtpm", simulate=simulate, url=url, unix_socket_path=self.unix_socket_path
@@ -90,7 +144,9 @@ class Vtpm:
 
         Requests a token with specified nonces for replay protection,
         targeted at the specified audience. Supports both OIDC and PKI
-        token types.
+        token types. Tokens are served from cache until `expiry_margin`
+        seconds before they expire, and concurrent identical requests share
+        a single teeserver call.
 
         Args:
             nonces: List of random nonce strings for replay protection
@@ -117,30 +173,119 @@ class Vtpm:
             self.logger.debug("sim_token", token=SIM_TOKEN)
             return SIM_TOKEN
 
-        # Connect to the socket
-        client_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
-        client_socket.connect(self.unix_socket_path)
+        key: TokenKey = (audience, token_type, frozenset(nonces))
+        with self._cache_lock:
+            cached = self._token_cache.get(key)
+            if cached and cached[1] - self.expiry_margin > time.time():
+                self._token_cache.move_to_end(key)
+                self.logger.debug("token_cache_hit", token_type=token_type)
+                return cached[0]
+            future = self._in_flight.get(key)
+            owner = future is None
+            if future is None:
+                future = Future()
+                self._in_flight[key] = future
+
+        if not owner:
+            # Someone else is already asking the teeserver for this token.
+            return future.result()
+
+        try:
+            token = self._request_token(audience, token_type, nonces)
+        except BaseException as e:
+            with self._cache_lock:
+                del self._in_flight[key]
+            future.set_exception(e)
+            raise
 
-        # Create an HTTP connection object
-        conn = HTTPConnection("localhost", timeout=10)
-        conn.sock = client_socket
+        expires_at = self._token_expiry(token)
+        with self._cache_lock:
+            if expires_at is not None:
+                self._store_token(key, token, expires_at)
+            del self._in_flight[key]
+        future.set_result(token)
+        return token
+
+    def _store_token(self, key: TokenKey, token: str, expires_at: float) -> None:
+        """Cache a token, dropping stale ones and then the least recently used."""
+        stale_before = time.time() + self.expiry_margin
+        for old_key, (_, old_expiry) in list(self._token_cache.items()):
+            if old_expiry <= stale_before:
+                del self._token_cache[old_key]
+        self._token_cache[key] = (token, expires_at)
+        self._token_cache.move_to_end(key)
+        while len(self._token_cache) > self.max_cached:
+            self._token_cache.popitem(last=False)
 
-        # Send a POST request
+    async def get_token_async(
+        self,
+        nonces: list[str],
+        audience: str = "https://sts.google.com",
+        token_type: str = "OIDC",  # noqa: S107
+    ) -> str:
+        """
+        Request an attestation token without blocking the event loop.
+
+        Same semantics as `get_token`; the teeserver call runs in a worker thread.
+        """
+        return await asyncio.to_thread(self.get_token, nonces, audience, token_type)
+
+    def _request_token(self, audience: str, token_type: str, nonces: list[str]) -> str:
+        """
+        POST a token request over the persistent teeserver connection.
+
+        A stale keep-alive connection is replaced and the request retried once.
+
+        Raises:
+            VtpmAttestationError: If the teeserver is unreachable or refuses
+        """
         headers = {"Content-Type": "application/json"}
         body = json.dumps(
             {"audience": audience, "token_type": token_type, "nonces": nonces}
         )
-        conn.request("POST", self.url, body=body, headers=headers)
+        with self._conn_lock:
+            for attempt in range(2):
+                if self._conn is None:
+                    self._conn = UnixHTTPConnection(self.unix_socket_path)
+                try:
+                    self._conn.request("POST", self.url, body=body, headers=headers)
+                    res = self._conn.getresponse()
+                    payload = res.read()
+                except (OSError, HTTPException) as e:
+                    self._close_connection()
+                    if attempt:
+                        msg = f"Failed to reach attestation service: {e}"
+                        raise VtpmAttestationError(msg) from e
+                    self.logger.debug("teeserver_reconnect", error=str(e))
+                    continue
+                if res.will_close:
+                    self._close_connection()
+                break
 
-        # Get and decode the response
-        res = conn.getresponse()
         success_status = 200
         if res.status != success_status:
             msg = f"Failed to get attestation response: {res.status} {res.reason}"
             raise VtpmAttestationError(msg)
-        token = res.read().decode()
+        token = payload.decode()
         self.logger.debug("token", token_type=token_type, token=token)
-
-        # Close the connection
-        conn.close()
         return token
+
+    def _close_connection(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    @staticmethod
+    def _token_expiry(token: str) -> float | None:
+        """Read the exp claim of a JWT, or None if it has none."""
+        try:
+            claims = jwt.decode(token, options={"verify_signature": False})
+        except jwt.InvalidTokenError:
+            return None
+        exp = claims.get("exp")
+        return float(exp) if exp is not None else None
+
+    def close(self) -> None:
+        """Close the teeserver connection."""
+        with self._conn_lock:
+            self._close_connection()
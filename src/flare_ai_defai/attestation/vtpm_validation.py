@@ -10,6 +10,9 @@ Classes:
     CertificateParsingError: Raised when certificate parsing fails
     SignatureValidationError: Raised when signature verification fails
     PKICertificates: Container for certificate chain components
+    ValidationKeyCache: TTL cache for discovery documents, JWKS keys and root cert
+    TokenValidationResult: Outcome of validating one token in a batch
+    BatchValidationReport: Per-token results and throughput of a batch
     VtpmValidation: Main validator class for vTPM token verification
 
 Constants:
@@ -22,8 +25,13 @@ Constants:
 import base64
 import datetime
 import hashlib
+import os
 import re
-from dataclasses import dataclass
+import threading
+import time
+from collections.abc import Sequence
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
 from typing import Any, Final
 
 import jwt
@@ -83,6 +91,199 @@ CERT_FINGERPRINT: Final[str] = (
 )
 
 
+class ValidationKeyCache:
+    """
+    Caches everything token validation needs from the issuer.
+
+    The OpenID configuration and JWKS are kept for `ttl` seconds, parsed RSA
+    public keys are memoized by kid, and the root certificate is fetched and
+    fingerprint-checked once per `root_cert_ttl`. A token signed with an unknown
+    kid forces a JWKS refresh (at most once per `min_refresh_interval`) so key
+    rotation is picked up without waiting for the TTL.
+
+    Args:
+        expected_issuer: Base URL of the token issuer
+        oidc_endpoint: Path to OpenID Connect configuration
+        pki_endpoint: Path to root certificate
+        ttl: Lifetime of the discovery document and JWKS in seconds
+        root_cert_ttl: Lifetime of the root certificate in seconds
+        min_refresh_interval: Minimum seconds between kid-miss refreshes
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        expected_issuer: str,
+        oidc_endpoint: str,
+        pki_endpoint: str,
+        ttl: float = 3600,
+        root_cert_ttl: float = 86400,
+        min_refresh_interval: float = 30,
+    ) -> None:
+        self.expected_issuer = expected_issuer
+        self.oidc_endpoint = oidc_endpoint
+        self.pki_endpoint = pki_endpoint
+        self.ttl = ttl
+        self.root_cert_ttl = root_cert_ttl
+        self.min_refresh_interval = min_refresh_interval
+        self._keys: dict[str, rsa.RSAPublicKey] = {}
+        self._keys_expire_at = 0.0
+        self._keys_fetched_at = 0.0
+        self._root_cert: x509.Certificate | None = None
+        self._root_cert_expires_at = 0.0
+        self._lock = threading.Lock()
+        self.logger = logger.bind(router="vtpm_key_cache")
+
+    def get_rsa_key(self, kid: str) -> rsa.RSAPublicKey:
+        """
+        Return the issuer's RSA public key for a key ID.
+
+        Raises:
+            VtpmValidationError: If the kid is not in the issuer's JWKS
+        """
+        with self._lock:
+            now = time.monotonic()
+            if now >= self._keys_expire_at:
+                self._refresh_keys(now)
+            elif (
+                kid not in self._keys
+                and now - self._keys_fetched_at >= self.min_refresh_interval
+            ):
+                self.logger.info("kid_miss_refresh", kid=kid)
+                self._refresh_keys(now)
+            key = self._keys.get(kid)
+        if key is None:
+            msg = "Unable to find appropriate key id (kid) in header"
+            raise VtpmValidationError(msg)
+        return key
+
+    def _refresh_keys(self, now: float) -> None:
+        config = VtpmValidation._get_well_known_file(  # noqa: SLF001
+            self.expected_issuer, self.oidc_endpoint
+        ).json()
+        jwks = VtpmValidation._fetch_jwks(config["jwks_uri"])  # noqa: SLF001
+        self._keys = {
+            key["kid"]: VtpmValidation._jwk_to_rsa_key(key)  # noqa: SLF001
+            for key in jwks["keys"]
+            if key.get("kid")
+        }
+        self._keys_fetched_at = now
+        self._keys_expire_at = now + self.ttl
+        self.logger.info("jwks_refreshed", kids=list(self._keys))
+
+    def get_root_cert(self) -> x509.Certificate:
+        """
+        Return the trusted root certificate, checked against CERT_FINGERPRINT.
+
+        Raises:
+            VtpmValidationError: If the fetched root has an unexpected fingerprint
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self._root_cert is None or now >= self._root_cert_expires_at:
+                res = VtpmValidation._get_well_known_file(  # noqa: SLF001
+                    self.expected_issuer, self.pki_endpoint
+                ).content
+                root_cert = x509.load_pem_x509_certificate(res, default_backend())
+                fingerprint = root_cert.fingerprint(hashes.SHA1())  # noqa: S303
+                calculated_fingerprint = ":".join(
+                    format(b, "02x") for b in fingerprint
+                ).upper()
+                if calculated_fingerprint != CERT_FINGERPRINT:
+                    msg = (
+                        "Root certificate fingerprint does not match expected "
+                        f"fingerprint. Expected: {CERT_FINGERPRINT}, "
+                        f"Received: {calculated_fingerprint}"
+                    )
+                    raise VtpmValidationError(msg)
+                self._root_cert = root_cert
+                self._root_cert_expires_at = now + self.root_cert_ttl
+            return self._root_cert
+
+
+@dataclass(frozen=True)
+class VerifiedChain:
+    """
+    Outcome of a successful certificate chain verification.
+
+    Attributes:
+        public_pem: PEM encoded public key of the leaf certificate
+        not_before: Latest not-before date across the chain
+        not_after: Earliest not-after date across the chain
+    """
+
+    public_pem: bytes
+    not_before: datetime.datetime
+    not_after: datetime.datetime
+
+
+@dataclass(frozen=True)
+class TokenValidationResult:
+    """
+    Outcome of validating one token from a batch.
+
+    Attributes:
+        index: Position of the token in the input sequence
+        valid: Whether the token passed validation
+        group: Key ID or leaf certificate fingerprint the token was checked with
+        claims: Validated claims if valid
+        error: Failure reason if not valid
+    """
+
+    index: int
+    valid: bool
+    group: str | None = None
+    claims: dict[str, Any] | None = None
+    error: str | None = None
+
+
+@dataclass
+class BatchValidationReport:
+    """
+    Results of `VtpmValidation.validate_many`.
+
+    Attributes:
+        results: One result per input token, in input order
+        unique_groups: Number of distinct keys / certificate chains verified
+        elapsed_seconds: Wall-clock time for the whole batch
+    """
+
+    results: list[TokenValidationResult] = field(default_factory=list)
+    unique_groups: int = 0
+    elapsed_seconds: float = 0.0
+
+    @property
+    def valid_count(self) -> int:
+        return sum(result.valid for result in self.results)
+
+    @property
+    def invalid_count(self) -> int:
+        return len(self.results) - self.valid_count
+
+    @property
+    def tokens_per_second(self) -> float:
+        if not self.elapsed_seconds:
+            return 0.0
+        return len(self.results) / self.elapsed_seconds
+
+
+# Below this many signature checks a process pool costs more than it saves.
+PARALLEL_THRESHOLD: Final[int] = 64
+
+
+def _verify_signature(
+    job: tuple[int, str, str, bytes, bool],
+) -> TokenValidationResult:
+    """Check one token signature; runs in a worker process."""
+    index, group, token, public_pem, verify_aud = job
+    try:
+        claims = jwt.decode(
+            token, public_pem, algorithms=[ALGO], options={"verify_aud": verify_aud}
+        )
+    except jwt.InvalidTokenError as e:
+        return TokenValidationResult(index, valid=False, group=group, error=str(e))
+    return TokenValidationResult(index, valid=True, group=group, claims=claims)
+
+
 class VtpmValidation:
     """
     Validates Confidential Space vTPM tokens through PKI or OIDC schemes.
@@ -97,6 +298,11 @@ class VtpmValidation:
             (default: /.well-known/openid-configuration)
         pki_endpoint: Path to root certificate
             (default: /.well-known/confidential_space_root.crt)
+        key_cache: Cache of issuer keys, shared between validators if given
+
+    Issuer keys, the root certificate and verified certificate chains (keyed by
+    leaf certificate fingerprint) are cached, so validating a token normally
+    costs a single signature check and no network round-trips.
 
     Usage:
         validator = VtpmValidation()
@@ -112,10 +318,17 @@ class VtpmValidation:
         expected_issuer: str = "https://confidentialcomputing.googleapis.com",
         oidc_endpoint: str = "/.well-known/openid-configuration",
         pki_endpoint: str = "/.well-known/confidential_space_root.crt",
+        key_cache: ValidationKeyCache | None = None,
     ) -> None:
         self.expected_issuer = expected_issuer
         self.oidc_endpoint = oidc_endpoint
         self.pki_endpoint = pki_endpoint
+        self.key_cache = key_cache or ValidationKeyCache(
+            expected_issuer, oidc_endpoint, pki_endpoint
+        )
+        # Verified chains keyed by the SHA-256 of the leaf certificate (x5c[0])
+        self._verified_chains: dict[str, VerifiedChain] = {}
+        self._chain_lock = threading.Lock()
         self.logger = logger.bind(router="vtpm_validation")
 
     def validate_token(self, token: str) -> dict[str, Any]:
@@ -153,14 +366,109 @@ class VtpmValidation:
         self.logger.info("OIDC_token", alg=unverified_header.get("alg"))
         return self._decode_and_validate_oidc(token, unverified_header)
 
+    def validate_many(
+        self, tokens: Sequence[str], max_workers: int | None = None
+    ) -> BatchValidationReport:
+        """
+        Validate a batch of tokens, e.g. from logs or replay evidence.
+
+        Tokens are grouped by OIDC key ID or by PKI leaf certificate. Each
+        group's key or certificate chain is resolved and verified once, then
+        the per-token signature checks run in parallel across a process pool.
+
+        Args:
+            tokens: JWT token strings to validate
+            max_workers: Worker processes for signature checks; 0 checks
+                signatures in-process (default: one per CPU)
+
+        Returns:
+            BatchValidationReport: Per-token results in input order
+        """
+        start = time.perf_counter()
+        results: dict[int, TokenValidationResult] = {}
+        group_keys: dict[str, bytes] = {}
+        group_errors: dict[str, str] = {}
+        jobs: list[tuple[int, str, str, bytes, bool]] = []
+
+        for index, token in enumerate(tokens):
+            group = None
+            try:
+                header = jwt.get_unverified_header(token)
+                if header.get("alg") != ALGO:
+                    msg = f"Invalid algorithm: got {header.get('alg')}, expected {ALGO}"
+                    raise VtpmValidationError(msg)
+                x5c_headers = header.get("x5c")
+                verify_aud = bool(x5c_headers)
+                if x5c_headers:
+                    group = "x5c:" + hashlib.sha256(x5c_headers[0].encode()).hexdigest()
+                else:
+                    group = f"kid:{header.get('kid')}"
+                if group in group_errors:
+                    raise VtpmValidationError(group_errors[group])
+                if group not in group_keys:
+                    group_keys[group] = self._resolve_group_key(header)
+            except (VtpmValidationError, jwt.InvalidTokenError) as e:
+                if group is not None and group not in group_keys:
+                    group_errors[group] = str(e)
+                results[index] = TokenValidationResult(
+                    index, valid=False, group=group, error=str(e)
+                )
+                continue
+            jobs.append((index, group, token, group_keys[group], verify_aud))
+
+        workers = (os.cpu_count() or 1) if max_workers is None else max_workers
+        if workers > 1 and len(jobs) >= PARALLEL_THRESHOLD:
+            chunksize = max(1, len(jobs) // (workers * 4))
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                checked = list(pool.map(_verify_signature, jobs, chunksize=chunksize))
+        else:
+            checked = [_verify_signature(job) for job in jobs]
+        results.update((result.index, result) for result in checked)
+
+        report = BatchValidationReport(
+            results=[results[i] for i in range(len(tokens))],
+            unique_groups=len(group_keys),
+            elapsed_seconds=time.perf_counter() - start,
+        )
+        self.logger.info(
+            "batch_validated",
+            tokens=len(tokens),
+            valid=report.valid_count,
+            unique_groups=report.unique_groups,
+            tokens_per_second=round(report.tokens_per_second, 1),
+        )
+        return report
+
+    def _resolve_group_key(self, unverified_header: dict[str, Any]) -> bytes:
+        """
+        Return the PEM public key that signs tokens with this header.
+
+        Raises:
+            VtpmValidationError: If the key cannot be resolved, including
+                failures fetching the chain's root or the issuer's JWKS
+        """
+        try:
+            if unverified_header.get("x5c"):
+                return self._get_verified_chain(unverified_header).public_pem
+            rsa_key = self.key_cache.get_rsa_key(unverified_header.get("kid", ""))
+            return rsa_key.public_bytes(
+                encoding=serialization.Encoding.PEM,
+                format=serialization.PublicFormat.SubjectPublicKeyInfo,
+            )
+        except VtpmValidationError:
+            raise
+        except Exception as e:
+            msg = f"Unexpected error during validation: {e}"
+            raise VtpmValidationError(msg) from e
+
     def _decode_and_validate_oidc(
         self, token: str, unverified_header: dict[str, str]
     ) -> dict[str, Any]:
         """
         Validates a token using OIDC JWKS-based validation.
 
-        Fetches the JWKS from the issuer's endpoint, finds the matching key by key ID,
-        and validates the token signature.
+        Looks up the issuer key matching the key ID in the cached JWKS and
+        validates the token signature.
 
         Args:
             token: The JWT token string
@@ -173,22 +481,8 @@ class VtpmValidation:
             VtpmValidationError: For any validation failure
             SignatureValidationError: If signature validation fails
         """
-        res = self._get_well_known_file(self.expected_issuer, self.oidc_endpoint).json()
-        jwks_uri = res["jwks_uri"]
-
-        jwks = self._fetch_jwks(jwks_uri)
-        rsa_key = None
-
-        # Find the correct key based on the key ID (kid) in header
-        for key in jwks["keys"]:
-            if key.get("kid") == unverified_header["kid"]:
-                self.logger.info("kid_match", kid=key["kid"])
-                rsa_key = self._jwk_to_rsa_key(key)
-                break
-
-        if rsa_key is None:
-            msg = "Unable to find appropriate key id (kid) in header"
-            raise VtpmValidationError(msg)
+        rsa_key = self.key_cache.get_rsa_key(unverified_header["kid"])
+        self.logger.info("kid_match", kid=unverified_header["kid"])
 
         # Verify and decode the token using the public RSA key
         try:
@@ -236,27 +530,8 @@ class VtpmValidation:
             VtpmValidationError: For any validation failure
             InvalidCertificateChainError: If certificate chain validation fails
         """
-        res = self._get_well_known_file(self.expected_issuer, self.pki_endpoint).content
-        root_cert = x509.load_pem_x509_certificate(res, default_backend())
-        fingerprint = root_cert.fingerprint(hashes.SHA1())  # noqa: S303
-        calculated_fingerprint = ":".join(format(b, "02x") for b in fingerprint).upper()
-
-        if calculated_fingerprint != CERT_FINGERPRINT:
-            msg = "Root certificate fingerprint does not match expected fingerprint."
-            f"Expected: {CERT_FINGERPRINT}, Received: {calculated_fingerprint}"
-            raise VtpmValidationError(msg)
         try:
-            certs = self._extract_and_validate_certificates(unverified_header)
-            self._validate_leaf_certificate(certs.leaf_cert)
-            self._compare_root_certificates(certs.root_cert, root_cert)
-            self._check_certificate_validity(certs)
-            self._verify_certificate_chain(certs)
-
-            public_key = certs.leaf_cert.public_key()
-            public_pem = public_key.public_bytes(
-                encoding=serialization.Encoding.PEM,
-                format=serialization.PublicFormat.SubjectPublicKeyInfo,
-            )
+            public_pem = self._get_verified_chain(unverified_header).public_pem
 
             return jwt.decode(
                 token,
@@ -266,10 +541,66 @@ class VtpmValidation:
         except (InvalidKey, jwt.InvalidTokenError) as e:
             msg = f"Token signature validation failed: {e}"
             raise VtpmValidationError(msg) from e
+        except VtpmValidationError:
+            raise
         except Exception as e:
             msg = f"Unexpected error during validation: {e}"
             raise VtpmValidationError(msg) from e
 
+    def _get_verified_chain(self, unverified_header: dict[str, Any]) -> VerifiedChain:
+        """
+        Verify the x5c chain in a token header, memoized by leaf certificate.
+
+        The first token carrying a given leaf certificate pays for parsing,
+        root comparison and OpenSSL chain verification; later tokens with the
+        same leaf reuse the result.
+
+        Args:
+            unverified_header: Token header containing x5c certificates
+
+        Returns:
+            VerifiedChain: Leaf public key and the chain's validity window
+
+        Raises:
+            VtpmValidationError: If the chain cannot be verified
+        """
+        x5c_headers = unverified_header.get("x5c") or [""]
+        leaf_fingerprint = hashlib.sha256(x5c_headers[0].encode()).hexdigest()
+        with self._chain_lock:
+            cached = self._verified_chains.get(leaf_fingerprint)
+        if cached is not None:
+            self._check_chain_window(cached)
+            return cached
+
+        root_cert = self.key_cache.get_root_cert()
+        certs = self._extract_and_validate_certificates(unverified_header)
+        self._validate_leaf_certificate(certs.leaf_cert)
+        self._compare_root_certificates(certs.root_cert, root_cert)
+        self._check_certificate_validity(certs)
+        self._verify_certificate_chain(certs)
+
+        chain_certs = (certs.leaf_cert, certs.intermediate_cert, certs.root_cert)
+        chain = VerifiedChain(
+            public_pem=certs.leaf_cert.public_key().public_bytes(
+                encoding=serialization.Encoding.PEM,
+                format=serialization.PublicFormat.SubjectPublicKeyInfo,
+            ),
+            not_before=max(c.not_valid_before_utc for c in chain_certs),
+            not_after=min(c.not_valid_after_utc for c in chain_certs),
+        )
+        self._check_chain_window(chain)
+        with self._chain_lock:
+            self._verified_chains[leaf_fingerprint] = chain
+        return chain
+
+    @staticmethod
+    def _check_chain_window(chain: VerifiedChain) -> None:
+        """Raise if the current time is outside the chain's validity window."""
+        current_time = datetime.datetime.now(tz=datetime.UTC)
+        if not chain.not_before <= current_time <= chain.not_after:
+            msg = "Certificate chain is not valid at the current time"
+            raise InvalidCertificateChainError(msg)
+
     @staticmethod
     def _get_well_known_file(
         expected_issuer: str, well_known_path: str
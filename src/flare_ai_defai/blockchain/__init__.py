@@ -1,6 +1,65 @@
 from .flare import FlareProvider
-from .explorer import FlareExplorer
+from .allowances import AllowanceTracker
+from .amounts import TokenAmount
+from .balances import BalanceCache
+from .block_watcher import BlockHeader, BlockWatcher
+from .explorer import AsyncFlareExplorer, FlareExplorer, RateLimiter
+from .ftso import FeedPrice, PriceService
+from .gas_model import GasModel
+from .history import HistoryIndexer
+from .kinetic_indexer import AccountSnapshot, KineticIndexer, MarketData
 from .kinetic_market import KineticMarket
+from .kinetic_risk import AccountRisk, RiskEngine
+from .local_chain import LocalChain
+from .local_contracts import LocalFlare
+from .multicall import Multicall
+from .preflight import BundleSimulation, BundleSimulator
+from .pool_cache import PoolState, PoolStateCache
+from .quoter import SparkDEXQuoter, SwapQuote
+from .routing import Hop, Route, RouteFinder, SplitRoute
+from .rpc_cache import RPCCache
+from .rpc_pool import RPCPool
 from .sparkdex import SparkDEX
+from .universal_router import RouterPlan
+from .v3_simulator import PoolSnapshot, SimulatedSwap
 
-__all__ = ["FlareProvider", "FlareExplorer", "KineticMarket", "SparkDEX"]
+__all__ = [
+    "AccountRisk",
+    "AccountSnapshot",
+    "AllowanceTracker",
+    "AsyncFlareExplorer",
+    "BalanceCache",
+    "BlockHeader",
+    "BlockWatcher",
+    "BundleSimulation",
+    "BundleSimulator",
+    "FeedPrice",
+    "FlareExplorer",
+    "FlareProvider",
+    "GasModel",
+    "HistoryIndexer",
+    "Hop",
+    "KineticIndexer",
+    "KineticMarket",
+    "LocalChain",
+    "LocalFlare",
+    "MarketData",
+    "Multicall",
+    "PoolSnapshot",
+    "PoolState",
+    "PoolStateCache",
+    "PriceService",
+    "RateLimiter",
+    "RiskEngine",
+    "Route",
+    "RouteFinder",
+    "RouterPlan",
+    "RPCCache",
+    "RPCPool",
+    "SparkDEX",
+    "SimulatedSwap",
+    "SplitRoute",
+    "SparkDEXQuoter",
+    "SwapQuote",
+    "TokenAmount",
+]
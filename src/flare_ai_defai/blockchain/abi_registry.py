@@ -0,0 +1,215 @@
+"""
+ABI Registry Module
+
+This module keeps every ABI the blockchain layer uses in one place. Each ABI
+is parsed once (at import, or lazily on first use for ABIs fetched from the
+explorer), its function selectors and event topics are precomputed, and
+contract factories/instances are cached per Web3 instance so building a
+transaction never reconstructs ABI lists or contract objects.
+"""
+
+import threading
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from weakref import WeakKeyDictionary
+
+import structlog
+from eth_utils.abi import (
+    abi_to_signature,
+    event_abi_to_log_topic,
+    function_abi_to_4byte_selector,
+)
+from web3 import Web3
+from web3.contract import Contract
+
+from flare_ai_defai.blockchain import abi_lib
+from flare_ai_defai.blockchain.abi_lib import ABI
+
+logger = structlog.get_logger(__name__)
+
+
+@dataclass(frozen=True)
+class ParsedABI:
+    """
+    An ABI together with its precomputed lookup tables.
+
+    Attributes:
+        name (str): Registry name of the ABI
+        abi (ABI): The raw ABI entries
+        selectors (dict[str, bytes]): 4-byte selectors keyed by function
+            name and by full signature (e.g. ``approve(address,uint256)``)
+        topics (dict[str, bytes]): Event topic0 keyed by event name and signature
+    """
+
+    name: str
+    abi: ABI
+    selectors: dict[str, bytes] = field(default_factory=dict)
+    topics: dict[str, bytes] = field(default_factory=dict)
+
+    @classmethod
+    def parse(cls, name: str, abi: ABI) -> "ParsedABI":
+        selectors: dict[str, bytes] = {}
+        topics: dict[str, bytes] = {}
+        for entry in abi:
+            if entry.get("type") == "function":
+                selector = function_abi_to_4byte_selector(entry)
+                selectors[abi_to_signature(entry)] = selector
+                # Overloaded names resolve to the first definition.
+                selectors.setdefault(entry["name"], selector)
+            elif entry.get("type") == "event":
+                topic = event_abi_to_log_topic(entry)
+                topics[abi_to_signature(entry)] = topic
+                topics.setdefault(entry["name"], topic)
+        return cls(name=name, abi=abi, selectors=selectors, topics=topics)
+
+
+class AbiRegistry:
+    """
+    Registry of named ABIs with cached contract factories.
+
+    Attributes:
+        _parsed (dict[str, ParsedABI]): ABIs that have been parsed
+        _loaders (dict[str, Callable[[], ABI]]): Deferred ABI sources, e.g.
+            an explorer lookup, resolved on first use
+        _load_locks (dict[str, threading.Lock]): Per-name locks so concurrent
+            first lookups of a lazy ABI run its loader once
+        _factories (WeakKeyDictionary): Per-Web3 contract factory cache
+        _instances (WeakKeyDictionary): Per-Web3 contract instance cache
+    """
+
+    def __init__(self) -> None:
+        self._parsed: dict[str, ParsedABI] = {}
+        self._loaders: dict[str, Callable[[], ABI]] = {}
+        self._load_locks: dict[str, threading.Lock] = {}
+        self._factories: WeakKeyDictionary[Web3, dict[str, type[Contract]]] = (
+            WeakKeyDictionary()
+        )
+        self._instances: WeakKeyDictionary[Web3, dict[tuple[str, str], Contract]] = (
+            WeakKeyDictionary()
+        )
+        self._lock = threading.Lock()
+        self.logger = logger.bind(router="abi_registry")
+
+    def register(self, name: str, abi: ABI) -> ParsedABI:
+        """
+        Parse and register an ABI under a name.
+
+        Args:
+            name (str): Registry name
+            abi (ABI): ABI entries
+
+        Returns:
+            ParsedABI: The parsed ABI
+        """
+        parsed = ParsedABI.parse(name, abi)
+        with self._lock:
+            self._parsed[name] = parsed
+            self._loaders.pop(name, None)
+        return parsed
+
+    def register_lazy(self, name: str, loader: Callable[[], ABI]) -> None:
+        """
+        Register an ABI that is only fetched and parsed when first needed.
+
+        Args:
+            name (str): Registry name
+            loader (Callable[[], ABI]): Returns the ABI, called at most once
+        """
+        with self._lock:
+            if name not in self._parsed:
+                self._loaders[name] = loader
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._parsed or name in self._loaders
+
+    def get(self, name: str) -> ParsedABI:
+        """
+        Look up a parsed ABI, resolving a lazy loader if necessary.
+
+        Raises:
+            KeyError: If no ABI is registered under the name
+        """
+        parsed = self._parsed.get(name)
+        if parsed is not None:
+            return parsed
+        with self._lock:
+            load_lock = self._load_locks.setdefault(name, threading.Lock())
+        with load_lock:
+            # Another thread may have loaded it while this one waited.
+            parsed = self._parsed.get(name)
+            if parsed is not None:
+                return parsed
+            loader = self._loaders.get(name)
+            if loader is None:
+                msg = f"No ABI registered under '{name}'"
+                raise KeyError(msg)
+            self.logger.debug("loading_lazy_abi", name=name)
+            return self.register(name, loader())
+
+    def abi(self, name: str) -> ABI:
+        return self.get(name).abi
+
+    def selector(self, name: str, function: str) -> bytes:
+        """Return the 4-byte selector for a function name or signature."""
+        return self.get(name).selectors[function]
+
+    def topic(self, name: str, event: str) -> bytes:
+        """Return topic0 for an event name or signature."""
+        return self.get(name).topics[event]
+
+    def factory(self, w3: Web3, name: str) -> type[Contract]:
+        """
+        Return the contract factory for an ABI, built once per Web3 instance.
+
+        Args:
+            w3 (Web3): Web3 instance the contract talks through
+            name (str): Registry name of the ABI
+        """
+        factories = self._factories.setdefault(w3, {})
+        factory = factories.get(name)
+        if factory is None:
+            factory = w3.eth.contract(abi=self.abi(name))
+            factories[name] = factory
+        return factory
+
+    def contract(self, w3: Web3, name: str, address: str) -> Contract:
+        """
+        Return a contract bound to an address, built once per Web3 instance.
+
+        Args:
+            w3 (Web3): Web3 instance the contract talks through
+            name (str): Registry name of the ABI
+            address (str): Contract address, any casing
+
+        Returns:
+            Contract: Cached contract instance
+        """
+        checksum_address = Web3.to_checksum_address(address)
+        instances = self._instances.setdefault(w3, {})
+        key = (name, checksum_address)
+        contract = instances.get(key)
+        if contract is None:
+            contract = self.factory(w3, name)(address=checksum_address)
+            instances[key] = contract
+        return contract
+
+
+abi_registry = AbiRegistry()
+abi_registry.register("erc20", abi_lib.ERC20_ABI)
+abi_registry.register("wflr", abi_lib.WFLR_ABI)
+abi_registry.register("sflr", abi_lib.SFLR_ABI)
+abi_registry.register("joule", abi_lib.JOULE_ABI)
+abi_registry.register("swap_router", abi_lib.SWAP_ROUTER_ABI)
+abi_registry.register("universal_router", abi_lib.UNIVERSAL_ROUTER_ABI)
+abi_registry.register("ktoken", abi_lib.KTOKEN_ABI)
+abi_registry.register("kinetic_comptroller", abi_lib.KINETIC_COMPTROLLER_ABI)
+abi_registry.register("kinetic_oracle", abi_lib.KINETIC_ORACLE_ABI)
+abi_registry.register("multicall3", abi_lib.MULTICALL3_ABI)
+abi_registry.register("quoter_v2", abi_lib.QUOTER_V2_ABI)
+abi_registry.register("v3_factory", abi_lib.V3_FACTORY_ABI)
+abi_registry.register("v3_pool", abi_lib.V3_POOL_ABI)
+abi_registry.register("v2_factory", abi_lib.V2_FACTORY_ABI)
+abi_registry.register("v2_pair", abi_lib.V2_PAIR_ABI)
+abi_registry.register("permit2", abi_lib.PERMIT2_ABI)
+abi_registry.register("flare_contract_registry", abi_lib.FLARE_CONTRACT_REGISTRY_ABI)
+abi_registry.register("ftso_v2", abi_lib.FTSO_V2_ABI)
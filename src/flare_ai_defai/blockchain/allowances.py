@@ -0,0 +1,368 @@
+"""
+Token Allowance Tracker
+
+Caches ERC-20 `allowance(owner, spender)` and Permit2 `allowance(owner, token,
+spender)` values per (owner, token, spender) so a swap only queues an
+`approve` when the spender cannot already pull the input. Missing values are
+read in one multicall; afterwards the cache is moved forward by replaying the
+owners' `Approval` events and Permit2 `Lockdown` events, which revoke an
+allowance without an `Approval`. Approvals are only cached once their event
+is seen, while spends are deducted as soon as they are queued, so for wallets
+that only spend through the app a stale value causes a redundant approval
+rather than a missing one. Events are only replayed up to `head_lag`
+blocks below the head, so a reorg near the tip cannot leave an allowance
+cached that a dropped `Approval` or `Lockdown` no longer supports.
+"""
+
+import threading
+from collections.abc import Iterable
+from typing import Literal
+
+import structlog
+from eth_typing import ChecksumAddress
+from hexbytes import HexBytes
+from web3 import Web3
+from web3.types import LogReceipt
+
+from flare_ai_defai.blockchain.abi_registry import abi_registry
+from flare_ai_defai.blockchain.block_watcher import HEAD_LAG_BLOCKS, BlockHeader
+from flare_ai_defai.blockchain.multicall import Call, Multicall
+from flare_ai_defai.blockchain.pool_cache import MAX_LOG_RANGE
+from flare_ai_defai.blockchain.universal_router import PERMIT2_ADDRESS
+
+logger = structlog.get_logger(__name__)
+
+MAX_UINT256 = 2**256 - 1
+MAX_UINT160 = 2**160 - 1
+# Permit2 allowances are granted for this long when no expiry is given.
+PERMIT2_EXPIRATION = 30 * 24 * 3600
+
+ERC20_APPROVAL_TOPIC = abi_registry.topic("erc20", "Approval")
+PERMIT2_APPROVAL_TOPIC = abi_registry.topic("permit2", "Approval")
+PERMIT2_LOCKDOWN_TOPIC = abi_registry.topic("permit2", "Lockdown")
+
+ApprovalMode = Literal["exact", "max"]
+
+_Key = tuple[ChecksumAddress, ChecksumAddress, ChecksumAddress]
+
+
+def _address_topic(address: str) -> str:
+    return "0x" + "00" * 12 + Web3.to_checksum_address(address)[2:].lower()
+
+
+def _topic_address(topic: bytes) -> ChecksumAddress:
+    return Web3.to_checksum_address(HexBytes(topic)[-20:])
+
+
+class AllowanceTracker:
+    """
+    Cached token allowances of the wallets the app signs for.
+
+    Attributes:
+        block_number (int | None): Block the cached values are valid at
+        head (int | None): Latest head from a block watcher, used in place
+            of `eth_blockNumber` once known
+        head_lag (int): Blocks below the head left for a later sync
+    """
+
+    def __init__(
+        self,
+        w3: Web3,
+        multicall: Multicall | None = None,
+        permit2_address: str = PERMIT2_ADDRESS,
+        max_log_range: int = MAX_LOG_RANGE,
+        head_lag: int = HEAD_LAG_BLOCKS,
+    ) -> None:
+        self.w3 = w3
+        self.multicall = multicall or Multicall(w3)
+        self.permit2_address = Web3.to_checksum_address(permit2_address)
+        self.permit2 = abi_registry.contract(w3, "permit2", self.permit2_address)
+        self.max_log_range = max_log_range
+        self.head_lag = head_lag
+        self.block_number: int | None = None
+        self.head: int | None = None
+        self._erc20: dict[_Key, int] = {}
+        # (owner, token, spender) -> (amount, expiration)
+        self._permit2: dict[_Key, tuple[int, int]] = {}
+        # Spends recorded since the key's last Approval event.
+        self._pending_erc20: dict[_Key, int] = {}
+        self._pending_permit2: dict[_Key, int] = {}
+        self._lock = threading.RLock()
+        self.logger = logger.bind(router="allowance_tracker")
+
+    def load(
+        self,
+        owner: str,
+        erc20: Iterable[tuple[str, str]] = (),
+        permit2: Iterable[tuple[str, str]] = (),
+    ) -> None:
+        """
+        Read the allowances that are not cached yet, in one multicall.
+
+        Args:
+            owner (str): Wallet granting the allowances
+            erc20 (Iterable[tuple[str, str]]): (token, spender) ERC-20 allowances
+            permit2 (Iterable[tuple[str, str]]): (token, spender) Permit2 allowances
+        """
+        self.sync()
+        owner = Web3.to_checksum_address(owner)
+        with self._lock:
+            erc20_keys = [
+                k
+                for k in {self._key(owner, *pair) for pair in erc20}
+                if k not in self._erc20
+            ]
+            permit2_keys = [
+                k
+                for k in {self._key(owner, *pair) for pair in permit2}
+                if k not in self._permit2
+            ]
+        if not erc20_keys and not permit2_keys:
+            return
+
+        calls = [
+            Call.from_function(
+                abi_registry.contract(self.w3, "erc20", token).functions.allowance(
+                    owner, spender
+                )
+            )
+            for owner, token, spender in erc20_keys
+        ] + [
+            Call.from_function(self.permit2.functions.allowance(*key))
+            for key in permit2_keys
+        ]
+        results = self.multicall.aggregate(calls, self.block_number or "latest")
+        with self._lock:
+            for key, result in zip(erc20_keys, results[: len(erc20_keys)], strict=True):
+                self._erc20[key] = result.value[0] if result.success else 0
+            for key, result in zip(
+                permit2_keys, results[len(erc20_keys) :], strict=True
+            ):
+                amount, expiration, _ = result.value if result.success else (0, 0, 0)
+                self._permit2[key] = (amount, expiration)
+        self.logger.debug(
+            "loaded", owner=owner, erc20=len(erc20_keys), permit2=len(permit2_keys)
+        )
+
+    def allowance(self, owner: str, token: str, spender: str) -> int:
+        """Return the ERC-20 allowance `owner` has given `spender`."""
+        self.load(owner, erc20=[(token, spender)])
+        return self._erc20[self._key(owner, token, spender)]
+
+    def permit2_allowance(
+        self, owner: str, token: str, spender: str
+    ) -> tuple[int, int]:
+        """Return the Permit2 (amount, expiration) `owner` has given `spender`."""
+        self.load(owner, permit2=[(token, spender)])
+        return self._permit2[self._key(owner, token, spender)]
+
+    def required_approval(
+        self,
+        owner: str,
+        token: str,
+        spender: str,
+        amount: int,
+        mode: ApprovalMode = "exact",
+    ) -> int | None:
+        """
+        Return the ERC-20 amount to approve before `spender` pulls `amount`.
+
+        Args:
+            owner (str): Wallet spending the tokens
+            token (str): Token spent
+            spender (str): Contract that pulls the tokens
+            amount (int): Amount about to be spent
+            mode (ApprovalMode): Approve exactly `amount` or the maximum
+
+        Returns:
+            int | None: Amount to approve, or None if the allowance covers it
+        """
+        if self.allowance(owner, token, spender) >= amount:
+            return None
+        return MAX_UINT256 if mode == "max" else amount
+
+    def required_permit2_approval(
+        self,
+        owner: str,
+        token: str,
+        spender: str,
+        amount: int,
+        deadline: int,
+        mode: ApprovalMode = "exact",
+    ) -> tuple[int, int] | None:
+        """
+        Return the Permit2 (amount, expiration) to grant before a spend.
+
+        Args:
+            owner (str): Wallet spending the tokens
+            token (str): Token spent
+            spender (str): Contract that pulls the tokens through Permit2
+            amount (int): Amount about to be spent
+            deadline (int): Unix time the spend must happen by
+            mode (ApprovalMode): Grant exactly `amount` until `deadline`, or
+                the maximum for PERMIT2_EXPIRATION seconds
+
+        Returns:
+            tuple[int, int] | None: Grant to make, or None if the current
+                one covers the spend
+        """
+        allowed, expiration = self.permit2_allowance(owner, token, spender)
+        if allowed >= amount and expiration >= deadline:
+            return None
+        if mode == "max":
+            return MAX_UINT160, deadline + PERMIT2_EXPIRATION
+        return amount, deadline
+
+    def record_spend(
+        self,
+        owner: str,
+        token: str,
+        spender: str,
+        amount: int,
+        *,
+        via_permit2: bool = False,
+    ) -> None:
+        """
+        Deduct a spend from the cached allowance.
+
+        `transferFrom` lowers allowances without an `Approval` event, so
+        spends have to be accounted for here. A spend queued behind its own
+        approval is also deducted from the next `Approval` event for the
+        key, which is the approval it follows. Maximum allowances are never
+        lowered by either ERC-20 or Permit2.
+
+        Args:
+            owner (str): Wallet the tokens are pulled from
+            token (str): Token spent
+            spender (str): Contract pulling the tokens
+            amount (int): Amount pulled
+            via_permit2 (bool): Pulled through Permit2 rather than directly
+        """
+        key = self._key(owner, token, spender)
+        with self._lock:
+            if via_permit2:
+                allowed, expiration = self._permit2.get(key, (0, 0))
+                if allowed != MAX_UINT160:
+                    self._permit2[key] = (max(0, allowed - amount), expiration)
+                    self._pending_permit2[key] = (
+                        self._pending_permit2.get(key, 0) + amount
+                    )
+            else:
+                allowed = self._erc20.get(key, 0)
+                if allowed != MAX_UINT256:
+                    self._erc20[key] = max(0, allowed - amount)
+                    self._pending_erc20[key] = self._pending_erc20.get(key, 0) + amount
+
+    def sync(self, block_number: int | None = None) -> int:
+        """
+        Bring cached allowances forward from approval events, up to
+        `head_lag` blocks below a head.
+
+        Args:
+            block_number (int | None): Head to sync behind, defaults to the
+                chain head
+
+        Returns:
+            int: Block the cache is now valid at
+        """
+        if block_number is None:
+            block_number = self.w3.eth.block_number if self.head is None else self.head
+        head = max(0, block_number - self.head_lag)
+        with self._lock:
+            if self.block_number is None or not (self._erc20 or self._permit2):
+                self.block_number = max(head, self.block_number or 0)
+                return self.block_number
+            if head <= self.block_number:
+                return self.block_number
+            if head - self.block_number > self.max_log_range:
+                for cache in (
+                    self._erc20,
+                    self._permit2,
+                    self._pending_erc20,
+                    self._pending_permit2,
+                ):
+                    cache.clear()
+            else:
+                owners = {k[0] for k in self._erc20} | {k[0] for k in self._permit2}
+                tokens = {k[1] for k in self._erc20}
+                logs = self.w3.eth.get_logs(
+                    {
+                        "address": [*sorted(tokens), self.permit2_address],
+                        "fromBlock": self.block_number + 1,
+                        "toBlock": head,
+                        "topics": [
+                            [
+                                Web3.to_hex(ERC20_APPROVAL_TOPIC),
+                                Web3.to_hex(PERMIT2_APPROVAL_TOPIC),
+                                Web3.to_hex(PERMIT2_LOCKDOWN_TOPIC),
+                            ],
+                            [_address_topic(owner) for owner in sorted(owners)],
+                        ],
+                    }
+                )
+                self.apply_logs(logs)
+            self.block_number = head
+            return head
+
+    def on_block(self, header: BlockHeader) -> None:
+        """Record a new chain head for the next allowance read to sync behind."""
+        self.head = header.number
+
+    def apply_logs(self, logs: Iterable[LogReceipt]) -> None:
+        """
+        Apply ERC-20 and Permit2 `Approval` events and Permit2 `Lockdown`
+        events to cached allowances.
+
+        Args:
+            logs (Iterable[LogReceipt]): Approval and lockdown logs, in order
+        """
+        with self._lock:
+            for log in logs:
+                topics = [HexBytes(t) for t in log["topics"]]
+                address = Web3.to_checksum_address(log["address"])
+                if not topics:
+                    continue
+                if (
+                    topics[0] == PERMIT2_APPROVAL_TOPIC
+                    and address == self.permit2_address
+                ):
+                    owner, token, spender = (_topic_address(t) for t in topics[1:4])
+                    amount, expiration = self.w3.codec.decode(
+                        ["uint160", "uint48"], HexBytes(log["data"])
+                    )
+                    key = (owner, token, spender)
+                    pending = self._pending_permit2.pop(key, 0)
+                    if amount != MAX_UINT160:
+                        amount = max(0, amount - pending)
+                    self._permit2[key] = (amount, expiration)
+                elif (
+                    topics[0] == PERMIT2_LOCKDOWN_TOPIC
+                    and address == self.permit2_address
+                ):
+                    token, spender = self.w3.codec.decode(
+                        ["address", "address"], HexBytes(log["data"])
+                    )
+                    key = self._key(_topic_address(topics[1]), token, spender)
+                    # Lockdown zeroes the amount and keeps the expiration.
+                    self._pending_permit2.pop(key, None)
+                    if key in self._permit2:
+                        self._permit2[key] = (0, self._permit2[key][1])
+                elif topics[0] == ERC20_APPROVAL_TOPIC and len(topics) == 3:  # noqa: PLR2004
+                    owner, spender = (
+                        _topic_address(topics[1]),
+                        _topic_address(topics[2]),
+                    )
+                    (amount,) = self.w3.codec.decode(["uint256"], HexBytes(log["data"]))
+                    key = (owner, address, spender)
+                    pending = self._pending_erc20.pop(key, 0)
+                    if amount != MAX_UINT256:
+                        amount = max(0, amount - pending)
+                    self._erc20[key] = amount
+
+    @staticmethod
+    def _key(owner: str, token: str, spender: str) -> _Key:
+        return (
+            Web3.to_checksum_address(owner),
+            Web3.to_checksum_address(token),
+            Web3.to_checksum_address(spender),
+        )
@@ -0,0 +1,125 @@
+"""
+Exact Token Amounts
+
+`TokenAmount` holds a token quantity as integer base units plus the token's
+decimals, so amounts parsed from LLM output or read from chain are converted
+once and never round-trip through `float`. Parsing goes through `Decimal`
+and rounds down to the token's precision, so a user can never be charged
+more than they asked for.
+"""
+
+from collections.abc import Sequence
+from dataclasses import dataclass
+from decimal import ROUND_DOWN, Decimal, InvalidOperation
+from functools import cache
+from typing import Self
+
+FLR_DECIMALS = 18
+
+
+@cache
+def _scale(decimals: int) -> int:
+    return 10**decimals
+
+
+@dataclass(frozen=True, order=True)
+class TokenAmount:
+    """
+    A token quantity in base units.
+
+    Attributes:
+        wei (int): Amount in the token's smallest unit
+        decimals (int): Token decimals, 18 for FLR
+    """
+
+    wei: int
+    decimals: int = FLR_DECIMALS
+
+    def __post_init__(self) -> None:
+        if self.wei < 0:
+            msg = f"Token amount cannot be negative: {self.wei}"
+            raise ValueError(msg)
+
+    @classmethod
+    def from_decimal(
+        cls, value: Decimal | str | float, decimals: int = FLR_DECIMALS
+    ) -> Self:
+        """
+        Parse a human-readable amount such as ``"1.5"`` or ``0.1``.
+
+        Floats are read through their shortest repr, so ``0.1`` is exactly
+        one tenth. Digits beyond the token's precision are dropped.
+
+        Args:
+            value (Decimal | str | float): Amount in whole tokens
+            decimals (int): Token decimals
+
+        Raises:
+            ValueError: If the value is not a finite, non-negative number
+        """
+        try:
+            amount = Decimal(str(value).strip())
+        except InvalidOperation as e:
+            msg = f"Invalid token amount: {value!r}"
+            raise ValueError(msg) from e
+        if not amount.is_finite() or amount < 0:
+            msg = f"Invalid token amount: {value!r}"
+            raise ValueError(msg)
+        wei = (amount * _scale(decimals)).to_integral_value(rounding=ROUND_DOWN)
+        return cls(int(wei), decimals)
+
+    def to_decimal(self) -> Decimal:
+        """Amount in whole tokens, exactly."""
+        return Decimal(self.wei).scaleb(-self.decimals)
+
+    def __float__(self) -> float:
+        return self.wei / _scale(self.decimals)
+
+    def __str__(self) -> str:
+        whole, frac = divmod(self.wei, _scale(self.decimals))
+        if not frac:
+            return str(whole)
+        return f"{whole}.{frac:0{self.decimals}d}".rstrip("0")
+
+    def __bool__(self) -> bool:
+        return self.wei != 0
+
+    def __add__(self, other: "TokenAmount") -> "TokenAmount":
+        self._check(other)
+        return TokenAmount(self.wei + other.wei, self.decimals)
+
+    def __sub__(self, other: "TokenAmount") -> "TokenAmount":
+        self._check(other)
+        return TokenAmount(self.wei - other.wei, self.decimals)
+
+    def _check(self, other: "TokenAmount") -> None:
+        if not isinstance(other, TokenAmount) or other.decimals != self.decimals:
+            msg = f"Cannot combine amounts with {self.decimals} and other decimals"
+            raise TypeError(msg)
+
+
+def format_amounts(amounts: Sequence[TokenAmount], places: int = 6) -> list[str]:
+    """
+    Format a column of amounts with a shared number of decimal places.
+
+    Rounds down in integer arithmetic and pads the results to one width so
+    they line up in a balance table.
+
+    Args:
+        amounts (Sequence[TokenAmount]): Amounts to format
+        places (int): Decimal places to show
+
+    Returns:
+        list[str]: Right-aligned strings, in input order
+    """
+    texts = []
+    for amount in amounts:
+        shift = amount.decimals - places
+        if shift >= 0:
+            units = amount.wei // _scale(shift)
+        else:
+            units = amount.wei * _scale(-shift)
+        whole, frac = divmod(units, _scale(places))
+        texts.append(f"{whole:,}.{frac:0{places}d}" if places else f"{whole:,}")
+    width = max(map(len, texts), default=0)
+    return [text.rjust(width) for text in texts]
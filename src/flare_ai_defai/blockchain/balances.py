@@ -0,0 +1,230 @@
+"""
+Wallet Balance Cache
+
+Keeps the FLR and token balances of recently viewed wallets in memory and
+re-reads a wallet only after a block touches it: an ERC-20 Transfer from
+or to it, or a transaction it sent or that paid it native value. Reading a
+wallet costs one multicall (native balance, every `balanceOf` and, the
+first time, `decimals`). Checking a new block costs two `eth_getLogs` and
+one batched `eth_getBlockByNumber` for all watched wallets together, and
+nothing at all once no wallet has been viewed for `idle_seconds`. Wallets
+whose first read is still in flight are checked too, so a read that raced
+a touching block is not kept, and if a check fails every watched wallet is
+dropped rather than kept on balances the block may have changed. Blocks are
+only checked once they are `head_lag` below the head, and reads are pinned
+to the last checked block, so a reorg near the tip cannot hide a change.
+
+Native value moved by internal calls of contracts the wallet did not
+call itself is not visible in either source and only shows up after the
+wallet's next own transaction or when it goes idle and is read afresh.
+"""
+
+import threading
+import time
+from collections.abc import Callable, Mapping
+
+import structlog
+from eth_typing import ChecksumAddress
+from hexbytes import HexBytes
+from web3 import Web3
+
+from flare_ai_defai.blockchain.abi_registry import abi_registry
+from flare_ai_defai.blockchain.amounts import FLR_DECIMALS, TokenAmount
+from flare_ai_defai.blockchain.block_watcher import HEAD_LAG_BLOCKS, BlockHeader
+from flare_ai_defai.blockchain.multicall import MULTICALL3_ADDRESS, Call, Multicall
+from flare_ai_defai.blockchain.pool_cache import MAX_LOG_RANGE
+
+logger = structlog.get_logger(__name__)
+
+TRANSFER_TOPIC = abi_registry.topic("erc20", "Transfer")
+# Wallets not read for this many seconds stop being watched.
+IDLE_SECONDS = 300.0
+
+# Tokens shown on the stats panel; FLR is always included.
+STATS_TOKENS = {
+    "wflr": "0x1D80c49BbBCd1C0911346656B529DF9E5c2F783d",
+    "joule": "0xE6505f92583103AF7ed9974DEC451A7Af4e3A3bE",
+    "usdc": "0xFbDa5F676cB37624f28265A144A48B0d6e87d3b6",
+    "usdt": "0x0B38e83B86d491735fEaa0a791F65c2B99535396",
+    "weth": "0x1502FA4be69d526124D453619276FacCab275d3D",
+    "ksflr": "0x1812C40b5785AeD831EC4a0d675f30c5461Fd42E",
+    "sflr": "0x12e605bc104e93B45e1aD99F9e555f659051c2BB",
+}
+
+
+def _address_topic(address: str) -> str:
+    return "0x" + "00" * 12 + address[2:].lower()
+
+
+class BalanceCache:
+    """
+    Per-wallet balances, invalidated by the blocks that change them.
+
+    Attributes:
+        tokens (dict[str, ChecksumAddress]): Token symbol to ERC-20 address
+        block_number (int | None): Last block checked for activity, which
+            reads are made at
+        idle_seconds (float): Time after the last read a wallet is dropped
+        max_log_range (int): Largest block gap checked from logs; larger
+            gaps drop every cached wallet instead
+        head_lag (int): Blocks below the head left for a later check
+    """
+
+    def __init__(  # noqa: PLR0913, PLR0917
+        self,
+        w3: Web3,
+        tokens: Mapping[str, str] = STATS_TOKENS,
+        multicall: Multicall | None = None,
+        idle_seconds: float = IDLE_SECONDS,
+        max_log_range: int = MAX_LOG_RANGE,
+        clock: Callable[[], float] = time.monotonic,
+        head_lag: int = HEAD_LAG_BLOCKS,
+    ) -> None:
+        self.w3 = w3
+        self.tokens = {
+            token: Web3.to_checksum_address(address)
+            for token, address in tokens.items()
+        }
+        self.multicall = multicall or Multicall(w3)
+        # Multicall3 also reports native balances, in the same batch.
+        self.multicall3 = abi_registry.contract(w3, "multicall3", MULTICALL3_ADDRESS)
+        self.idle_seconds = idle_seconds
+        self.max_log_range = max_log_range
+        self.clock = clock
+        self.head_lag = head_lag
+        self.block_number: int | None = None
+        self._balances: dict[ChecksumAddress, dict[str, TokenAmount]] = {}
+        self._last_read: dict[ChecksumAddress, float] = {}
+        # Bumped on invalidation, so a read racing a new block is not kept.
+        self._generation: dict[ChecksumAddress, int] = {}
+        self._decimals: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.logger = logger.bind(router="balance_cache")
+
+    def balances(self, address: str) -> dict[str, TokenAmount]:
+        """
+        Return a wallet's FLR and token balances.
+
+        Args:
+            address (str): Wallet address
+
+        Returns:
+            dict[str, TokenAmount]: "flr" and every token, zero where the
+                balance could not be read
+        """
+        address = Web3.to_checksum_address(address)
+        with self._lock:
+            self._last_read[address] = self.clock()
+            cached = self._balances.get(address)
+            if cached is not None:
+                return dict(cached)
+            generation = self._generation.get(address, 0)
+            block_number = self.block_number
+        amounts = self._read(address, block_number)
+        with self._lock:
+            if self._generation.get(address, 0) == generation:
+                self._balances[address] = amounts
+        return dict(amounts)
+
+    def invalidate(self, addresses: set[ChecksumAddress]) -> None:
+        """Drop the cached balances of wallets, e.g. after sending from them."""
+        with self._lock:
+            for address in addresses:
+                self._balances.pop(address, None)
+                self._generation[address] = self._generation.get(address, 0) + 1
+
+    def on_block(self, header: BlockHeader) -> None:
+        """
+        Invalidate the wallets touched by the blocks a new head moves
+        `head_lag` below it.
+
+        Args:
+            header (BlockHeader): New chain head
+        """
+        end = max(0, header.number - self.head_lag)
+        with self._lock:
+            start = end if self.block_number is None else self.block_number + 1
+            self.block_number = max(end, self.block_number or 0)
+            now = self.clock()
+            for address, seen in list(self._last_read.items()):
+                if now - seen > self.idle_seconds:
+                    del self._last_read[address]
+                    self._balances.pop(address, None)
+            # Recently read wallets, including reads in flight.
+            watched = set(self._last_read)
+        if not watched or start > end:
+            return
+        if end - start >= self.max_log_range:
+            touched = watched
+        else:
+            try:
+                touched = self._touched(start, end, watched)
+            except Exception as e:  # noqa: BLE001
+                # The blocks were never checked, so any wallet may be stale;
+                # whatever the node raised, dropping them is the safe answer.
+                self.logger.warning("activity_check_failed", block=end, error=str(e))
+                touched = watched
+        if touched:
+            self.invalidate(touched)
+            self.logger.debug("invalidated", block=end, wallets=len(touched))
+
+    def _touched(
+        self, start: int, end: int, watched: set[ChecksumAddress]
+    ) -> set[ChecksumAddress]:
+        touched: set[ChecksumAddress] = set()
+        topics = [_address_topic(address) for address in sorted(watched)]
+        transfer = Web3.to_hex(TRANSFER_TOPIC)
+        for position in (1, 2):
+            for log in self.w3.eth.get_logs(
+                {
+                    "fromBlock": start,
+                    "toBlock": end,
+                    "topics": [transfer, *[None] * (position - 1), topics],
+                }
+            ):
+                touched.add(
+                    Web3.to_checksum_address(HexBytes(log["topics"][position])[-20:])
+                )
+        with self.w3.batch_requests() as batch:
+            for number in range(start, end + 1):
+                batch.add(self.w3.eth.get_block(number, full_transactions=True))
+            blocks = batch.execute()
+        for block in blocks:
+            for tx in block["transactions"]:
+                # Senders pay gas, so any transaction they send changes FLR.
+                sender = Web3.to_checksum_address(tx["from"])
+                if sender in watched:
+                    touched.add(sender)
+                if tx.get("to") and tx["value"]:
+                    recipient = Web3.to_checksum_address(tx["to"])
+                    if recipient in watched:
+                        touched.add(recipient)
+        return touched & watched
+
+    def _read(
+        self, address: ChecksumAddress, block_number: int | None
+    ) -> dict[str, TokenAmount]:
+        missing = [token for token in self.tokens if token not in self._decimals]
+        calls = [Call.from_function(self.multicall3.functions.getEthBalance(address))]
+        for token_address in self.tokens.values():
+            erc20 = abi_registry.contract(self.w3, "erc20", token_address)
+            calls.append(Call.from_function(erc20.functions.balanceOf(address)))
+        for token in missing:
+            erc20 = abi_registry.contract(self.w3, "erc20", self.tokens[token])
+            calls.append(Call.from_function(erc20.functions.decimals()))
+        results = self.multicall.aggregate(calls, block_number or "latest")
+        native, balances, decimals = (
+            results[0],
+            results[1 : len(self.tokens) + 1],
+            results[len(self.tokens) + 1 :],
+        )
+        for token, result in zip(missing, decimals, strict=True):
+            if result.success:
+                self._decimals[token] = result.value[0]
+        amounts = {"flr": TokenAmount(native.value[0] if native.success else 0)}
+        for token, result in zip(self.tokens, balances, strict=True):
+            amounts[token] = TokenAmount(
+                result.value[0] if result.success else 0,
+                self._decimals.get(token, FLR_DECIMALS),
+            )
+        return amounts
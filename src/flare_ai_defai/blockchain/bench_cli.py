@@ -0,0 +1,197 @@
+"""
+Command line entry point for offline end-to-end benchmarks.
+
+Deploys the app's contracts on an in-process LocalChain, points the
+FlareProvider, SparkDEX and KineticMarket at it and times their real code
+paths, so optimisations can be measured without a node or network jitter.
+Prints a JSON report with latency percentiles, throughput and the JSON-RPC
+requests each operation made.
+
+Scenarios:
+    quote   best SparkDEX quote of FLR to USDC
+    route   route and split search for FLR to USDC
+    swap    FLR to USDC swap through the Universal Router, confirmed
+    borrow  Kinetic USDC borrow against sFLR collateral, confirmed
+
+Usage:
+    bench-local --iterations 50
+    bench-local swap borrow --iterations 20
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from collections import Counter
+from collections.abc import Callable, Sequence
+
+from flare_ai_defai.blockchain.abi_registry import abi_registry
+from flare_ai_defai.blockchain.amounts import TokenAmount
+from flare_ai_defai.blockchain.explorer import FlareExplorer
+from flare_ai_defai.blockchain.flare import FlareProvider
+from flare_ai_defai.blockchain.kinetic_market import KineticMarket
+from flare_ai_defai.blockchain.local_contracts import LocalFlare
+from flare_ai_defai.blockchain.sparkdex import SparkDEX
+from flare_ai_defai.models import UserInfo
+from flare_ai_defai.storage.fake_storage import WalletStore
+
+SCENARIOS = ("quote", "route", "swap", "borrow")
+# Read-only scenarios get a new block before each run, as requests a block or
+# more apart would, so per-block caches do not answer every run.
+NEW_HEAD_SCENARIOS = frozenset({"quote", "route"})
+EXPLORER_URL = "https://flare-explorer.flare.network/"
+# FLR quoted and swapped per run, and sFLR backing the borrows.
+SWAP_FLR = 100
+COLLATERAL_SFLR = 100_000
+BORROW_USDC = 1
+
+
+class Bench:
+    """
+    The app's services wired to a fresh local deployment.
+
+    Attributes:
+        local (LocalFlare): Deployment the services talk to
+        user (UserInfo): Funded user the operations run as
+    """
+
+    def __init__(self) -> None:
+        self.local = LocalFlare.deploy()
+        store = WalletStore()
+        self.user = UserInfo(user_id="bench", email="bench@localhost")
+        explorer = FlareExplorer(EXPLORER_URL)
+        self.provider = FlareProvider(self.local.chain, store)
+        self.sparkdex = SparkDEX(self.local.chain, explorer, self.provider, store)
+        self.kinetic = KineticMarket(self.local.chain, explorer, self.provider, store)
+        address, _ = self.provider.generate_account(self.user)
+        self.local.fund(address, flr=10_000_000, sflr=COLLATERAL_SFLR)
+        self._collateral_ready = False
+
+    def quote(self) -> None:
+        self.sparkdex.quoter.best_quote(
+            SparkDEX.WFLR_ADDRESS,
+            SparkDEX.TOKEN_ADDRESSES["usdc"],
+            TokenAmount.from_decimal(SWAP_FLR).wei,
+            offline=False,
+        )
+
+    def route(self) -> None:
+        self.sparkdex.swap_legs(
+            SparkDEX.WFLR_ADDRESS,
+            SparkDEX.TOKEN_ADDRESSES["usdc"],
+            TokenAmount.from_decimal(SWAP_FLR).wei,
+            self.local.chain.base_fee,
+        )
+
+    def swap(self) -> None:
+        self.sparkdex.add_swap_txs_to_queue(self.user, "flr", "usdc", SWAP_FLR)
+        self.provider.send_tx_in_queue(self.user)
+
+    def borrow(self) -> None:
+        if not self._collateral_ready:
+            self._supply_collateral()
+        txs = self.kinetic.borrowTx(self.user, "usdc", BORROW_USDC)
+        self.provider.add_tx_to_queue(f"Borrow {BORROW_USDC} USDC", txs)
+        self.provider.send_tx_in_queue(self.user)
+
+    def _supply_collateral(self) -> None:
+        market = self.kinetic.getMarket("sflr")
+        sflr = abi_registry.contract(self.provider.w3, "sflr", SparkDEX.SFLR_ADDRESS)
+        approve = self.provider.create_contract_function_tx(
+            self.user, sflr, "approve", 0, market, COLLATERAL_SFLR * 10**18
+        )
+        self.provider.add_tx_to_queue("Approve sFLR", [approve])
+        self.provider.send_tx_in_queue(self.user)
+        mint = self.kinetic.supplySFLR(self.user, COLLATERAL_SFLR)
+        self.provider.add_tx_to_queue("Supply sFLR", [mint])
+        self.provider.send_tx_in_queue(self.user)
+        self.provider.add_tx_to_queue(
+            "Enable sFLR as collateral",
+            self.kinetic.enterMarketsTx(self.user, ["sflr"]),
+        )
+        self.provider.send_tx_in_queue(self.user)
+        self._collateral_ready = True
+
+
+def run(
+    operation: Callable[[], None],
+    requests: Counter,
+    iterations: int,
+    setup: Callable[[], object] | None = None,
+) -> dict:
+    """
+    Time an operation after one warm-up run.
+
+    Args:
+        operation (Callable[[], None]): Operation benchmarked
+        requests (Counter): The chain's per-method request counter
+        iterations (int): Timed runs
+        setup (Callable[[], object] | None): Untimed step before each run
+
+    Returns:
+        dict: Latency percentiles in ms, throughput and RPC requests per run
+    """
+    operation()
+    before = Counter(requests)
+    timings = []
+    for _ in range(iterations):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        operation()
+        timings.append((time.perf_counter() - start) * 1000)
+    made = requests - before
+    timings.sort()
+    return {
+        "iterations": iterations,
+        "p50_ms": round(statistics.median(timings), 3),
+        "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+        "mean_ms": round(statistics.fmean(timings), 3),
+        "ops_per_second": round(1000 * len(timings) / sum(timings), 1),
+        "rpc_requests_per_op": round(made.total() / iterations, 2),
+        "rpc_methods_per_op": {
+            method: round(count / iterations, 2)
+            for method, count in sorted(made.items())
+        },
+    }
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Benchmark the DeFi paths against an in-process Flare chain."
+    )
+    parser.add_argument(
+        "scenarios",
+        nargs="*",
+        metavar="scenario",
+        help=f"Scenarios to run ({', '.join(SCENARIOS)}), all by default",
+    )
+    parser.add_argument(
+        "--iterations", type=int, default=20, help="Timed runs per scenario"
+    )
+    args = parser.parse_args(argv)
+    if args.iterations < 1:
+        parser.error("--iterations must be at least 1")
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    bench = Bench()
+    chain = bench.local.chain
+    report = {
+        scenario: run(
+            getattr(bench, scenario),
+            chain.requests,
+            args.iterations,
+            chain.mine if scenario in NEW_HEAD_SCENARIOS else None,
+        )
+        for scenario in args.scenarios or SCENARIOS
+    }
+    json.dump(report, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,199 @@
+"""
+Block Watcher
+
+One process-wide source of new chain heads. A background thread follows
+`newHeads` over a WebSocket when one is configured and polls the HTTP
+endpoint for the latest block otherwise, or whenever the socket fails or
+goes quiet, retrying the socket every `ws_retry` seconds. Each head is
+handed to the registered subscribers once, in order of registration.
+
+Subscribers run one after another on the watcher thread, so `on_block`
+has to return quickly. Most caches only record the new head, so a read
+that follows syncs to it without an `eth_blockNumber` of its own and an
+idle process costs one head poll per block in total. The balance cache
+checks the new blocks' activity with a few requests, and the history
+indexer hands its passes to a thread of its own.
+"""
+
+import asyncio
+import threading
+import time
+from collections.abc import Callable, Mapping
+from dataclasses import dataclass
+from typing import Any
+
+import structlog
+from hexbytes import HexBytes
+from web3 import AsyncWeb3, Web3, WebSocketProvider
+
+logger = structlog.get_logger(__name__)
+
+# Seconds between HTTP polls, about one Flare block.
+POLL_INTERVAL = 1.0
+# Seconds without a WebSocket head before falling back to polling.
+STALL_TIMEOUT = 10.0
+# Seconds between attempts to re-establish the WebSocket.
+WS_RETRY = 60.0
+# Blocks a node may trail the published head by. It can answer log queries
+# that reach closer to the head than this with some of the logs missing.
+HEAD_LAG_BLOCKS = 3
+
+
+@dataclass(frozen=True)
+class BlockHeader:
+    """
+    The fields of a chain head that subscribers use.
+
+    Attributes:
+        number (int): Block number
+        hash (str): Block hash
+        timestamp (int): Block time
+        base_fee (int): Base fee per gas of the block
+    """
+
+    number: int
+    hash: str
+    timestamp: int
+    base_fee: int
+
+    @classmethod
+    def from_rpc(cls, block: Mapping[str, Any]) -> "BlockHeader":
+        """Build a header from a `newHeads` message or `eth_getBlockByNumber`."""
+
+        def number(value: int | str) -> int:
+            return value if isinstance(value, int) else int(value, 16)
+
+        return cls(
+            number=number(block["number"]),
+            hash=Web3.to_hex(HexBytes(block["hash"])),
+            timestamp=number(block["timestamp"]),
+            base_fee=number(block.get("baseFeePerGas", 0)),
+        )
+
+
+class BlockWatcher:
+    """
+    Publishes new chain heads to subscribers.
+
+    Attributes:
+        ws_url (str | None): WebSocket endpoint for `newHeads`, None to poll
+        poll_interval (float): Seconds between HTTP polls
+        head (BlockHeader | None): Latest head published
+    """
+
+    def __init__(
+        self,
+        w3: Web3,
+        ws_url: str | None = None,
+        poll_interval: float = POLL_INTERVAL,
+        stall_timeout: float = STALL_TIMEOUT,
+        ws_retry: float = WS_RETRY,
+    ) -> None:
+        self.w3 = w3
+        self.ws_url = ws_url or None
+        self.poll_interval = poll_interval
+        self.stall_timeout = stall_timeout
+        self.ws_retry = ws_retry
+        self.head: BlockHeader | None = None
+        self._subscribers: list[Callable[[BlockHeader], None]] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.logger = logger.bind(router="block_watcher")
+
+    def subscribe(self, callback: Callable[[BlockHeader], None]) -> Callable[[], None]:
+        """
+        Call `callback` with every new head.
+
+        Args:
+            callback (Callable[[BlockHeader], None]): Subscriber, run on the
+                watcher thread; exceptions it raises are logged and do not
+                reach other subscribers, but time it takes delays them
+
+        Returns:
+            Callable[[], None]: Function that removes the subscription
+        """
+        with self._lock:
+            self._subscribers.append(callback)
+
+        def unsubscribe() -> None:
+            with self._lock:
+                if callback in self._subscribers:
+                    self._subscribers.remove(callback)
+
+        return unsubscribe
+
+    def publish(self, header: BlockHeader) -> bool:
+        """
+        Hand a head to the subscribers unless it is not newer than the last.
+
+        Args:
+            header (BlockHeader): New chain head
+
+        Returns:
+            bool: Whether the head was new
+        """
+        with self._lock:
+            if self.head is not None and header.number <= self.head.number:
+                return False
+            self.head = header
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(header)
+            except Exception as e:  # noqa: BLE001
+                # One failing subscriber must not starve the others.
+                self.logger.warning(
+                    "subscriber_failed", block=header.number, error=str(e)
+                )
+        return True
+
+    def poll(self) -> bool:
+        """Fetch the latest block over HTTP and publish it if it is new."""
+        return self.publish(BlockHeader.from_rpc(self.w3.eth.get_block("latest")))
+
+    def start(self) -> None:
+        """Watch for heads in a background thread until `stop` is called."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="block-watcher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        next_ws_attempt = 0.0
+        while not self._stop.is_set():
+            if self.ws_url and time.monotonic() >= next_ws_attempt:
+                try:
+                    asyncio.run(self._listen())
+                except Exception as e:  # noqa: BLE001
+                    # Any socket failure falls back to polling until the retry.
+                    self.logger.warning("ws_unavailable", error=str(e))
+                next_ws_attempt = time.monotonic() + self.ws_retry
+                continue
+            try:
+                self.poll()
+            except Exception as e:  # noqa: BLE001
+                # The watcher thread outlives node errors; the next poll retries.
+                self.logger.warning("poll_failed", error=str(e))
+            self._stop.wait(self.poll_interval)
+
+    async def _listen(self) -> None:
+        # The watcher retries the socket itself, polling in between.
+        provider = WebSocketProvider(self.ws_url, max_connection_retries=1)
+        async with AsyncWeb3(provider) as w3:
+            await w3.eth.subscribe("newHeads")
+            self.logger.info("ws_subscribed", url=self.ws_url)
+            messages = w3.socket.process_subscriptions()
+            while not self._stop.is_set():
+                message = await asyncio.wait_for(anext(messages), self.stall_timeout)
+                self.publish(BlockHeader.from_rpc(message["result"]))
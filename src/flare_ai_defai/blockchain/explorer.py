@@ -1,73 +1,240 @@
+import asyncio
 import json
 import logging
-import structlog
+import threading
+import time
 
+import httpx
 import requests
+import structlog
+from requests.adapters import HTTPAdapter
 from requests.exceptions import RequestException, Timeout
+from urllib3.util.retry import Retry
 
 logging.basicConfig(level=logging.DEBUG)
 logger = structlog.get_logger(__name__)
 
+# Status codes worth retrying: explorer throttling and transient upstream errors.
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+class RateLimiter:
+    """
+    Token bucket limiting how often we hit the Chain Explorer API.
+
+    The explorer enforces a per-IP quota, so every client sharing a process
+    should share one limiter. Both the sync and async clients draw from it.
+    """
+
+    def __init__(self, rate: float, burst: int = 1) -> None:
+        """
+        :param rate: Sustained requests per second allowed.
+        :param burst: Number of requests that may be sent back to back.
+        """
+        if rate <= 0:
+            msg = f"Rate must be positive, got {rate}"
+            raise ValueError(msg)
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Take a token and return how long the caller must wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self) -> None:
+        """Block until a request may be sent."""
+        delay = self._reserve()
+        if delay:
+            time.sleep(delay)
+
+    async def acquire_async(self) -> None:
+        """Wait, without blocking the event loop, until a request may be sent."""
+        delay = self._reserve()
+        if delay:
+            await asyncio.sleep(delay)
+
+
+def _parse_response(text: str, log: structlog.stdlib.BoundLogger) -> dict:
+    """
+    Decode an explorer response body and check it carries a result.
+
+    :param text: Raw response body
+    :param log: Logger to report the payload size to
+    :return: JSON response
+    """
+    # Bodies can be hundreds of KB for large ABIs, so only their size is logged.
+    log.debug("explorer_response", size_bytes=len(text))
+    try:
+        json_response = json.loads(text)
+    except ValueError as e:
+        log.exception("explorer_response_not_json", size_bytes=len(text))
+        msg = "Response content is not valid JSON."
+        raise ValueError(msg) from e
+
+    if "result" not in json_response:
+        msg = f"Malformed response from API: {json_response.get('message')}"
+        raise ValueError(msg)
+    return json_response
+
+
+def _abi_params(contract_address: str) -> dict[str, str]:
+    return {"module": "contract", "action": "getabi", "address": contract_address}
+
+
 class FlareExplorer:
-    def __init__(self, base_url: str) -> None:
+    def __init__(
+        self,
+        base_url: str,
+        timeout: float = 10,
+        max_retries: int = 3,
+        backoff_factor: float = 0.5,
+        pool_size: int = 10,
+        rate_limiter: RateLimiter | None = None,
+    ) -> None:
+        """
+        :param base_url: Chain Explorer API endpoint
+        :param timeout: Per-request timeout in seconds
+        :param max_retries: Retries for connection errors and retryable statuses
+        :param backoff_factor: Base of the exponential backoff between retries
+        :param pool_size: Keep-alive connections held open to the explorer
+        :param rate_limiter: Shared limiter, defaults to 5 requests per second
+        """
         self.base_url = base_url
-        self.logger = logger
+        self.timeout = timeout
+        self.rate_limiter = rate_limiter or RateLimiter(rate=5, burst=5)
         self.logger = logger.bind(blockchain="explorer")
 
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            backoff_max=10,
+            status_forcelist=RETRY_STATUS_CODES,
+            allowed_methods=frozenset({"GET"}),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry
+        )
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({"accept": "application/json"})
+
     def _get(self, params: dict) -> dict:
         """Get data from the Chain Explorer API.
 
         :param params: Query parameters
         :return: JSON response
         """
-        headers = {"accept": "application/json"}
+        self.rate_limiter.acquire()
         try:
-            response = requests.get(
-                self.base_url, params=params, headers=headers, timeout=10
+            response = self.session.get(
+                self.base_url, params=params, timeout=self.timeout
             )
             response.raise_for_status()
-            try:
-                json_response = response.json()
-                self.logger.debug("Response JSON:", extra={"json_response": json_response})
-            except ValueError:
-                # If the response is not JSON, log the raw content
-                self.logger.error("Response is not in JSON format, raw content:", extra={"response_text": response.text})
-                #with open('invalid_response.json', 'w') as f:
-                #    f.write(response.text)
-                
-                # Raise an exception to stop the program
-                raise ValueError("Response content is not valid JSON.")
-
-
-            if "result" not in json_response:
-                msg = (f"Malformed response from API: {json_response}",)
-                raise ValueError(msg)
-
         except (RequestException, Timeout):
-            logger.exception("Network error during API request")
+            self.logger.exception("Network error during API request")
             raise
-        else:
-            return json_response
+        return _parse_response(response.text, self.logger)
 
-    def get_contract_abi(self, contract_address: str) -> dict:
+    def get_contract_abi(self, contract_address: str) -> list[dict]:
         """Get the ABI for a contract from the Chain Explorer API.
 
         :param contract_address: Address of the contract
         :return: Contract ABI
         """
-        self.logger.debug("Fetching ABI for `%s` from `%s`", contract_address, self.base_url)
-        #self.logger.debug("Fetching ABI for `%s` from `%s`", contract_address, self.base_url)
-        response = self._get(
-            params={
-                "module": "contract",
-                "action": "getabi",
-                "address": contract_address,
-            }
+        self.logger.debug(
+            "Fetching ABI for `%s` from `%s`", contract_address, self.base_url
+        )
+        response = self._get(params=_abi_params(contract_address))
+        return json.loads(response["result"])
+
+    def close(self) -> None:
+        """Close the pooled connections."""
+        self.session.close()
+
+
+class AsyncFlareExplorer:
+    """Asynchronous client for the Chain Explorer API."""
+
+    def __init__(
+        self,
+        base_url: str,
+        timeout: float = 10,
+        max_retries: int = 3,
+        backoff_factor: float = 0.5,
+        pool_size: int = 10,
+        rate_limiter: RateLimiter | None = None,
+    ) -> None:
+        """
+        :param base_url: Chain Explorer API endpoint
+        :param timeout: Per-request timeout in seconds
+        :param max_retries: Retries for connection errors and retryable statuses
+        :param backoff_factor: Base of the exponential backoff between retries
+        :param pool_size: Keep-alive connections held open to the explorer
+        :param rate_limiter: Shared limiter, defaults to 5 requests per second
+        """
+        self.base_url = base_url
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.rate_limiter = rate_limiter or RateLimiter(rate=5, burst=5)
+        self.logger = logger.bind(blockchain="async_explorer")
+        self.client = httpx.AsyncClient(
+            timeout=timeout,
+            headers={"accept": "application/json"},
+            limits=httpx.Limits(
+                max_connections=pool_size, max_keepalive_connections=pool_size
+            ),
         )
-        #self.logger.debug("After self._get() call", response=response)
-        #return json.loads(response["result"])
 
-        abi_list = json.loads(response["result"])  # Convert string to list
-        #return {"abi": abi_list}    # Convert list to dict
+    async def _get(self, params: dict) -> dict:
+        """Get data from the Chain Explorer API, retrying with exponential backoff.
+
+        :param params: Query parameters
+        :return: JSON response
+        """
+        for attempt in range(self.max_retries + 1):
+            await self.rate_limiter.acquire_async()
+            try:
+                response = await self.client.get(self.base_url, params=params)
+                if (
+                    response.status_code not in RETRY_STATUS_CODES
+                    or attempt == self.max_retries
+                ):
+                    response.raise_for_status()
+                    return _parse_response(response.text, self.logger)
+            except httpx.TransportError:
+                if attempt == self.max_retries:
+                    self.logger.exception("Network error during API request")
+                    raise
+            delay = min(self.backoff_factor * (2**attempt), 10)
+            self.logger.debug("explorer_retry", attempt=attempt + 1, delay=delay)
+            await asyncio.sleep(delay)
+        msg = "Retries exhausted"  # unreachable, the loop returns or raises
+        raise RuntimeError(msg)
+
+    async def get_contract_abi(self, contract_address: str) -> list[dict]:
+        """Get the ABI for a contract from the Chain Explorer API.
+
+        :param contract_address: Address of the contract
+        :return: Contract ABI
+        """
+        response = await self._get(params=_abi_params(contract_address))
+        return json.loads(response["result"])
 
-        return abi_list
\ No newline at end of file
+    async def close(self) -> None:
+        """Close the underlying asynchronous HTTP client."""
+        await self.client.aclose()
@@ -5,6 +5,7 @@ This module provides a FlareProvider class for interacting with the Flare Networ
 It handles account management, transaction queuing, and blockchain interactions.
 """
 
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass
 
 import structlog
@@ -12,9 +13,16 @@ import logging
 from eth_account import Account
 from eth_typing import ChecksumAddress
 from web3 import Web3
+from web3.providers.base import BaseProvider
 from web3.types import TxParams
 from web3.contract import Contract
 
+from flare_ai_defai.blockchain.balances import BalanceCache
+from flare_ai_defai.blockchain.block_watcher import BlockHeader
+from flare_ai_defai.blockchain.ftso import PriceService
+from flare_ai_defai.blockchain.gas_model import FALLBACK_GAS_LIMIT, GasModel
+from flare_ai_defai.blockchain.preflight import BundleSimulation, BundleSimulator
+from flare_ai_defai.blockchain.rpc_pool import rpc_provider
 from flare_ai_defai.models import UserInfo
 from flare_ai_defai.storage.fake_storage import WalletStore
 
@@ -28,11 +36,52 @@ class TxQueueElement:
     Attributes:
         msg (str): Description or context of the transaction
         tx (TxParams): Transaction parameters
+        simulation (Future[BundleSimulation] | None): Pre-flight simulation
+            of the transactions, started when they are queued
     """
 
     msg: str
     confirm_msg: str
     txs: list[TxParams]
+    simulation: Future[BundleSimulation] | None = None
+
+
+@dataclass(frozen=True)
+class ChainContext:
+    """
+    Chain state shared by every transaction of a bundle.
+
+    Attributes:
+        sender (ChecksumAddress): Wallet signing the bundle
+        nonce (int): The wallet's next nonce, pending transactions included
+        base_fee (int): Base fee of the latest block
+        priority_fee (int): Suggested priority fee
+        chain_id (int): Chain ID
+        timestamp (int): Timestamp of the latest block
+    """
+
+    sender: ChecksumAddress
+    nonce: int
+    base_fee: int
+    priority_fee: int
+    chain_id: int
+    timestamp: int
+
+    def tx_params(self, index: int = 0, value: int = 0, fee_multiplier: int = 2) -> TxParams:
+        """Transaction fields for the `index`-th transaction of the bundle."""
+        tx_params: TxParams = {
+            "from": self.sender,
+            "nonce": self.nonce + index,
+            # Placeholder so web3 does not estimate; the gas model sets the limit
+            "gas": FALLBACK_GAS_LIMIT,
+            "maxFeePerGas": fee_multiplier * (self.base_fee + self.priority_fee),
+            "maxPriorityFeePerGas": fee_multiplier * self.priority_fee,
+            "chainId": self.chain_id,
+            "type": 2,
+        }
+        if value:
+            tx_params["value"] = value
+        return tx_params
 
 
 logger = structlog.get_logger(__name__)
@@ -49,26 +98,49 @@ class FlareProvider:
         tx_queue (list[TxQueueElement]): Queue of pending transactions
         w3 (Web3): Web3 instance for blockchain interactions
         logger (BoundLogger): Structured logger for the provider
+        prices (PriceService): USD prices from the FTSO, cached per voting epoch
+        head (BlockHeader | None): Latest chain head from the block watcher,
+            whose base fee and time bundles are built against
+        balances (BalanceCache): Wallet balances, re-read only after a block
+            touches the wallet
     """
 
-    def __init__(self, web3_provider_url: str, wallet_store: WalletStore) -> None:
+    def __init__(self, web3_provider_url: str | BaseProvider, wallet_store: WalletStore) -> None:
         """
         Initialize the Flare Provider.
 
         Args:
-            web3_provider_url (str): URL of the Web3 provider endpoint
+            web3_provider_url (str | BaseProvider): URL of the Web3 provider
+                endpoint, or a provider such as an RPCPool to share
         """
         self.address: ChecksumAddress | None = None
         self.private_key: str | None = None
         self.tx_queue: list[TxQueueElement] = []
-        self.w3 = Web3(Web3.HTTPProvider(web3_provider_url))
+        self.w3 = Web3(rpc_provider(web3_provider_url))
         self.logger = logger.bind(router="flare_provider")
         self.wallet_store = wallet_store
+        self.simulator = BundleSimulator(self.w3)
+        self.gas_model = GasModel(self.w3)
+        self.prices = PriceService(self.w3)
+        self.head: BlockHeader | None = None
+        self.balances = BalanceCache(self.w3)
+        self._preflight_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="preflight")
         
         # Just for testing!
         #self.address = "0x1812C40b5785AeD831EC4a0d675f30c5461Fd42E"
         #self.private_key = "3294ca045aacbd40c717fe064ef5e39932d635b90335e881aae8d2c27dccccde"
 
+    def on_block(self, header: BlockHeader) -> None:
+        """
+        Record a new chain head, so bundles skip fetching the latest block,
+        and drop the cached balances of wallets its block touched.
+
+        Args:
+            header (BlockHeader): New chain head
+        """
+        self.head = header
+        self.balances.on_block(header)
+
     def reset(self) -> None:
         """
         Reset the provider state by clearing account details and transaction queue.
@@ -87,9 +159,73 @@ class FlareProvider:
             tx (TxParams): Transaction parameters
         """
         tx_queue_element = TxQueueElement(msg=msg, confirm_msg="CONFIRM", txs=txs)
+        # Simulate in the background while the caller builds its preview
+        tx_queue_element.simulation = self._preflight_pool.submit(
+            self.simulator.simulate, [dict(tx) for tx in txs]
+        )
         self.tx_queue.append(tx_queue_element)
         self.logger.debug("add_tx_to_queue", tx_queue=self.tx_queue)
 
+    def preflight(self, element: TxQueueElement | None = None) -> BundleSimulation | None:
+        """
+        Wait for a queued bundle's simulation and size its gas limits from it.
+
+        Args:
+            element (TxQueueElement | None): Queue entry, defaults to the latest
+
+        Returns:
+            BundleSimulation | None: The simulation, or None if there is nothing
+                to simulate or the node could not run it
+        """
+        element = element or (self.tx_queue[-1] if self.tx_queue else None)
+        if element is None or element.simulation is None:
+            return None
+        try:
+            simulation = element.simulation.result()
+        except Exception as e:
+            self.logger.warning("preflight_unavailable", error=str(e))
+            return None
+        if simulation.ok:
+            for tx, result in zip(element.txs, simulation.results, strict=True):
+                tx["gas"] = int(result.gas_used * self.gas_model.margin)
+                self.gas_model.seed(tx, result.gas_used)
+        return simulation
+
+    def chain_context(self, user: UserInfo) -> ChainContext:
+        """
+        Fetch the nonce, fees and chain ID for a bundle in one batched request.
+
+        Args:
+            user (UserInfo): User whose wallet signs the bundle
+
+        Returns:
+            ChainContext: State to build the bundle's transactions from
+
+        Raises:
+            ValueError: If the user has no wallet
+        """
+        address = self.wallet_store.get_address(user)
+        if not address:
+            raise ValueError("Account not initialized")
+        head = self.head
+        with self.w3.batch_requests() as batch:
+            batch.add(self.w3.eth.get_transaction_count(address, "pending"))
+            batch.add(self.w3.eth.max_priority_fee)
+            batch.add(self.w3.eth.chain_id)
+            if head is None:
+                batch.add(self.w3.eth.get_block("latest"))
+            nonce, priority_fee, chain_id, *block = batch.execute()
+        if head is None:
+            head = BlockHeader.from_rpc(block[0])
+        return ChainContext(
+            sender=Web3.to_checksum_address(address),
+            nonce=nonce,
+            base_fee=head.base_fee,
+            priority_fee=priority_fee,
+            chain_id=chain_id,
+            timestamp=head.timestamp,
+        )
+
     def send_tx_in_queue(self, user: UserInfo) -> list[str]:
         """
         Send the most recent transaction in the queue.
@@ -98,10 +234,16 @@ class FlareProvider:
             str: Transaction hash of the sent transaction
 
         Raises:
-            ValueError: If no transaction is found in the queue
+            ValueError: If no transaction is found in the queue, or the
+                pre-flight simulation shows it would revert
         """
         self.logger.debug("In send_tx_in_queue.", tx_queue=self.tx_queue)
         if self.tx_queue:
+            simulation = self.preflight(self.tx_queue[-1])
+            if simulation is not None and not simulation.ok:
+                self.tx_queue.pop()
+                msg = f"Transaction would revert, {simulation.revert_reason}"
+                raise ValueError(msg)
             tx_hashes = []
             for tx in self.tx_queue[-1].txs:
                 tx_hash = self.sign_and_send_transaction(user, tx)
@@ -148,7 +290,8 @@ class FlareProvider:
             tx, private_key=self.wallet_store.get_private_key(user)
         )
         tx_hash = self.w3.eth.send_raw_transaction(signed_tx.raw_transaction)
-        self.w3.eth.wait_for_transaction_receipt(tx_hash)
+        receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash)
+        self.gas_model.observe(tx, receipt)
         self.logger.debug("sign_and_send_transaction", tx=tx)
         return "0x" + tx_hash.hex()   
 
@@ -191,13 +334,12 @@ class FlareProvider:
             "nonce": self.w3.eth.get_transaction_count(self.wallet_store.get_address(user)),
             "to": self.w3.to_checksum_address(to_address),
             "value": self.w3.to_wei(amount, unit="ether"),
-            "gas": 500000,
             "maxFeePerGas": self.w3.eth.gas_price,
             "maxPriorityFeePerGas": self.w3.eth.max_priority_fee,
             "chainId": self.w3.eth.chain_id,
             "type": 2,
         }
-        return tx
+        return self.gas_model.fill(tx)
 
     def create_contract_function_tx(self, user:UserInfo, contract: Contract, function_name: str, add_to_nonce: int = 0, *args, **kwargs) -> TxParams:
         if not self.wallet_store.get_address(user):
@@ -220,12 +362,15 @@ class FlareProvider:
         tx = function(*args).build_transaction({
             "from": self.wallet_store.get_address(user),
             "nonce": nonce,
-            "gas": kwargs.get("gas", 500000),
+            # Placeholder so web3 does not estimate; the gas model sets the limit
+            "gas": kwargs.get("gas", 0),
             "maxFeePerGas": 2*(gas_price + priority_fee),
             "maxPriorityFeePerGas": 2*(priority_fee),
             "chainId": self.w3.eth.chain_id,
             "value": kwargs.get("value", 0),
         })
+        if "gas" not in kwargs:
+            self.gas_model.fill(tx)
         self.logger.debug("Created contract function tx", function=function_name, tx=tx)
         return tx
    
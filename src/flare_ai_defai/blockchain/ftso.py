@@ -0,0 +1,166 @@
+"""
+FTSOv2 Price Feeds
+
+Values token holdings in USD from Flare's enshrined FTSOv2 oracle. Feed
+values only change once per 90 second voting epoch, so every feed the app
+needs is read with a single `getFeedsById` call the first time prices are
+asked for in an epoch, and answered from memory for the rest of it. Which
+epoch it is follows from the clock alone, so a cached read costs no RPC.
+"""
+
+import threading
+import time
+from collections.abc import Callable, Mapping
+from dataclasses import dataclass
+from decimal import Decimal
+
+import structlog
+from requests.exceptions import RequestException
+from web3 import Web3
+from web3.contract import Contract
+from web3.exceptions import ContractLogicError, Web3RPCError
+
+from flare_ai_defai.blockchain.abi_registry import abi_registry
+from flare_ai_defai.blockchain.amounts import TokenAmount
+
+logger = structlog.get_logger(__name__)
+
+FLARE_CONTRACT_REGISTRY = "0xaD67FE66660Fb8dFE9d6b1b4240d8650e30F6019"
+VOTING_EPOCH_SECONDS = 90
+# Start of voting epoch 0 on Flare mainnet.
+FIRST_VOTING_EPOCH_START = 1658430000
+# Feed category of crypto price feeds.
+CRYPTO_CATEGORY = 0x01
+
+# Token -> FTSO feed name; tokens without a feed are left unpriced.
+TOKEN_FEEDS = {
+    "flr": "FLR/USD",
+    "wflr": "FLR/USD",
+    "usdc": "USDC/USD",
+    "usdt": "USDT/USD",
+    "weth": "ETH/USD",
+}
+
+
+def feed_id(name: str, category: int = CRYPTO_CATEGORY) -> bytes:
+    """Return the 21-byte FTSOv2 id of a feed such as ``"FLR/USD"``."""
+    return bytes([category]) + name.encode().ljust(20, b"\x00")
+
+
+def voting_epoch(timestamp: float) -> int:
+    """Return the voting epoch a Unix time falls in."""
+    return int(timestamp - FIRST_VOTING_EPOCH_START) // VOTING_EPOCH_SECONDS
+
+
+@dataclass(frozen=True)
+class FeedPrice:
+    """
+    A feed value as published for a voting epoch.
+
+    Attributes:
+        feed (str): Feed name, e.g. "FLR/USD"
+        value (int): Price scaled by 10**decimals
+        decimals (int): Decimal places of `value`, may be negative
+        timestamp (int): Time the value was published
+    """
+
+    feed: str
+    value: int
+    decimals: int
+    timestamp: int
+
+    def to_decimal(self) -> Decimal:
+        """Price as an exact decimal."""
+        return Decimal(self.value).scaleb(-self.decimals)
+
+
+class PriceService:
+    """
+    USD prices of tokens, refreshed once per FTSO voting epoch.
+
+    Attributes:
+        feeds (Mapping[str, str]): Token to feed name
+    """
+
+    def __init__(
+        self,
+        w3: Web3,
+        feeds: Mapping[str, str] = TOKEN_FEEDS,
+        ftso_address: str | None = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.w3 = w3
+        self.feeds = dict(feeds)
+        self.clock = clock
+        self._ftso: Contract | None = (
+            None
+            if ftso_address is None
+            else abi_registry.contract(w3, "ftso_v2", ftso_address)
+        )
+        self._epoch: int | None = None
+        self._prices: dict[str, FeedPrice] = {}
+        self._lock = threading.Lock()
+        self.logger = logger.bind(router="ftso")
+
+    @property
+    def ftso(self) -> Contract:
+        """FtsoV2 contract, resolved through the contract registry once."""
+        if self._ftso is None:
+            registry = abi_registry.contract(
+                self.w3, "flare_contract_registry", FLARE_CONTRACT_REGISTRY
+            )
+            address = registry.functions.getContractAddressByName("FtsoV2").call()
+            self._ftso = abi_registry.contract(self.w3, "ftso_v2", address)
+        return self._ftso
+
+    def prices(self) -> dict[str, FeedPrice]:
+        """
+        Return the current price of every priced token.
+
+        Returns:
+            dict[str, FeedPrice]: Token to feed price, from the current
+                voting epoch or, if the oracle could not be read, the last
+                one that was
+        """
+        epoch = voting_epoch(self.clock())
+        with self._lock:
+            if epoch != self._epoch:
+                self._refresh(epoch)
+            return dict(self._prices)
+
+    def price(self, token: str) -> Decimal | None:
+        """Return a token's USD price, None if it has no feed."""
+        feed_price = self.prices().get(token.lower())
+        return None if feed_price is None else feed_price.to_decimal()
+
+    def value(self, token: str, amount: TokenAmount) -> Decimal | None:
+        """Return the USD value of an amount of a token, None if unpriced."""
+        price = self.price(token)
+        return None if price is None else amount.to_decimal() * price
+
+    def _refresh(self, epoch: int) -> None:
+        names = sorted(set(self.feeds.values()))
+        try:
+            values, decimals, timestamp = self.ftso.functions.getFeedsById(
+                [feed_id(name) for name in names]
+            ).call()
+        except (
+            ContractLogicError,
+            Web3RPCError,
+            ValueError,
+            RequestException,
+            ConnectionError,
+            TimeoutError,
+        ) as e:
+            # Keep the last prices and retry next epoch rather than on every
+            # call, so an outage costs one failed read per epoch.
+            self._epoch = epoch
+            self.logger.warning("feeds_unavailable", epoch=epoch, error=str(e))
+            return
+        by_name = {
+            name: FeedPrice(name, value, places, timestamp)
+            for name, value, places in zip(names, values, decimals, strict=True)
+        }
+        self._prices = {token: by_name[name] for token, name in self.feeds.items()}
+        self._epoch = epoch
+        self.logger.debug("feeds_refreshed", epoch=epoch, feeds=len(names))
@@ -0,0 +1,131 @@
+"""
+Gas Limit Model
+
+Supplies gas limits without an `eth_estimateGas` per transaction. Gas is
+estimated once per (contract, function selector, argument shape) and then
+tracked as an exponentially-decayed average of the `gasUsed` reported by
+receipts, so limits follow what the chain actually charges. The argument
+shape is the calldata length, which captures dynamic arguments such as a
+swap path, plus whether the call carries value.
+"""
+
+import threading
+
+import structlog
+from eth_typing import ChecksumAddress
+from hexbytes import HexBytes
+from web3 import Web3
+from web3.exceptions import ContractLogicError, Web3RPCError
+from web3.types import TxParams, TxReceipt
+
+logger = structlog.get_logger(__name__)
+
+# Headroom over the expected gas, since state can change before inclusion.
+GAS_MARGIN = 1.2
+# Weight of each new receipt in the running average.
+GAS_DECAY = 0.2
+# Used when a transaction cannot be estimated on its own, e.g. a swap whose
+# approval is still queued; the pre-flight simulation then tightens it.
+FALLBACK_GAS_LIMIT = 500_000
+
+GasKey = tuple[ChecksumAddress | None, bytes, int, bool]
+
+
+def gas_key(tx: TxParams) -> GasKey:
+    """Return the (contract, selector, argument shape) key of a transaction."""
+    to = Web3.to_checksum_address(tx["to"]) if tx.get("to") else None
+    data = HexBytes(tx.get("data", b""))
+    return to, bytes(data[:4]), max(0, len(data) - 4), bool(tx.get("value"))
+
+
+class GasModel:
+    """
+    Gas expectations per (contract, selector, argument shape).
+
+    Attributes:
+        margin (float): Factor applied to the expected gas for the limit
+        decay (float): Weight of each new receipt in the running average
+    """
+
+    def __init__(
+        self, w3: Web3, margin: float = GAS_MARGIN, decay: float = GAS_DECAY
+    ) -> None:
+        self.w3 = w3
+        self.margin = margin
+        self.decay = decay
+        self._expected: dict[GasKey, float] = {}
+        self._lock = threading.Lock()
+        self.logger = logger.bind(router="gas_model")
+
+    def expected_gas(self, tx: TxParams) -> int | None:
+        """
+        Return the gas a transaction is expected to use.
+
+        Estimates it with one `eth_estimateGas` the first time its key is
+        seen, and answers from memory afterwards.
+
+        Args:
+            tx (TxParams): Transaction with at least `from`, `to` and `data`
+
+        Returns:
+            int | None: Expected gas, None if the transaction cannot be
+                estimated on its own
+        """
+        key = gas_key(tx)
+        with self._lock:
+            expected = self._expected.get(key)
+        if expected is not None:
+            return round(expected)
+        call: TxParams = {k: tx[k] for k in ("from", "to", "data", "value") if k in tx}
+        try:
+            gas = self.w3.eth.estimate_gas(call)
+        except (ContractLogicError, Web3RPCError, ValueError) as e:
+            self.logger.debug("estimate_failed", key=key[:2], error=str(e))
+            return None
+        self.seed(tx, gas)
+        return gas
+
+    def gas_limit(self, tx: TxParams) -> int:
+        """Return the gas limit for a transaction: expected gas plus the margin."""
+        expected = self.expected_gas(tx)
+        if expected is None:
+            return FALLBACK_GAS_LIMIT
+        return int(expected * self.margin)
+
+    def fill(self, tx: TxParams) -> TxParams:
+        """Set `tx["gas"]` from the model and return the transaction."""
+        tx["gas"] = self.gas_limit(tx)
+        return tx
+
+    def seed(self, tx: TxParams, gas: int) -> None:
+        """Record an estimate for a transaction's key unless one is known."""
+        with self._lock:
+            self._expected.setdefault(gas_key(tx), float(gas))
+
+    def observe(self, tx: TxParams, receipt: TxReceipt) -> None:
+        """
+        Fold a mined transaction's `gasUsed` into the running average.
+
+        Failed transactions are never folded in: one that reverted early
+        used less gas than a success needs, and one that ran out of gas says
+        nothing about what it needed, so the latter's key is dropped and
+        estimated again next time.
+
+        Args:
+            tx (TxParams): The transaction as sent
+            receipt (TxReceipt): Its receipt
+        """
+        key = gas_key(tx)
+        gas_used = receipt["gasUsed"]
+        with self._lock:
+            if not receipt["status"]:
+                if gas_used >= tx.get("gas", 0):
+                    self._expected.pop(key, None)
+                    self.logger.debug("out_of_gas", key=key[:2], gas=gas_used)
+                return
+            previous = self._expected.get(key)
+            self._expected[key] = (
+                float(gas_used)
+                if previous is None
+                else (1 - self.decay) * previous + self.decay * gas_used
+            )
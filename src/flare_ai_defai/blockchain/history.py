@@ -0,0 +1,261 @@
+"""
+Transaction History Indexer
+
+Tails `eth_getLogs` for the events that make up a user's history: ERC-20
+transfers in and out (which also cover kToken mints and redeems, and WFLR
+wraps), approvals and SparkDEX V3 swaps paid out to a wallet. Each pass
+reads from the stored checkpoint to a few blocks below the chain head (a
+node trailing the head can answer ranges that reach it with logs missing)
+in block ranges that shrink when the node rejects a range and grow back
+while it accepts them, and commits every range's events together with the
+new checkpoint, so a restart picks up where the last run left off. Passes
+run on a thread of the indexer's own, woken by each head the block watcher
+publishes, so a long backfill never holds up the watcher's other
+subscribers. Flare has single-slot finality, so indexed blocks never need
+to be rolled back.
+"""
+
+import threading
+from collections.abc import Iterable
+
+import structlog
+from eth_typing import ChecksumAddress
+from hexbytes import HexBytes
+from web3 import Web3
+from web3.exceptions import Web3RPCError
+from web3.types import LogReceipt
+
+from flare_ai_defai.blockchain.abi_registry import abi_registry
+from flare_ai_defai.blockchain.block_watcher import HEAD_LAG_BLOCKS, BlockHeader
+from flare_ai_defai.blockchain.pool_cache import MAX_LOG_RANGE, SWAP_TOPIC
+from flare_ai_defai.storage.fake_storage import WalletStore
+from flare_ai_defai.storage.history_store import HistoryEvent, HistoryStore
+
+logger = structlog.get_logger(__name__)
+
+TRANSFER_TOPIC = abi_registry.topic("erc20", "Transfer")
+APPROVAL_TOPIC = abi_registry.topic("erc20", "Approval")
+
+
+def _topic_address(topic: bytes) -> ChecksumAddress:
+    return Web3.to_checksum_address(HexBytes(topic)[-20:])
+
+
+def _address_topic(address: str) -> str:
+    return "0x" + "00" * 12 + address[2:].lower()
+
+
+class HistoryIndexer:
+    """
+    Incremental log indexer for the wallets in a WalletStore.
+
+    Attributes:
+        store (HistoryStore): Where events and the checkpoint are kept
+        wallets (WalletStore): Source of the addresses to index
+        start_block (int | None): Block to start from when there is no
+            checkpoint yet, defaults to the chain head at the first pass
+        max_range (int): Largest block range asked for in one request
+        head_lag (int): Blocks below the head left for a later pass
+    """
+
+    CHECKPOINT = "history"
+
+    def __init__(  # noqa: PLR0913, PLR0917
+        self,
+        w3: Web3,
+        store: HistoryStore,
+        wallets: WalletStore,
+        start_block: int | None = None,
+        max_range: int = MAX_LOG_RANGE,
+        head_lag: int = HEAD_LAG_BLOCKS,
+    ) -> None:
+        self.w3 = w3
+        self.store = store
+        self.wallets = wallets
+        self.start_block = start_block
+        self.max_range = max_range
+        self.head_lag = head_lag
+        self._range = max_range
+        self._lock = threading.Lock()
+        self._target: int | None = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.logger = logger.bind(router="history")
+
+    def sync(self, block_number: int | None = None) -> int:
+        """
+        Index every block from the checkpoint up to `head_lag` below a head.
+
+        Args:
+            block_number (int | None): Chain head, defaults to the node's
+                latest block
+
+        Returns:
+            int: Checkpoint after the pass
+
+        Raises:
+            Web3RPCError: If the node rejects even a single-block range
+        """
+        if block_number is None:
+            block_number = self.w3.eth.block_number
+        target = block_number - self.head_lag
+        with self._lock:
+            checkpoint = self.store.checkpoint(self.CHECKPOINT)
+            if checkpoint is None:
+                checkpoint = (
+                    target if self.start_block is None else self.start_block
+                ) - 1
+                self.store.commit(self.CHECKPOINT, checkpoint, [])
+            users = {Web3.to_checksum_address(a) for a in self.wallets.addresses()}
+            while checkpoint < target and not self._stop.is_set():
+                end = min(checkpoint + self._range, target) if users else target
+                try:
+                    logs = self._fetch(checkpoint + 1, end, users) if users else []
+                except (Web3RPCError, ValueError) as e:
+                    if self._range == 1:
+                        raise
+                    self._range = max(1, self._range // 2)
+                    self.logger.debug("range_shrunk", size=self._range, error=str(e))
+                    continue
+                events = self.decode(logs, users)
+                self.store.commit(self.CHECKPOINT, end, events)
+                self.logger.debug(
+                    "indexed",
+                    from_block=checkpoint + 1,
+                    to_block=end,
+                    events=len(events),
+                )
+                checkpoint = end
+                self._range = min(self.max_range, self._range * 2)
+            return checkpoint
+
+    def decode(
+        self, logs: Iterable[LogReceipt], users: set[ChecksumAddress]
+    ) -> list[HistoryEvent]:
+        """
+        Turn logs into one history event per wallet they touch.
+
+        Args:
+            logs (Iterable[LogReceipt]): Transfer, Approval and Swap logs
+            users (set[ChecksumAddress]): Indexed wallets
+
+        Returns:
+            list[HistoryEvent]: Events, possibly two for a transfer between
+                two indexed wallets
+        """
+        events: list[HistoryEvent] = []
+        for log in logs:
+            topics = [HexBytes(t) for t in log["topics"]]
+            if len(topics) < 3:  # noqa: PLR2004
+                continue
+            data = HexBytes(log["data"])
+            first, second = _topic_address(topics[1]), _topic_address(topics[2])
+            base = {
+                "block_number": log["blockNumber"],
+                "log_index": log["logIndex"],
+                "tx_hash": Web3.to_hex(log["transactionHash"]),
+                "contract": Web3.to_checksum_address(log["address"]),
+            }
+            if topics[0] == SWAP_TOPIC and second in users:
+                amount0, amount1 = self.w3.codec.decode(["int256", "int256"], data[:64])
+                events.append(
+                    HistoryEvent(
+                        account=second,
+                        kind="swap",
+                        counterparty=first,
+                        amount0=str(amount0),
+                        amount1=str(amount1),
+                        **base,
+                    )
+                )
+                continue
+            # ERC-721 transfers carry the token id as a fourth topic.
+            raw = data[:32] if data else (topics[3] if len(topics) > 3 else b"")  # noqa: PLR2004
+            value = str(int.from_bytes(raw, "big"))
+            if topics[0] == APPROVAL_TOPIC and first in users:
+                events.append(
+                    HistoryEvent(
+                        account=first,
+                        kind="approval",
+                        counterparty=second,
+                        amount0=value,
+                        **base,
+                    )
+                )
+            elif topics[0] == TRANSFER_TOPIC:
+                if first in users:
+                    events.append(
+                        HistoryEvent(
+                            account=first,
+                            kind="transfer_out",
+                            counterparty=second,
+                            amount0=value,
+                            **base,
+                        )
+                    )
+                if second in users:
+                    events.append(
+                        HistoryEvent(
+                            account=second,
+                            kind="transfer_in",
+                            counterparty=first,
+                            amount0=value,
+                            **base,
+                        )
+                    )
+        return events
+
+    def on_block(self, header: BlockHeader) -> None:
+        """Record a new chain head and wake the indexing thread to reach it."""
+        self._target = header.number
+        self._wake.set()
+
+    def start(self) -> None:
+        """Index up to each new head in a background thread until `stop`."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="history-indexer", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background thread once its current block range is stored."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait()
+            self._wake.clear()
+            target = self._target
+            if target is None or self._stop.is_set():
+                continue
+            try:
+                self.sync(target)
+            except Exception as e:  # noqa: BLE001
+                # The indexer thread outlives node errors; the next head
+                # retries from the checkpoint.
+                self.logger.warning("sync_failed", block=target, error=str(e))
+
+    def _fetch(
+        self, start: int, end: int, users: set[ChecksumAddress]
+    ) -> list[LogReceipt]:
+        # Topic filters OR within a position, so one request covers logs
+        # from/owned by a wallet and another covers logs paid out to one.
+        user_topics = [_address_topic(user) for user in sorted(users)]
+        logs: dict[tuple[int, int], LogReceipt] = {}
+        for topics in (
+            [[Web3.to_hex(TRANSFER_TOPIC), Web3.to_hex(APPROVAL_TOPIC)], user_topics],
+            [[Web3.to_hex(TRANSFER_TOPIC), Web3.to_hex(SWAP_TOPIC)], None, user_topics],
+        ):
+            for log in self.w3.eth.get_logs(
+                {"fromBlock": start, "toBlock": end, "topics": topics}
+            ):
+                logs[log["blockNumber"], log["logIndex"]] = log
+        return [logs[key] for key in sorted(logs)]
@@ -0,0 +1,421 @@
+"""
+Kinetic Market Indexer
+
+Keeps the read side of Kinetic in memory: per-kToken interest rates,
+exchange rate, cash, collateral factor and oracle price, plus
+`getAccountSnapshot` and the entered markets of every tracked wallet.
+Everything is read in one multicall per block, pinned to that block, so the
+values are mutually consistent and APY or position questions are answered
+without further RPC until the chain moves on. The market list and the oracle
+address come from the Comptroller once and are kept for the life of the
+indexer.
+"""
+
+import threading
+from collections.abc import Iterable
+from dataclasses import dataclass
+
+import structlog
+from eth_typing import ChecksumAddress
+from web3 import Web3
+from web3.contract import Contract
+
+from flare_ai_defai.blockchain.abi_registry import abi_registry
+from flare_ai_defai.blockchain.amounts import FLR_DECIMALS
+from flare_ai_defai.blockchain.block_watcher import BlockHeader
+from flare_ai_defai.blockchain.multicall import Call, CallResult, Multicall
+
+logger = structlog.get_logger(__name__)
+
+MANTISSA = 10**18
+# Flare produces a block roughly every 1.8 seconds.
+BLOCKS_PER_DAY = 48_000
+DAYS_PER_YEAR = 365
+
+MARKET_GETTERS = (
+    "supplyRatePerBlock",
+    "borrowRatePerBlock",
+    "exchangeRateStored",
+    "getCash",
+)
+
+
+def rate_to_apy(rate_per_block: int) -> float:
+    """Compound a per-block rate mantissa daily into an annual yield."""
+    daily = rate_per_block * BLOCKS_PER_DAY / MANTISSA
+    return (1 + daily) ** DAYS_PER_YEAR - 1
+
+
+@dataclass(frozen=True)
+class MarketData:
+    """
+    Rates and liquidity of a kToken market.
+
+    Attributes:
+        address (ChecksumAddress): kToken address
+        supply_rate_per_block (int): Supply rate mantissa per block
+        borrow_rate_per_block (int): Borrow rate mantissa per block
+        exchange_rate (int): Underlying per kToken, scaled by 1e18
+        cash (int): Underlying held by the market, in base units
+        block_number (int): Block the values were read at
+        collateral_factor (int): Share of supplies that backs borrows,
+            scaled by 1e18
+        price (int): Oracle price of one underlying base unit in USD,
+            scaled by 1e36, 0 if the oracle has none
+    """
+
+    address: ChecksumAddress
+    supply_rate_per_block: int
+    borrow_rate_per_block: int
+    exchange_rate: int
+    cash: int
+    block_number: int
+    collateral_factor: int = 0
+    price: int = 0
+
+    @property
+    def supply_apy(self) -> float:
+        return rate_to_apy(self.supply_rate_per_block)
+
+    @property
+    def borrow_apy(self) -> float:
+        return rate_to_apy(self.borrow_rate_per_block)
+
+
+@dataclass(frozen=True)
+class AccountSnapshot:
+    """
+    A wallet's position in one kToken market.
+
+    Attributes:
+        market (ChecksumAddress): kToken address
+        account (ChecksumAddress): Wallet address
+        ktoken_balance (int): kTokens held
+        borrow_balance (int): Underlying owed, in base units
+        exchange_rate (int): Underlying per kToken, scaled by 1e18
+        block_number (int): Block the snapshot was read at
+        collateral (bool): Whether the wallet entered the market, so its
+            supply backs the wallet's borrows
+    """
+
+    market: ChecksumAddress
+    account: ChecksumAddress
+    ktoken_balance: int
+    borrow_balance: int
+    exchange_rate: int
+    block_number: int
+    collateral: bool = False
+
+    @property
+    def supplied(self) -> int:
+        """Underlying the kTokens redeem for, in base units."""
+        return self.ktoken_balance * self.exchange_rate // MANTISSA
+
+    def __bool__(self) -> bool:
+        return bool(self.ktoken_balance or self.borrow_balance)
+
+
+class KineticIndexer:
+    """
+    Block-synchronised cache of Kinetic market data and account snapshots.
+
+    Reads call `refresh` first, which costs one `eth_blockNumber` and, only
+    when a new block has arrived, one multicall over every market and
+    tracked wallet.
+
+    Attributes:
+        block_number (int | None): Block the cached values are valid at
+        head (int | None): Latest head pushed by a block watcher; reads
+            refresh to it without an `eth_blockNumber` of their own
+    """
+
+    COMPTROLLER = "0x8041680Fb73E1Fe5F851e76233DCDfA0f2D2D7c8"
+
+    def __init__(
+        self,
+        w3: Web3,
+        multicall: Multicall | None = None,
+        markets: Iterable[str] | None = None,
+        comptroller_address: str = COMPTROLLER,
+        oracle_address: str | None = None,
+    ) -> None:
+        self.w3 = w3
+        self.multicall = multicall or Multicall(w3)
+        self.comptroller = abi_registry.contract(
+            w3, "kinetic_comptroller", comptroller_address
+        )
+        self.block_number: int | None = None
+        self.head: int | None = None
+        self._markets: list[ChecksumAddress] | None = (
+            None if markets is None else [Web3.to_checksum_address(m) for m in markets]
+        )
+        self._oracle: Contract | None = (
+            None
+            if oracle_address is None
+            else abi_registry.contract(w3, "kinetic_oracle", oracle_address)
+        )
+        # kToken -> (underlying token or None for native FLR, decimals)
+        self._underlyings: dict[
+            ChecksumAddress, tuple[ChecksumAddress | None, int]
+        ] = {}
+        self._accounts: set[ChecksumAddress] = set()
+        self._market_data: dict[ChecksumAddress, MarketData] = {}
+        self._snapshots: dict[
+            tuple[ChecksumAddress, ChecksumAddress], AccountSnapshot
+        ] = {}
+        self._lock = threading.RLock()
+        self.logger = logger.bind(router="kinetic_indexer")
+
+    @property
+    def markets(self) -> list[ChecksumAddress]:
+        """kToken addresses, read from the Comptroller on first use."""
+        with self._lock:
+            if self._markets is None:
+                self._markets = [
+                    Web3.to_checksum_address(m)
+                    for m in self.comptroller.functions.getAllMarkets().call()
+                ]
+                self.logger.debug("markets_loaded", markets=len(self._markets))
+            return self._markets
+
+    @property
+    def oracle(self) -> Contract:
+        """Price oracle, read from the Comptroller on first use."""
+        with self._lock:
+            if self._oracle is None:
+                self._oracle = abi_registry.contract(
+                    self.w3,
+                    "kinetic_oracle",
+                    self.comptroller.functions.oracle().call(),
+                )
+            return self._oracle
+
+    def underlying(self, market: str) -> tuple[ChecksumAddress | None, int]:
+        """
+        Return a market's underlying token and its decimals.
+
+        Every market's underlying is read on the first call, with one
+        multicall for the addresses and one for their decimals.
+
+        Args:
+            market (str): kToken address
+
+        Returns:
+            tuple[ChecksumAddress | None, int]: Underlying token, None for
+                the native FLR market, and its decimals
+        """
+        market = Web3.to_checksum_address(market)
+        with self._lock:
+            if market not in self._underlyings:
+                self._load_underlyings([*self.markets, market])
+            return self._underlyings[market]
+
+    def _load_underlyings(self, markets: list[ChecksumAddress]) -> None:
+        markets = [m for m in dict.fromkeys(markets) if m not in self._underlyings]
+        results = self.multicall.aggregate(
+            [
+                Call.from_function(
+                    abi_registry.contract(self.w3, "ktoken", m).functions.underlying()
+                )
+                for m in markets
+            ]
+        )
+        # The native market has no `underlying`, its calls revert.
+        tokens = {
+            market: Web3.to_checksum_address(result.value[0])
+            for market, result in zip(markets, results, strict=True)
+            if result.success
+        }
+        decimals = self.multicall.aggregate(
+            [
+                Call.from_function(
+                    abi_registry.contract(self.w3, "erc20", token).functions.decimals()
+                )
+                for token in tokens.values()
+            ]
+        )
+        token_decimals = {
+            token: result.value[0] if result.success else FLR_DECIMALS
+            for token, result in zip(tokens.values(), decimals, strict=True)
+        }
+        for market in markets:
+            token = tokens.get(market)
+            self._underlyings[market] = (
+                token,
+                FLR_DECIMALS if token is None else token_decimals[token],
+            )
+
+    @property
+    def accounts(self) -> list[ChecksumAddress]:
+        """Tracked wallets, sorted."""
+        with self._lock:
+            return sorted(self._accounts)
+
+    def track(self, account: str) -> None:
+        """Include a wallet's snapshots in every refresh from now on."""
+        account = Web3.to_checksum_address(account)
+        with self._lock:
+            if account in self._accounts:
+                return
+            self._accounts.add(account)
+            if self.block_number is not None:
+                self._read(self.block_number, accounts=[account], with_markets=False)
+
+    def refresh(self, block_number: int | None = None) -> int:
+        """
+        Bring markets and tracked snapshots up to a block.
+
+        Args:
+            block_number (int | None): Target block, defaults to the chain head
+
+        Returns:
+            int: Block the cache is now valid at
+        """
+        if block_number is None:
+            block_number = self.w3.eth.block_number if self.head is None else self.head
+        head = block_number
+        with self._lock:
+            if self.block_number is not None and head <= self.block_number:
+                return self.block_number
+            self._read(head, accounts=sorted(self._accounts), with_markets=True)
+            self.block_number = head
+            return head
+
+    def on_block(self, header: BlockHeader) -> None:
+        """Mark market data stale as of a new head; it is re-read on demand."""
+        self.head = header.number
+
+    def market(self, address: str) -> MarketData | None:
+        """Return the cached data of a kToken market, None if not listed."""
+        self.refresh()
+        return self._market_data.get(Web3.to_checksum_address(address))
+
+    def all_markets(self) -> list[MarketData]:
+        """Return the cached data of every market, in Comptroller order."""
+        self.refresh()
+        return [self._market_data[m] for m in self.markets if m in self._market_data]
+
+    def positions(self, account: str) -> list[AccountSnapshot]:
+        """
+        Return a wallet's non-empty positions.
+
+        The first call for a wallet starts tracking it; later calls in the
+        same block are answered from memory.
+
+        Args:
+            account (str): Wallet address
+
+        Returns:
+            list[AccountSnapshot]: Positions with a supply or a borrow
+        """
+        account = Web3.to_checksum_address(account)
+        self.refresh()
+        self.track(account)
+        with self._lock:
+            snapshots = [self._snapshots.get((m, account)) for m in self.markets]
+        return [s for s in snapshots if s]
+
+    def snapshots(self) -> list[AccountSnapshot]:
+        """Return the non-empty positions of every tracked wallet."""
+        self.refresh()
+        with self._lock:
+            return [s for s in self._snapshots.values() if s]
+
+    def _read(
+        self,
+        block_number: int,
+        accounts: list[ChecksumAddress],
+        *,
+        with_markets: bool,
+    ) -> None:
+        markets = self.markets
+        contracts = [abi_registry.contract(self.w3, "ktoken", m) for m in markets]
+        calls = []
+        if with_markets:
+            oracle = self.oracle
+            for market, contract in zip(markets, contracts, strict=True):
+                calls += [
+                    Call.from_function(getattr(contract.functions, getter)())
+                    for getter in MARKET_GETTERS
+                ]
+                calls += [
+                    Call.from_function(self.comptroller.functions.markets(market)),
+                    Call.from_function(oracle.functions.getUnderlyingPrice(market)),
+                ]
+        for account in accounts:
+            calls += [
+                Call.from_function(contract.functions.getAccountSnapshot(account))
+                for contract in contracts
+            ]
+            calls.append(
+                Call.from_function(self.comptroller.functions.getAssetsIn(account))
+            )
+        if not calls:
+            return
+        results = self.multicall.aggregate(calls, block_number)
+
+        if with_markets:
+            results = self._store_markets(block_number, results)
+        self._store_accounts(block_number, accounts, results)
+        self.logger.debug(
+            "indexed",
+            block=block_number,
+            markets=len(markets) if with_markets else 0,
+            accounts=len(accounts),
+        )
+
+    def _store_markets(
+        self, block_number: int, results: list[CallResult]
+    ) -> list[CallResult]:
+        """Store the market rows at the front of `results`; return the rest."""
+        width = len(MARKET_GETTERS) + 2
+        for i, market in enumerate(self.markets):
+            values = results[i * width : (i + 1) * width]
+            rates, listing, price = values[:-2], values[-2], values[-1]
+            if not all(r.success for r in rates):
+                self._market_data.pop(market, None)
+                continue
+            supply, borrow, exchange, cash = (r.value[0] for r in rates)
+            self._market_data[market] = MarketData(
+                market,
+                supply,
+                borrow,
+                exchange,
+                cash,
+                block_number,
+                collateral_factor=listing.value[1] if listing.success else 0,
+                price=price.value[0] if price.success else 0,
+            )
+        return results[len(self.markets) * width :]
+
+    def _store_accounts(
+        self,
+        block_number: int,
+        accounts: list[ChecksumAddress],
+        results: list[CallResult],
+    ) -> None:
+        """Store one row of market snapshots plus `getAssetsIn` per account."""
+        markets = self.markets
+        width = len(markets) + 1
+        for j, account in enumerate(accounts):
+            row = results[j * width : (j + 1) * width]
+            assets_in = (
+                {Web3.to_checksum_address(a) for a in row[-1].value[0]}
+                if row[-1].success
+                else set()
+            )
+            for market, result in zip(markets, row[:-1], strict=True):
+                # A non-zero first output is a Comptroller error code.
+                if not result.success or result.value[0] != 0:
+                    self._snapshots.pop((market, account), None)
+                    continue
+                _, balance, borrowed, exchange = result.value
+                self._snapshots[(market, account)] = AccountSnapshot(
+                    market,
+                    account,
+                    balance,
+                    borrowed,
+                    exchange,
+                    block_number,
+                    collateral=market in assets_in,
+                )
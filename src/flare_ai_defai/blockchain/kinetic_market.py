@@ -10,13 +10,26 @@ import structlog
 from eth_account import Account
 from eth_typing import ChecksumAddress
 from web3 import Web3
+from web3.providers.base import BaseProvider
 from web3.contract import Contract
+from web3.contract.contract import ContractFunction
 from web3.types import TxParams
 from flare_ai_defai.storage.fake_storage import WalletStore
 
 from flare_ai_defai.models import UserInfo
 
 from flare_ai_defai.blockchain import FlareExplorer, FlareProvider
+from flare_ai_defai.blockchain.abi_registry import abi_registry
+from flare_ai_defai.blockchain.allowances import AllowanceTracker
+from flare_ai_defai.blockchain.amounts import TokenAmount
+from flare_ai_defai.blockchain.block_watcher import BlockHeader
+from flare_ai_defai.blockchain.kinetic_indexer import (
+    AccountSnapshot,
+    KineticIndexer,
+    MarketData,
+)
+from flare_ai_defai.blockchain.kinetic_risk import AccountRisk, RiskEngine
+from flare_ai_defai.blockchain.rpc_pool import rpc_provider
 
 
 logger = structlog.get_logger(__name__)
@@ -33,93 +46,27 @@ class KineticMarket:
     SFLR_ABI_ADDRESS = "0x21c8F8DEf0A82000558EB5ceB5d5887AdFFb6256"
     
     SUPPLY_SFLR_ADDRESS = "0x291487beC339c2fE5D83DD45F0a15EFC9Ac45656"
+
+    # Token -> kToken market
+    MARKETS = {"sflr": SUPPLY_SFLR_ADDRESS, "usdc": BORROW_ADDRESS}
     
-    SFLR_ABI = [{
-        "inputs": [],
-        "name": "submit",
-        "outputs": [
-        {
-            "internalType": "uint256",
-            "name": "",
-            "type": "uint256"
-        }
-        ],
-        "stateMutability": "payable",
-        "type": "function"
-    },
-    {
-        "inputs": [],
-        "name": "decimals",
-        "outputs": [
-        {
-            "internalType": "uint8",
-            "name": "",
-            "type": "uint8"
-        }
-        ],
-        "stateMutability": "pure",
-        "type": "function"
-    },
-    {
-        "inputs": [
-        {
-            "internalType": "address",
-            "name": "spender",
-            "type": "address"
-        },
-        {
-            "internalType": "uint256",
-            "name": "amount",
-            "type": "uint256"
-        }
-        ],
-        "name": "approve",
-        "outputs": [
-        {
-            "internalType": "bool",
-            "name": "",
-            "type": "bool"
-        }
-        ],
-        "stateMutability": "nonpayable",
-        "type": "function"
-    }]
-    
-    SUPPLY_SFLR_ABI = [{
-        "constant": False,
-        "inputs": [
-        {
-            "internalType": "uint256",
-            "name": "mintAmount",
-            "type": "uint256"
-        }
-        ],
-        "name": "mint",
-        "outputs": [
-        {
-            "internalType": "uint256",
-            "name": "",
-            "type": "uint256"
-        }
-        ],
-        "payable": False,
-        "stateMutability": "nonpayable",
-        "type": "function"
-    },]
-
-    def __init__(self, web3_provider_url: str, flare_explorer: FlareExplorer, flare_provider: FlareProvider, wallet_store: WalletStore) -> None:
+    def __init__(self, web3_provider_url: str | BaseProvider, flare_explorer: FlareExplorer, flare_provider: FlareProvider, wallet_store: WalletStore) -> None:
         """
         Args:
-            web3_provider_url (str): URL of the Web3 provider endpoint
+            web3_provider_url (str | BaseProvider): URL of the Web3 provider
+                endpoint, or a provider such as an RPCPool to share
         """
         self.address: ChecksumAddress | None = None
         self.private_key: str | None = None
-        self.w3 = Web3(Web3.HTTPProvider(web3_provider_url)) 
+        self.w3 = Web3(rpc_provider(web3_provider_url))
         self.logger = logger.bind(router="kinetic_market")
         self.web3_provider_url = web3_provider_url
         self.flare_explorer = flare_explorer
         self.flare_provider = flare_provider
         self.wallet_store = wallet_store
+        self.indexer = KineticIndexer(self.w3)
+        self.risk = RiskEngine(self.indexer)
+        self.allowances = AllowanceTracker(self.w3, self.indexer.multicall)
         
         #self.supplySFLRwithFLR(user, 1)
         
@@ -127,9 +74,35 @@ class KineticMarket:
         #self.borrowUSDC(d)
         
 
+    def on_block(self, header: BlockHeader) -> None:
+        """
+        Mark market data, positions and allowances stale as of a new chain head.
+
+        Args:
+            header (BlockHeader): New chain head
+        """
+        self.indexer.on_block(header)
+        self.allowances.on_block(header)
+
     def getContract(self, address: str, abi_address: str) -> Contract:
-        abi = self.flare_explorer.get_contract_abi(abi_address)
-        return self.w3.eth.contract(address=address, abi=abi)
+        # The explorer is only asked for the ABI the first time it is needed.
+        abi_name = f"explorer:{abi_address}"
+        abi_registry.register_lazy(
+            abi_name, lambda: self.flare_explorer.get_contract_abi(abi_address)
+        )
+        return abi_registry.contract(self.w3, abi_name, address)
+
+    def getMarkets(self) -> list[MarketData]:
+        """Rates and cash of every Kinetic market, read once per block."""
+        return self.indexer.all_markets()
+
+    def getPositions(self, user: UserInfo) -> list[AccountSnapshot]:
+        """The user's Kinetic supplies and borrows, read once per block."""
+        return self.indexer.positions(self.wallet_store.get_address(user))
+
+    def getAccountRisk(self, user: UserInfo) -> AccountRisk:
+        """The user's health factor and remaining borrowing power."""
+        return self.risk.assess(self.wallet_store.get_address(user))
 
     def getBuyInFee(self) -> int:
         # Use the existing Web3 instance
@@ -180,8 +153,8 @@ class KineticMarket:
         https://flare-explorer.flare.network/tx/0x87345aaabd6d2ca19730c2dad62e617272200a1a0fdf2ebc31d2fb413d1ae4ae
         
         """
-        amount_wei = int( amount * pow(10,18) )
-        contract = self.w3.eth.contract(address=self.SUPPLY_SFLR_ADDRESS, abi=self.SUPPLY_SFLR_ABI)
+        amount_wei = TokenAmount.from_decimal(amount).wei
+        contract = abi_registry.contract(self.w3, "ktoken", self.SUPPLY_SFLR_ADDRESS)
         tx = self.flare_provider.create_contract_function_tx(
             user, contract, "mint", 0, amount_wei
         )
@@ -206,20 +179,20 @@ class KineticMarket:
         if not self.w3.is_connected():
             raise Exception("Not connected to Flare blockchain")
         
-        contract = self.w3.eth.contract(address=self.SFLR_ADDRESS, abi=self.SFLR_ABI)
+        contract = abi_registry.contract(self.w3, "sflr", self.SFLR_ADDRESS)
 
         # Get decimals (typically 18 for FLR/sFLR)
         decimals = contract.functions.decimals().call()
         self.logger.debug("Fetched decimals", decimals=decimals)
         
         # Convert amount to wei
-        amount_wei = int(amount * pow(10,decimals))
+        amount_wei = TokenAmount.from_decimal(amount, decimals).wei
         self.logger.debug("Converted amount to wei", amount=amount, amount_wei=amount_wei)
         
         # Check balance
         balance = self.w3.eth.get_balance(self.wallet_store.get_address(user))
         if balance < amount_wei:
-            raise ValueError(f"Insufficient balance: {self.w3.from_wei(balance, 'ether')} FLR, required: {amount} FLR")
+            raise ValueError(f"Insufficient balance: {TokenAmount(balance)} FLR, required: {amount} FLR")
         
         # Fetch current nonce
         current_nonce = self.w3.eth.get_transaction_count(self.wallet_store.get_address(user))
@@ -241,31 +214,129 @@ class KineticMarket:
         return [tx1]
         
         
-    def borrowUSDC(self,user_order: dict):
+    def getMarket(self, token: str) -> str:
+        """kToken address of the market for `token`, e.g. "usdc"."""
+        market = self.MARKETS.get(token.lower())
+        if market is None:
+            raise ValueError(f"Kinetic has no {token} market")
+        return market
+
+    def previewBorrow(self, user: UserInfo, token: str, amount: float,
+                      collateral: str | None = None) -> AccountRisk:
+        """
+        The user's position after a borrow, from cached prices and positions.
+
+        Args:
+            user (UserInfo): Borrowing user
+            token (str): Token borrowed
+            amount (float): Amount borrowed, in whole tokens
+            collateral (str | None): Token whose supply backs the borrow; its
+                market is entered first if the user has not entered it yet
+
+        Returns:
+            AccountRisk: Position after the borrow
+
+        Raises:
+            ValueError: If the market cannot lend the amount
+        """
+        market = self.getMarket(token)
+        _, decimals = self.indexer.underlying(market)
+        entering = [self.getMarket(collateral)] if collateral else []
+        return self.risk.check_borrow(self.wallet_store.get_address(user), market,
+                                      TokenAmount.from_decimal(amount, decimals).wei, entering)
+
+    def borrowTx(self, user: UserInfo, token: str, amount: float,
+                 collateral: str | None = None, *,
+                 risk: AccountRisk | None = None) -> list[TxParams]:
         """
+        Build a borrow, preceded by entering the collateral market if needed.
+
         When you click to borrow you sign a transaction request with 29B8.
         This interacts with a borrow() function
         https://flarescan.com//tx/0x91b3d1e4c4178d05914f05c13d47ee3c2869087b0a7ef7a9b636f8e8ad759f19
+
+        `risk` is the caller's `previewBorrow` of the same borrow, if it
+        already has one.
+
+        Raises:
+            ValueError: If the borrow would leave the user liquidatable
         """
-        token = user_order["token"]
-        collateral = user_order["collateral"]
-        amount = user_order["amount"]
-        
-        contract = self.getContract(self.BORROW_ADDRESS, self.BORROW_ABI_ADDRESS)
-        #for function in contract.functions:
-        #    print(function)
-        decimals = contract.functions.decimals().call()
-        result = contract.functions.borrow(int(pow(10,decimals)*amount)).call()
-        print(result)
+        market = self.getMarket(token)
+        _, decimals = self.indexer.underlying(market)
+        amount_wei = TokenAmount.from_decimal(amount, decimals).wei
+        if not amount_wei:
+            raise ValueError("Borrow amount must be more than 0")
+        if risk is None:
+            risk = self.previewBorrow(user, token, amount, collateral)
+        if risk.health_factor < 1:
+            entering = [self.getMarket(collateral)] if collateral else []
+            max_borrow = TokenAmount(self.risk.max_borrow(risk.account, market, entering), decimals)
+            raise ValueError(f"Not enough collateral to borrow {amount} {token}, at most {max_borrow} can be borrowed")
+
+        calls = []
+        entered = {p.market for p in self.indexer.positions(risk.account) if p.collateral}
+        if collateral and self.getMarket(collateral) not in entered:
+            calls.append(self.indexer.comptroller.functions.enterMarkets([self.getMarket(collateral)]))
+        ktoken = abi_registry.contract(self.w3, "ktoken", market)
+        calls.append(ktoken.functions.borrow(amount_wei))
+        return self._bundle(user, calls)
 
-    def borrowUSDT():
+    def repayTx(self, user: UserInfo, token: str, amount: float) -> list[TxParams]:
         """
-        When you click to borrow you sign a transaction request with 93bb.
-        This interacts with a borrow() function
-        https://flarescan.com//tx/0xfaff5427e53996a324e81357b1eb9eef430ba5e210f0973f46719f2066510d6d
-        
+        Build a repayment, preceded by an approval if the allowance is short.
+
+        Repays at most what is owed as of the cached block.
         """
-        pass
+        market = self.getMarket(token)
+        underlying, decimals = self.indexer.underlying(market)
+        if underlying is None:
+            raise ValueError(f"Repaying {token} is not supported")
+        address = self.wallet_store.get_address(user)
+        owed = sum(p.borrow_balance for p in self.indexer.positions(address) if p.market == market)
+        if not owed:
+            raise ValueError(f"Nothing to repay, no {token} is borrowed")
+        amount_wei = min(TokenAmount.from_decimal(amount, decimals).wei, owed)
+
+        calls = []
+        approval = self.allowances.required_approval(address, underlying, market, amount_wei)
+        if approval is not None:
+            erc20 = abi_registry.contract(self.w3, "erc20", underlying)
+            calls.append(erc20.functions.approve(market, approval))
+        ktoken = abi_registry.contract(self.w3, "ktoken", market)
+        calls.append(ktoken.functions.repayBorrow(amount_wei))
+        txs = self._bundle(user, calls)
+        self.allowances.record_spend(address, underlying, market, amount_wei)
+        return txs
+
+    def redeemTx(self, user: UserInfo, token: str, amount: float) -> list[TxParams]:
+        """Build a withdrawal of `amount` underlying from a market's supply."""
+        market = self.getMarket(token)
+        _, decimals = self.indexer.underlying(market)
+        address = self.wallet_store.get_address(user)
+        supplied = sum(p.supplied for p in self.indexer.positions(address) if p.market == market)
+        amount_wei = TokenAmount.from_decimal(amount, decimals).wei
+        if amount_wei > supplied:
+            raise ValueError(f"Only {TokenAmount(supplied, decimals)} {token} is supplied")
+        ktoken = abi_registry.contract(self.w3, "ktoken", market)
+        return self._bundle(user, [ktoken.functions.redeemUnderlying(amount_wei)])
+
+    def enterMarketsTx(self, user: UserInfo, tokens: list[str]) -> list[TxParams]:
+        """
+        Build a transaction that lets the user's supplies back borrows.
+
+        When you click to enable collateral, you a prompted with a transaction request with D7c8
+        """
+        markets = [self.getMarket(token) for token in tokens]
+        return self._bundle(user, [self.indexer.comptroller.functions.enterMarkets(markets)])
+
+    def _bundle(self, user: UserInfo, calls: list[ContractFunction]) -> list[TxParams]:
+        """One transaction per call, nonces and fees from one batched fetch."""
+        context = self.flare_provider.chain_context(user)
+        gas_model = self.flare_provider.gas_model
+        return [
+            gas_model.fill(call.build_transaction(context.tx_params(index)))
+            for index, call in enumerate(calls)
+        ]
 
     def stakeJoule():
         pass
@@ -0,0 +1,274 @@
+"""
+Kinetic Liquidation Risk
+
+Health factors, borrowing power and liquidation prices for every wallet the
+`KineticIndexer` tracks. Once per block, all positions are flattened into
+parallel columns of per-(wallet, market) collateral and borrow values and
+summed per wallet in a single pass, using the block's oracle prices and
+collateral factors. A borrow preview, a liquidation price or an alert scan
+is then a few integer operations on those totals, with no RPC.
+
+Values follow the Comptroller's liquidity check: USD scaled by 1e18, with
+only markets the wallet entered counting as collateral, at their collateral
+factor.
+"""
+
+import math
+import threading
+from collections import defaultdict
+from collections.abc import Iterable
+from dataclasses import dataclass
+
+import structlog
+from eth_typing import ChecksumAddress
+from web3 import Web3
+
+from flare_ai_defai.blockchain.kinetic_indexer import MANTISSA, KineticIndexer
+
+logger = structlog.get_logger(__name__)
+
+# Wallets below this health factor are reported by `scan`.
+ALERT_HEALTH_FACTOR = 1.1
+
+_Position = tuple[int, int]  # (collateral value, borrow value)
+
+
+@dataclass(frozen=True)
+class AccountRisk:
+    """
+    A wallet's aggregate Kinetic position.
+
+    Attributes:
+        account (ChecksumAddress): Wallet address
+        collateral_value (int): Borrowing power of its collateral, USD * 1e18
+        borrow_value (int): Value of its borrows, USD * 1e18
+        block_number (int): Block the prices and positions are from
+    """
+
+    account: ChecksumAddress
+    collateral_value: int
+    borrow_value: int
+    block_number: int
+
+    @property
+    def health_factor(self) -> float:
+        """Collateral over borrows; below 1 the wallet can be liquidated."""
+        if not self.borrow_value:
+            return math.inf
+        return self.collateral_value / self.borrow_value
+
+    @property
+    def liquidity(self) -> int:
+        """Value that can still be borrowed, USD * 1e18."""
+        return max(0, self.collateral_value - self.borrow_value)
+
+    @property
+    def shortfall(self) -> int:
+        """Value by which borrows exceed collateral, USD * 1e18."""
+        return max(0, self.borrow_value - self.collateral_value)
+
+
+@dataclass(frozen=True)
+class _Book:
+    block_number: int
+    totals: dict[ChecksumAddress, _Position]
+    positions: dict[tuple[ChecksumAddress, ChecksumAddress], _Position]
+
+
+class RiskEngine:
+    """
+    Liquidation risk of tracked Kinetic wallets, recomputed once per block.
+
+    Attributes:
+        indexer (KineticIndexer): Source of prices and positions
+    """
+
+    def __init__(self, indexer: KineticIndexer) -> None:
+        self.indexer = indexer
+        self._book: _Book | None = None
+        self._lock = threading.Lock()
+        self.logger = logger.bind(router="kinetic_risk")
+
+    def assess(self, account: str) -> AccountRisk:
+        """Return a wallet's current risk, tracking it from now on."""
+        account = Web3.to_checksum_address(account)
+        if account not in self.indexer.accounts:
+            self.indexer.track(account)
+            with self._lock:
+                self._book = None
+        book = self._current()
+        collateral, borrowed = book.totals.get(account, (0, 0))
+        return AccountRisk(account, collateral, borrowed, book.block_number)
+
+    def scan(self, threshold: float = ALERT_HEALTH_FACTOR) -> list[AccountRisk]:
+        """
+        Return tracked wallets whose health factor is below `threshold`.
+
+        Args:
+            threshold (float): Health factor to alert below
+
+        Returns:
+            list[AccountRisk]: Wallets at risk, riskiest first
+        """
+        book = self._current()
+        at_risk = [
+            AccountRisk(account, collateral, borrowed, book.block_number)
+            for account, (collateral, borrowed) in book.totals.items()
+            if borrowed and collateral < threshold * borrowed
+        ]
+        return sorted(at_risk, key=lambda risk: risk.health_factor)
+
+    def check_borrow(
+        self,
+        account: str,
+        market: str,
+        amount: int,
+        entering: Iterable[str] = (),
+    ) -> AccountRisk:
+        """
+        Return a wallet's risk as it would be after borrowing.
+
+        Args:
+            account (str): Borrowing wallet
+            market (str): kToken borrowed from
+            amount (int): Underlying borrowed, in base units
+            entering (Iterable[str]): Markets the wallet enters in the same
+                bundle, whose supplies start counting as collateral
+
+        Returns:
+            AccountRisk: Position after the borrow; a health factor below 1
+                means the Comptroller would reject it
+
+        Raises:
+            ValueError: If the market is unknown, unpriced or short of cash
+        """
+        data = self.indexer.market(market)
+        if data is None or not data.price:
+            msg = f"No price for Kinetic market {market}"
+            raise ValueError(msg)
+        if amount > data.cash:
+            msg = f"Kinetic market {market} only holds {data.cash} to lend"
+            raise ValueError(msg)
+        risk = self.assess(account)
+        entering = {Web3.to_checksum_address(m) for m in entering}
+        collateral_value = risk.collateral_value
+        for snapshot in self.indexer.positions(risk.account):
+            entered = self.indexer.market(snapshot.market)
+            if snapshot.collateral or snapshot.market not in entering or not entered:
+                continue
+            collateral_value += (
+                snapshot.supplied
+                * entered.price
+                // MANTISSA
+                * entered.collateral_factor
+                // MANTISSA
+            )
+        return AccountRisk(
+            risk.account,
+            collateral_value,
+            risk.borrow_value + amount * data.price // MANTISSA,
+            risk.block_number,
+        )
+
+    def max_borrow(
+        self, account: str, market: str, entering: Iterable[str] = ()
+    ) -> int:
+        """
+        Return the most a wallet can borrow from a market.
+
+        Args:
+            account (str): Borrowing wallet
+            market (str): kToken borrowed from
+            entering (Iterable[str]): Markets the wallet enters first
+
+        Returns:
+            int: Underlying in base units, limited by the market's cash
+        """
+        data = self.indexer.market(market)
+        if data is None or not data.price:
+            return 0
+        liquidity = self.check_borrow(account, market, 0, entering).liquidity
+        return min(liquidity * MANTISSA // data.price, data.cash)
+
+    def liquidation_price(self, account: str, market: str) -> int | None:
+        """
+        Return the price of a market's underlying at which a wallet breaks even.
+
+        Other prices are held fixed. Collateral in the market lowers the
+        liquidation price below the current one; a borrow raises it above.
+
+        Args:
+            account (str): Wallet address
+            market (str): kToken whose underlying price moves
+
+        Returns:
+            int | None: Price in the oracle's scale, None if no price of
+                this asset alone can make the wallet liquidatable
+        """
+        account = Web3.to_checksum_address(account)
+        market = Web3.to_checksum_address(market)
+        data = self.indexer.market(market)
+        risk = self.assess(account)
+        if data is None or not data.price or not risk.borrow_value:
+            return None
+        book = self._current()
+        collateral, borrowed = book.positions.get((account, market), (0, 0))
+        exposure = collateral - borrowed
+        if not exposure:
+            return None
+        # Solve other_collateral + k * collateral == other_borrows + k * borrowed.
+        net_other = (risk.borrow_value - borrowed) - (
+            risk.collateral_value - collateral
+        )
+        if net_other * exposure <= 0:
+            return None
+        return data.price * net_other // exposure
+
+    def _current(self) -> _Book:
+        block_number = self.indexer.refresh()
+        with self._lock:
+            if self._book is not None and self._book.block_number == block_number:
+                return self._book
+        book = self._build(block_number)
+        with self._lock:
+            self._book = book
+        return book
+
+    def _build(self, block_number: int) -> _Book:
+        markets = {m.address: m for m in self.indexer.all_markets()}
+        snapshots = [s for s in self.indexer.snapshots() if s.market in markets]
+
+        # Columns, one row per (wallet, market) position.
+        prices = [markets[s.market].price for s in snapshots]
+        collateral_factors = [
+            markets[s.market].collateral_factor if s.collateral else 0
+            for s in snapshots
+        ]
+        collateral_values = [
+            s.supplied * price // MANTISSA * factor // MANTISSA
+            for s, price, factor in zip(
+                snapshots, prices, collateral_factors, strict=True
+            )
+        ]
+        borrow_values = [
+            s.borrow_balance * price // MANTISSA
+            for s, price in zip(snapshots, prices, strict=True)
+        ]
+
+        collateral_totals: defaultdict[ChecksumAddress, int] = defaultdict(int)
+        borrow_totals: defaultdict[ChecksumAddress, int] = defaultdict(int)
+        positions = {}
+        for s, collateral, borrowed in zip(
+            snapshots, collateral_values, borrow_values, strict=True
+        ):
+            collateral_totals[s.account] += collateral
+            borrow_totals[s.account] += borrowed
+            positions[(s.account, s.market)] = (collateral, borrowed)
+        totals = {
+            account: (collateral_totals[account], borrow_totals[account])
+            for account in collateral_totals
+        }
+        self.logger.debug(
+            "risk_book", block=block_number, accounts=len(totals), rows=len(snapshots)
+        )
+        return _Book(block_number, totals, positions)
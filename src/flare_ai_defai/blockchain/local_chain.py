@@ -0,0 +1,1000 @@
+"""
+Local Flare Chain
+
+In-process stand-in for a Flare node, so the FlareProvider, SparkDEX and
+KineticMarket paths can be exercised and benchmarked with no network. It is
+a web3 provider that answers the JSON-RPC methods the app uses from an
+in-memory chain that mines one block per transaction.
+
+Contracts are Python classes (see `local_contracts`) rather than bytecode.
+Calls are decoded with the same registry ABIs the app encodes them with and
+routed to a method of the same name, and contract state lives in 256-bit
+storage slots laid out as the Solidity originals lay it out, so `eth_call`
+state overrides, `eth_getStorageAt` and the pre-flight slot probing behave
+as they do against a real node. Gas is a per-function schedule, close to
+mainnet costs but not exact.
+
+State is kept per block for the most recent `HISTORY_BLOCKS` blocks;
+reading older state fails the way a pruned node does.
+"""
+
+import functools
+import re
+import threading
+import time
+from collections import Counter
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, ClassVar, TypeVar
+
+import structlog
+from eth_abi import decode, encode
+from eth_abi.exceptions import DecodingError
+from eth_account import Account
+from eth_account.typed_transactions import TypedTransaction
+from eth_typing import ChecksumAddress
+from eth_utils import keccak
+from eth_utils.abi import abi_to_signature, get_abi_input_types, get_abi_output_types
+from hexbytes import HexBytes
+from web3 import Web3
+from web3.providers.base import JSONBaseProvider
+from web3.types import RPCEndpoint, RPCResponse
+
+from flare_ai_defai.blockchain.abi_registry import abi_registry
+
+logger = structlog.get_logger(__name__)
+
+CHAIN_ID = 14
+# Flare's minimum base fee.
+BASE_FEE = 25 * 10**9
+PRIORITY_FEE = 10**9
+BLOCK_GAS_LIMIT = 15_000_000
+INTRINSIC_GAS = 21_000
+ZERO_BYTE_GAS = 4
+DATA_BYTE_GAS = 16
+# Gas of a contract function missing from its contract's schedule.
+DEFAULT_CALL_GAS = 5_000
+# Blocks whose state stays readable.
+HISTORY_BLOCKS = 64
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+ZERO_HASH = bytes(32)
+WORD_MASK = 2**256 - 1
+ERROR_SELECTOR = bytes.fromhex("08c379a0")
+SELECTOR_SIZE = 4
+# Highest first byte of a typed (EIP-2718) transaction.
+MAX_TX_TYPE = 0x7F
+CLIENT_VERSION = "flare-ai-defai/local-chain"
+
+
+class Revert(Exception):  # noqa: N818
+    """A contract call reverted; `reason` is returned as `Error(string)`."""
+
+    def __init__(self, reason: str = "") -> None:
+        super().__init__(reason)
+        self.reason = reason
+
+    @property
+    def data(self) -> bytes:
+        return ERROR_SELECTOR + encode(["string"], [self.reason])
+
+
+def require(condition: object, reason: str) -> None:
+    """Revert with `reason` unless `condition` holds, like Solidity's `require`."""
+    if not condition:
+        raise Revert(reason)
+
+
+class OutOfGas(Exception):  # noqa: N818
+    """Execution used more gas than its limit; it cannot be caught by contracts."""
+
+
+class RPCError(Exception):
+    """A JSON-RPC error answer."""
+
+    def __init__(self, code: int, message: str, data: str | None = None) -> None:
+        super().__init__(message)
+        self.code = code
+        self.message = message
+        self.data = data
+
+    def to_dict(self) -> dict[str, Any]:
+        error: dict[str, Any] = {"code": self.code, "message": self.message}
+        if self.data is not None:
+            error["data"] = self.data
+        return error
+
+
+def to_address(value: int | str | bytes) -> ChecksumAddress:
+    """Checksum an address given as a storage word, hex string or bytes."""
+    if isinstance(value, int):
+        value = value.to_bytes(32, "big")[-20:]
+    return Web3.to_checksum_address(value)
+
+
+def _key_word(key: int | str | bytes) -> bytes:
+    if isinstance(key, str):
+        return bytes(12) + bytes.fromhex(to_address(key)[2:])
+    if isinstance(key, bytes):
+        # Fixed-size byte keys are left aligned.
+        return key.ljust(32, b"\x00")
+    return (key & WORD_MASK).to_bytes(32, "big")
+
+
+def storage_slot(base: int, *keys: int | str | bytes) -> int:
+    """
+    Storage slot of `mapping[keys[0]][keys[1]]...` declared at slot `base`.
+
+    Args:
+        base (int): Slot the mapping is declared at
+        *keys (int | str | bytes): Address, integer or fixed-size byte keys;
+            negative integers are stored as two's complement, like int24 ticks
+
+    Returns:
+        int: Slot of the value
+    """
+    slot = base
+    for key in keys:
+        slot = int.from_bytes(keccak(_key_word(key) + slot.to_bytes(32, "big")), "big")
+    return slot
+
+
+def to_signed(word: int, bits: int = 256) -> int:
+    """Read a storage word as a two's complement integer of `bits` bits."""
+    word &= (1 << bits) - 1
+    return word - (1 << bits) if word >> (bits - 1) else word
+
+
+@dataclass(frozen=True)
+class Log:
+    """An event emitted during execution."""
+
+    address: ChecksumAddress
+    topics: tuple[bytes, ...]
+    data: bytes
+
+
+class State:
+    """
+    One layer of account state over its parent.
+
+    Every block, transaction and call gets its own layer, which is merged
+    into its parent when it succeeds and dropped when it reverts.
+    """
+
+    def __init__(self, parent: "State | None" = None) -> None:
+        self.parent = parent
+        self.balances: dict[str, int] = {}
+        self.nonces: dict[str, int] = {}
+        self.storage: dict[str, dict[int, int]] = {}
+        # Accounts whose storage below this layer is ignored.
+        self.replaced: set[str] = set()
+        self.logs: list[Log] = []
+
+    def child(self) -> "State":
+        return State(self)
+
+    def balance(self, address: str) -> int:
+        layer: State | None = self
+        while layer is not None:
+            value = layer.balances.get(address)
+            if value is not None:
+                return value
+            layer = layer.parent
+        return 0
+
+    def nonce(self, address: str) -> int:
+        layer: State | None = self
+        while layer is not None:
+            value = layer.nonces.get(address)
+            if value is not None:
+                return value
+            layer = layer.parent
+        return 0
+
+    def load(self, address: str, slot: int) -> int:
+        layer: State | None = self
+        while layer is not None:
+            slots = layer.storage.get(address)
+            if slots is not None:
+                value = slots.get(slot)
+                if value is not None:
+                    return value
+            if address in layer.replaced:
+                return 0
+            layer = layer.parent
+        return 0
+
+    def store(self, address: str, slot: int, value: int) -> None:
+        self.storage.setdefault(address, {})[slot] = value & WORD_MASK
+
+    def commit(self) -> None:
+        """Merge this layer into its parent."""
+        parent = self.parent
+        if parent is None:
+            return
+        for address in self.replaced:
+            parent.storage[address] = {}
+            parent.replaced.add(address)
+        parent.balances.update(self.balances)
+        parent.nonces.update(self.nonces)
+        for address, slots in self.storage.items():
+            parent.storage.setdefault(address, {}).update(slots)
+        parent.logs.extend(self.logs)
+
+
+@dataclass(frozen=True)
+class BlockEnv:
+    """The block a transaction or call executes in."""
+
+    number: int
+    timestamp: int
+    base_fee: int
+
+
+@dataclass(frozen=True)
+class Message:
+    """
+    A call into a contract.
+
+    Attributes:
+        sender (ChecksumAddress): Caller, `msg.sender`
+        address (ChecksumAddress): Contract called, `address(this)`
+        value (int): Native FLR sent, in wei
+        data (bytes): Calldata
+    """
+
+    sender: ChecksumAddress
+    address: ChecksumAddress
+    value: int
+    data: bytes
+
+
+@dataclass
+class _Block:
+    number: int
+    hash: bytes
+    parent_hash: bytes
+    timestamp: int
+    base_fee: int
+    state: State | None
+    gas_used: int = 0
+    transactions: list[bytes] = field(default_factory=list)
+    logs: list[dict[str, Any]] = field(default_factory=list)
+
+
+class Context:
+    """
+    Execution of one transaction or call.
+
+    Contracts read and write state, call each other and emit events through
+    the context, which unwinds the writes of any call that reverts.
+
+    Attributes:
+        chain (LocalChain): Chain executed on
+        state (State): Layer of the call currently executing
+        block (BlockEnv): Block executed in
+        origin (ChecksumAddress): Sender of the transaction, `tx.origin`
+        gas_limit (int): Gas available
+        gas_used (int): Gas charged so far
+    """
+
+    def __init__(
+        self,
+        chain: "LocalChain",
+        state: State,
+        block: BlockEnv,
+        origin: str = ZERO_ADDRESS,
+        gas_limit: int = BLOCK_GAS_LIMIT,
+    ) -> None:
+        self.chain = chain
+        self.state = state
+        self.block = block
+        self.origin = to_address(origin)
+        self.gas_limit = gas_limit
+        self.gas_used = 0
+
+    def charge(self, gas: int) -> None:
+        """Use gas, failing the whole execution once the limit is passed."""
+        self.gas_used += gas
+        if self.gas_used > self.gas_limit:
+            raise OutOfGas
+
+    @contextmanager
+    def frame(self) -> Iterator[None]:
+        """Run a block in a state layer of its own, undone if it raises."""
+        parent = self.state
+        self.state = parent.child()
+        try:
+            yield
+        except Exception:
+            self.state = parent
+            raise
+        child, self.state = self.state, parent
+        child.commit()
+
+    def call(self, sender: str, to: str, data: bytes = b"", value: int = 0) -> bytes:
+        """
+        Call an account, sending `value` FLR along.
+
+        Args:
+            sender (str): Caller
+            to (str): Account called
+            data (bytes): Calldata
+            value (int): FLR sent, in wei
+
+        Returns:
+            bytes: Return data, empty for an account without code
+
+        Raises:
+            Revert: If the call reverts; its writes are undone
+        """
+        sender, to = to_address(sender), to_address(to)
+        with self.frame():
+            if value:
+                self.transfer(sender, to, value)
+            contract = self.chain.contracts.get(to)
+            if contract is None:
+                return b""
+            return contract.dispatch(self, Message(sender, to, value, bytes(data)))
+
+    def invoke(
+        self,
+        sender: str,
+        to: str,
+        abi_name: str,
+        function: str,
+        *args: Any,
+        value: int = 0,
+    ) -> Any:
+        """
+        Call a contract function by name and decode its outputs.
+
+        Returns:
+            Any: The only output, or a tuple of several
+        """
+        entry = _function_by_name(abi_name, function)
+        data = abi_registry.selector(abi_name, function) + encode(
+            entry.inputs, list(args)
+        )
+        output = self.call(sender, to, data, value)
+        values = decode(entry.outputs, output) if entry.outputs else ()
+        return values[0] if len(values) == 1 else values
+
+    def transfer(self, sender: str, to: str, value: int) -> None:
+        """Move native FLR between accounts."""
+        balance = self.state.balance(sender)
+        require(balance >= value, "insufficient balance for transfer")
+        self.state.balances[sender] = balance - value
+        self.state.balances[to] = self.state.balance(to) + value
+
+    def emit(self, address: str, abi_name: str, event: str, *args: Any) -> None:
+        """Emit an event of a registry ABI, indexed arguments as topics."""
+        topic, indexed, data_types = _event(abi_name, event)
+        topics = [topic]
+        data_values = []
+        for (abi_type, is_indexed), value in zip(indexed, args, strict=True):
+            if is_indexed:
+                topics.append(encode([abi_type], [value]))
+            else:
+                data_values.append(value)
+        self.state.logs.append(
+            Log(to_address(address), tuple(topics), encode(data_types, data_values))
+        )
+
+    def contract(self, address: str) -> "LocalContract":
+        """The contract deployed at `address`."""
+        contract = self.chain.contracts.get(to_address(address))
+        require(contract is not None, f"no contract at {address}")
+        return contract
+
+
+@dataclass(frozen=True)
+class _Function:
+    name: str
+    method: str
+    inputs: tuple[str, ...]
+    outputs: tuple[str, ...]
+    payable: bool
+
+
+def _snake_case(name: str) -> str:
+    return re.sub(r"(?<!^)(?=[A-Z])", "_", name).lower()
+
+
+@functools.cache
+def _functions(abi_name: str) -> dict[bytes, _Function]:
+    functions = {}
+    for entry in abi_registry.abi(abi_name):
+        if entry.get("type") != "function":
+            continue
+        selector = abi_registry.selector(abi_name, abi_to_signature(entry))
+        functions[selector] = _Function(
+            name=entry["name"],
+            method=_snake_case(entry["name"]),
+            inputs=tuple(get_abi_input_types(entry)),
+            outputs=tuple(get_abi_output_types(entry)),
+            payable=entry.get("stateMutability") == "payable",
+        )
+    return functions
+
+
+@functools.cache
+def _function_by_name(abi_name: str, name: str) -> _Function:
+    return _functions(abi_name)[abi_registry.selector(abi_name, name)]
+
+
+@functools.cache
+def _event(
+    abi_name: str, name: str
+) -> tuple[bytes, tuple[tuple[str, bool], ...], tuple[str, ...]]:
+    entry = next(
+        e
+        for e in abi_registry.abi(abi_name)
+        if e.get("type") == "event" and e["name"] == name
+    )
+    types = tuple(get_abi_input_types(entry))
+    indexed = tuple(
+        (abi_type, bool(arg.get("indexed")))
+        for abi_type, arg in zip(types, entry["inputs"], strict=True)
+    )
+    data_types = tuple(abi_type for abi_type, is_indexed in indexed if not is_indexed)
+    return abi_registry.topic(abi_name, name), indexed, data_types
+
+
+class LocalContract:
+    """
+    Base of the Python contracts a LocalChain runs.
+
+    Calls are decoded with the registry ABI named by `abi_name` and routed to
+    the snake_case method of the same name, e.g. `balanceOf` to
+    `balance_of(ctx, msg, owner)`, whose return value is encoded with the
+    ABI's outputs. Calldata shorter than a selector goes to `receive`.
+
+    Attributes:
+        address (ChecksumAddress): Where the contract is deployed
+        abi_name (str): Registry ABI of the contract's interface
+        gas (dict[str, int]): Gas charged per function, on top of the
+            transaction's intrinsic gas
+    """
+
+    abi_name: ClassVar[str]
+    gas: ClassVar[dict[str, int]] = {}
+
+    def __init__(self, address: str) -> None:
+        self.address = to_address(address)
+
+    @property
+    def code(self) -> bytes:
+        """Stand-in bytecode, so the account reads as a contract."""
+        return b"\xfe" + type(self).__name__.encode()
+
+    def dispatch(self, ctx: Context, msg: Message) -> bytes:
+        if len(msg.data) < SELECTOR_SIZE:
+            return self.receive(ctx, msg)
+        function = _functions(self.abi_name).get(msg.data[:4])
+        method = None if function is None else getattr(self, function.method, None)
+        require(method is not None, f"unknown function 0x{msg.data[:4].hex()}")
+        require(not msg.value or function.payable, f"{function.name} is not payable")
+        ctx.charge(self.gas.get(function.name, DEFAULT_CALL_GAS))
+        try:
+            args = decode(function.inputs, msg.data[4:])
+        except DecodingError as e:
+            msg = f"invalid calldata for {function.name}"
+            raise Revert(msg) from e
+        result = method(ctx, msg, *args)
+        if not function.outputs:
+            return b""
+        if len(function.outputs) == 1:
+            result = (result,)
+        return encode(function.outputs, list(result))
+
+    def receive(self, _ctx: Context, msg: Message) -> bytes:
+        """Plain FLR transfers are refused unless a contract accepts them."""
+        require(not msg.value, f"{type(self).__name__} does not accept FLR")
+        return b""
+
+    def load(self, ctx: Context, slot: int) -> int:
+        return ctx.state.load(self.address, slot)
+
+    def store(self, ctx: Context, slot: int, value: int) -> None:
+        ctx.state.store(self.address, slot, value)
+
+    def emit(self, ctx: Context, event: str, *args: Any) -> None:
+        ctx.emit(self.address, self.abi_name, event, *args)
+
+
+ContractT = TypeVar("ContractT", bound=LocalContract)
+
+
+def _quantity(value: int) -> str:
+    return hex(value)
+
+
+def _data(value: bytes) -> str:
+    return "0x" + bytes(value).hex()
+
+
+def _int(value: Any) -> int:
+    if value is None:
+        return 0
+    if isinstance(value, str):
+        return int(value, 16)
+    return int(value)
+
+
+class LocalChain(JSONBaseProvider):
+    """
+    Web3 provider backed by an in-memory chain with Python contracts.
+
+    Every accepted transaction is mined at once in a block of its own, so a
+    receipt is available as soon as `eth_sendRawTransaction` returns and
+    "pending" state is the head's. Only typed (EIP-1559) transactions are
+    accepted, which is all the app sends.
+
+    Usage:
+        chain = LocalChain()
+        w3 = Web3(chain)
+
+    Attributes:
+        chain_id (int): Chain ID reported and required of transactions
+        base_fee (int): Base fee of every block
+        priority_fee (int): Suggested priority fee
+        contracts (dict[ChecksumAddress, LocalContract]): Deployed contracts
+        requests (Counter[str]): Requests answered, by method
+    """
+
+    def __init__(
+        self,
+        chain_id: int = CHAIN_ID,
+        base_fee: int = BASE_FEE,
+        priority_fee: int = PRIORITY_FEE,
+        history_blocks: int = HISTORY_BLOCKS,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        super().__init__()
+        self.chain_id = chain_id
+        self.base_fee = base_fee
+        self.priority_fee = priority_fee
+        self.history_blocks = history_blocks
+        self.clock = clock
+        self.contracts: dict[ChecksumAddress, LocalContract] = {}
+        self.requests: Counter[str] = Counter()
+        self._blocks: list[_Block] = []
+        self._first_live = 0
+        self._by_hash: dict[bytes, _Block] = {}
+        self._transactions: dict[bytes, tuple[dict[str, Any], dict[str, Any]]] = {}
+        self._lock = threading.RLock()
+        self._request_id = 0
+        self.logger = logger.bind(router="local_chain")
+        self._methods: dict[str, Callable[..., Any]] = {
+            "web3_clientVersion": lambda: CLIENT_VERSION,
+            "net_version": lambda: str(self.chain_id),
+            "eth_chainId": lambda: _quantity(self.chain_id),
+            "eth_syncing": lambda: False,
+            "eth_accounts": list,
+            "eth_blockNumber": lambda: _quantity(self.head.number),
+            "eth_gasPrice": lambda: _quantity(self.base_fee + self.priority_fee),
+            "eth_maxPriorityFeePerGas": lambda: _quantity(self.priority_fee),
+            "eth_getBlockByNumber": self._get_block_by_number,
+            "eth_getBlockByHash": self._get_block_by_hash,
+            "eth_getBalance": self._get_balance,
+            "eth_getTransactionCount": self._get_transaction_count,
+            "eth_getCode": self._get_code,
+            "eth_getStorageAt": self._get_storage_at,
+            "eth_call": self._call,
+            "eth_estimateGas": self._estimate_gas,
+            "eth_sendRawTransaction": self._send_raw_transaction,
+            "eth_getTransactionByHash": self._get_transaction_by_hash,
+            "eth_getTransactionReceipt": self._get_transaction_receipt,
+            "eth_getLogs": self._get_logs,
+        }
+        self._mine(State(), [], [])
+
+    @property
+    def head(self) -> _Block:
+        return self._blocks[-1]
+
+    def deploy(self, contract: ContractT) -> ContractT:
+        """Deploy a contract at its address, replacing whatever was there."""
+        with self._lock:
+            self.contracts[contract.address] = contract
+        return contract
+
+    def mine(self, apply: Callable[[Context], None] | None = None) -> int:
+        """
+        Mine a block without transactions, optionally changing state first.
+
+        Args:
+            apply (Callable[[Context], None] | None): Setup run in the new
+                block with unlimited gas, e.g. to seed balances; its events
+                are logged in the block
+
+        Returns:
+            int: Number of the new block
+        """
+        with self._lock:
+            state = self.head.state.child()
+            if apply is not None:
+                apply(Context(self, state, self._next_env(), gas_limit=2**63))
+            logs, state.logs = state.logs, []
+            return self._mine(state, [], [(ZERO_HASH, 0, logs)]).number
+
+    def make_request(self, method: RPCEndpoint, params: Any) -> RPCResponse:
+        with self._lock:
+            self._request_id += 1
+            self.requests[method] += 1
+            response: dict[str, Any] = {"jsonrpc": "2.0", "id": self._request_id}
+            handler = self._methods.get(method)
+            if handler is None:
+                message = f"the method {method} does not exist"
+                response["error"] = {"code": -32601, "message": message}
+                return response  # type: ignore[return-value]
+            try:
+                response["result"] = handler(*(params or []))
+            except RPCError as e:
+                response["error"] = e.to_dict()
+            except Exception as e:
+                self.logger.exception("request_failed", method=method)
+                response["error"] = {"code": -32603, "message": str(e)}
+            return response  # type: ignore[return-value]
+
+    def make_batch_request(
+        self, requests: list[tuple[RPCEndpoint, Any]]
+    ) -> list[RPCResponse]:
+        with self._lock:
+            return [self.make_request(method, params) for method, params in requests]
+
+    def is_connected(self, show_traceback: bool = False) -> bool:  # noqa: ARG002, FBT001, FBT002
+        return True
+
+    @contextmanager
+    def _at(self, tag: Any, overrides: dict | None = None) -> Iterator[Context]:
+        block = self._block(tag)
+        if block.state is None:
+            msg = f"missing trie node, state of block {block.number} is pruned"
+            raise RPCError(-32000, msg)
+        state = block.state.child()
+        if overrides:
+            self._override(state, overrides)
+        env = BlockEnv(block.number, block.timestamp, block.base_fee)
+        if tag in ("pending", None):
+            env = self._next_env()
+        yield Context(self, state, env)
+
+    @staticmethod
+    def _override(state: State, overrides: dict[str, dict[str, Any]]) -> None:
+        for address, override in overrides.items():
+            account = to_address(address)
+            if "code" in override:
+                raise RPCError(-32602, "code overrides are not supported")
+            if "balance" in override:
+                state.balances[account] = _int(override["balance"])
+            if "nonce" in override:
+                state.nonces[account] = _int(override["nonce"])
+            if "state" in override:
+                state.replaced.add(account)
+                state.storage[account] = {}
+            for slot, value in {
+                **override.get("state", {}),
+                **override.get("stateDiff", {}),
+            }.items():
+                state.store(account, _int(slot), _int(value))
+
+    def _block(self, tag: Any) -> _Block:
+        if isinstance(tag, dict):
+            if "blockHash" in tag:
+                return self._block_by_hash(tag["blockHash"])
+            tag = tag.get("blockNumber")
+        if tag in (None, "latest", "pending", "safe", "finalized"):
+            return self.head
+        if tag == "earliest":
+            return self._blocks[0]
+        number = _int(tag)
+        if not 0 <= number < len(self._blocks):
+            raise RPCError(-32000, "header not found")
+        return self._blocks[number]
+
+    def _block_by_hash(self, block_hash: Any) -> _Block:
+        block = self._by_hash.get(bytes(HexBytes(block_hash)))
+        if block is None:
+            raise RPCError(-32000, "header not found")
+        return block
+
+    def _next_env(self) -> BlockEnv:
+        head = self.head
+        timestamp = max(head.timestamp + 1, int(self.clock()))
+        return BlockEnv(head.number + 1, timestamp, self.base_fee)
+
+    def _mine(
+        self,
+        state: State,
+        transactions: list[bytes],
+        logs: list[tuple[bytes, int, list[Log]]],
+        gas_used: int = 0,
+    ) -> _Block:
+        parent = self._blocks[-1] if self._blocks else None
+        env = (
+            self._next_env()
+            if parent
+            else BlockEnv(0, int(self.clock()), self.base_fee)
+        )
+        parent_hash = parent.hash if parent else ZERO_HASH
+        block_hash = keccak(
+            env.number.to_bytes(8, "big")
+            + parent_hash
+            + env.timestamp.to_bytes(8, "big")
+            + b"".join(transactions)
+        )
+        block = _Block(
+            env.number,
+            block_hash,
+            parent_hash,
+            env.timestamp,
+            env.base_fee,
+            state,
+            gas_used,
+            transactions,
+        )
+        log_index = 0
+        for tx_hash, tx_index, tx_logs in logs:
+            for log in tx_logs:
+                block.logs.append(
+                    {
+                        "address": log.address,
+                        "topics": [_data(topic) for topic in log.topics],
+                        "data": _data(log.data),
+                        "blockNumber": _quantity(block.number),
+                        "blockHash": _data(block.hash),
+                        "transactionHash": _data(tx_hash),
+                        "transactionIndex": _quantity(tx_index),
+                        "logIndex": _quantity(log_index),
+                        "removed": False,
+                    }
+                )
+                log_index += 1
+        self._blocks.append(block)
+        self._by_hash[block.hash] = block
+        self._prune()
+        return block
+
+    def _prune(self) -> None:
+        """Fold the oldest block layers into the root beyond the history window."""
+        while len(self._blocks) - self._first_live > self.history_blocks + 1:
+            oldest, folded = self._blocks[self._first_live : self._first_live + 2]
+            root = oldest.state
+            folded.state.commit()
+            if self._first_live + 2 < len(self._blocks):
+                self._blocks[self._first_live + 2].state.parent = root
+            folded.state, oldest.state = root, None
+            self._first_live += 1
+
+    def _get_block_by_number(self, tag: Any, full: bool = False) -> dict | None:  # noqa: FBT001, FBT002
+        try:
+            block = self._block(tag)
+        except RPCError:
+            return None
+        return self._format_block(block, full=full)
+
+    def _get_block_by_hash(self, block_hash: str, full: bool = False) -> dict | None:  # noqa: FBT001, FBT002
+        block = self._by_hash.get(bytes(HexBytes(block_hash)))
+        return None if block is None else self._format_block(block, full=full)
+
+    def _format_block(self, block: _Block, *, full: bool) -> dict[str, Any]:
+        return {
+            "number": _quantity(block.number),
+            "hash": _data(block.hash),
+            "parentHash": _data(block.parent_hash),
+            "timestamp": _quantity(block.timestamp),
+            "baseFeePerGas": _quantity(block.base_fee),
+            "gasLimit": _quantity(BLOCK_GAS_LIMIT),
+            "gasUsed": _quantity(block.gas_used),
+            "miner": ZERO_ADDRESS,
+            "difficulty": "0x1",
+            "totalDifficulty": _quantity(block.number + 1),
+            "extraData": "0x",
+            "nonce": "0x0000000000000000",
+            "mixHash": _data(ZERO_HASH),
+            "sha3Uncles": _data(ZERO_HASH),
+            "stateRoot": _data(keccak(block.hash)),
+            "transactionsRoot": _data(ZERO_HASH),
+            "receiptsRoot": _data(ZERO_HASH),
+            "logsBloom": _data(bytes(256)),
+            "size": "0x0",
+            "uncles": [],
+            "transactions": [
+                self._transactions[tx_hash][0] if full else _data(tx_hash)
+                for tx_hash in block.transactions
+            ],
+        }
+
+    def _get_balance(self, address: str, tag: Any = "latest") -> str:
+        with self._at(tag) as ctx:
+            return _quantity(ctx.state.balance(to_address(address)))
+
+    def _get_transaction_count(self, address: str, tag: Any = "latest") -> str:
+        with self._at(tag) as ctx:
+            return _quantity(ctx.state.nonce(to_address(address)))
+
+    def _get_code(self, address: str, tag: Any = "latest") -> str:
+        self._block(tag)
+        contract = self.contracts.get(to_address(address))
+        return _data(b"" if contract is None else contract.code)
+
+    def _get_storage_at(self, address: str, slot: Any, tag: Any = "latest") -> str:
+        with self._at(tag) as ctx:
+            word = ctx.state.load(to_address(address), _int(slot))
+            return _data(word.to_bytes(32, "big"))
+
+    def _call(
+        self, call: dict[str, Any], tag: Any = "latest", overrides: dict | None = None
+    ) -> str:
+        with self._at(tag, overrides) as ctx:
+            if "gas" in call:
+                ctx.gas_limit = _int(call["gas"])
+            return _data(self._execute(ctx, call))
+
+    def _estimate_gas(
+        self, call: dict[str, Any], tag: Any = "pending", overrides: dict | None = None
+    ) -> str:
+        with self._at(tag, overrides) as ctx:
+            ctx.charge(
+                _intrinsic_gas(HexBytes(call.get("data") or call.get("input") or b""))
+            )
+            self._execute(ctx, call)
+            return _quantity(ctx.gas_used)
+
+    def _execute(self, ctx: Context, call: dict[str, Any]) -> bytes:
+        sender = to_address(call.get("from") or ZERO_ADDRESS)
+        ctx.origin = sender
+        data = HexBytes(call.get("data") or call.get("input") or b"")
+        try:
+            return ctx.call(sender, call["to"], data, _int(call.get("value")))
+        except Revert as e:
+            message = "execution reverted"
+            if e.reason:
+                message += f": {e.reason}"
+            raise RPCError(3, message, _data(e.data)) from e
+        except OutOfGas as e:
+            raise RPCError(-32000, "out of gas") from e
+
+    def _send_raw_transaction(self, raw: str) -> str:
+        raw_bytes = HexBytes(raw)
+        if not raw_bytes or raw_bytes[0] > MAX_TX_TYPE:
+            raise RPCError(-32602, "only typed (EIP-2718) transactions are supported")
+        tx = TypedTransaction.from_bytes(raw_bytes).as_dict()
+        sender = to_address(Account.recover_transaction(raw_bytes))
+        tx_hash = keccak(raw_bytes)
+        self._validate(tx_hash, tx, sender)
+
+        gas = tx["gas"]
+        max_fee = tx["maxFeePerGas"]
+        tip = tx["maxPriorityFeePerGas"]
+        price = min(max_fee, self.base_fee + tip)
+        layer = self.head.state.child()
+        layer.nonces[sender] = tx["nonce"] + 1
+        layer.balances[sender] = layer.balance(sender) - gas * price
+        ctx = Context(self, layer, self._next_env(), sender, gas)
+        status = 1
+        try:
+            ctx.charge(_intrinsic_gas(tx["data"]))
+            ctx.call(sender, tx["to"], tx["data"], tx["value"])
+        except Revert as e:
+            status = 0
+            self.logger.debug("reverted", tx_hash=_data(tx_hash), reason=e.reason)
+        except OutOfGas:
+            status = 0
+            self.logger.debug("out_of_gas", tx_hash=_data(tx_hash), gas=gas)
+        gas_used = min(ctx.gas_used, gas)
+        layer.balances[sender] = layer.balance(sender) + (gas - gas_used) * price
+        logs, layer.logs = layer.logs, []
+        block = self._mine(layer, [tx_hash], [(tx_hash, 0, logs)], gas_used)
+
+        tx_fields = {
+            "hash": _data(tx_hash),
+            "type": _quantity(raw_bytes[0]),
+            "chainId": _quantity(self.chain_id),
+            "nonce": _quantity(tx["nonce"]),
+            "from": sender,
+            "to": to_address(tx["to"]),
+            "value": _quantity(tx["value"]),
+            "input": _data(tx["data"]),
+            "gas": _quantity(gas),
+            "maxFeePerGas": _quantity(max_fee),
+            "maxPriorityFeePerGas": _quantity(tip),
+            "gasPrice": _quantity(price),
+            "accessList": [],
+            "v": _quantity(tx["v"]),
+            "r": _quantity(tx["r"]),
+            "s": _quantity(tx["s"]),
+            "blockHash": _data(block.hash),
+            "blockNumber": _quantity(block.number),
+            "transactionIndex": "0x0",
+        }
+        receipt = {
+            "transactionHash": _data(tx_hash),
+            "transactionIndex": "0x0",
+            "blockHash": _data(block.hash),
+            "blockNumber": _quantity(block.number),
+            "from": sender,
+            "to": to_address(tx["to"]),
+            "cumulativeGasUsed": _quantity(gas_used),
+            "gasUsed": _quantity(gas_used),
+            "effectiveGasPrice": _quantity(price),
+            "contractAddress": None,
+            "logs": block.logs,
+            "logsBloom": _data(bytes(256)),
+            "status": _quantity(status),
+            "type": _quantity(raw_bytes[0]),
+        }
+        self._transactions[tx_hash] = (tx_fields, receipt)
+        return _data(tx_hash)
+
+    def _validate(self, tx_hash: bytes, tx: dict[str, Any], sender: str) -> None:
+        """Reject a transaction the way a node's pool would."""
+        state = self.head.state
+        nonce = state.nonce(sender)
+        checks = (
+            (tx_hash not in self._transactions, "already known"),
+            (bool(tx.get("to")), "contract creation is not supported"),
+            ("maxFeePerGas" in tx, "only EIP-1559 transactions are supported"),
+            (tx.get("chainId") == self.chain_id, "invalid chain id"),
+            (tx["nonce"] >= nonce, f"nonce too low: next nonce {nonce}"),
+            (tx["nonce"] <= nonce, f"nonce too high: next nonce {nonce}"),
+            (tx["gas"] <= BLOCK_GAS_LIMIT, "exceeds block gas limit"),
+            (tx["gas"] >= _intrinsic_gas(tx["data"]), "intrinsic gas too low"),
+        )
+        for ok, message in checks:
+            if not ok:
+                raise RPCError(-32000, message)
+        if tx["maxFeePerGas"] < self.base_fee:
+            raise RPCError(-32000, "max fee per gas less than block base fee")
+        if state.balance(sender) < tx["gas"] * tx["maxFeePerGas"] + tx["value"]:
+            raise RPCError(-32000, "insufficient funds for gas * price + value")
+
+    def _get_transaction_by_hash(self, tx_hash: str) -> dict | None:
+        found = self._transactions.get(bytes(HexBytes(tx_hash)))
+        return None if found is None else found[0]
+
+    def _get_transaction_receipt(self, tx_hash: str) -> dict | None:
+        found = self._transactions.get(bytes(HexBytes(tx_hash)))
+        return None if found is None else found[1]
+
+    def _get_logs(self, log_filter: dict[str, Any]) -> list[dict[str, Any]]:
+        if "blockHash" in log_filter:
+            blocks = [self._block_by_hash(log_filter["blockHash"])]
+        else:
+            start = self._block(log_filter.get("fromBlock", "latest")).number
+            end = self._block(log_filter.get("toBlock", "latest")).number
+            blocks = self._blocks[start : end + 1]
+        addresses = log_filter.get("address")
+        if isinstance(addresses, str):
+            addresses = [addresses]
+        wanted = None if addresses is None else {a.lower() for a in addresses}
+        topics = [
+            None
+            if topic is None
+            else {t.lower() for t in ([topic] if isinstance(topic, str) else topic)}
+            for topic in log_filter.get("topics") or []
+        ]
+        return [
+            log
+            for block in blocks
+            for log in block.logs
+            if (wanted is None or log["address"].lower() in wanted)
+            and _topics_match(log["topics"], topics)
+        ]
+
+
+def _topics_match(log_topics: list[str], wanted: list[set[str] | None]) -> bool:
+    if len(wanted) > len(log_topics):
+        return False
+    return all(
+        alternatives is None or topic in alternatives
+        for topic, alternatives in zip(log_topics, wanted, strict=False)
+    )
+
+
+def _intrinsic_gas(data: bytes) -> int:
+    zeros = data.count(0)
+    return INTRINSIC_GAS + zeros * ZERO_BYTE_GAS + (len(data) - zeros) * DATA_BYTE_GAS
@@ -0,0 +1,1458 @@
+"""
+Local Flare Contracts
+
+Python stand-ins for the contracts the app talks to, for running on a
+LocalChain: ERC-20 tokens, WFLR, sFLR, Permit2, a SparkDEX V3 factory with
+pools, the swap and Universal routers, QuoterV2, Multicall3, a Kinetic
+Comptroller with its oracle and kTokens, and the FTSOv2 price feeds.
+
+Storage follows the Solidity layouts (ERC-20 balances at slot 0 and
+allowances at slot 1, Permit2 allowances at slot 1, V3 pool slot0 at 0,
+liquidity at 4, ticks at 5 and the tick bitmap at 6), so slot probes and
+state overrides see what they would on mainnet. Pool swaps run the same
+swap loop as the off-chain simulator. Kinetic accrues no interest.
+
+`LocalFlare.deploy` puts all of them at their mainnet addresses, seeded with
+pools and prices close to mainnet's, so the unmodified app code runs
+against them.
+"""
+
+import math
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import ClassVar
+
+from eth_abi import decode
+from eth_typing import ChecksumAddress
+from eth_utils import keccak
+from web3 import Web3
+
+from flare_ai_defai.blockchain.local_chain import (
+    ZERO_ADDRESS,
+    Context,
+    LocalChain,
+    LocalContract,
+    Message,
+    Revert,
+    require,
+    storage_slot,
+    to_address,
+    to_signed,
+)
+from flare_ai_defai.blockchain.v3_simulator import (
+    MAX_SQRT_RATIO,
+    MIN_SQRT_RATIO,
+    PoolSnapshot,
+    SimulatedSwap,
+    SnapshotRangeError,
+    get_amount0_delta,
+    get_amount1_delta,
+    get_sqrt_ratio_at_tick,
+    get_tick_at_sqrt_ratio,
+    simulate_swap,
+)
+
+MANTISSA = 10**18
+MAX_UINT256 = 2**256 - 1
+MAX_UINT160 = 2**160 - 1
+Q96 = 2**96
+# Recipient placeholders and the whole-balance amount of the Universal Router.
+MSG_SENDER = to_address(1)
+ADDRESS_THIS = to_address(2)
+CONTRACT_BALANCE = 2**255
+# Universal Router command bytes.
+V3_SWAP_EXACT_IN = 0x00
+SWEEP = 0x04
+WRAP_ETH = 0x0B
+UNWRAP_WETH = 0x0C
+COMMAND_TYPE_MASK = 0x3F
+ALLOW_REVERT_FLAG = 0x80
+TICK_SPACINGS = {100: 1, 500: 10, 3000: 60, 10000: 200}
+# Gas of one pool swap, and of each initialized tick it crosses.
+SWAP_GAS = 60_000
+TICK_CROSS_GAS = 20_000
+COMMAND_GAS = 5_000
+MULTICALL_CALL_GAS = 2_000
+# Initial kToken exchange rate, 0.02 underlying per kToken.
+KTOKEN_DECIMALS = 8
+KTOKEN_INITIAL_RATE = 2 * 10**16
+# Comptroller error code of an unlisted market.
+MARKET_NOT_LISTED = 9
+
+ERC20_GAS = {
+    "name": 2_400,
+    "symbol": 2_400,
+    "decimals": 2_400,
+    "totalSupply": 2_400,
+    "balanceOf": 2_600,
+    "allowance": 2_600,
+    "approve": 24_000,
+    "transfer": 30_000,
+    "transferFrom": 36_000,
+}
+
+
+def decode_path(path: bytes) -> list[tuple[ChecksumAddress, int, ChecksumAddress]]:
+    """Split an encoded V3 path into (token in, fee, token out) hops."""
+    hops = []
+    while len(path) >= 43:  # noqa: PLR2004
+        token_in = to_address(path[:20])
+        fee = int.from_bytes(path[20:23], "big")
+        token_out = to_address(path[23:43])
+        hops.append((token_in, fee, token_out))
+        path = path[23:]
+    require(hops, "invalid path")
+    return hops
+
+
+class ERC20Token(LocalContract):
+    """
+    OpenZeppelin style ERC-20; an unlimited allowance is never spent down.
+
+    Attributes:
+        token_name (str): Token name
+        token_symbol (str): Token symbol
+        token_decimals (int): Decimals
+    """
+
+    abi_name = "erc20"
+    gas: ClassVar[dict[str, int]] = ERC20_GAS
+    BALANCES = 0
+    ALLOWANCES = 1
+    TOTAL_SUPPLY = 2
+
+    def __init__(
+        self, address: str, token_name: str, token_symbol: str, token_decimals: int
+    ) -> None:
+        super().__init__(address)
+        self.token_name = token_name
+        self.token_symbol = token_symbol
+        self.token_decimals = token_decimals
+
+    def name(self, _ctx: Context, _msg: Message) -> str:
+        return self.token_name
+
+    def symbol(self, _ctx: Context, _msg: Message) -> str:
+        return self.token_symbol
+
+    def decimals(self, _ctx: Context, _msg: Message) -> int:
+        return self.token_decimals
+
+    def total_supply(self, ctx: Context, _msg: Message) -> int:
+        return self.load(ctx, self.TOTAL_SUPPLY)
+
+    def balance_of(self, ctx: Context, _msg: Message, owner: str) -> int:
+        return self.balance(ctx, owner)
+
+    def allowance(self, ctx: Context, _msg: Message, owner: str, spender: str) -> int:
+        return self.load(ctx, storage_slot(self.ALLOWANCES, owner, spender))
+
+    def approve(self, ctx: Context, msg: Message, spender: str, amount: int) -> bool:
+        self.store(ctx, storage_slot(self.ALLOWANCES, msg.sender, spender), amount)
+        self.emit(ctx, "Approval", msg.sender, spender, amount)
+        return True
+
+    def transfer(self, ctx: Context, msg: Message, to: str, amount: int) -> bool:
+        self.move(ctx, msg.sender, to, amount)
+        return True
+
+    def transfer_from(
+        self, ctx: Context, msg: Message, owner: str, to: str, amount: int
+    ) -> bool:
+        slot = storage_slot(self.ALLOWANCES, owner, msg.sender)
+        allowed = self.load(ctx, slot)
+        if allowed != MAX_UINT256:
+            require(allowed >= amount, "ERC20: insufficient allowance")
+            self.store(ctx, slot, allowed - amount)
+        self.move(ctx, owner, to, amount)
+        return True
+
+    def balance(self, ctx: Context, owner: str) -> int:
+        """Balance of `owner`, read without a call."""
+        return self.load(ctx, storage_slot(self.BALANCES, owner))
+
+    def move(self, ctx: Context, sender: str, to: str, amount: int) -> None:
+        sender_slot = storage_slot(self.BALANCES, sender)
+        balance = self.load(ctx, sender_slot)
+        require(balance >= amount, "ERC20: transfer amount exceeds balance")
+        self.store(ctx, sender_slot, balance - amount)
+        to_slot = storage_slot(self.BALANCES, to)
+        self.store(ctx, to_slot, self.load(ctx, to_slot) + amount)
+        self.emit(ctx, "Transfer", sender, to, amount)
+
+    def mint_to(self, ctx: Context, to: str, amount: int) -> None:
+        """Create tokens, as a token's owner or a deposit would."""
+        self.store(ctx, self.TOTAL_SUPPLY, self.load(ctx, self.TOTAL_SUPPLY) + amount)
+        slot = storage_slot(self.BALANCES, to)
+        self.store(ctx, slot, self.load(ctx, slot) + amount)
+        self.emit(ctx, "Transfer", ZERO_ADDRESS, to, amount)
+
+    def burn_from(self, ctx: Context, owner: str, amount: int) -> None:
+        slot = storage_slot(self.BALANCES, owner)
+        balance = self.load(ctx, slot)
+        require(balance >= amount, "ERC20: burn amount exceeds balance")
+        self.store(ctx, slot, balance - amount)
+        self.store(ctx, self.TOTAL_SUPPLY, self.load(ctx, self.TOTAL_SUPPLY) - amount)
+        self.emit(ctx, "Transfer", owner, ZERO_ADDRESS, amount)
+
+
+class WFLR(ERC20Token):
+    """Wrapped FLR; like Flare's WNat, wrapping and unwrapping also log a Transfer."""
+
+    abi_name = "wflr"
+    gas: ClassVar[dict[str, int]] = {**ERC20_GAS, "deposit": 24_000, "withdraw": 14_000}
+
+    def __init__(self, address: str) -> None:
+        super().__init__(address, "Wrapped Flare", "WFLR", 18)
+
+    def deposit(self, ctx: Context, msg: Message) -> None:
+        self.mint_to(ctx, msg.sender, msg.value)
+        self.emit(ctx, "Deposit", msg.sender, msg.value)
+
+    def withdraw(self, ctx: Context, msg: Message, amount: int) -> None:
+        self.burn_from(ctx, msg.sender, amount)
+        self.emit(ctx, "Withdrawal", msg.sender, amount)
+        ctx.transfer(self.address, msg.sender, amount)
+
+    def receive(self, ctx: Context, msg: Message) -> bytes:
+        ctx.charge(self.gas["deposit"])
+        self.deposit(ctx, msg)
+        return b""
+
+
+class SFLR(ERC20Token):
+    """
+    Staked FLR, minted at a fixed rate for FLR submitted.
+
+    Attributes:
+        rate (int): FLR per sFLR, scaled by 1e18
+    """
+
+    abi_name = "sflr"
+    gas: ClassVar[dict[str, int]] = {**ERC20_GAS, "submit": 60_000}
+
+    def __init__(self, address: str, rate: int) -> None:
+        super().__init__(address, "Staked FLR", "sFLR", 18)
+        self.rate = rate
+
+    def submit(self, ctx: Context, msg: Message) -> int:
+        require(msg.value, "ZERO_DEPOSIT")
+        shares = msg.value * MANTISSA // self.rate
+        self.mint_to(ctx, msg.sender, shares)
+        return shares
+
+
+class Permit2(LocalContract):
+    """Permit2 allowances, packed as amount | expiration << 160 | nonce << 208."""
+
+    abi_name = "permit2"
+    gas: ClassVar[dict[str, int]] = {"approve": 28_000, "allowance": 2_600}
+    ALLOWANCES = 1
+
+    def allowance(
+        self, ctx: Context, _msg: Message, owner: str, token: str, spender: str
+    ) -> tuple[int, int, int]:
+        packed = self.load(ctx, storage_slot(self.ALLOWANCES, owner, token, spender))
+        return packed & MAX_UINT160, packed >> 160 & (2**48 - 1), packed >> 208
+
+    def approve(  # noqa: PLR0913, PLR0917
+        self,
+        ctx: Context,
+        msg: Message,
+        token: str,
+        spender: str,
+        amount: int,
+        expiration: int,
+    ) -> None:
+        slot = storage_slot(self.ALLOWANCES, msg.sender, token, spender)
+        nonce = self.load(ctx, slot) >> 208
+        expiration = expiration or ctx.block.timestamp
+        self.store(ctx, slot, amount | expiration << 160 | nonce << 208)
+        self.emit(ctx, "Approval", msg.sender, token, spender, amount, expiration)
+
+    def transfer_from(  # noqa: PLR0913, PLR0917
+        self, ctx: Context, spender: str, owner: str, to: str, amount: int, token: str
+    ) -> None:
+        """Move tokens `spender` was allowed to move, as `transferFrom` would."""
+        slot = storage_slot(self.ALLOWANCES, owner, token, spender)
+        packed = self.load(ctx, slot)
+        allowed, expiration = packed & MAX_UINT160, packed >> 160 & (2**48 - 1)
+        require(ctx.block.timestamp <= expiration, "AllowanceExpired")
+        require(allowed >= amount, "InsufficientAllowance")
+        if allowed != MAX_UINT160:
+            self.store(ctx, slot, packed - amount)
+        ctx.invoke(self.address, token, "erc20", "transferFrom", owner, to, amount)
+
+
+class V3Factory(LocalContract):
+    """SparkDEX V3 factory; pools are created at setup only."""
+
+    abi_name = "v3_factory"
+    gas: ClassVar[dict[str, int]] = {"getPool": 2_600, "feeAmountTickSpacing": 2_400}
+
+    def __init__(self, address: str) -> None:
+        super().__init__(address)
+        self.pools: dict[tuple[ChecksumAddress, ChecksumAddress, int], V3Pool] = {}
+
+    def get_pool(
+        self, _ctx: Context, _msg: Message, token_a: str, token_b: str, fee: int
+    ) -> ChecksumAddress:
+        pool = self.pool(token_a, token_b, fee)
+        return ZERO_ADDRESS if pool is None else pool.address
+
+    def fee_amount_tick_spacing(self, _ctx: Context, _msg: Message, fee: int) -> int:
+        return TICK_SPACINGS.get(fee, 0)
+
+    def pool(self, token_a: str, token_b: str, fee: int) -> "V3Pool | None":
+        token0, token1 = sorted(
+            (to_address(token_a), to_address(token_b)), key=str.lower
+        )
+        return self.pools.get((token0, token1, fee))
+
+    def create_pool(
+        self,
+        chain: LocalChain,
+        token_a: str,
+        token_b: str,
+        fee: int,
+        sqrt_price_x96: int,
+    ) -> "V3Pool":
+        token0, token1 = sorted(
+            (to_address(token_a), to_address(token_b)), key=str.lower
+        )
+        salt = keccak(self.address.encode() + token0.encode() + token1.encode())
+        address = to_address(keccak(salt + fee.to_bytes(3, "big"))[-20:])
+        pool = chain.deploy(V3Pool(address, token0, token1, fee, TICK_SPACINGS[fee]))
+        chain.mine(lambda ctx: pool.initialize(ctx, sqrt_price_x96))
+        self.pools[(token0, token1, fee)] = pool
+        return pool
+
+
+class V3Pool(LocalContract):
+    """
+    Uniswap V3 pool with the V3 storage layout for the parts swaps read.
+
+    Liquidity is added by the deployer, tokens taken as already paid in.
+    Swaps pay out first and then call `pay` for the input, like the swap
+    callback, and revert when they would leave the pool's initialized ticks.
+    """
+
+    abi_name = "v3_pool"
+    gas: ClassVar[dict[str, int]] = {
+        "slot0": 2_600,
+        "liquidity": 2_400,
+        "tickBitmap": 2_600,
+        "ticks": 5_000,
+    }
+    SLOT0 = 0
+    LIQUIDITY = 4
+    TICKS = 5
+    TICK_BITMAP = 6
+
+    def __init__(
+        self, address: str, token0: str, token1: str, fee: int, spacing: int
+    ) -> None:
+        super().__init__(address)
+        self.token0_address = to_address(token0)
+        self.token1_address = to_address(token1)
+        self.fee_tier = fee
+        self.spacing = spacing
+        # Bitmap words any position ever touched, so swaps know where to look.
+        self.min_word = 0
+        self.max_word = -1
+
+    def token0(self, _ctx: Context, _msg: Message) -> ChecksumAddress:
+        return self.token0_address
+
+    def token1(self, _ctx: Context, _msg: Message) -> ChecksumAddress:
+        return self.token1_address
+
+    def fee(self, _ctx: Context, _msg: Message) -> int:
+        return self.fee_tier
+
+    def tick_spacing(self, _ctx: Context, _msg: Message) -> int:
+        return self.spacing
+
+    def liquidity(self, ctx: Context, _msg: Message) -> int:
+        return self.load(ctx, self.LIQUIDITY)
+
+    def slot0(self, ctx: Context, _msg: Message) -> tuple:
+        sqrt_price_x96, tick = self.price(ctx)
+        return sqrt_price_x96, tick, 0, 1, 1, 0, True
+
+    def tick_bitmap(self, ctx: Context, _msg: Message, word: int) -> int:
+        return self.load(ctx, storage_slot(self.TICK_BITMAP, word))
+
+    def ticks(self, ctx: Context, _msg: Message, tick: int) -> tuple:
+        gross, net = self.tick_info(ctx, tick)
+        return gross, net, 0, 0, 0, 0, 0, gross > 0
+
+    def price(self, ctx: Context) -> tuple[int, int]:
+        word = self.load(ctx, self.SLOT0)
+        return word & MAX_UINT160, to_signed(word >> 160, 24)
+
+    def tick_info(self, ctx: Context, tick: int) -> tuple[int, int]:
+        word = self.load(ctx, storage_slot(self.TICKS, tick))
+        return word & (2**128 - 1), to_signed(word >> 128, 128)
+
+    def initialize(self, ctx: Context, sqrt_price_x96: int) -> None:
+        tick = get_tick_at_sqrt_ratio(sqrt_price_x96)
+        self._store_price(ctx, sqrt_price_x96, tick)
+
+    def add_liquidity(
+        self, ctx: Context, owner: str, tick_lower: int, tick_upper: int, amount: int
+    ) -> tuple[int, int]:
+        """
+        Add a position, as `mint` would once the tokens are paid.
+
+        Returns:
+            tuple[int, int]: token0 and token1 the position holds
+        """
+        require(tick_lower < tick_upper, "TLU")
+        require(tick_lower % self.spacing == tick_upper % self.spacing == 0, "TS")
+        for tick, delta in ((tick_lower, amount), (tick_upper, -amount)):
+            gross, net = self.tick_info(ctx, tick)
+            if not gross:
+                compressed = tick // self.spacing
+                word_slot = storage_slot(self.TICK_BITMAP, compressed >> 8)
+                bitmap = self.load(ctx, word_slot) ^ 1 << (compressed & 0xFF)
+                self.store(ctx, word_slot, bitmap)
+                word = compressed >> 8
+                if self.min_word > self.max_word:
+                    self.min_word = self.max_word = word
+                self.min_word = min(self.min_word, word)
+                self.max_word = max(self.max_word, word)
+            self.store(
+                ctx,
+                storage_slot(self.TICKS, tick),
+                (gross + amount) | ((net + delta) & (2**128 - 1)) << 128,
+            )
+        sqrt_price, tick = self.price(ctx)
+        sqrt_lower = get_sqrt_ratio_at_tick(tick_lower)
+        sqrt_upper = get_sqrt_ratio_at_tick(tick_upper)
+        if tick < tick_lower:
+            amount0 = get_amount0_delta(sqrt_lower, sqrt_upper, amount, round_up=True)
+            amount1 = 0
+        elif tick < tick_upper:
+            amount0 = get_amount0_delta(sqrt_price, sqrt_upper, amount, round_up=True)
+            amount1 = get_amount1_delta(sqrt_lower, sqrt_price, amount, round_up=True)
+            self.store(ctx, self.LIQUIDITY, self.load(ctx, self.LIQUIDITY) + amount)
+        else:
+            amount0 = 0
+            amount1 = get_amount1_delta(sqrt_lower, sqrt_upper, amount, round_up=True)
+        self.emit(
+            ctx, "Mint", owner, owner, tick_lower, tick_upper, amount, amount0, amount1
+        )
+        return amount0, amount1
+
+    def snapshot(self, ctx: Context) -> PoolSnapshot:
+        """The pool's state as the off-chain simulator takes it."""
+        sqrt_price_x96, tick = self.price(ctx)
+        liquidity_net = {}
+        for word in range(self.min_word, self.max_word + 1):
+            bits = self.load(ctx, storage_slot(self.TICK_BITMAP, word))
+            while bits:
+                bit = (bits & -bits).bit_length() - 1
+                bits &= bits - 1
+                initialized = (word * 256 + bit) * self.spacing
+                liquidity_net[initialized] = self.tick_info(ctx, initialized)[1]
+        return PoolSnapshot(
+            sqrt_price_x96,
+            tick,
+            self.load(ctx, self.LIQUIDITY),
+            self.fee_tier,
+            self.spacing,
+            liquidity_net,
+            self.min_word,
+            self.max_word,
+        )
+
+    def quote(
+        self,
+        ctx: Context,
+        *,
+        zero_for_one: bool,
+        amount_specified: int,
+        sqrt_price_limit_x96: int = 0,
+    ) -> SimulatedSwap:
+        """Outcome of a swap against the current state, without making it."""
+        require(amount_specified, "AS")
+        sqrt_price_x96, _ = self.price(ctx)
+        if sqrt_price_limit_x96:
+            if zero_for_one:
+                valid = MIN_SQRT_RATIO < sqrt_price_limit_x96 < sqrt_price_x96
+            else:
+                valid = sqrt_price_x96 < sqrt_price_limit_x96 < MAX_SQRT_RATIO
+            require(valid, "SPL")
+        try:
+            return simulate_swap(
+                self.snapshot(ctx),
+                zero_for_one=zero_for_one,
+                amount_specified=amount_specified,
+                sqrt_price_limit_x96=sqrt_price_limit_x96 or None,
+            )
+        except SnapshotRangeError as e:
+            msg = "not enough liquidity"
+            raise Revert(msg) from e
+
+    def swap(  # noqa: PLR0913
+        self,
+        ctx: Context,
+        sender: str,
+        recipient: str,
+        *,
+        zero_for_one: bool,
+        amount_in: int,
+        pay: Callable[[ChecksumAddress, int], None],
+        sqrt_price_limit_x96: int = 0,
+    ) -> SimulatedSwap:
+        """
+        Swap an exact input, paying out to `recipient` before collecting.
+
+        Args:
+            ctx (Context): Execution context
+            sender (str): Caller, logged as the swap's sender
+            recipient (str): Receiver of the output
+            zero_for_one (bool): True to sell token0 for token1
+            amount_in (int): Input amount, fee included
+            pay (Callable[[ChecksumAddress, int], None]): Pays the pool a
+                token amount, standing in for the swap callback
+            sqrt_price_limit_x96 (int): Price the swap may not pass, 0 for none
+
+        Returns:
+            SimulatedSwap: Amounts and the pool state after the swap
+        """
+        result = self.quote(
+            ctx,
+            zero_for_one=zero_for_one,
+            amount_specified=amount_in,
+            sqrt_price_limit_x96=sqrt_price_limit_x96,
+        )
+        ctx.charge(SWAP_GAS + TICK_CROSS_GAS * result.ticks_crossed)
+        self._store_price(ctx, result.sqrt_price_x96_after, result.tick_after)
+        self.store(ctx, self.LIQUIDITY, result.liquidity_after)
+        token_in, token_out = (
+            (self.token0_address, self.token1_address)
+            if zero_for_one
+            else (self.token1_address, self.token0_address)
+        )
+        if result.amount_out:
+            ctx.invoke(
+                self.address,
+                token_out,
+                "erc20",
+                "transfer",
+                recipient,
+                result.amount_out,
+            )
+        paid_in = ctx.contract(token_in)
+        before = paid_in.balance(ctx, self.address)
+        pay(token_in, result.amount_in)
+        require(paid_in.balance(ctx, self.address) >= before + result.amount_in, "IIA")
+        amount0, amount1 = (
+            (result.amount_in, -result.amount_out)
+            if zero_for_one
+            else (-result.amount_out, result.amount_in)
+        )
+        self.emit(
+            ctx,
+            "Swap",
+            sender,
+            recipient,
+            amount0,
+            amount1,
+            result.sqrt_price_x96_after,
+            result.liquidity_after,
+            result.tick_after,
+        )
+        return result
+
+    def _store_price(self, ctx: Context, sqrt_price_x96: int, tick: int) -> None:
+        # sqrtPriceX96, tick and the unlocked flag, as packed in slot0.
+        word = sqrt_price_x96 | (tick & 0xFFFFFF) << 160 | 1 << 240
+        self.store(ctx, self.SLOT0, word)
+
+
+def _zero_for_one(token_in: str, token_out: str) -> bool:
+    return to_address(token_in).lower() < to_address(token_out).lower()
+
+
+class QuoterV2(LocalContract):
+    """Quotes by running the pool's swap without keeping its effects."""
+
+    abi_name = "quoter_v2"
+    gas: ClassVar[dict[str, int]] = {
+        "quoteExactInputSingle": 10_000,
+        "quoteExactInput": 10_000,
+    }
+
+    def __init__(self, address: str, factory: V3Factory) -> None:
+        super().__init__(address)
+        self.factory = factory
+
+    def quote_exact_input_single(
+        self, ctx: Context, _msg: Message, params: tuple
+    ) -> tuple[int, int, int, int]:
+        token_in, token_out, amount_in, fee, sqrt_price_limit_x96 = params
+        result = self._quote(
+            ctx, token_in, token_out, fee, amount_in, sqrt_price_limit_x96
+        )
+        return (
+            result.amount_out,
+            result.sqrt_price_x96_after,
+            result.ticks_crossed,
+            SWAP_GAS + TICK_CROSS_GAS * result.ticks_crossed,
+        )
+
+    def quote_exact_input(
+        self, ctx: Context, _msg: Message, path: bytes, amount_in: int
+    ) -> tuple[int, list[int], list[int], int]:
+        prices, crossed, gas_estimate = [], [], 0
+        amount = amount_in
+        for token_in, fee, token_out in decode_path(path):
+            result = self._quote(ctx, token_in, token_out, fee, amount)
+            amount = result.amount_out
+            prices.append(result.sqrt_price_x96_after)
+            crossed.append(result.ticks_crossed)
+            gas_estimate += SWAP_GAS + TICK_CROSS_GAS * result.ticks_crossed
+        return amount, prices, crossed, gas_estimate
+
+    def _quote(  # noqa: PLR0913, PLR0917
+        self,
+        ctx: Context,
+        token_in: str,
+        token_out: str,
+        fee: int,
+        amount_in: int,
+        sqrt_price_limit_x96: int = 0,
+    ) -> SimulatedSwap:
+        pool = self.factory.pool(token_in, token_out, fee)
+        require(pool is not None, "pool does not exist")
+        return pool.quote(
+            ctx,
+            zero_for_one=_zero_for_one(token_in, token_out),
+            amount_specified=amount_in,
+            sqrt_price_limit_x96=sqrt_price_limit_x96,
+        )
+
+
+class _SwapExecutor(LocalContract):
+    """Shared multi-hop swap loop of the routers."""
+
+    def __init__(self, address: str, factory: V3Factory) -> None:
+        super().__init__(address)
+        self.factory = factory
+
+    def swap_path(
+        self,
+        ctx: Context,
+        path: list[tuple[ChecksumAddress, int, ChecksumAddress]],
+        amount_in: int,
+        recipient: str,
+        pay_first: Callable[[ChecksumAddress, ChecksumAddress, int], None],
+    ) -> int:
+        """
+        Swap along `path`, the router holding the intermediate tokens.
+
+        Args:
+            ctx (Context): Execution context
+            path (list): Hops as decoded by `decode_path`
+            amount_in (int): Input of the first hop
+            recipient (str): Receiver of the last hop's output
+            pay_first (Callable): Pays the first pool (token, pool, amount)
+
+        Returns:
+            int: Output of the last hop
+        """
+        amount = amount_in
+        for index, (token_in, fee, token_out) in enumerate(path):
+            pool = self.factory.pool(token_in, token_out, fee)
+            require(pool is not None, "pool does not exist")
+            last = index == len(path) - 1
+
+            def pay(
+                token: ChecksumAddress,
+                owed: int,
+                pool: V3Pool = pool,
+                first: bool = index == 0,  # noqa: FBT001
+            ) -> None:
+                if first:
+                    pay_first(token, pool.address, owed)
+                else:
+                    ctx.invoke(
+                        self.address, token, "erc20", "transfer", pool.address, owed
+                    )
+
+            amount = pool.swap(
+                ctx,
+                self.address,
+                recipient if last else self.address,
+                zero_for_one=_zero_for_one(token_in, token_out),
+                amount_in=amount,
+                pay=pay,
+            ).amount_out
+        return amount
+
+
+class SwapRouter(_SwapExecutor):
+    """SwapRouter taking the input with a plain ERC-20 `transferFrom`."""
+
+    abi_name = "swap_router"
+    gas: ClassVar[dict[str, int]] = {"exactInputSingle": 25_000, "exactInput": 25_000}
+
+    def exact_input_single(self, ctx: Context, msg: Message, params: tuple) -> int:
+        token_in, token_out, fee, recipient, deadline, amount_in, amount_out_min, _ = (
+            params
+        )
+        require(ctx.block.timestamp <= deadline, "Transaction too old")
+        amount_out = self.swap_path(
+            ctx,
+            [(to_address(token_in), fee, to_address(token_out))],
+            amount_in,
+            recipient,
+            self._payer(ctx, msg.sender),
+        )
+        require(amount_out >= amount_out_min, "Too little received")
+        return amount_out
+
+    def exact_input(self, ctx: Context, msg: Message, params: tuple) -> int:
+        path, recipient, deadline, amount_in, amount_out_min = params
+        require(ctx.block.timestamp <= deadline, "Transaction too old")
+        amount_out = self.swap_path(
+            ctx, decode_path(path), amount_in, recipient, self._payer(ctx, msg.sender)
+        )
+        require(amount_out >= amount_out_min, "Too little received")
+        return amount_out
+
+    def _payer(
+        self, ctx: Context, payer: str
+    ) -> Callable[[ChecksumAddress, ChecksumAddress, int], None]:
+        def pay(token: ChecksumAddress, pool: ChecksumAddress, amount: int) -> None:
+            ctx.invoke(
+                self.address, token, "erc20", "transferFrom", payer, pool, amount
+            )
+
+        return pay
+
+
+class UniversalRouter(_SwapExecutor):
+    """
+    Universal Router running V3_SWAP_EXACT_IN, SWEEP, WRAP_ETH and UNWRAP_WETH.
+
+    User input is pulled through Permit2, so the user approves the token to
+    Permit2 and lets the router spend it there.
+    """
+
+    abi_name = "universal_router"
+    gas: ClassVar[dict[str, int]] = {"execute": 30_000}
+
+    def __init__(
+        self, address: str, factory: V3Factory, wflr: WFLR, permit2: Permit2
+    ) -> None:
+        super().__init__(address, factory)
+        self.wflr = wflr
+        self.permit2 = permit2
+
+    def execute(
+        self,
+        ctx: Context,
+        msg: Message,
+        commands: bytes,
+        inputs: list[bytes],
+        deadline: int,
+    ) -> None:
+        require(ctx.block.timestamp <= deadline, "TransactionDeadlinePassed")
+        require(len(commands) == len(inputs), "LengthMismatch")
+        for command, data in zip(commands, inputs, strict=True):
+            ctx.charge(COMMAND_GAS)
+            try:
+                with ctx.frame():
+                    self._dispatch(ctx, msg, command & COMMAND_TYPE_MASK, data)
+            except Revert:
+                if not command & ALLOW_REVERT_FLAG:
+                    raise
+
+    def receive(self, _ctx: Context, _msg: Message) -> bytes:
+        return b""
+
+    def _dispatch(self, ctx: Context, msg: Message, command: int, data: bytes) -> None:
+        handlers = {
+            V3_SWAP_EXACT_IN: self._v3_swap_exact_in,
+            SWEEP: self._sweep,
+            WRAP_ETH: self._wrap_eth,
+            UNWRAP_WETH: self._unwrap_weth,
+        }
+        handler = handlers.get(command)
+        require(handler is not None, f"InvalidCommandType({command})")
+        handler(ctx, msg, data)
+
+    def _v3_swap_exact_in(self, ctx: Context, msg: Message, data: bytes) -> None:
+        recipient, amount_in, amount_out_min, path, payer_is_user = decode(
+            ["address", "uint256", "uint256", "bytes", "bool"], data
+        )
+        hops = decode_path(path)
+        if amount_in == CONTRACT_BALANCE:
+            amount_in = ctx.contract(hops[0][0]).balance(ctx, self.address)
+        amount_out = self.swap_path(
+            ctx,
+            hops,
+            amount_in,
+            self._recipient(msg, recipient),
+            self._payer(ctx, msg.sender if payer_is_user else self.address),
+        )
+        require(amount_out >= amount_out_min, "V3TooLittleReceived")
+
+    def _sweep(self, ctx: Context, msg: Message, data: bytes) -> None:
+        token, recipient, amount_min = decode(["address", "address", "uint256"], data)
+        balance = ctx.contract(token).balance(ctx, self.address)
+        require(balance >= amount_min, "InsufficientToken")
+        if balance:
+            recipient = self._recipient(msg, recipient)
+            ctx.invoke(self.address, token, "erc20", "transfer", recipient, balance)
+
+    def _wrap_eth(self, ctx: Context, msg: Message, data: bytes) -> None:
+        recipient, amount = decode(["address", "uint256"], data)
+        balance = ctx.state.balance(self.address)
+        if amount == CONTRACT_BALANCE:
+            amount = balance
+        require(balance >= amount, "InsufficientETH")
+        if not amount:
+            return
+        wflr = self.wflr.address
+        ctx.invoke(self.address, wflr, "wflr", "deposit", value=amount)
+        recipient = self._recipient(msg, recipient)
+        if recipient != self.address:
+            ctx.invoke(self.address, wflr, "erc20", "transfer", recipient, amount)
+
+    def _unwrap_weth(self, ctx: Context, msg: Message, data: bytes) -> None:
+        recipient, amount_min = decode(["address", "uint256"], data)
+        balance = self.wflr.balance(ctx, self.address)
+        require(balance >= amount_min, "InsufficientETH")
+        if balance:
+            ctx.invoke(self.address, self.wflr.address, "wflr", "withdraw", balance)
+            ctx.transfer(self.address, self._recipient(msg, recipient), balance)
+
+    def _recipient(self, msg: Message, recipient: str) -> ChecksumAddress:
+        recipient = to_address(recipient)
+        if recipient == MSG_SENDER:
+            return msg.sender
+        if recipient == ADDRESS_THIS:
+            return self.address
+        return recipient
+
+    def _payer(
+        self, ctx: Context, payer: ChecksumAddress
+    ) -> Callable[[ChecksumAddress, ChecksumAddress, int], None]:
+        def pay(token: ChecksumAddress, pool: ChecksumAddress, amount: int) -> None:
+            if payer == self.address:
+                ctx.invoke(self.address, token, "erc20", "transfer", pool, amount)
+            else:
+                self.permit2.transfer_from(
+                    ctx, self.address, payer, pool, amount, token
+                )
+
+        return pay
+
+
+class Multicall3(LocalContract):
+    """Multicall3; batched calls are made with the multicall as `msg.sender`."""
+
+    abi_name = "multicall3"
+    gas: ClassVar[dict[str, int]] = {
+        "aggregate3": 5_000,
+        "getEthBalance": 2_600,
+        "getBlockNumber": 2_400,
+        "getCurrentBlockTimestamp": 2_400,
+        "getBasefee": 2_400,
+    }
+
+    def aggregate3(
+        self, ctx: Context, _msg: Message, calls: tuple
+    ) -> list[tuple[bool, bytes]]:
+        results = []
+        for target, allow_failure, call_data in calls:
+            ctx.charge(MULTICALL_CALL_GAS)
+            try:
+                results.append((True, ctx.call(self.address, target, call_data)))
+            except Revert as e:
+                if not allow_failure:
+                    msg = "Multicall3: call failed"
+                    raise Revert(msg) from e
+                results.append((False, e.data))
+        return results
+
+    def get_eth_balance(self, ctx: Context, _msg: Message, address: str) -> int:
+        return ctx.state.balance(to_address(address))
+
+    def get_block_number(self, ctx: Context, _msg: Message) -> int:
+        return ctx.block.number
+
+    def get_current_block_timestamp(self, ctx: Context, _msg: Message) -> int:
+        return ctx.block.timestamp
+
+    def get_basefee(self, ctx: Context, _msg: Message) -> int:
+        return ctx.block.base_fee
+
+
+class KineticOracle(LocalContract):
+    """Price oracle, prices of one underlying base unit scaled by 1e36."""
+
+    abi_name = "kinetic_oracle"
+    gas: ClassVar[dict[str, int]] = {"getUnderlyingPrice": 5_000}
+    PRICES = 0
+
+    def get_underlying_price(self, ctx: Context, _msg: Message, ktoken: str) -> int:
+        return self.price(ctx, ktoken)
+
+    def price(self, ctx: Context, ktoken: str) -> int:
+        return self.load(ctx, storage_slot(self.PRICES, ktoken))
+
+    def set_price(self, ctx: Context, ktoken: str, price: int) -> None:
+        self.store(ctx, storage_slot(self.PRICES, ktoken), price)
+
+
+class KineticComptroller(LocalContract):
+    """
+    Compound style Comptroller checking collateral on borrows and redeems.
+
+    Attributes:
+        oracle_address (ChecksumAddress): Price oracle
+        market_list (list[ChecksumAddress]): Listed kTokens, in listing order
+    """
+
+    abi_name = "kinetic_comptroller"
+    gas: ClassVar[dict[str, int]] = {
+        "getAllMarkets": 5_000,
+        "enterMarkets": 45_000,
+        "getAssetsIn": 5_000,
+        "markets": 2_600,
+        "oracle": 2_400,
+    }
+    # Market struct: isListed, then collateralFactorMantissa.
+    MARKETS = 1
+    MEMBERSHIP = 2
+
+    def __init__(self, address: str, oracle: KineticOracle) -> None:
+        super().__init__(address)
+        self.oracle_address = oracle.address
+        self.market_list: list[ChecksumAddress] = []
+
+    def get_all_markets(self, _ctx: Context, _msg: Message) -> list[ChecksumAddress]:
+        return list(self.market_list)
+
+    def oracle(self, _ctx: Context, _msg: Message) -> ChecksumAddress:
+        return self.oracle_address
+
+    def markets(self, ctx: Context, _msg: Message, ktoken: str) -> tuple[bool, int]:
+        slot = storage_slot(self.MARKETS, ktoken)
+        return bool(self.load(ctx, slot)), self.load(ctx, slot + 1)
+
+    def get_assets_in(
+        self, ctx: Context, _msg: Message, account: str
+    ) -> list[ChecksumAddress]:
+        return self.assets_in(ctx, account)
+
+    def enter_markets(
+        self, ctx: Context, msg: Message, ktokens: list[str]
+    ) -> list[int]:
+        errors = []
+        for ktoken in ktokens:
+            if not self.load(ctx, storage_slot(self.MARKETS, ktoken)):
+                errors.append(MARKET_NOT_LISTED)
+                continue
+            self.store(ctx, storage_slot(self.MEMBERSHIP, ktoken, msg.sender), 1)
+            errors.append(0)
+        return errors
+
+    def list_market(self, ctx: Context, ktoken: str, collateral_factor: int) -> None:
+        slot = storage_slot(self.MARKETS, ktoken)
+        self.store(ctx, slot, 1)
+        self.store(ctx, slot + 1, collateral_factor)
+        self.market_list.append(to_address(ktoken))
+
+    def assets_in(self, ctx: Context, account: str) -> list[ChecksumAddress]:
+        return [m for m in self.market_list if self.is_member(ctx, m, account)]
+
+    def is_member(self, ctx: Context, ktoken: str, account: str) -> bool:
+        return bool(self.load(ctx, storage_slot(self.MEMBERSHIP, ktoken, account)))
+
+    def borrow_allowed(
+        self, ctx: Context, ktoken: str, borrower: str, amount: int
+    ) -> None:
+        """Revert unless the borrower's collateral covers the borrow."""
+        require(self.load(ctx, storage_slot(self.MARKETS, ktoken)), "market not listed")
+        # The borrowed market is entered on the borrower's behalf.
+        self.store(ctx, storage_slot(self.MEMBERSHIP, ktoken, borrower), 1)
+        require(
+            self._shortfall(ctx, borrower, ktoken, borrow_amount=amount) == 0,
+            "insufficient liquidity",
+        )
+
+    def redeem_allowed(
+        self, ctx: Context, ktoken: str, redeemer: str, tokens: int
+    ) -> None:
+        """Revert if redeeming would leave the redeemer's borrows uncovered."""
+        if self.is_member(ctx, ktoken, redeemer):
+            require(
+                self._shortfall(ctx, redeemer, ktoken, redeem_tokens=tokens) == 0,
+                "insufficient liquidity",
+            )
+
+    def _shortfall(
+        self,
+        ctx: Context,
+        account: str,
+        ktoken: str,
+        *,
+        redeem_tokens: int = 0,
+        borrow_amount: int = 0,
+    ) -> int:
+        oracle = ctx.contract(self.oracle_address)
+        collateral = borrows = 0
+        for market in self.assets_in(ctx, account):
+            kt = ctx.contract(market)
+            balance, borrowed = kt.balance(ctx, account), kt.borrowed(ctx, account)
+            price = oracle.price(ctx, market)
+            factor = self.load(ctx, storage_slot(self.MARKETS, market) + 1)
+            if market == to_address(ktoken):
+                balance -= redeem_tokens
+                borrowed += borrow_amount
+            underlying = balance * kt.exchange_rate // MANTISSA
+            collateral += underlying * factor // MANTISSA * price // MANTISSA
+            borrows += borrowed * price // MANTISSA
+        return max(borrows - collateral, 0)
+
+
+class KToken(ERC20Token):
+    """
+    Kinetic kToken over an ERC-20 underlying, at a fixed exchange rate.
+
+    Attributes:
+        underlying_address (ChecksumAddress): Token supplied and borrowed
+        comptroller (KineticComptroller): Comptroller the market is listed in
+        exchange_rate (int): Underlying per kToken, scaled by 1e18
+        supply_rate (int): Reported supply rate per block
+        borrow_rate (int): Reported borrow rate per block
+    """
+
+    abi_name = "ktoken"
+    gas: ClassVar[dict[str, int]] = {
+        **ERC20_GAS,
+        "mint": 90_000,
+        "redeem": 90_000,
+        "redeemUnderlying": 90_000,
+        "borrow": 150_000,
+        "repayBorrow": 70_000,
+        "getAccountSnapshot": 5_000,
+        "getCash": 5_000,
+    }
+    ACCOUNT_BORROWS = 3
+    TOTAL_BORROWS = 4
+
+    def __init__(  # noqa: PLR0913, PLR0917
+        self,
+        address: str,
+        symbol: str,
+        underlying: ERC20Token,
+        comptroller: KineticComptroller,
+        supply_rate: int = 0,
+        borrow_rate: int = 0,
+    ) -> None:
+        super().__init__(address, f"Kinetic {symbol}", f"k{symbol}", KTOKEN_DECIMALS)
+        self.underlying_address = underlying.address
+        self.comptroller = comptroller
+        self.exchange_rate = (
+            KTOKEN_INITIAL_RATE * 10**underlying.token_decimals // 10**KTOKEN_DECIMALS
+        )
+        self.supply_rate = supply_rate
+        self.borrow_rate = borrow_rate
+
+    def underlying(self, _ctx: Context, _msg: Message) -> ChecksumAddress:
+        return self.underlying_address
+
+    def exchange_rate_stored(self, _ctx: Context, _msg: Message) -> int:
+        return self.exchange_rate
+
+    def supply_rate_per_block(self, _ctx: Context, _msg: Message) -> int:
+        return self.supply_rate
+
+    def borrow_rate_per_block(self, _ctx: Context, _msg: Message) -> int:
+        return self.borrow_rate
+
+    def get_cash(self, ctx: Context, _msg: Message) -> int:
+        return self.cash(ctx)
+
+    def get_account_snapshot(
+        self, ctx: Context, _msg: Message, account: str
+    ) -> tuple[int, int, int, int]:
+        return (
+            0,
+            self.balance(ctx, account),
+            self.borrowed(ctx, account),
+            self.exchange_rate,
+        )
+
+    def cash(self, ctx: Context) -> int:
+        """Underlying the market holds."""
+        return ctx.contract(self.underlying_address).balance(ctx, self.address)
+
+    def borrowed(self, ctx: Context, account: str) -> int:
+        return self.load(ctx, storage_slot(self.ACCOUNT_BORROWS, account))
+
+    def mint(self, ctx: Context, msg: Message, amount: int) -> int:
+        self._pull(ctx, msg.sender, amount)
+        self.mint_to(ctx, msg.sender, amount * MANTISSA // self.exchange_rate)
+        return 0
+
+    def redeem(self, ctx: Context, msg: Message, tokens: int) -> int:
+        self._redeem(ctx, msg.sender, tokens, tokens * self.exchange_rate // MANTISSA)
+        return 0
+
+    def redeem_underlying(self, ctx: Context, msg: Message, amount: int) -> int:
+        tokens = -(-amount * MANTISSA // self.exchange_rate)
+        self._redeem(ctx, msg.sender, tokens, amount)
+        return 0
+
+    def borrow(self, ctx: Context, msg: Message, amount: int) -> int:
+        self.comptroller.borrow_allowed(ctx, self.address, msg.sender, amount)
+        require(self.cash(ctx) >= amount, "insufficient cash")
+        slot = storage_slot(self.ACCOUNT_BORROWS, msg.sender)
+        self.store(ctx, slot, self.load(ctx, slot) + amount)
+        self.store(ctx, self.TOTAL_BORROWS, self.load(ctx, self.TOTAL_BORROWS) + amount)
+        self._push(ctx, msg.sender, amount)
+        return 0
+
+    def repay_borrow(self, ctx: Context, msg: Message, amount: int) -> int:
+        slot = storage_slot(self.ACCOUNT_BORROWS, msg.sender)
+        owed = self.borrowed(ctx, msg.sender)
+        if amount == MAX_UINT256:
+            amount = owed
+        require(amount <= owed, "repay exceeds borrow")
+        self._pull(ctx, msg.sender, amount)
+        self.store(ctx, slot, owed - amount)
+        self.store(ctx, self.TOTAL_BORROWS, self.load(ctx, self.TOTAL_BORROWS) - amount)
+        return 0
+
+    def _redeem(self, ctx: Context, redeemer: str, tokens: int, amount: int) -> None:
+        require(self.balance(ctx, redeemer) >= tokens, "redeem exceeds balance")
+        self.comptroller.redeem_allowed(ctx, self.address, redeemer, tokens)
+        require(self.cash(ctx) >= amount, "insufficient cash")
+        self.burn_from(ctx, redeemer, tokens)
+        self._push(ctx, redeemer, amount)
+
+    def _pull(self, ctx: Context, owner: str, amount: int) -> None:
+        ctx.invoke(
+            self.address,
+            self.underlying_address,
+            "erc20",
+            "transferFrom",
+            owner,
+            self.address,
+            amount,
+        )
+
+    def _push(self, ctx: Context, to: str, amount: int) -> None:
+        ctx.invoke(
+            self.address, self.underlying_address, "erc20", "transfer", to, amount
+        )
+
+
+class FlareContractRegistry(LocalContract):
+    """Name to address registry of Flare's system contracts."""
+
+    abi_name = "flare_contract_registry"
+    gas: ClassVar[dict[str, int]] = {"getContractAddressByName": 5_000}
+
+    def __init__(self, address: str, contracts: dict[str, str]) -> None:
+        super().__init__(address)
+        self.contracts = {name: to_address(a) for name, a in contracts.items()}
+
+    def get_contract_address_by_name(
+        self, _ctx: Context, _msg: Message, name: str
+    ) -> ChecksumAddress:
+        return self.contracts.get(name, to_address(ZERO_ADDRESS))
+
+
+class FtsoV2(LocalContract):
+    """
+    FTSOv2 feeds with fixed values, stamped with the block time.
+
+    Attributes:
+        feeds (dict[bytes, tuple[int, int]]): Feed id to value and decimals
+    """
+
+    abi_name = "ftso_v2"
+    gas: ClassVar[dict[str, int]] = {"getFeedsById": 10_000}
+
+    def __init__(self, address: str) -> None:
+        super().__init__(address)
+        self.feeds: dict[bytes, tuple[int, int]] = {}
+
+    def get_feeds_by_id(
+        self, ctx: Context, _msg: Message, feed_ids: list[bytes]
+    ) -> tuple[list[int], list[int], int]:
+        values, decimals = [], []
+        for feed in feed_ids:
+            require(feed in self.feeds, "feed not supported")
+            value, places = self.feeds[feed]
+            values.append(value)
+            decimals.append(places)
+        return values, decimals, ctx.block.timestamp
+
+
+# Decimals of the FTSO feed values.
+FEED_DECIMALS = 7
+
+
+@dataclass(frozen=True)
+class TokenSpec:
+    """
+    A token deployed on the local chain.
+
+    Attributes:
+        symbol (str): Lowercase symbol the app looks tokens up by
+        name (str): Token name
+        decimals (int): Decimals
+        usd_price (float): Price pools and feeds are seeded with
+        feed (str | None): FTSO feed name, None for none
+    """
+
+    symbol: str
+    name: str
+    decimals: int
+    usd_price: float
+    feed: str | None = None
+
+    def feed_value(self) -> int:
+        """Price as an FTSO feed value with FEED_DECIMALS decimals."""
+        return round(self.usd_price * 10**FEED_DECIMALS)
+
+    def oracle_price(self) -> int:
+        """Price of one base unit, scaled by 1e36 as the Kinetic oracle gives it."""
+        return self.feed_value() * 10 ** (36 - FEED_DECIMALS - self.decimals)
+
+
+TOKENS = (
+    TokenSpec("wflr", "Wrapped Flare", 18, 0.02, "FLR/USD"),
+    TokenSpec("sflr", "Staked FLR", 18, 0.022),
+    TokenSpec("joule", "Joule", 18, 0.01),
+    TokenSpec("usdc", "Bridged USDC", 6, 1.0, "USDC/USD"),
+    TokenSpec("usdt", "Bridged USDT", 6, 1.0, "USDT/USD"),
+    TokenSpec("weth", "Bridged Wrapped Ether", 18, 2500.0, "ETH/USD"),
+)
+# Pools as (token a, token b, fee, USD depth on each side).
+POOLS = (
+    ("wflr", "usdc", 500, 2_000_000),
+    ("wflr", "usdc", 3000, 500_000),
+    ("wflr", "usdt", 500, 1_000_000),
+    ("wflr", "weth", 3000, 1_000_000),
+    ("wflr", "sflr", 100, 1_000_000),
+    ("wflr", "joule", 3000, 200_000),
+    ("usdc", "usdt", 100, 2_000_000),
+    ("usdc", "weth", 500, 1_000_000),
+)
+# Ticks each side of the price that pool liquidity spans.
+POSITION_HALF_WIDTH = 6_000
+COLLATERAL_FACTORS = {"sflr": 5 * 10**17, "usdc": 8 * 10**17}
+# Underlying each Kinetic market holds for lending.
+MARKET_CASH_USD = 1_000_000
+KINETIC_ORACLE = "0x0000000000000000000000000000000000004B10"
+FTSO_V2 = "0x7BDE3Df0624114eDB3A67dFe6753e62f4e7c1d20"
+# Rates the Kinetic markets report, about 2% and 6% a year at 1.8 s blocks.
+SUPPLY_RATE_PER_BLOCK = 1_141_000_000
+BORROW_RATE_PER_BLOCK = 3_425_000_000
+
+
+@dataclass
+class LocalFlare:
+    """
+    The contracts the app uses, deployed on a LocalChain.
+
+    Usage:
+        local = LocalFlare.deploy()
+        provider = FlareProvider(local.chain, WalletStore())
+        local.fund(address, flr=1_000, usdc=500)
+
+    Attributes:
+        chain (LocalChain): Chain the contracts run on
+        tokens (dict[str, ERC20Token]): Tokens by lowercase symbol
+        pools (list[V3Pool]): SparkDEX V3 pools
+        markets (dict[str, KToken]): Kinetic markets by underlying symbol
+        w3 (Web3): Web3 instance on the chain
+    """
+
+    chain: LocalChain
+    tokens: dict[str, ERC20Token] = field(default_factory=dict)
+    pools: list[V3Pool] = field(default_factory=list)
+    markets: dict[str, KToken] = field(default_factory=dict)
+    w3: Web3 = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self.w3 = Web3(self.chain)
+
+    @classmethod
+    def deploy(cls, chain: LocalChain | None = None) -> "LocalFlare":
+        """
+        Deploy every contract at its mainnet address and seed pools and prices.
+
+        Args:
+            chain (LocalChain | None): Chain to deploy on, a new one by default
+
+        Returns:
+            LocalFlare: The deployment
+        """
+        # Imported here: these modules import the package this one is part of.
+        from flare_ai_defai.blockchain.ftso import FLARE_CONTRACT_REGISTRY, feed_id  # noqa: PLC0415
+        from flare_ai_defai.blockchain.kinetic_indexer import KineticIndexer  # noqa: PLC0415
+        from flare_ai_defai.blockchain.kinetic_market import KineticMarket  # noqa: PLC0415
+        from flare_ai_defai.blockchain.multicall import MULTICALL3_ADDRESS  # noqa: PLC0415
+        from flare_ai_defai.blockchain.pool_cache import PoolStateCache  # noqa: PLC0415
+        from flare_ai_defai.blockchain.quoter import SparkDEXQuoter  # noqa: PLC0415
+        from flare_ai_defai.blockchain.sparkdex import SparkDEX  # noqa: PLC0415
+        from flare_ai_defai.blockchain.universal_router import PERMIT2_ADDRESS  # noqa: PLC0415
+
+        chain = chain or LocalChain()
+        local = cls(chain)
+        addresses = {**SparkDEX.TOKEN_ADDRESSES, "sflr": SparkDEX.SFLR_ADDRESS}
+        for spec in TOKENS:
+            if spec.symbol == "wflr":
+                token: ERC20Token = WFLR(addresses["wflr"])
+            elif spec.symbol == "sflr":
+                rate = int(spec.usd_price / TOKENS[0].usd_price * MANTISSA)
+                token = SFLR(addresses["sflr"], rate)
+            else:
+                token = ERC20Token(
+                    addresses[spec.symbol],
+                    spec.name,
+                    spec.symbol.upper(),
+                    spec.decimals,
+                )
+            local.tokens[spec.symbol] = chain.deploy(token)
+
+        chain.deploy(Multicall3(MULTICALL3_ADDRESS))
+        permit2 = chain.deploy(Permit2(PERMIT2_ADDRESS))
+        factory = chain.deploy(V3Factory(PoolStateCache.FACTORY))
+        chain.deploy(QuoterV2(SparkDEXQuoter.QUOTER_V2, factory))
+        chain.deploy(SwapRouter(SparkDEX.UNIVERSAL_ROUTER, factory))
+        chain.deploy(
+            UniversalRouter(
+                SparkDEX.SPARKDEX_ROUTER, factory, local.tokens["wflr"], permit2
+            )
+        )
+        specs = {spec.symbol: spec for spec in TOKENS}
+        for symbol_a, symbol_b, fee, depth_usd in POOLS:
+            local.pools.append(
+                local._seed_pool(
+                    factory, specs[symbol_a], specs[symbol_b], fee, depth_usd
+                )
+            )
+
+        oracle = chain.deploy(KineticOracle(KINETIC_ORACLE))
+        comptroller = chain.deploy(
+            KineticComptroller(KineticIndexer.COMPTROLLER, oracle)
+        )
+        for symbol, address in KineticMarket.MARKETS.items():
+            underlying = local.tokens[symbol]
+            market = chain.deploy(
+                KToken(
+                    address,
+                    underlying.token_symbol,
+                    underlying,
+                    comptroller,
+                    SUPPLY_RATE_PER_BLOCK,
+                    BORROW_RATE_PER_BLOCK,
+                )
+            )
+            local.markets[symbol] = market
+
+        def list_markets(ctx: Context) -> None:
+            for symbol, market in local.markets.items():
+                spec = specs[symbol]
+                comptroller.list_market(ctx, market.address, COLLATERAL_FACTORS[symbol])
+                oracle.set_price(ctx, market.address, spec.oracle_price())
+                cash = int(MARKET_CASH_USD / spec.usd_price * 10**spec.decimals)
+                local.tokens[symbol].mint_to(ctx, market.address, cash)
+
+        chain.mine(list_markets)
+
+        ftso = chain.deploy(FtsoV2(FTSO_V2))
+        for spec in TOKENS:
+            if spec.feed is not None:
+                ftso.feeds[feed_id(spec.feed)] = (spec.feed_value(), FEED_DECIMALS)
+        chain.deploy(
+            FlareContractRegistry(FLARE_CONTRACT_REGISTRY, {"FtsoV2": FTSO_V2})
+        )
+        return local
+
+    def fund(self, address: str, flr: float = 0, **amounts: float) -> None:
+        """
+        Give an account FLR and tokens, in whole units.
+
+        Args:
+            address (str): Account funded
+            flr (float): Native FLR
+            **amounts (float): Token symbol to amount, e.g. usdc=100
+        """
+        address = to_address(address)
+
+        def apply(ctx: Context) -> None:
+            if flr:
+                wei = int(flr * MANTISSA)
+                ctx.state.balances[address] = ctx.state.balance(address) + wei
+            for symbol, amount in amounts.items():
+                token = self.tokens[symbol.lower()]
+                token.mint_to(ctx, address, int(amount * 10**token.token_decimals))
+
+        self.chain.mine(apply)
+
+    def balance(self, address: str, symbol: str = "flr") -> int:
+        """Latest balance of an account, in base units."""
+        with self.chain._lock:  # noqa: SLF001
+            ctx = Context(self.chain, self.chain.head.state, self.chain._next_env())  # noqa: SLF001
+            if symbol.lower() == "flr":
+                return ctx.state.balance(to_address(address))
+            return self.tokens[symbol.lower()].balance(ctx, address)
+
+    def _seed_pool(
+        self,
+        factory: V3Factory,
+        spec_a: TokenSpec,
+        spec_b: TokenSpec,
+        fee: int,
+        depth_usd: float,
+    ) -> V3Pool:
+        token_a, token_b = self.tokens[spec_a.symbol], self.tokens[spec_b.symbol]
+        spec0, spec1 = (
+            (spec_a, spec_b)
+            if token_a.address.lower() < token_b.address.lower()
+            else (spec_b, spec_a)
+        )
+        # token1 base units per token0 base unit
+        price = (spec0.usd_price / spec1.usd_price) * 10 ** (
+            spec1.decimals - spec0.decimals
+        )
+        sqrt_price_x96 = int(math.sqrt(price) * Q96)
+        pool = factory.create_pool(
+            self.chain, token_a.address, token_b.address, fee, sqrt_price_x96
+        )
+        spacing = TICK_SPACINGS[fee]
+        tick = get_tick_at_sqrt_ratio(sqrt_price_x96)
+        lower = (tick - POSITION_HALF_WIDTH) // spacing * spacing
+        upper = -(-(tick + POSITION_HALF_WIDTH) // spacing) * spacing
+        # Liquidity whose token1 side is worth `depth_usd`.
+        amount1 = depth_usd / spec1.usd_price * 10**spec1.decimals
+        liquidity = int(
+            amount1 * Q96 / (sqrt_price_x96 - get_sqrt_ratio_at_tick(lower))
+        )
+        token0 = self.tokens[spec0.symbol]
+        token1 = self.tokens[spec1.symbol]
+
+        def add(ctx: Context) -> None:
+            amount0, amount1 = pool.add_liquidity(
+                ctx, factory.address, lower, upper, liquidity
+            )
+            token0.mint_to(ctx, pool.address, amount0)
+            token1.mint_to(ctx, pool.address, amount1)
+
+        self.chain.mine(add)
+        return pool
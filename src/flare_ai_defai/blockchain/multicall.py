@@ -0,0 +1,123 @@
+"""
+Multicall Module
+
+Batches many contract reads into a single `eth_call` through Multicall3's
+`aggregate3`, so gathering quotes, pool state or balances costs one RPC
+round-trip instead of one per value.
+"""
+
+from collections.abc import Sequence
+from dataclasses import dataclass
+
+import structlog
+from eth_typing import ChecksumAddress
+from eth_utils.abi import get_abi_output_types
+from hexbytes import HexBytes
+from web3 import Web3
+from web3.contract.contract import ContractFunction
+from web3.types import BlockIdentifier
+
+from flare_ai_defai.blockchain.abi_registry import abi_registry
+
+logger = structlog.get_logger(__name__)
+
+MULTICALL3_ADDRESS = "0xcA11bde05977b3631167028862bE2a173976CA11"
+
+
+@dataclass(frozen=True)
+class Call:
+    """
+    A single contract read to batch.
+
+    Attributes:
+        target (ChecksumAddress): Contract to call
+        data (bytes): ABI encoded calldata
+        output_types (tuple[str, ...]): ABI types used to decode the result
+        allow_failure (bool): If False, a revert fails the whole batch
+    """
+
+    target: ChecksumAddress
+    data: bytes
+    output_types: tuple[str, ...]
+    allow_failure: bool = True
+
+    @classmethod
+    def from_function(
+        cls, function: ContractFunction, *, allow_failure: bool = True
+    ) -> "Call":
+        """Build a call from a bound contract function, e.g. `c.functions.f(x)`."""
+        return cls(
+            target=function.address,
+            data=HexBytes(function._encode_transaction_data()),  # noqa: SLF001
+            output_types=tuple(get_abi_output_types(function.abi)),
+            allow_failure=allow_failure,
+        )
+
+
+@dataclass(frozen=True)
+class CallResult:
+    """
+    Decoded result of a batched call.
+
+    Attributes:
+        success (bool): False if the call reverted or could not be decoded
+        value (tuple | None): Decoded outputs, None on failure
+    """
+
+    success: bool
+    value: tuple | None = None
+
+
+class Multicall:
+    """
+    Thin client for Multicall3.
+
+    Attributes:
+        w3 (Web3): Web3 instance to call through
+        batch_size (int): Calls per `aggregate3`, larger batches are split
+    """
+
+    def __init__(
+        self, w3: Web3, address: str = MULTICALL3_ADDRESS, batch_size: int = 500
+    ) -> None:
+        self.w3 = w3
+        self.batch_size = batch_size
+        self.contract = abi_registry.contract(w3, "multicall3", address)
+        self.logger = logger.bind(router="multicall")
+
+    def aggregate(
+        self, calls: Sequence[Call], block_identifier: BlockIdentifier = "latest"
+    ) -> list[CallResult]:
+        """
+        Execute calls in as few `eth_call`s as possible.
+
+        Args:
+            calls (Sequence[Call]): Calls to execute, in order
+            block_identifier (BlockIdentifier): Block to read state at
+
+        Returns:
+            list[CallResult]: One result per call, in order
+        """
+        results: list[CallResult] = []
+        for start in range(0, len(calls), self.batch_size):
+            batch = calls[start : start + self.batch_size]
+            raw = self.contract.functions.aggregate3(
+                [(call.target, call.allow_failure, call.data) for call in batch]
+            ).call(block_identifier=block_identifier)
+            results.extend(
+                self._decode(call, success, data)
+                for call, (success, data) in zip(batch, raw, strict=True)
+            )
+        self.logger.debug("aggregate", calls=len(calls), block=block_identifier)
+        return results
+
+    def _decode(self, call: Call, success: bool, data: bytes) -> CallResult:  # noqa: FBT001
+        if not success or (call.output_types and not data):
+            return CallResult(success=False)
+        try:
+            return CallResult(
+                True, tuple(self.w3.codec.decode(call.output_types, data))
+            )
+        except Exception:  # noqa: BLE001
+            self.logger.debug("undecodable_result", target=call.target)
+            return CallResult(success=False)
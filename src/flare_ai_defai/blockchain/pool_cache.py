@@ -0,0 +1,527 @@
+"""
+SparkDEX Pool State Cache
+
+Keeps SparkDEX V3 pool addresses and their `slot0`/`liquidity` in memory.
+Pool addresses never change once a pool exists, so they are resolved once.
+Pool state is valid for the block it was read at and is moved forward by
+replaying the pools' own events: a `Swap` log carries the new price, tick and
+in-range liquidity, so it is applied without any RPC, while `Mint`/`Burn`
+may change in-range liquidity and mark the pool for a multicall refresh.
+Pools no event touched are never re-read. A node trailing the head can
+answer a log query that reaches it with logs missing, so the last
+`head_lag` blocks are asked for again on the next sync, and a replayed log
+is only applied if it is not older than the state it would update.
+Initialized ticks around the price are loaded on demand into
+`PoolSnapshot`s for the offline swap simulator and are only dropped when
+liquidity positions change.
+"""
+
+import threading
+from collections.abc import Iterable
+from dataclasses import dataclass, replace
+
+import structlog
+from eth_typing import ChecksumAddress
+from hexbytes import HexBytes
+from web3 import Web3
+from web3.contract import Contract
+from web3.types import LogReceipt
+
+from flare_ai_defai.blockchain.abi_registry import abi_registry
+from flare_ai_defai.blockchain.block_watcher import HEAD_LAG_BLOCKS, BlockHeader
+from flare_ai_defai.blockchain.multicall import Call, Multicall
+from flare_ai_defai.blockchain.v3_simulator import PoolSnapshot
+
+logger = structlog.get_logger(__name__)
+
+# Fee tiers in hundredths of a bip: 0.01%, 0.05%, 0.3%, 1%.
+FEE_TIERS = (100, 500, 3000, 10000)
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+# Flare RPC nodes cap eth_getLogs ranges; past this, re-reading is cheaper.
+MAX_LOG_RANGE = 30
+# Blocks before a fee tier with no pool is looked up again (~1h on Flare).
+MISSING_POOL_RECHECK_BLOCKS = 2000
+# Tick bitmap words loaded either side of the current price for snapshots.
+WORD_RADIUS = 2
+
+SWAP_TOPIC = abi_registry.topic("v3_pool", "Swap")
+MINT_TOPIC = abi_registry.topic("v3_pool", "Mint")
+BURN_TOPIC = abi_registry.topic("v3_pool", "Burn")
+POOL_EVENT_TOPICS = (SWAP_TOPIC, MINT_TOPIC, BURN_TOPIC)
+SWAP_DATA_TYPES = ("int256", "int256", "uint160", "uint128", "int24")
+
+
+def sort_pair(token_a: str, token_b: str) -> tuple[ChecksumAddress, ChecksumAddress]:
+    """Order two token addresses as (token0, token1), the way V3 pools do."""
+    token0, token1 = sorted((token_a.lower(), token_b.lower()))
+    return Web3.to_checksum_address(token0), Web3.to_checksum_address(token1)
+
+
+@dataclass(frozen=True)
+class _TickData:
+    tick_spacing: int
+    liquidity_net: dict[int, int]
+    min_word: int
+    max_word: int
+
+
+@dataclass(frozen=True)
+class PoolState:
+    """
+    Price and in-range liquidity of a V3 pool.
+
+    Attributes:
+        address (ChecksumAddress): Pool address
+        token0 (ChecksumAddress): Lower-sorted token of the pair
+        token1 (ChecksumAddress): Higher-sorted token of the pair
+        fee (int): Fee tier in hundredths of a bip
+        sqrt_price_x96 (int): Current sqrt(token1/token0) price as Q64.96
+        tick (int): Current tick
+        liquidity (int): In-range liquidity
+        block_number (int): Block the state was last read or updated at
+    """
+
+    address: ChecksumAddress
+    token0: ChecksumAddress
+    token1: ChecksumAddress
+    fee: int
+    sqrt_price_x96: int
+    tick: int
+    liquidity: int
+    block_number: int
+
+
+class PoolStateCache:
+    """
+    Block-synchronised cache of SparkDEX V3 pool addresses and state.
+
+    All cached states are consistent as of `block_number`. Reads call `sync`
+    first, which costs one `eth_blockNumber` and, only when a new block has
+    arrived, one `eth_getLogs` over the tracked pools.
+
+    Attributes:
+        block_number (int | None): Block the cached states are valid at
+        head (int | None): Latest head announced through `on_block`; once
+            set, `sync` targets it instead of asking for `eth_blockNumber`
+        max_log_range (int): Largest block gap replayed from logs; larger
+            gaps re-read every tracked pool with one multicall instead
+        head_lag (int): Blocks below the last synced head whose logs are
+            read again, in case a trailing node left some out
+    """
+
+    FACTORY = "0x8A2578d23d4C532cC9A98FaD91C0523f5efDE652"
+
+    def __init__(  # noqa: PLR0913, PLR0917
+        self,
+        w3: Web3,
+        multicall: Multicall | None = None,
+        factory_address: str = FACTORY,
+        fee_tiers: tuple[int, ...] = FEE_TIERS,
+        max_log_range: int = MAX_LOG_RANGE,
+        head_lag: int = HEAD_LAG_BLOCKS,
+    ) -> None:
+        self.w3 = w3
+        self.multicall = multicall or Multicall(w3)
+        self.factory = abi_registry.contract(w3, "v3_factory", factory_address)
+        self.fee_tiers = fee_tiers
+        self.max_log_range = max_log_range
+        self.head_lag = head_lag
+        self.block_number: int | None = None
+        self.head: int | None = None
+        self._addresses: dict[tuple[str, str, int], ChecksumAddress] = {}
+        self._missing: dict[tuple[str, str, int], int] = {}
+        self._states: dict[ChecksumAddress, PoolState] = {}
+        self._ticks: dict[ChecksumAddress, _TickData] = {}
+        self._tick_spacings: dict[ChecksumAddress, int] = {}
+        self._lock = threading.RLock()
+        self.logger = logger.bind(router="pool_cache")
+
+    def pool_addresses(self, token_a: str, token_b: str) -> dict[int, ChecksumAddress]:
+        """
+        Return the existing pools for a pair, keyed by fee tier.
+
+        Args:
+            token_a (str): Address of one token
+            token_b (str): Address of the other token
+        """
+        return self.pool_addresses_many([(token_a, token_b)])[
+            sort_pair(token_a, token_b)
+        ]
+
+    def pool_addresses_many(
+        self, pairs: Iterable[tuple[str, str]]
+    ) -> dict[tuple[ChecksumAddress, ChecksumAddress], dict[int, ChecksumAddress]]:
+        """
+        Return the existing pools for many pairs.
+
+        Addresses are looked up once with a single multicall of `getPool` for
+        every unknown (pair, fee) and kept for good. Tiers without a pool are
+        rechecked every `MISSING_POOL_RECHECK_BLOCKS` blocks in case one gets
+        created.
+
+        Args:
+            pairs (Iterable[tuple[str, str]]): Token address pairs, any order
+
+        Returns:
+            dict: Pools keyed by sorted (token0, token1), then by fee tier
+        """
+        sorted_pairs = list(dict.fromkeys(sort_pair(a, b) for a, b in pairs))
+        with self._lock:
+            current = self.block_number or 0
+            unknown = [
+                (token0, token1, fee)
+                for token0, token1 in sorted_pairs
+                for fee in self.fee_tiers
+                if (token0, token1, fee) not in self._addresses
+                and current - self._missing.get((token0, token1, fee), -(10**18))
+                >= MISSING_POOL_RECHECK_BLOCKS
+            ]
+            if unknown:
+                results = self.multicall.aggregate(
+                    [
+                        Call.from_function(self.factory.functions.getPool(*key))
+                        for key in unknown
+                    ]
+                )
+                for key, result in zip(unknown, results, strict=True):
+                    if (
+                        result.success
+                        and result.value
+                        and result.value[0] != ZERO_ADDRESS
+                    ):
+                        self._addresses[key] = Web3.to_checksum_address(result.value[0])
+                        self._missing.pop(key, None)
+                    else:
+                        self._missing[key] = current
+            return {
+                (token0, token1): {
+                    fee: self._addresses[(token0, token1, fee)]
+                    for fee in self.fee_tiers
+                    if (token0, token1, fee) in self._addresses
+                }
+                for token0, token1 in sorted_pairs
+            }
+
+    def pool_states(self, token_a: str, token_b: str) -> dict[int, PoolState]:
+        """
+        Return the current state of every pool for a pair, keyed by fee tier.
+
+        Args:
+            token_a (str): Address of one token
+            token_b (str): Address of the other token
+
+        Returns:
+            dict[int, PoolState]: States as of the latest block
+        """
+        return self.pool_states_many([(token_a, token_b)])[sort_pair(token_a, token_b)]
+
+    def pool_states_many(
+        self, pairs: Iterable[tuple[str, str]]
+    ) -> dict[tuple[ChecksumAddress, ChecksumAddress], dict[int, PoolState]]:
+        """
+        Return the current state of every pool of many pairs.
+
+        Syncs once, then reads all untracked pools in a single multicall.
+
+        Args:
+            pairs (Iterable[tuple[str, str]]): Token address pairs, any order
+
+        Returns:
+            dict: States as of the latest block, keyed by sorted (token0,
+                token1), then by fee tier
+        """
+        with self._lock:
+            self.sync()
+            pools = self.pool_addresses_many(pairs)
+            missing = [
+                (address, token0, token1, fee)
+                for (token0, token1), by_fee in pools.items()
+                for fee, address in by_fee.items()
+                if address not in self._states
+            ]
+            if missing:
+                self._read_states(missing)
+            return {
+                pair: {
+                    fee: self._states[address]
+                    for fee, address in by_fee.items()
+                    if address in self._states
+                }
+                for pair, by_fee in pools.items()
+            }
+
+    def sync(self, block_number: int | None = None) -> int:
+        """
+        Bring tracked pool states forward to a block.
+
+        Args:
+            block_number (int | None): Target block, defaults to the chain head
+
+        Returns:
+            int: Block the cache is now valid at
+        """
+        if block_number is None:
+            block_number = self.w3.eth.block_number if self.head is None else self.head
+        head = block_number
+        with self._lock:
+            if self.block_number is None or not self._states:
+                self.block_number = max(head, self.block_number or 0)
+                return self.block_number
+            if head <= self.block_number:
+                return self.block_number
+            start = max(0, self.block_number + 1 - self.head_lag)
+            if head - start >= self.max_log_range:
+                stale = set(self._states)
+                self._ticks.clear()
+            else:
+                logs = self.w3.eth.get_logs(
+                    {
+                        "address": list(self._states),
+                        "fromBlock": start,
+                        "toBlock": head,
+                        "topics": [[Web3.to_hex(t) for t in POOL_EVENT_TOPICS]],
+                    }
+                )
+                stale = self.apply_logs(logs)
+            self.block_number = head
+            if stale:
+                self._read_states(
+                    [
+                        (s.address, s.token0, s.token1, s.fee)
+                        for s in (self._states[address] for address in stale)
+                    ]
+                )
+            self.logger.debug(
+                "synced", from_block=start, to_block=head, refreshed=len(stale)
+            )
+            return head
+
+    def on_block(self, header: BlockHeader) -> None:
+        """Record a new chain head; the next read syncs pool states to it."""
+        self.head = header.number
+
+    def apply_logs(self, logs: Iterable[LogReceipt]) -> set[ChecksumAddress]:
+        """
+        Apply pool events to cached states, in order.
+
+        Args:
+            logs (Iterable[LogReceipt]): Swap/Mint/Burn logs of tracked pools
+
+        Returns:
+            set[ChecksumAddress]: Pools whose liquidity may have changed in a
+                way the logs do not describe and that need re-reading
+        """
+        stale: set[ChecksumAddress] = set()
+        with self._lock:
+            for log in logs:
+                address = Web3.to_checksum_address(log["address"])
+                state = self._states.get(address)
+                if state is None or not log["topics"]:
+                    continue
+                # Replayed logs the state already reflects.
+                if log["blockNumber"] < state.block_number:
+                    continue
+                topic = HexBytes(log["topics"][0])
+                if topic == SWAP_TOPIC and address not in stale:
+                    _, _, sqrt_price_x96, liquidity, tick = self.w3.codec.decode(
+                        SWAP_DATA_TYPES, HexBytes(log["data"])
+                    )
+                    self._states[address] = replace(
+                        state,
+                        sqrt_price_x96=sqrt_price_x96,
+                        liquidity=liquidity,
+                        tick=tick,
+                        block_number=log["blockNumber"],
+                    )
+                elif topic in (MINT_TOPIC, BURN_TOPIC):
+                    stale.add(address)
+                    self._ticks.pop(address, None)
+        return stale
+
+    def snapshots(
+        self, token_a: str, token_b: str, word_radius: int = WORD_RADIUS
+    ) -> dict[int, PoolSnapshot]:
+        """
+        Return swap simulator snapshots for every pool of a pair.
+
+        Args:
+            token_a (str): Address of one token
+            token_b (str): Address of the other token
+            word_radius (int): Bitmap words to load either side of the price
+
+        Returns:
+            dict[int, PoolSnapshot]: Snapshots as of the latest block, keyed
+                by fee tier
+        """
+        return self.snapshots_many([(token_a, token_b)], word_radius)[
+            sort_pair(token_a, token_b)
+        ]
+
+    def snapshots_many(
+        self, pairs: Iterable[tuple[str, str]], word_radius: int = WORD_RADIUS
+    ) -> dict[tuple[ChecksumAddress, ChecksumAddress], dict[int, PoolSnapshot]]:
+        """
+        Return swap simulator snapshots for every pool of many pairs.
+
+        Initialized ticks within `word_radius` bitmap words of the price are
+        read with two multicalls (bitmap words, then the set ticks) the first
+        time and whenever the price leaves the loaded words.
+
+        Args:
+            pairs (Iterable[tuple[str, str]]): Token address pairs, any order
+            word_radius (int): Bitmap words to load either side of the price
+
+        Returns:
+            dict: Snapshots as of the latest block, keyed by sorted (token0,
+                token1), then by fee tier
+        """
+        with self._lock:
+            states = self.pool_states_many(pairs)
+            self._load_ticks(
+                [
+                    state
+                    for by_fee in states.values()
+                    for state in by_fee.values()
+                    if not self._covers(self._ticks.get(state.address), state)
+                ],
+                word_radius,
+            )
+            return {
+                pair: {
+                    fee: PoolSnapshot(
+                        sqrt_price_x96=state.sqrt_price_x96,
+                        tick=state.tick,
+                        liquidity=state.liquidity,
+                        fee=state.fee,
+                        tick_spacing=ticks.tick_spacing,
+                        liquidity_net=ticks.liquidity_net,
+                        min_word=ticks.min_word,
+                        max_word=ticks.max_word,
+                    )
+                    for fee, state in by_fee.items()
+                    if (ticks := self._ticks.get(state.address)) is not None
+                }
+                for pair, by_fee in states.items()
+            }
+
+    @staticmethod
+    def _covers(ticks: _TickData | None, state: PoolState) -> bool:
+        if ticks is None:
+            return False
+        word = (state.tick // ticks.tick_spacing) >> 8
+        return ticks.min_word < word < ticks.max_word
+
+    def _load_ticks(self, states: list[PoolState], word_radius: int) -> None:
+        """Read tick spacing, bitmap words and liquidityNet for pools."""
+        if not states:
+            return
+        pools = {
+            state.address: abi_registry.contract(self.w3, "v3_pool", state.address)
+            for state in states
+        }
+        block = self.block_number if self.block_number is not None else "latest"
+        self._load_tick_spacings(pools, block)
+        centers = {
+            state.address: (state.tick // spacing) >> 8
+            for state in states
+            if (spacing := self._tick_spacings.get(state.address))
+        }
+        if not centers:
+            return
+        liquidity_net = self._read_liquidity_net(pools, centers, word_radius, block)
+        for address, center in centers.items():
+            self._ticks[address] = _TickData(
+                tick_spacing=self._tick_spacings[address],
+                liquidity_net=liquidity_net[address],
+                min_word=center - word_radius,
+                max_word=center + word_radius,
+            )
+
+    def _load_tick_spacings(
+        self, pools: dict[ChecksumAddress, Contract], block: int | str
+    ) -> None:
+        unknown = [a for a in pools if a not in self._tick_spacings]
+        if not unknown:
+            return
+        results = self.multicall.aggregate(
+            [Call.from_function(pools[a].functions.tickSpacing()) for a in unknown],
+            block,
+        )
+        for address, result in zip(unknown, results, strict=True):
+            if result.success:
+                self._tick_spacings[address] = result.value[0]
+
+    def _read_liquidity_net(
+        self,
+        pools: dict[ChecksumAddress, Contract],
+        centers: dict[ChecksumAddress, int],
+        word_radius: int,
+        block: int | str,
+    ) -> dict[ChecksumAddress, dict[int, int]]:
+        """Read the bitmap words around each center, then their set ticks."""
+        words = [
+            (address, word)
+            for address, center in centers.items()
+            for word in range(center - word_radius, center + word_radius + 1)
+        ]
+        results = self.multicall.aggregate(
+            [
+                Call.from_function(pools[address].functions.tickBitmap(word))
+                for address, word in words
+            ],
+            block,
+        )
+        ticks: list[tuple[ChecksumAddress, int]] = []
+        for (address, word), result in zip(words, results, strict=True):
+            bitmap = result.value[0] if result.success else 0
+            spacing = self._tick_spacings[address]
+            ticks.extend(
+                (address, ((word << 8) + bit) * spacing)
+                for bit in range(256)
+                if bitmap >> bit & 1
+            )
+        results = (
+            self.multicall.aggregate(
+                [
+                    Call.from_function(pools[address].functions.ticks(tick))
+                    for address, tick in ticks
+                ],
+                block,
+            )
+            if ticks
+            else []
+        )
+        liquidity_net: dict[ChecksumAddress, dict[int, int]] = {
+            address: {} for address in centers
+        }
+        for (address, tick), result in zip(ticks, results, strict=True):
+            if result.success:
+                liquidity_net[address][tick] = result.value[1]
+        return liquidity_net
+
+    def _read_states(
+        self, pools: list[tuple[ChecksumAddress, ChecksumAddress, ChecksumAddress, int]]
+    ) -> None:
+        """Read slot0 and liquidity for pools at the cache's block."""
+        calls: list[Call] = []
+        for address, *_ in pools:
+            pool = abi_registry.contract(self.w3, "v3_pool", address)
+            calls.append(Call.from_function(pool.functions.slot0()))
+            calls.append(Call.from_function(pool.functions.liquidity()))
+        block = self.block_number if self.block_number is not None else "latest"
+        results = self.multicall.aggregate(calls, block)
+        for i, (address, token0, token1, fee) in enumerate(pools):
+            slot0, liquidity = results[2 * i], results[2 * i + 1]
+            if not (slot0.success and liquidity.success):
+                self.logger.warning("pool_state_unavailable", pool=address)
+                continue
+            self._states[address] = PoolState(
+                address=address,
+                token0=token0,
+                token1=token1,
+                fee=fee,
+                sqrt_price_x96=slot0.value[0],
+                tick=slot0.value[1],
+                liquidity=liquidity.value[0],
+                block_number=self.block_number or 0,
+            )
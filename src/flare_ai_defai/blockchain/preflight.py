@@ -0,0 +1,243 @@
+"""
+Transaction Bundle Pre-flight Simulation
+
+Runs every transaction of a queued bundle against pending state before the
+user confirms it, so a bundle that would revert is reported with its revert
+reason instead of costing gas. Transactions in a bundle depend on the ones
+before them (a swap needs its approve, a swap of WFLR needs its wrap), so
+the effects of earlier approvals and wraps are carried forward as state
+overrides: the storage slot behind `allowance`/`balanceOf` is found once per
+token by probing and then written directly. Each simulation is an
+`eth_estimateGas`, which gives the gas limit and the revert reason in one
+call.
+"""
+
+import threading
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass
+
+import structlog
+from eth_typing import ChecksumAddress
+from eth_utils import keccak
+from hexbytes import HexBytes
+from web3 import Web3
+from web3.contract.contract import ContractFunction
+from web3.exceptions import ContractLogicError, Web3RPCError
+from web3.types import BlockIdentifier, StateOverrideParams, TxParams
+
+from flare_ai_defai.blockchain.abi_registry import abi_registry
+
+logger = structlog.get_logger(__name__)
+
+# Highest storage slot tried when looking for a token's mapping.
+MAX_PROBED_SLOT = 20
+PROBE_VALUE = 0x5EED_CAFE_F00D
+ERC20_APPROVE = abi_registry.selector("erc20", "approve")
+PERMIT2_APPROVE = abi_registry.selector("permit2", "approve")
+WFLR_DEPOSIT = abi_registry.selector("wflr", "deposit")
+
+StateOverride = dict[ChecksumAddress, StateOverrideParams]
+
+
+def mapping_slot(base: int, *keys: str) -> int:
+    """Storage slot of `mapping[keys[0]][keys[1]]...` declared at slot `base`."""
+    slot = base
+    for key in keys:
+        slot = int.from_bytes(
+            keccak(
+                bytes(12)
+                + bytes.fromhex(Web3.to_checksum_address(key)[2:])
+                + slot.to_bytes(32, "big")
+            ),
+            "big",
+        )
+    return slot
+
+
+@dataclass(frozen=True)
+class SimulatedTx:
+    """
+    Outcome of simulating one transaction.
+
+    Attributes:
+        index (int): Position in the bundle
+        success (bool): Whether the transaction would succeed
+        gas_used (int | None): Estimated gas, None if it reverts
+        revert_reason (str | None): Why it reverts
+    """
+
+    index: int
+    success: bool
+    gas_used: int | None = None
+    revert_reason: str | None = None
+
+
+@dataclass(frozen=True)
+class BundleSimulation:
+    """
+    Outcome of simulating a bundle, stopped at the first revert.
+
+    Attributes:
+        results (tuple[SimulatedTx, ...]): One result per simulated transaction
+    """
+
+    results: tuple[SimulatedTx, ...]
+
+    @property
+    def ok(self) -> bool:
+        return all(result.success for result in self.results)
+
+    @property
+    def revert_reason(self) -> str | None:
+        for result in self.results:
+            if not result.success:
+                return f"transaction {result.index + 1}: {result.revert_reason}"
+        return None
+
+    @property
+    def gas_used(self) -> int:
+        return sum(result.gas_used or 0 for result in self.results)
+
+
+class BundleSimulator:
+    """
+    Simulates transaction bundles against pending state.
+
+    Only Solidity storage layouts are recognised; for other tokens the
+    approval or wrap is not carried forward and a dependent transaction may
+    be reported as reverting.
+    """
+
+    def __init__(self, w3: Web3, block_identifier: BlockIdentifier = "pending") -> None:
+        self.w3 = w3
+        self.block_identifier = block_identifier
+        # (contract, getter) -> mapping base slot, None if not found
+        self._slots: dict[tuple[ChecksumAddress, str], int | None] = {}
+        self._lock = threading.Lock()
+        self.logger = logger.bind(router="preflight")
+
+    def simulate(self, txs: Sequence[TxParams]) -> BundleSimulation:
+        """
+        Simulate `txs` in order, each on top of the earlier ones' effects.
+
+        Args:
+            txs (Sequence[TxParams]): Bundle to simulate
+
+        Returns:
+            BundleSimulation: Per-transaction outcomes up to the first revert
+        """
+        overrides: StateOverride = {}
+        results = []
+        for index, tx in enumerate(txs):
+            call: TxParams = {
+                key: tx[key] for key in ("from", "to", "data", "value") if key in tx
+            }
+            try:
+                gas = self.w3.eth.estimate_gas(
+                    call, self.block_identifier, overrides or None
+                )
+            except (ContractLogicError, Web3RPCError, ValueError) as e:
+                results.append(SimulatedTx(index, success=False, revert_reason=str(e)))
+                break
+            results.append(SimulatedTx(index, success=True, gas_used=gas))
+            self._apply_effects(tx, overrides)
+        simulation = BundleSimulation(tuple(results))
+        self.logger.debug(
+            "simulated",
+            txs=len(txs),
+            ok=simulation.ok,
+            gas_used=simulation.gas_used,
+            revert_reason=simulation.revert_reason,
+        )
+        return simulation
+
+    def _apply_effects(self, tx: TxParams, overrides: StateOverride) -> None:
+        """Add the storage writes of an approval or wrap to `overrides`."""
+        if "to" not in tx or "data" not in tx:
+            return
+        target = Web3.to_checksum_address(tx["to"])
+        owner = Web3.to_checksum_address(tx["from"])
+        data = HexBytes(tx["data"])
+        selector, args = bytes(data[:4]), bytes(data[4:])
+        codec = self.w3.codec
+        if selector == ERC20_APPROVE:
+            spender, amount = codec.decode(["address", "uint256"], args)
+            spender = Web3.to_checksum_address(spender)
+            getter = abi_registry.contract(self.w3, "erc20", target).functions.allowance
+            self._write(
+                overrides, target, "allowance", getter, (owner, spender), amount
+            )
+        elif selector == PERMIT2_APPROVE:
+            token, spender, amount, expiration = codec.decode(
+                ["address", "address", "uint160", "uint48"], args
+            )
+            token, spender = (Web3.to_checksum_address(a) for a in (token, spender))
+            getter = abi_registry.contract(
+                self.w3, "permit2", target
+            ).functions.allowance
+            _, _, nonce = getter(owner, token, spender).call(
+                block_identifier=self.block_identifier
+            )
+            packed = amount | expiration << 160 | nonce << 208
+            self._write(
+                overrides, target, "allowance", getter, (owner, token, spender), packed
+            )
+        elif selector == WFLR_DEPOSIT and tx.get("value"):
+            getter = abi_registry.contract(self.w3, "wflr", target).functions.balanceOf
+            balance = getter(owner).call(
+                block_identifier=self.block_identifier, state_override=overrides or None
+            )
+            self._write(
+                overrides, target, "balanceOf", getter, (owner,), balance + tx["value"]
+            )
+
+    def _write(
+        self,
+        overrides: StateOverride,
+        contract: ChecksumAddress,
+        name: str,
+        getter: Callable[..., ContractFunction],
+        keys: tuple[str, ...],
+        value: int,
+    ) -> None:
+        base = self._find_slot(contract, name, getter, keys)
+        if base is None:
+            self.logger.debug("slot_not_found", contract=contract, getter=name)
+            return
+        state = overrides.setdefault(contract, {}).setdefault("stateDiff", {})
+        state[_word(mapping_slot(base, *keys))] = _word(value)
+
+    def _find_slot(
+        self,
+        contract: ChecksumAddress,
+        name: str,
+        getter: Callable[..., ContractFunction],
+        keys: tuple[str, ...],
+    ) -> int | None:
+        """Find the base slot of a mapping by writing a marker and reading it back."""
+        with self._lock:
+            if (contract, name) in self._slots:
+                return self._slots[(contract, name)]
+        found = None
+        for base in range(MAX_PROBED_SLOT):
+            probe: StateOverride = {
+                contract: {
+                    "stateDiff": {_word(mapping_slot(base, *keys)): _word(PROBE_VALUE)}
+                }
+            }
+            try:
+                value = getter(*keys).call(
+                    block_identifier=self.block_identifier, state_override=probe
+                )
+            except (ContractLogicError, Web3RPCError, ValueError):
+                break
+            if (value[0] if isinstance(value, (list, tuple)) else value) == PROBE_VALUE:
+                found = base
+                break
+        with self._lock:
+            self._slots[(contract, name)] = found
+        return found
+
+
+def _word(value: int) -> str:
+    return "0x" + value.to_bytes(32, "big").hex()
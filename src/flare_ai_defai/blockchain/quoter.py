@@ -0,0 +1,293 @@
+"""
+SparkDEX Quote Engine
+
+Quotes a swap against every SparkDEX V3 fee tier for a token pair in a single
+multicall of QuoterV2 `quoteExactInputSingle` and picks the tier with the best
+output, so swaps are not forced through a thin pool. Pool addresses and spot
+prices come from the `PoolStateCache`, and quotes are reused for as long as the
+pools they were computed against are unchanged. `simulate_all` produces the
+same quotes offline from cached tick snapshots with the V3 swap simulator.
+"""
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from fractions import Fraction
+
+import structlog
+from eth_typing import ChecksumAddress
+from web3 import Web3
+
+from flare_ai_defai.blockchain.abi_registry import abi_registry
+from flare_ai_defai.blockchain.multicall import Call, Multicall
+from flare_ai_defai.blockchain.pool_cache import PoolState, PoolStateCache
+from flare_ai_defai.blockchain.v3_simulator import SnapshotRangeError, simulate_swap
+
+logger = structlog.get_logger(__name__)
+
+Q192 = 2**192
+QUOTE_CACHE_SIZE = 256
+# Rough swap gas for simulated quotes, which have no QuoterV2 measurement.
+SIMULATED_SWAP_GAS = 90_000
+SIMULATED_TICK_CROSS_GAS = 25_000
+
+
+@dataclass(frozen=True)
+class SwapQuote:
+    """
+    Quote for an exact-input single-pool swap.
+
+    Attributes:
+        token_in (ChecksumAddress): Token sold
+        token_out (ChecksumAddress): Token bought
+        fee (int): Pool fee tier in hundredths of a bip
+        pool_address (ChecksumAddress): Pool the swap goes through
+        amount_in (int): Input amount in token_in base units
+        amount_out (int): Expected output in token_out base units
+        price_impact (float): Fractional shortfall against the pre-swap spot
+            price after fees, e.g. 0.012 for 1.2%
+        gas_estimate (int): Quoter's estimate of the swap's gas cost
+        sqrt_price_x96_after (int): Pool price after the swap
+        ticks_crossed (int): Initialized ticks crossed by the swap
+    """
+
+    token_in: ChecksumAddress
+    token_out: ChecksumAddress
+    fee: int
+    pool_address: ChecksumAddress
+    amount_in: int
+    amount_out: int
+    price_impact: float
+    gas_estimate: int
+    sqrt_price_x96_after: int
+    ticks_crossed: int
+
+
+def spot_amount_out(
+    sqrt_price_x96: int, amount_in: int, *, zero_for_one: bool
+) -> Fraction:
+    """Output at the pool's spot price, before fees and price impact."""
+    if zero_for_one:
+        return Fraction(amount_in * sqrt_price_x96 * sqrt_price_x96, Q192)
+    return Fraction(amount_in * Q192, sqrt_price_x96 * sqrt_price_x96)
+
+
+def price_impact(
+    sqrt_price_x96: int,
+    fee: int,
+    amount_in: int,
+    amount_out: int,
+    *,
+    zero_for_one: bool,
+) -> float:
+    """Fractional shortfall of `amount_out` against the fee-adjusted spot output."""
+    ideal = spot_amount_out(sqrt_price_x96, amount_in, zero_for_one=zero_for_one)
+    ideal *= Fraction(1_000_000 - fee, 1_000_000)
+    if ideal <= 0:
+        return 1.0
+    return max(0.0, float(1 - Fraction(amount_out) / ideal))
+
+
+class SparkDEXQuoter:
+    """
+    Finds the best SparkDEX V3 fee tier for a swap.
+
+    Attributes:
+        pool_cache (PoolStateCache): Source of pool addresses and spot prices
+    """
+
+    QUOTER_V2 = "0x5B5513c55fd06e2658010c121c37b07fC8e8B705"
+
+    def __init__(
+        self,
+        w3: Web3,
+        multicall: Multicall | None = None,
+        pool_cache: PoolStateCache | None = None,
+        quoter_address: str = QUOTER_V2,
+    ) -> None:
+        self.w3 = w3
+        self.multicall = multicall or Multicall(w3)
+        self.pool_cache = pool_cache or PoolStateCache(w3, self.multicall)
+        self.quoter = abi_registry.contract(w3, "quoter_v2", quoter_address)
+        self._quotes: OrderedDict[
+            tuple[str, str, int], tuple[tuple[PoolState, ...], list[SwapQuote]]
+        ] = OrderedDict()
+        self.logger = logger.bind(router="sparkdex_quoter")
+
+    def get_pools(self, token_a: str, token_b: str) -> dict[int, ChecksumAddress]:
+        """
+        Return the existing pools for a pair, keyed by fee tier.
+
+        Args:
+            token_a (str): Address of one token
+            token_b (str): Address of the other token
+        """
+        return self.pool_cache.pool_addresses(token_a, token_b)
+
+    def quote_all(
+        self, token_in: str, token_out: str, amount_in: int
+    ) -> list[SwapQuote]:
+        """
+        Quote an exact-input swap against every fee tier in one multicall.
+
+        Quotes are taken at the pool cache's block and served from memory
+        until one of the pair's pools changes.
+
+        Args:
+            token_in (str): Address of the token sold
+            token_out (str): Address of the token bought
+            amount_in (int): Input amount in token_in base units
+
+        Returns:
+            list[SwapQuote]: Quotes for tiers whose pool exists and can fill
+                the swap, best output first
+        """
+        token_in = Web3.to_checksum_address(token_in)
+        token_out = Web3.to_checksum_address(token_out)
+        states = self.pool_cache.pool_states(token_in, token_out)
+        key = (token_in, token_out, amount_in)
+        version = tuple(states.values())
+        cached = self._quotes.get(key)
+        if cached is not None and cached[0] == version:
+            self._quotes.move_to_end(key)
+            return list(cached[1])
+
+        calls = [
+            Call.from_function(
+                self.quoter.functions.quoteExactInputSingle(
+                    (token_in, token_out, amount_in, fee, 0)
+                )
+            )
+            for fee in states
+        ]
+        results = self.multicall.aggregate(
+            calls, self.pool_cache.block_number or "latest"
+        )
+
+        zero_for_one = token_in.lower() < token_out.lower()
+        quotes = []
+        for (fee, state), result in zip(states.items(), results, strict=True):
+            if not result.success or not result.value or not result.value[0]:
+                continue
+            amount_out, sqrt_price_after, ticks_crossed, gas_estimate = result.value
+            quotes.append(
+                SwapQuote(
+                    token_in=token_in,
+                    token_out=token_out,
+                    fee=fee,
+                    pool_address=state.address,
+                    amount_in=amount_in,
+                    amount_out=amount_out,
+                    price_impact=price_impact(
+                        state.sqrt_price_x96,
+                        fee,
+                        amount_in,
+                        amount_out,
+                        zero_for_one=zero_for_one,
+                    )
+                    if state.sqrt_price_x96
+                    else 0.0,
+                    gas_estimate=gas_estimate,
+                    sqrt_price_x96_after=sqrt_price_after,
+                    ticks_crossed=ticks_crossed,
+                )
+            )
+        quotes.sort(key=lambda q: q.amount_out, reverse=True)
+        self._quotes[key] = (version, quotes)
+        if len(self._quotes) > QUOTE_CACHE_SIZE:
+            self._quotes.popitem(last=False)
+        self.logger.debug(
+            "quote_all",
+            token_in=token_in,
+            token_out=token_out,
+            amount_in=amount_in,
+            quotes={q.fee: q.amount_out for q in quotes},
+        )
+        return list(quotes)
+
+    def simulate_all(
+        self, token_in: str, token_out: str, amount_in: int
+    ) -> list[SwapQuote]:
+        """
+        Quote an exact-input swap against every fee tier without an RPC.
+
+        Runs the V3 swap simulator over the pool cache's tick snapshots, so
+        once a pair's snapshots are loaded a quote only costs CPU time.
+
+        Args:
+            token_in (str): Address of the token sold
+            token_out (str): Address of the token bought
+            amount_in (int): Input amount in token_in base units
+
+        Returns:
+            list[SwapQuote]: Quotes for tiers that can fill the swap, best
+                output first
+
+        Raises:
+            SnapshotRangeError: If a swap runs past the loaded ticks
+        """
+        token_in = Web3.to_checksum_address(token_in)
+        token_out = Web3.to_checksum_address(token_out)
+        zero_for_one = token_in.lower() < token_out.lower()
+        pools = self.pool_cache.pool_addresses(token_in, token_out)
+        quotes = []
+        for fee, snapshot in self.pool_cache.snapshots(token_in, token_out).items():
+            if not snapshot.liquidity and not snapshot.liquidity_net:
+                continue
+            result = simulate_swap(
+                snapshot, zero_for_one=zero_for_one, amount_specified=amount_in
+            )
+            # A partial fill means the pool ran out of liquidity.
+            if not result.amount_out or result.amount_in != amount_in:
+                continue
+            quotes.append(
+                SwapQuote(
+                    token_in=token_in,
+                    token_out=token_out,
+                    fee=fee,
+                    pool_address=pools[fee],
+                    amount_in=amount_in,
+                    amount_out=result.amount_out,
+                    price_impact=price_impact(
+                        snapshot.sqrt_price_x96,
+                        fee,
+                        amount_in,
+                        result.amount_out,
+                        zero_for_one=zero_for_one,
+                    ),
+                    gas_estimate=SIMULATED_SWAP_GAS
+                    + SIMULATED_TICK_CROSS_GAS * result.ticks_crossed,
+                    sqrt_price_x96_after=result.sqrt_price_x96_after,
+                    ticks_crossed=result.ticks_crossed,
+                )
+            )
+        quotes.sort(key=lambda q: q.amount_out, reverse=True)
+        return quotes
+
+    def best_quote(
+        self, token_in: str, token_out: str, amount_in: int, *, offline: bool = True
+    ) -> SwapQuote:
+        """
+        Return the quote with the highest output across fee tiers.
+
+        Args:
+            token_in (str): Address of the token sold
+            token_out (str): Address of the token bought
+            amount_in (int): Input amount in token_in base units
+            offline (bool): Simulate from tick snapshots, falling back to
+                QuoterV2 when no snapshot can fill the swap
+
+        Raises:
+            ValueError: If no SparkDEX V3 pool can fill the swap
+        """
+        quotes = None
+        if offline:
+            try:
+                quotes = self.simulate_all(token_in, token_out, amount_in)
+            except SnapshotRangeError as e:
+                self.logger.debug("simulation_fallback", reason=str(e))
+        if not quotes:
+            quotes = self.quote_all(token_in, token_out, amount_in)
+        if not quotes:
+            msg = f"No SparkDEX pool can swap {token_in} to {token_out}"
+            raise ValueError(msg)
+        return quotes[0]
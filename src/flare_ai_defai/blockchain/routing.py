@@ -0,0 +1,705 @@
+"""
+SparkDEX Route Finder
+
+Finds the best multi-hop swap routes (e.g. USDT -> WFLR -> WETH) over the
+SparkDEX pool graph. The token graph and the candidate token paths between
+each pair of tokens are computed once; a search then only simulates each hop
+over cached pool snapshots, picking the best pool per hop, and ranks routes by
+output net of the gas they cost, so it runs in milliseconds without an RPC.
+
+Large orders can be split across several disjoint routes (different fee tiers
+of one pair, or different intermediate tokens). Output as a function of input
+is concave for every route, so allocating the order chunk by chunk to the
+route with the best marginal output approaches the optimal split.
+"""
+
+from collections import defaultdict
+from collections.abc import Iterable
+from dataclasses import dataclass
+from itertools import combinations, pairwise
+
+import structlog
+from eth_typing import ChecksumAddress
+from web3 import Web3
+
+from flare_ai_defai.blockchain.abi_registry import abi_registry
+from flare_ai_defai.blockchain.multicall import Call
+from flare_ai_defai.blockchain.pool_cache import (
+    ZERO_ADDRESS,
+    PoolStateCache,
+    sort_pair,
+)
+from flare_ai_defai.blockchain.quoter import (
+    SIMULATED_SWAP_GAS,
+    SIMULATED_TICK_CROSS_GAS,
+    spot_amount_out,
+)
+from flare_ai_defai.blockchain.v3_simulator import (
+    PoolSnapshot,
+    SnapshotRangeError,
+    simulate_swap,
+)
+
+logger = structlog.get_logger(__name__)
+
+MAX_HOPS = 3
+SPLIT_PARTS = 20
+MAX_SPLIT_LEGS = 4
+V2_FEE = 3000
+V2_HOP_GAS = 60_000
+WFLR_ADDRESS = "0x1D80c49BbBCd1C0911346656B529DF9E5c2F783d"
+
+
+def encode_v3_path(tokens: Iterable[str], fees: Iterable[int]) -> bytes:
+    """
+    Encode a V3 multi-hop path: token, then (fee, token) for every hop.
+
+    Args:
+        tokens (Iterable[str]): Token addresses along the route
+        fees (Iterable[int]): Fee tier of each hop
+
+    Returns:
+        bytes: 20-byte addresses interleaved with 3-byte fees
+    """
+    tokens, fees = list(tokens), list(fees)
+    if len(tokens) != len(fees) + 1:
+        msg = f"A path over {len(tokens)} tokens needs {len(tokens) - 1} fees"
+        raise ValueError(msg)
+    path = bytearray(bytes.fromhex(tokens[0][2:]))
+    for fee, token in zip(fees, tokens[1:], strict=True):
+        path += fee.to_bytes(3, "big") + bytes.fromhex(token[2:])
+    return bytes(path)
+
+
+def v2_amount_out(
+    amount_in: int, reserve_in: int, reserve_out: int, fee: int = V2_FEE
+) -> int:
+    """Constant-product output, as `UniswapV2Library.getAmountOut`."""
+    amount_in_with_fee = amount_in * (1_000_000 - fee)
+    return (amount_in_with_fee * reserve_out) // (
+        reserve_in * 1_000_000 + amount_in_with_fee
+    )
+
+
+@dataclass(frozen=True)
+class Hop:
+    """
+    One swap of a route.
+
+    Attributes:
+        token_in (ChecksumAddress): Token sold
+        token_out (ChecksumAddress): Token bought
+        protocol (str): "v3" or "v2"
+        fee (int): Fee in hundredths of a bip
+        pool (ChecksumAddress): Pool or pair swapped through
+        amount_in (int): Input in token_in base units
+        amount_out (int): Output in token_out base units
+        gas_estimate (int): Rough gas cost of the hop
+    """
+
+    token_in: ChecksumAddress
+    token_out: ChecksumAddress
+    protocol: str
+    fee: int
+    pool: ChecksumAddress
+    amount_in: int
+    amount_out: int
+    gas_estimate: int
+
+
+@dataclass(frozen=True)
+class Route:
+    """
+    A simulated swap route.
+
+    Attributes:
+        hops (tuple[Hop, ...]): Swaps in order
+        gas_cost_out (int): Gas cost of the route in token_out base units,
+            0 if it could not be priced
+    """
+
+    hops: tuple[Hop, ...]
+    gas_cost_out: int = 0
+
+    @property
+    def tokens(self) -> tuple[ChecksumAddress, ...]:
+        return (self.hops[0].token_in, *(hop.token_out for hop in self.hops))
+
+    @property
+    def fees(self) -> tuple[int, ...]:
+        return tuple(hop.fee for hop in self.hops)
+
+    @property
+    def amount_in(self) -> int:
+        return self.hops[0].amount_in
+
+    @property
+    def amount_out(self) -> int:
+        return self.hops[-1].amount_out
+
+    @property
+    def net_amount_out(self) -> int:
+        return self.amount_out - self.gas_cost_out
+
+    @property
+    def gas_estimate(self) -> int:
+        return sum(hop.gas_estimate for hop in self.hops)
+
+    @property
+    def is_v3(self) -> bool:
+        return all(hop.protocol == "v3" for hop in self.hops)
+
+    @property
+    def path(self) -> bytes:
+        """
+        V3 path bytes for `exactInput`.
+
+        Raises:
+            ValueError: If the route has a V2 hop
+        """
+        if not self.is_v3:
+            msg = "Only all-V3 routes can be encoded as a V3 path"
+            raise ValueError(msg)
+        return encode_v3_path(self.tokens, self.fees)
+
+
+@dataclass(frozen=True)
+class SplitRoute:
+    """
+    An order split across routes that share no pool.
+
+    Attributes:
+        legs (tuple[Route, ...]): Routes with the part of the order each takes
+    """
+
+    legs: tuple[Route, ...]
+
+    @property
+    def amount_in(self) -> int:
+        return sum(leg.amount_in for leg in self.legs)
+
+    @property
+    def amount_out(self) -> int:
+        return sum(leg.amount_out for leg in self.legs)
+
+    @property
+    def gas_cost_out(self) -> int:
+        return sum(leg.gas_cost_out for leg in self.legs)
+
+    @property
+    def net_amount_out(self) -> int:
+        return self.amount_out - self.gas_cost_out
+
+    @property
+    def gas_estimate(self) -> int:
+        return sum(leg.gas_estimate for leg in self.legs)
+
+
+def _disjoint_legs(
+    candidates: dict[tuple[tuple, tuple], Route], max_legs: int
+) -> list[tuple[tuple, tuple]]:
+    """Keep the best candidates, at most `max_legs`, that share no pool."""
+    legs: list[tuple[tuple, tuple]] = []
+    used_pools: set[str] = set()
+    for key, route in sorted(
+        candidates.items(), key=lambda item: item[1].amount_out, reverse=True
+    ):
+        pools = {hop.pool for hop in route.hops}
+        if pools & used_pools:
+            continue
+        legs.append(key)
+        used_pools |= pools
+        if len(legs) == max_legs:
+            break
+    return legs
+
+
+class RouteFinder:
+    """
+    k-best route search over the SparkDEX pool graph.
+
+    Attributes:
+        pool_cache (PoolStateCache): Source of V3 pools and snapshots
+        tokens (list[ChecksumAddress]): Tokens that may appear in a route
+        max_hops (int): Longest route considered
+        v2_factory (Contract | None): V2 factory, V2 hops are only used
+            when one is configured
+    """
+
+    def __init__(
+        self,
+        pool_cache: PoolStateCache,
+        tokens: Iterable[str],
+        max_hops: int = MAX_HOPS,
+        v2_factory_address: str | None = None,
+        v2_fee: int = V2_FEE,
+    ) -> None:
+        self.pool_cache = pool_cache
+        self.w3 = pool_cache.w3
+        self.multicall = pool_cache.multicall
+        self.tokens = list(dict.fromkeys(Web3.to_checksum_address(t) for t in tokens))
+        self.max_hops = max_hops
+        self.v2_factory = (
+            abi_registry.contract(self.w3, "v2_factory", v2_factory_address)
+            if v2_factory_address
+            else None
+        )
+        self.v2_fee = v2_fee
+        self._adjacency: dict[ChecksumAddress, tuple[ChecksumAddress, ...]] | None = (
+            None
+        )
+        self._v2_pairs: dict[
+            tuple[ChecksumAddress, ChecksumAddress], ChecksumAddress
+        ] = {}
+        self._paths: dict[
+            tuple[ChecksumAddress, ChecksumAddress], list[tuple[ChecksumAddress, ...]]
+        ] = {}
+        self.logger = logger.bind(router="route_finder")
+
+    def build_graph(self) -> None:
+        """
+        Discover which token pairs have a pool and precompute adjacency.
+
+        Costs one multicall for V3 pools and one for V2 pairs; candidate
+        paths computed from the previous graph are dropped.
+        """
+        pairs = list(combinations(self.tokens, 2))
+        neighbours: dict[ChecksumAddress, set[ChecksumAddress]] = defaultdict(set)
+        for (token0, token1), pools in self.pool_cache.pool_addresses_many(
+            pairs
+        ).items():
+            if pools:
+                neighbours[token0].add(token1)
+                neighbours[token1].add(token0)
+
+        self._v2_pairs = {}
+        if self.v2_factory is not None:
+            sorted_pairs = [sort_pair(a, b) for a, b in pairs]
+            results = self.multicall.aggregate(
+                [
+                    Call.from_function(self.v2_factory.functions.getPair(*pair))
+                    for pair in sorted_pairs
+                ]
+            )
+            for (token0, token1), result in zip(sorted_pairs, results, strict=True):
+                if result.success and result.value[0] != ZERO_ADDRESS:
+                    self._v2_pairs[(token0, token1)] = Web3.to_checksum_address(
+                        result.value[0]
+                    )
+                    neighbours[token0].add(token1)
+                    neighbours[token1].add(token0)
+
+        self._adjacency = {
+            token: tuple(sorted(neighbours[token])) for token in self.tokens
+        }
+        self._paths.clear()
+        self.logger.debug(
+            "graph_built",
+            tokens=len(self.tokens),
+            edges=sum(map(len, self._adjacency.values())) // 2,
+        )
+
+    def paths(self, token_in: str, token_out: str) -> list[tuple[ChecksumAddress, ...]]:
+        """
+        Return every simple token path of up to `max_hops` hops between two
+        tokens, shortest first. Computed once per pair.
+        """
+        if self._adjacency is None:
+            self.build_graph()
+        adjacency = self._adjacency or {}
+        key = (Web3.to_checksum_address(token_in), Web3.to_checksum_address(token_out))
+        cached = self._paths.get(key)
+        if cached is not None:
+            return cached
+
+        source, target = key
+        found: list[tuple[ChecksumAddress, ...]] = []
+        stack: list[tuple[ChecksumAddress, ...]] = [(source,)]
+        while stack:
+            path = stack.pop()
+            for neighbour in adjacency.get(path[-1], ()):
+                if neighbour == target:
+                    found.append((*path, neighbour))
+                elif neighbour not in path and len(path) < self.max_hops:
+                    stack.append((*path, neighbour))
+        found.sort(key=len)
+        self._paths[key] = found
+        return found
+
+    def find_routes(  # noqa: PLR0913
+        self,
+        token_in: str,
+        token_out: str,
+        amount_in: int,
+        k: int = 3,
+        gas_price: int | None = None,
+        *,
+        v3_only: bool = False,
+    ) -> list[Route]:
+        """
+        Simulate every candidate path and return the k best routes.
+
+        Each hop goes through whichever pool gives the most output for the
+        amount reaching it, which maximises the route's output.
+
+        Args:
+            token_in (str): Address of the token sold
+            token_out (str): Address of the token bought
+            amount_in (int): Input amount in token_in base units
+            k (int): Number of routes to return
+            gas_price (int | None): Gas price in wei, defaults to the node's
+            v3_only (bool): Skip V2 hops, e.g. for `exactInput` execution
+
+        Returns:
+            list[Route]: Routes by output net of gas, best first
+        """
+        token_out = Web3.to_checksum_address(token_out)
+        paths = self.paths(token_in, token_out)
+        if not paths:
+            return []
+        snapshots = self._load_snapshots(paths, token_out)
+        reserves = (
+            {}
+            if v3_only
+            else self._v2_reserves((a, b) for path in paths for a, b in pairwise(path))
+        )
+
+        best_hops: dict[tuple[str, str, int], Hop | None] = {}
+        routes = [
+            route
+            for path in paths
+            if (
+                route := self._simulate_best(
+                    path, amount_in, snapshots, reserves, best_hops
+                )
+            )
+            is not None
+        ]
+
+        if routes:
+            if gas_price is None:
+                gas_price = self.w3.eth.gas_price
+            routes = [
+                Route(
+                    hops=route.hops,
+                    gas_cost_out=self._gas_cost_out(
+                        route.gas_estimate * gas_price, token_out, snapshots
+                    ),
+                )
+                for route in routes
+            ]
+        routes.sort(key=lambda route: route.net_amount_out, reverse=True)
+        self.logger.debug(
+            "find_routes",
+            token_in=token_in,
+            token_out=token_out,
+            candidates=len(paths),
+            routes=[(len(r.hops), r.net_amount_out) for r in routes[:k]],
+        )
+        return routes[:k]
+
+    def best_route(
+        self,
+        token_in: str,
+        token_out: str,
+        amount_in: int,
+        gas_price: int | None = None,
+        *,
+        v3_only: bool = False,
+    ) -> Route:
+        """
+        Return the route with the highest output net of gas.
+
+        Raises:
+            ValueError: If no route can fill the swap
+        """
+        routes = self.find_routes(
+            token_in, token_out, amount_in, 1, gas_price, v3_only=v3_only
+        )
+        if not routes:
+            msg = f"No SparkDEX route from {token_in} to {token_out}"
+            raise ValueError(msg)
+        return routes[0]
+
+    def find_split(  # noqa: PLR0913, PLR0917
+        self,
+        token_in: str,
+        token_out: str,
+        amount_in: int,
+        gas_price: int | None = None,
+        parts: int = SPLIT_PARTS,
+        max_legs: int = MAX_SPLIT_LEGS,
+    ) -> SplitRoute:
+        """
+        Split an order across V3 routes to maximise output net of gas.
+
+        Candidates are every fee tier of the direct pair plus the best
+        multi-hop routes; the best `max_legs` of them that share no pool are
+        kept. The order is then cut into `parts` chunks and each chunk goes
+        to the leg whose output grows the most from it, with a leg's gas
+        charged on its first chunk.
+
+        Args:
+            token_in (str): Address of the token sold
+            token_out (str): Address of the token bought
+            amount_in (int): Input amount in token_in base units
+            gas_price (int | None): Gas price in wei, defaults to the node's
+            parts (int): Chunks the order is allocated in
+            max_legs (int): Most routes the order is split across
+
+        Returns:
+            SplitRoute: Legs with their share of the order, possibly just one
+
+        Raises:
+            ValueError: If no route can take the order
+        """
+        token_in = Web3.to_checksum_address(token_in)
+        token_out = Web3.to_checksum_address(token_out)
+        paths = self.paths(token_in, token_out)
+        snapshots = self._load_snapshots(paths, token_out) if paths else {}
+        parts = max(1, min(parts, amount_in))
+        chunk = amount_in // parts
+
+        candidates = self._split_candidates(paths, chunk, snapshots)
+        legs = _disjoint_legs(candidates, max_legs)
+        if not legs:
+            msg = f"No SparkDEX route from {token_in} to {token_out}"
+            raise ValueError(msg)
+
+        if gas_price is None:
+            gas_price = self.w3.eth.gas_price
+        gas_costs = [
+            self._gas_cost_out(
+                candidates[key].gas_estimate * gas_price, token_out, snapshots
+            )
+            for key in legs
+        ]
+        chunks = [chunk] * parts
+        chunks[-1] += amount_in - chunk * parts
+        routes = self._allocate_chunks(legs, chunks, gas_costs, snapshots)
+        if routes is None:
+            msg = f"SparkDEX routes cannot absorb {amount_in} of {token_in}"
+            raise ValueError(msg)
+
+        split = SplitRoute(
+            legs=tuple(
+                Route(hops=route.hops, gas_cost_out=gas_costs[i])
+                for i, route in enumerate(routes)
+                if route is not None
+            )
+        )
+        self.logger.debug(
+            "find_split",
+            token_in=token_in,
+            token_out=token_out,
+            legs=[(leg.fees, leg.amount_in) for leg in split.legs],
+            amount_out=split.amount_out,
+        )
+        return split
+
+    def _split_candidates(
+        self, paths: list[tuple[ChecksumAddress, ...]], chunk: int, snapshots: dict
+    ) -> dict[tuple[tuple, tuple], Route]:
+        """Quote one chunk on each direct fee tier and each best multi-hop."""
+        candidates: dict[tuple[tuple, tuple], Route] = {}
+        for path in paths:
+            if len(path) == 2:  # noqa: PLR2004
+                fee_options = [(fee,) for fee in snapshots.get(sort_pair(*path), {})]
+            else:
+                best = self._simulate_best(path, chunk, snapshots, {})
+                fee_options = [best.fees] if best is not None else []
+            for fees in fee_options:
+                route = self._simulate_path(path, fees, chunk, snapshots)
+                if route is not None:
+                    candidates[(path, fees)] = route
+        return candidates
+
+    def _allocate_chunks(
+        self,
+        legs: list[tuple[tuple, tuple]],
+        chunks: list[int],
+        gas_costs: list[int],
+        snapshots: dict,
+    ) -> list[Route | None] | None:
+        """Give each chunk to the leg it raises output the most, net of gas."""
+        allocated = [0] * len(legs)
+        routes: list[Route | None] = [None] * len(legs)
+        for size in chunks:
+            best_gain, best_leg, best_route = None, -1, None
+            for i, (path, fees) in enumerate(legs):
+                route = self._simulate_path(path, fees, allocated[i] + size, snapshots)
+                if route is None:
+                    continue
+                current = routes[i]
+                gain = route.amount_out - (
+                    current.amount_out if current else gas_costs[i]
+                )
+                if best_gain is None or gain > best_gain:
+                    best_gain, best_leg, best_route = gain, i, route
+            if best_route is None:
+                return None
+            allocated[best_leg] += size
+            routes[best_leg] = best_route
+        return routes
+
+    def _load_snapshots(
+        self, paths: list[tuple[ChecksumAddress, ...]], token_out: ChecksumAddress
+    ) -> dict:
+        """Snapshots for every pair on `paths` and for pricing gas in token_out."""
+        pairs = {(a, b) for path in paths for a, b in pairwise(path)}
+        wflr = Web3.to_checksum_address(WFLR_ADDRESS)
+        if token_out != wflr:
+            pairs.add((wflr, token_out))
+        return self.pool_cache.snapshots_many(pairs)
+
+    def _simulate_best(
+        self,
+        path: tuple[ChecksumAddress, ...],
+        amount_in: int,
+        snapshots: dict,
+        reserves: dict,
+        best_hops: dict | None = None,
+    ) -> Route | None:
+        """Simulate a path through the best pool at every hop."""
+        best_hops = {} if best_hops is None else best_hops
+        hops = []
+        amount = amount_in
+        for a, b in pairwise(path):
+            key = (a, b, amount)
+            if key not in best_hops:
+                best_hops[key] = self._best_hop(a, b, amount, snapshots, reserves)
+            hop = best_hops[key]
+            if hop is None:
+                return None
+            hops.append(hop)
+            amount = hop.amount_out
+        return Route(hops=tuple(hops))
+
+    def _simulate_path(
+        self,
+        path: tuple[ChecksumAddress, ...],
+        fees: tuple[int, ...],
+        amount_in: int,
+        snapshots: dict,
+    ) -> Route | None:
+        """Simulate a V3 route through fixed fee tiers, None if it cannot fill."""
+        hops = []
+        amount = amount_in
+        for (a, b), fee in zip(pairwise(path), fees, strict=True):
+            pair = sort_pair(a, b)
+            snapshot = snapshots.get(pair, {}).get(fee)
+            hop = snapshot and self._v3_hop(a, b, fee, amount, snapshot)
+            if not hop:
+                return None
+            hops.append(hop)
+            amount = hop.amount_out
+        return Route(hops=tuple(hops))
+
+    def _v3_hop(
+        self,
+        token_in: ChecksumAddress,
+        token_out: ChecksumAddress,
+        fee: int,
+        amount_in: int,
+        snapshot: PoolSnapshot,
+    ) -> Hop | None:
+        pair = sort_pair(token_in, token_out)
+        try:
+            result = simulate_swap(
+                snapshot, zero_for_one=pair[0] == token_in, amount_specified=amount_in
+            )
+        except SnapshotRangeError:
+            return None
+        if result.amount_in != amount_in or not result.amount_out:
+            return None
+        return Hop(
+            token_in=token_in,
+            token_out=token_out,
+            protocol="v3",
+            fee=fee,
+            pool=self.pool_cache.pool_addresses(*pair)[fee],
+            amount_in=amount_in,
+            amount_out=result.amount_out,
+            gas_estimate=SIMULATED_SWAP_GAS
+            + SIMULATED_TICK_CROSS_GAS * result.ticks_crossed,
+        )
+
+    def _best_hop(
+        self,
+        token_in: ChecksumAddress,
+        token_out: ChecksumAddress,
+        amount_in: int,
+        snapshots: dict,
+        reserves: dict,
+    ) -> Hop | None:
+        pair = sort_pair(token_in, token_out)
+        zero_for_one = pair[0] == token_in
+        best: Hop | None = None
+        for fee, snapshot in snapshots.get(pair, {}).items():
+            hop = self._v3_hop(token_in, token_out, fee, amount_in, snapshot)
+            if hop is not None and (best is None or hop.amount_out > best.amount_out):
+                best = hop
+        if pair in reserves:
+            reserve0, reserve1 = reserves[pair]
+            reserve_in, reserve_out = (
+                (reserve0, reserve1) if zero_for_one else (reserve1, reserve0)
+            )
+            amount_out = v2_amount_out(amount_in, reserve_in, reserve_out, self.v2_fee)
+            if amount_out and (best is None or amount_out > best.amount_out):
+                best = Hop(
+                    token_in=token_in,
+                    token_out=token_out,
+                    protocol="v2",
+                    fee=self.v2_fee,
+                    pool=self._v2_pairs[pair],
+                    amount_in=amount_in,
+                    amount_out=amount_out,
+                    gas_estimate=V2_HOP_GAS,
+                )
+        return best
+
+    def _v2_reserves(
+        self, pairs: Iterable[tuple[str, str]]
+    ) -> dict[tuple[ChecksumAddress, ChecksumAddress], tuple[int, int]]:
+        """Read reserves of the V2 pairs among `pairs` in one multicall."""
+        wanted = [
+            pair
+            for pair in dict.fromkeys(sort_pair(a, b) for a, b in pairs)
+            if pair in self._v2_pairs
+        ]
+        if not wanted:
+            return {}
+        results = self.multicall.aggregate(
+            [
+                Call.from_function(
+                    abi_registry.contract(
+                        self.w3, "v2_pair", self._v2_pairs[pair]
+                    ).functions.getReserves()
+                )
+                for pair in wanted
+            ],
+            self.pool_cache.block_number or "latest",
+        )
+        return {
+            pair: (result.value[0], result.value[1])
+            for pair, result in zip(wanted, results, strict=True)
+            if result.success
+        }
+
+    def _gas_cost_out(
+        self, gas_cost_wei: int, token_out: ChecksumAddress, snapshots: dict
+    ) -> int:
+        """Price a gas cost in token_out through the deepest WFLR pool."""
+        wflr = Web3.to_checksum_address(WFLR_ADDRESS)
+        if token_out == wflr:
+            return gas_cost_wei
+        pair = sort_pair(wflr, token_out)
+        pools = snapshots.get(pair)
+        if not pools:
+            return 0
+        deepest = max(pools.values(), key=lambda snapshot: snapshot.liquidity)
+        return int(
+            spot_amount_out(
+                deepest.sqrt_price_x96, gas_cost_wei, zero_for_one=pair[0] == wflr
+            )
+        )
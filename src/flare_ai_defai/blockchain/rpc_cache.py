@@ -0,0 +1,322 @@
+"""
+JSON-RPC Response Cache
+
+Read-through cache for the web3 middleware stack. Requests are sorted into
+three kinds by method and block tag:
+
+- immutable: answers that can never change, such as the chain ID, a
+  mined receipt, a call or balance at a fixed block number, or non-empty
+  logs over blocks a few below the head (Flare blocks are final once
+  produced, but the node answering may trail the watcher's head and return
+  a range close to it with logs missing), and contract code, which
+  SparkDEX pool checks ask for over and over
+- per-block: answers about "latest", kept until the next head arrives
+  (or `max_age` passes, should heads stop arriving)
+- uncacheable: writes, "pending" state and anything unrecognised
+
+Identical cacheable requests that are in flight at the same time share
+one round-trip, and hits and misses are counted per method.
+"""
+
+import copy
+import functools
+import json
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from concurrent.futures import Future
+from typing import Any
+
+import structlog
+from web3 import Web3
+from web3.middleware.base import Web3Middleware
+from web3.types import RPCEndpoint, RPCResponse
+
+from flare_ai_defai.blockchain.block_watcher import HEAD_LAG_BLOCKS, BlockHeader
+
+logger = structlog.get_logger(__name__)
+
+IMMUTABLE = "immutable"
+PER_BLOCK = "per_block"
+
+# Methods whose non-null answers never change.
+IMMUTABLE_METHODS = frozenset(
+    {
+        "eth_chainId",
+        "net_version",
+        "eth_getBlockByHash",
+        "eth_getTransactionByHash",
+        "eth_getTransactionReceipt",
+    }
+)
+# Methods about the current head that take no block parameter.
+HEAD_METHODS = frozenset(
+    {"eth_blockNumber", "eth_gasPrice", "eth_maxPriorityFeePerGas", "eth_blobBaseFee"}
+)
+# Methods taking a block parameter, and its position. Nonces are left out:
+# two sends within one block must not share the same answer.
+BLOCK_PARAM = {
+    "eth_call": 1,
+    "eth_estimateGas": 1,
+    "eth_feeHistory": 1,
+    "eth_getBalance": 1,
+    "eth_getBlockByNumber": 0,
+    "eth_getCode": 1,
+    "eth_getStorageAt": 2,
+}
+HEAD_TAGS = frozenset({"latest", "safe", "finalized"})
+# Immutable answers kept, least recently used dropped first.
+MAX_ENTRIES = 10_000
+# Seconds a per-block answer is trusted without a new head, about a block.
+PER_BLOCK_MAX_AGE = 2.0
+
+
+def _block_number(tag: Any) -> int | None:
+    if isinstance(tag, int):
+        return tag
+    if isinstance(tag, str) and tag.startswith("0x"):
+        return int(tag, 16)
+    return None
+
+
+class RPCCache:
+    """
+    Response cache shared by every Web3 instance it is installed on.
+
+    Attributes:
+        head (int | None): Latest block number announced through `on_block`
+        max_entries (int): Capacity of the immutable store
+        max_age (float): Lifetime of a per-block answer without a new head
+        head_lag (int): Log ranges ending this close to the head are not cached
+    """
+
+    def __init__(
+        self,
+        max_entries: int = MAX_ENTRIES,
+        max_age: float = PER_BLOCK_MAX_AGE,
+        head_lag: int = HEAD_LAG_BLOCKS,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.head_lag = head_lag
+        self.clock = clock
+        self.head: int | None = None
+        self._immutable: OrderedDict[str, RPCResponse] = OrderedDict()
+        self._per_block: dict[str, tuple[float, RPCResponse]] = {}
+        self._inflight: dict[str, Future] = {}
+        self._metrics: dict[str, dict[str, int]] = {}
+        self._lock = threading.Lock()
+        self.logger = logger.bind(router="rpc_cache")
+
+    def install(self, w3: Web3) -> None:
+        """Add the cache to a Web3 instance's middleware."""
+        w3.middleware_onion.add(
+            functools.partial(RPCCacheMiddleware, cache=self), "rpc_cache"
+        )
+
+    def on_block(self, header: BlockHeader) -> None:
+        """Drop per-block answers once a new head arrives."""
+        with self._lock:
+            self.head = header.number
+            self._per_block.clear()
+
+    def classify(self, method: str, params: Any) -> str | None:  # noqa: PLR0911
+        """
+        Decide how long an answer to a request stays valid.
+
+        Args:
+            method (str): JSON-RPC method
+            params (Any): Request parameters
+
+        Returns:
+            str | None: IMMUTABLE, PER_BLOCK or None for uncacheable
+        """
+        params = list(params or [])
+        if method in IMMUTABLE_METHODS:
+            return IMMUTABLE
+        if method in HEAD_METHODS:
+            return PER_BLOCK
+        if method == "eth_getLogs":
+            log_filter = params[0] if params else {}
+            if "blockHash" in log_filter:
+                return IMMUTABLE
+            to_block = _block_number(log_filter.get("toBlock", "latest"))
+            from_block = _block_number(log_filter.get("fromBlock", "latest"))
+            head = self.head
+            if None in (from_block, to_block, head) or (
+                to_block >= head - self.head_lag
+            ):
+                return None
+            return IMMUTABLE
+        if method in BLOCK_PARAM:
+            position = BLOCK_PARAM[method]
+            tag = params[position] if len(params) > position else "latest"
+            if isinstance(tag, dict) or _block_number(tag) is not None:
+                return IMMUTABLE
+            if tag in HEAD_TAGS:
+                return PER_BLOCK
+            if tag == "earliest":
+                return IMMUTABLE
+        return None
+
+    def request(
+        self,
+        make_request: Callable[[RPCEndpoint, Any], RPCResponse],
+        method: RPCEndpoint,
+        params: Any,
+    ) -> RPCResponse:
+        """Answer one request from the cache, or fetch and store it."""
+        policy = self.classify(method, params)
+        if policy is None:
+            return make_request(method, params)
+        key = self._key(method, params)
+        with self._lock:
+            cached = self._lookup(key)
+            if cached is not None:
+                self._count_locked(method, "hits")
+                return copy.deepcopy(cached)
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                inflight = self._inflight[key] = Future()
+                owner = True
+            else:
+                owner = False
+        if not owner:
+            self._count(method, "coalesced")
+            return copy.deepcopy(inflight.result())
+        self._count(method, "misses")
+        try:
+            response = make_request(method, params)
+        except Exception as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+            inflight.set_exception(e)
+            raise
+        # Stored before the in-flight entry goes, so no caller falls between.
+        self._store(key, method, policy, response)
+        with self._lock:
+            self._inflight.pop(key, None)
+        inflight.set_result(response)
+        return copy.deepcopy(response)
+
+    def batch(
+        self,
+        make_batch_request: Callable[
+            [list[tuple[RPCEndpoint, Any]]], list[RPCResponse] | RPCResponse
+        ],
+        requests: list[tuple[RPCEndpoint, Any]],
+    ) -> list[RPCResponse] | RPCResponse:
+        """Answer a batch, sending only the requests that miss the cache."""
+        responses: list[RPCResponse | None] = []
+        misses: list[tuple[int, str, str | None]] = []
+        with self._lock:
+            for index, (method, params) in enumerate(requests):
+                policy = self.classify(method, params)
+                key = self._key(method, params)
+                cached = None if policy is None else self._lookup(key)
+                responses.append(copy.deepcopy(cached))
+                if cached is None:
+                    misses.append((index, key, policy))
+                else:
+                    self._count_locked(method, "hits")
+        if not misses:
+            return responses
+        fetched = make_batch_request([requests[index] for index, _, _ in misses])
+        if not isinstance(fetched, list):
+            return fetched
+        for (index, key, policy), response in zip(misses, fetched, strict=True):
+            method = requests[index][0]
+            if policy is not None:
+                self._count(method, "misses")
+                self._store(key, method, policy, response)
+            responses[index] = response
+        return responses
+
+    def metrics(self) -> dict[str, dict[str, float]]:
+        """
+        Report cache effectiveness per method.
+
+        Returns:
+            dict[str, dict[str, float]]: Method to hits, coalesced requests,
+                misses and the share answered without a round-trip of its own
+        """
+        with self._lock:
+            report: dict[str, dict[str, float]] = {}
+            for method, counts in sorted(self._metrics.items()):
+                served = counts["hits"] + counts["coalesced"]
+                total = served + counts["misses"]
+                report[method] = {
+                    **counts,
+                    "hit_rate": served / total if total else 0.0,
+                }
+            return report
+
+    def _lookup(self, key: str) -> RPCResponse | None:
+        if key in self._immutable:
+            self._immutable.move_to_end(key)
+            return self._immutable[key]
+        entry = self._per_block.get(key)
+        if entry is None:
+            return None
+        stored_at, response = entry
+        if self.clock() - stored_at > self.max_age:
+            del self._per_block[key]
+            return None
+        return response
+
+    def _store(self, key: str, method: str, policy: str, response: RPCResponse) -> None:
+        if "error" in response or response.get("result") is None:
+            return
+        result = response["result"]
+        if method == "eth_getCode":
+            # Deployed code does not change; an empty account may get some.
+            policy = PER_BLOCK if result in ("0x", "") else IMMUTABLE
+        if method == "eth_getLogs" and not result:
+            # A node missing the range's blocks also answers with no logs.
+            policy = PER_BLOCK
+        if method == "eth_getTransactionByHash" and result.get("blockNumber") is None:
+            return
+        with self._lock:
+            if policy == IMMUTABLE:
+                self._immutable[key] = response
+                if len(self._immutable) > self.max_entries:
+                    self._immutable.popitem(last=False)
+            else:
+                self._per_block[key] = (self.clock(), response)
+
+    def _count(self, method: str, outcome: str) -> None:
+        with self._lock:
+            self._count_locked(method, outcome)
+
+    def _count_locked(self, method: str, outcome: str) -> None:
+        counts = self._metrics.setdefault(
+            method, {"hits": 0, "coalesced": 0, "misses": 0}
+        )
+        counts[outcome] += 1
+
+    @staticmethod
+    def _key(method: str, params: Any) -> str:
+        return f"{method}:{json.dumps(params, sort_keys=True, default=str)}"
+
+
+class RPCCacheMiddleware(Web3Middleware):
+    """Web3 middleware that routes requests through a shared RPCCache."""
+
+    def __init__(self, w3: Web3, cache: RPCCache) -> None:
+        super().__init__(w3)
+        self.cache = cache
+
+    def wrap_make_request(
+        self, make_request: Callable[[RPCEndpoint, Any], RPCResponse]
+    ) -> Callable[[RPCEndpoint, Any], RPCResponse]:
+        return functools.partial(self.cache.request, make_request)
+
+    def wrap_make_batch_request(
+        self,
+        make_batch_request: Callable[
+            [list[tuple[RPCEndpoint, Any]]], list[RPCResponse] | RPCResponse
+        ],
+    ) -> Callable[[list[tuple[RPCEndpoint, Any]]], list[RPCResponse] | RPCResponse]:
+        return functools.partial(self.cache.batch, make_batch_request)
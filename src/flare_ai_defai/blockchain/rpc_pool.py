@@ -0,0 +1,223 @@
+"""
+RPC Endpoint Pool
+
+A web3 provider that spreads JSON-RPC traffic over several Flare nodes so
+one slow or rate-limited node no longer sets the app's latency. Every
+endpoint keeps an exponentially weighted average of its latency and error
+rate. Reads go to the healthiest endpoint; if it has not answered within
+`hedge_after` seconds the same request is sent to the next one and the
+first good answer wins, and a failed endpoint is failed over immediately.
+Transactions go to the primary (the first endpoint, or the healthiest
+working one if it fails) and are then rebroadcast to the others in the
+background so they reach block producers through more than one node.
+"""
+
+import threading
+import time
+from collections.abc import Callable, Sequence
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, TypeVar
+
+import structlog
+from web3 import Web3
+from web3.providers.base import BaseProvider, JSONBaseProvider
+from web3.types import RPCEndpoint, RPCResponse
+
+logger = structlog.get_logger(__name__)
+
+T = TypeVar("T")
+
+WRITE_METHODS = frozenset({"eth_sendRawTransaction", "eth_sendTransaction"})
+# JSON-RPC errors that say the node, not the request, is at fault.
+NODE_ERROR_CODES = frozenset({-32005, -32603, 429})
+# Seconds to wait on the best endpoint before hedging to the next one.
+HEDGE_AFTER = 0.5
+# Weight of the newest sample in the latency and error averages.
+EWMA_ALPHA = 0.2
+# How much a fully failing endpoint's latency is inflated when ranking.
+ERROR_PENALTY = 10.0
+# Latency assumed for an endpoint that has not answered yet.
+INITIAL_LATENCY = 0.1
+HTTP_TIMEOUT = 10
+
+
+def rpc_provider(endpoint: str | BaseProvider) -> BaseProvider:
+    """Return `endpoint` if it is a provider, else an HTTP provider for the URL."""
+    if isinstance(endpoint, BaseProvider):
+        return endpoint
+    return Web3.HTTPProvider(endpoint)
+
+
+def _node_error(response: RPCResponse | list[RPCResponse]) -> bool:
+    responses = response if isinstance(response, list) else [response]
+    return any(
+        isinstance(r.get("error"), dict) and r["error"].get("code") in NODE_ERROR_CODES
+        for r in responses
+    )
+
+
+class Endpoint:
+    """
+    One RPC node and its observed health.
+
+    Attributes:
+        provider (BaseProvider): Provider that talks to the node
+        name (str): Label used in logs
+        latency (float): Average seconds per answered request
+        error_rate (float): Average share of failed requests, 0 to 1
+    """
+
+    def __init__(self, provider: BaseProvider, name: str) -> None:
+        self.provider = provider
+        self.name = name
+        self.latency = INITIAL_LATENCY
+        self.error_rate = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def score(self) -> float:
+        """Expected cost of a request, lower is better."""
+        return self.latency * (1 + ERROR_PENALTY * self.error_rate)
+
+    def record(self, seconds: float, *, ok: bool) -> None:
+        """Fold one request's outcome into the averages."""
+        with self._lock:
+            if ok:
+                self.latency += EWMA_ALPHA * (seconds - self.latency)
+            self.error_rate += EWMA_ALPHA * ((0.0 if ok else 1.0) - self.error_rate)
+
+
+class RPCPool(JSONBaseProvider):
+    """
+    JSON-RPC provider over several endpoints with hedged reads.
+
+    Attributes:
+        endpoints (list[Endpoint]): Endpoints, the primary first
+        hedge_after (float): Seconds before a read is duplicated to the
+            next-best endpoint
+    """
+
+    def __init__(
+        self,
+        endpoints: Sequence[str | BaseProvider],
+        hedge_after: float = HEDGE_AFTER,
+    ) -> None:
+        if not endpoints:
+            msg = "RPCPool needs at least one endpoint"
+            raise ValueError(msg)
+        super().__init__()
+        self.endpoints = [
+            Endpoint(self._provider(endpoint), self._name(endpoint, index))
+            for index, endpoint in enumerate(endpoints)
+        ]
+        self.hedge_after = hedge_after
+        self._executor = ThreadPoolExecutor(
+            max_workers=4 * len(self.endpoints), thread_name_prefix="rpc-pool"
+        )
+        self.logger = logger.bind(router="rpc_pool")
+
+    def ranked(self) -> list[Endpoint]:
+        """Endpoints from healthiest to least healthy, ties in configured order."""
+        return sorted(self.endpoints, key=lambda endpoint: endpoint.score)
+
+    def make_request(self, method: RPCEndpoint, params: Any) -> RPCResponse:
+        if method in WRITE_METHODS:
+            return self._write(method, params)
+        return self._read(lambda provider: provider.make_request(method, params))
+
+    def make_batch_request(
+        self, requests: list[tuple[RPCEndpoint, Any]]
+    ) -> list[RPCResponse] | RPCResponse:
+        return self._read(lambda provider: provider.make_batch_request(requests))
+
+    def is_connected(self, show_traceback: bool = False) -> bool:  # noqa: FBT001, FBT002
+        return any(
+            endpoint.provider.is_connected(show_traceback)
+            for endpoint in self.endpoints
+        )
+
+    def _read(self, request: Callable[[BaseProvider], T]) -> T:
+        candidates = iter(self.ranked())
+        pending = {self._submit(next(candidates), request)}
+        error: Exception | None = None
+        while pending:
+            done, pending = wait(
+                pending, timeout=self.hedge_after, return_when=FIRST_COMPLETED
+            )
+            for future in done:
+                try:
+                    return future.result()
+                except Exception as e:  # noqa: BLE001
+                    error = e
+            # Hedge a slow read, or fail over at once from a failed one.
+            endpoint = next(candidates, None)
+            if endpoint is not None:
+                if not done:
+                    self.logger.debug("hedged", endpoint=endpoint.name)
+                pending.add(self._submit(endpoint, request))
+        raise error or RuntimeError("No RPC endpoint answered")
+
+    def _write(self, method: RPCEndpoint, params: Any) -> RPCResponse:
+        primary = self.endpoints[0]
+        order = [primary, *(e for e in self.ranked() if e is not primary)]
+        error: Exception | None = None
+        for index, endpoint in enumerate(order):
+            try:
+                response = self._call(
+                    endpoint, lambda p: p.make_request(method, params)
+                )
+            except Exception as e:  # noqa: BLE001
+                error = e
+                continue
+            if "error" not in response:
+                for other in order[:index] + order[index + 1 :]:
+                    self._executor.submit(self._rebroadcast, other, method, params)
+            return response
+        raise error or RuntimeError("No RPC endpoint accepted the transaction")
+
+    def _rebroadcast(
+        self,
+        endpoint: Endpoint,
+        method: RPCEndpoint,
+        params: Any,
+    ) -> None:
+        try:
+            self._call(endpoint, lambda p: p.make_request(method, params))
+        except Exception as e:  # noqa: BLE001
+            self.logger.debug(
+                "rebroadcast_failed", endpoint=endpoint.name, error=str(e)
+            )
+
+    def _submit(
+        self, endpoint: Endpoint, request: Callable[[BaseProvider], T]
+    ) -> Future:
+        return self._executor.submit(self._call, endpoint, request)
+
+    def _call(self, endpoint: Endpoint, request: Callable[[BaseProvider], T]) -> T:
+        start = time.perf_counter()
+        try:
+            response = request(endpoint.provider)
+        except Exception:
+            endpoint.record(time.perf_counter() - start, ok=False)
+            raise
+        if _node_error(response):
+            endpoint.record(time.perf_counter() - start, ok=False)
+            msg = f"RPC endpoint {endpoint.name} is unavailable: {response}"
+            raise ConnectionError(msg)
+        endpoint.record(time.perf_counter() - start, ok=True)
+        return response
+
+    @staticmethod
+    def _provider(endpoint: str | BaseProvider) -> BaseProvider:
+        if isinstance(endpoint, BaseProvider):
+            return endpoint
+        # The pool fails over itself, so each node gets one attempt.
+        return Web3.HTTPProvider(
+            endpoint,
+            request_kwargs={"timeout": HTTP_TIMEOUT},
+            exception_retry_configuration=None,
+        )
+
+    @staticmethod
+    def _name(endpoint: str | BaseProvider, index: int) -> str:
+        return endpoint if isinstance(endpoint, str) else f"provider-{index}"
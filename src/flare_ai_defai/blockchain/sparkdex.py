@@ -13,10 +13,20 @@ import structlog
 from eth_account import Account
 from eth_typing import ChecksumAddress
 from web3 import Web3
+from web3.providers.base import BaseProvider
 from web3.middleware import ExtraDataToPOAMiddleware
 from web3.types import TxParams
 
 from flare_ai_defai.blockchain import FlareExplorer, FlareProvider
+from flare_ai_defai.blockchain.abi_registry import abi_registry
+from flare_ai_defai.blockchain.allowances import AllowanceTracker, ApprovalMode
+from flare_ai_defai.blockchain.amounts import TokenAmount
+from flare_ai_defai.blockchain.block_watcher import BlockHeader
+from flare_ai_defai.blockchain.gas_model import FALLBACK_GAS_LIMIT
+from flare_ai_defai.blockchain.quoter import SparkDEXQuoter
+from flare_ai_defai.blockchain.routing import Hop, Route, RouteFinder, SplitRoute
+from flare_ai_defai.blockchain.rpc_pool import rpc_provider
+from flare_ai_defai.blockchain.universal_router import ADDRESS_THIS, MSG_SENDER, PERMIT2_ADDRESS, RouterPlan
 from flare_ai_defai.models.user import UserInfo
 from flare_ai_defai.storage.fake_storage import WalletStore
 
@@ -28,41 +38,26 @@ class SparkDEX:
     SPARKDEX_ROUTER = "0x0f3D8a38D4c74afBebc2c42695642f0e3acb15D3"
     WFLR_ADDRESS = "0x1D80c49BbBCD1C0911346656B529DF9E5c2F783d"
     SFLR_ADDRESS = "0x12e605bc104e93B45e1aD99F9e555f659051c2BB"
-    SPARKDEX_ABI = [
-        {
-            "inputs": [
-            {
-                "internalType": "bytes",
-                "name": "commands",
-                "type": "bytes"
-            },
-            {
-                "internalType": "bytes[]",
-                "name": "inputs",
-                "type": "bytes[]"
-            },
-            {
-                "internalType": "uint256",
-                "name": "deadline",
-                "type": "uint256"
-            }
-            ],
-            "name": "execute",
-            "outputs": [],
-            "stateMutability": "payable",
-            "type": "function"
-        }
-    ]
-    
-    
-    def __init__(self, web3_provider_url: str, flare_explorer: FlareExplorer, flare_provider: FlareProvider, wallet_store: WalletStore) -> None:
+    UNIVERSAL_ROUTER = "0x8a1E35F5c98C4E85B36B7B253222eE17773b2781"
+    # "max" approves once per token and spender instead of once per swap
+    APPROVAL_MODE: ApprovalMode = "exact"
+    TOKEN_ADDRESSES = {
+        "wflr": "0x1D80c49BbBCd1C0911346656B529DF9E5c2F783d",
+        "joule": "0xE6505f92583103AF7ed9974DEC451A7Af4e3A3bE",
+        "usdc": "0xFbDa5F676cB37624f28265A144A48B0d6e87d3b6",
+        "usdt": "0x0B38e83B86d491735fEaa0a791F65c2B99535396",
+        "weth": "0x1502FA4be69d526124D453619276FacCab275d3D",
+    }
+
+    def __init__(self, web3_provider_url: str | BaseProvider, flare_explorer: FlareExplorer, flare_provider: FlareProvider, wallet_store: WalletStore) -> None:
         """
         Args:
-            web3_provider_url (str): URL of the Web3 provider endpoint
+            web3_provider_url (str | BaseProvider): URL of the Web3 provider
+                endpoint, or a provider such as an RPCPool to share
         """
         self.address: ChecksumAddress | None = None
         self.private_key: str | None = None
-        self.w3 = Web3(Web3.HTTPProvider(web3_provider_url))
+        self.w3 = Web3(rpc_provider(web3_provider_url))
         self.w3.middleware_onion.inject(ExtraDataToPOAMiddleware, layer=0)  # Added to deal with the PoA extraData issue.
         self.logger = logger.bind(router="SparkDEX")
         self.web3_provider_url = web3_provider_url
@@ -71,6 +66,10 @@ class SparkDEX:
         self.wallet_store = wallet_store
         
         self.add_to_nonce = 0  
+        self.quoter = SparkDEXQuoter(self.w3)
+        self.route_finder = RouteFinder(self.quoter.pool_cache, self.TOKEN_ADDRESSES.values())
+        self.allowances = AllowanceTracker(self.w3, self.quoter.multicall)
+        self.gas_model = flare_provider.gas_model
         
         #tx_hashes = self.swapFLRtoToken(
         #amount=1.0,
@@ -78,6 +77,16 @@ class SparkDEX:
         #min_amount_out=0.0001,  # Adjust based on expected rate
         #deadline_minutes=20
         #)
+
+    def on_block(self, header: BlockHeader) -> None:
+        """
+        Mark pool states and allowances stale as of a new chain head.
+
+        Args:
+            header (BlockHeader): New chain head
+        """
+        self.quoter.pool_cache.on_block(header)
+        self.allowances.on_block(header)
     
     
     def swapFLRforJOULE():
@@ -137,19 +146,12 @@ class SparkDEX:
 
         # Initialize SparkDEX router contract
         #abi = self.flare_explorer.get_contract_abi(self.SPARKDEX_ROUTER)
-        router = self.w3.eth.contract(address=self.SPARKDEX_ROUTER, abi=self.SPARKDEX_ABI)
+        router = abi_registry.contract(self.w3, "universal_router", self.SPARKDEX_ROUTER)
 
         # Convert amounts to wei
         amount_wei = self.w3.to_wei(amount, "ether")
         min_amount_out_wei = self.w3.to_wei(min_amount_out, "ether")  # Adjust for token decimals if needed
 
-        # Check balance
-        balance = self.w3.eth.get_balance(self.flare_provider.address)
-        gas_cost = 250000 * self.w3.eth.gas_price
-        if balance < amount_wei + gas_cost:
-            raise ValueError(f"Insufficient balance: {self.w3.from_wei(balance, 'ether')} FLR")
-        self.logger.debug(balance=balance, gas_cost=gas_cost, amount_wei=amount_wei)
-
         # Set path: FLR -> WFLR -> Token
         path = [self.WFLR_ADDRESS, self.w3.to_checksum_address(token_out)]
 
@@ -180,6 +182,7 @@ class SparkDEX:
         ]
         
         tx = self.flare_provider.create_contract_function_tx(
+            user,
             router,
             "execute",
             0,  # First tx in sequence
@@ -189,6 +192,13 @@ class SparkDEX:
             value=amount_wei
         )
 
+        # Check balance against the modelled gas limit rather than a fixed one
+        balance = self.w3.eth.get_balance(self.wallet_store.get_address(user))
+        gas_cost = tx["gas"] * self.w3.eth.gas_price
+        if balance < amount_wei + gas_cost:
+            raise ValueError(f"Insufficient balance: {self.w3.from_wei(balance, 'ether')} FLR")
+        self.logger.debug(balance=balance, gas_cost=gas_cost, amount_wei=amount_wei)
+
         # Queue and send
         self.flare_provider.add_tx_to_queue(f"Swapping {amount} FLR to {token_out}", [tx])
         tx_hashes = self.flare_provider.send_tx_in_queue(user)
@@ -209,156 +219,14 @@ class SparkDEX:
         """
 
         amount_in = self.w3.to_wei(amount_in, unit="ether")
-        universal_router_address = "0x8a1E35F5c98C4E85B36B7B253222eE17773b2781"  # Replace with Flare's Universal Router if different
-        
-        token_address = {
-            "wflr": "0x1D80c49BbBCd1C0911346656B529DF9E5c2F783d",
-            "joule": "0xE6505f92583103AF7ed9974DEC451A7Af4e3A3bE",
-            "usdc": "0xFbDa5F676cB37624f28265A144A48B0d6e87d3b6",
-            "usdt": "0x0B38e83B86d491735fEaa0a791F65c2B99535396",
-            "weth": "0x1502FA4be69d526124D453619276FacCab275d3D"
+        universal_router_address = self.UNIVERSAL_ROUTER
 
-        }
+        token_in_address = self.TOKEN_ADDRESSES[token_in.lower()]
+        token_out_address = self.TOKEN_ADDRESSES[token_out.lower()]
 
-        token_address_abi = {
-            "wflr": "0x1D80c49BbBCd1C0911346656B529DF9E5c2F783d",
-            "joule": "0xEE15da0edB70FC6D98D03651F949FcCc2C4e1E80",
-            "usdc": "0x3AdAE7Ad0449e26ad2e95059e08CC29ECB93E194",
-            "usdt": "0x0B38e83B86d491735fEaa0a791F65c2B99535396",
-            "weth": "0x1502FA4be69d526124D453619276FacCab275d3D"
-        }
-        
-        SWAP_ROUTER_ABI =   [{
-            "inputs": [
-            {
-                "components": [
-                {
-                    "internalType": "address",
-                    "name": "tokenIn",
-                    "type": "address"
-                },
-                {
-                    "internalType": "address",
-                    "name": "tokenOut",
-                    "type": "address"
-                },
-                {
-                    "internalType": "uint24",
-                    "name": "fee",
-                    "type": "uint24"
-                },
-                {
-                    "internalType": "address",
-                    "name": "recipient",
-                    "type": "address"
-                },
-                {
-                    "internalType": "uint256",
-                    "name": "deadline",
-                    "type": "uint256"
-                },
-                {
-                    "internalType": "uint256",
-                    "name": "amountIn",
-                    "type": "uint256"
-                },
-                {
-                    "internalType": "uint256",
-                    "name": "amountOutMinimum",
-                    "type": "uint256"
-                },
-                {
-                    "internalType": "uint160",
-                    "name": "sqrtPriceLimitX96",
-                    "type": "uint160"
-                }
-                ],
-                "internalType": "struct ISwapRouter.ExactInputSingleParams",
-                "name": "params",
-                "type": "tuple"
-            }
-            ],
-            "name": "exactInputSingle",
-            "outputs": [
-            {
-                "internalType": "uint256",
-                "name": "amountOut",
-                "type": "uint256"
-            }
-            ],
-            "stateMutability": "payable",
-            "type": "function"
-        }]
-
-        ERC20_ABI = {
-            "inputs": [
-            {
-                "internalType": "address",
-                "name": "spender",
-                "type": "address"
-            },
-            {
-                "internalType": "uint256",
-                "name": "amount",
-                "type": "uint256"
-            }
-            ],
-            "name": "approve",
-            "outputs": [
-            {
-                "internalType": "bool",
-                "name": "",
-                "type": "bool"
-            }
-            ],
-            "stateMutability": "nonpayable",
-            "type": "function"
-        },{
-            "inputs": [
-            {
-                "internalType": "address",
-                "name": "account",
-                "type": "address"
-            }
-            ],
-            "name": "balanceOf",
-            "outputs": [
-            {
-                "internalType": "uint256",
-                "name": "",
-                "type": "uint256"
-            }
-            ],
-            "stateMutability": "view",
-            "type": "function"
-        },{
-            "inputs": [],
-            "name": "decimals",
-            "outputs": [{"internalType": "uint8", "name": "", "type": "uint8"}],
-            "stateMutability": "view",
-            "type": "function"
-        }
-
-        # token_abi = {
-        #     "wflr": WFLR_ABI,
-        #     "joule": JOULE_ABI,
-        #     "usdc": USDC_ABI
-        # }
-
-        token_in_address = token_address[token_in.lower()]
-        token_out_address = token_address[token_out.lower()]
-
-        #token_in_abi = token_abi[token_in.lower()]
-        #token_out_abi = token_abi[token_out.lower()]
-
-        #token_in_abi = self.flare_explorer.get_contract_abi(contract_address=token_address_abi[token_in.lower()])
-        #token_out_abi = self.flare_explorer.get_contract_abi(contract_address=token_address_abi[token_out.lower()])
-        token_in_abi = ERC20_ABI
-        token_out_abi = ERC20_ABI
-        
-        universal_router = self.w3.eth.contract(address=universal_router_address, abi=SWAP_ROUTER_ABI)
-        contract_in = self.w3.eth.contract(address=token_in_address, abi=token_in_abi)
-        contract_out = self.w3.eth.contract(address=token_out_address, abi=token_out_abi)
+        universal_router = abi_registry.contract(self.w3, "swap_router", universal_router_address)
+        contract_in = abi_registry.contract(self.w3, "erc20", token_in_address)
+        contract_out = abi_registry.contract(self.w3, "erc20", token_out_address)
         
 
         fee_tier = 500  # Assuming 0.05% pool fee
@@ -421,160 +289,20 @@ class SparkDEX:
 
     def swap_erc20_tokens_tx(self, user: UserInfo, token_in: str, token_out: str, amount_in: float):
         slippage = 0.05
-        universal_router_address = "0x8a1E35F5c98C4E85B36B7B253222eE17773b2781"  # Replace with Flare's Universal Router if different
-        
-        token_address = {
-            "wflr": "0x1D80c49BbBCd1C0911346656B529DF9E5c2F783d",
-            "joule": "0xE6505f92583103AF7ed9974DEC451A7Af4e3A3bE",
-            "usdc": "0xFbDa5F676cB37624f28265A144A48B0d6e87d3b6",
-            "usdt": "0x0B38e83B86d491735fEaa0a791F65c2B99535396",
-            "weth": "0x1502FA4be69d526124D453619276FacCab275d3D"
-        }
+        universal_router_address = self.UNIVERSAL_ROUTER
+
+        token_in_address = self.TOKEN_ADDRESSES[token_in.lower()]
+        token_out_address = self.TOKEN_ADDRESSES[token_out.lower()]
+
 
-        token_address_abi = {
-            "wflr": "0x1D80c49BbBCd1C0911346656B529DF9E5c2F783d",
-            "joule": "0xEE15da0edB70FC6D98D03651F949FcCc2C4e1E80",
-            "usdc": "0x3AdAE7Ad0449e26ad2e95059e08CC29ECB93E194",
-            "usdt": "0x0B38e83B86d491735fEaa0a791F65c2B99535396",
-            "weth": "0x1502FA4be69d526124D453619276FacCab275d3D"
-        }
-        
-        ERC20_ABI = {
-                "inputs": [
-                {
-                    "internalType": "address",
-                    "name": "spender",
-                    "type": "address"
-                },
-                {
-                    "internalType": "uint256",
-                    "name": "amount",
-                    "type": "uint256"
-                }
-                ],
-                "name": "approve",
-                "outputs": [
-                {
-                    "internalType": "bool",
-                    "name": "",
-                    "type": "bool"
-                }
-                ],
-                "stateMutability": "nonpayable",
-                "type": "function"
-            },{
-                "inputs": [
-                {
-                    "internalType": "address",
-                    "name": "account",
-                    "type": "address"
-                }
-                ],
-                "name": "balanceOf",
-                "outputs": [
-                {
-                    "internalType": "uint256",
-                    "name": "",
-                    "type": "uint256"
-                }
-                ],
-                "stateMutability": "view",
-                "type": "function"
-            },{
-                "inputs": [],
-                "name": "decimals",
-                "outputs": [{"internalType": "uint8", "name": "", "type": "uint8"}],
-                "stateMutability": "view",
-                "type": "function"
-            }
-    
         
-        SWAP_ROUTER_ABI =   [{
-            "inputs": [
-            {
-                "components": [
-                {
-                    "internalType": "address",
-                    "name": "tokenIn",
-                    "type": "address"
-                },
-                {
-                    "internalType": "address",
-                    "name": "tokenOut",
-                    "type": "address"
-                },
-                {
-                    "internalType": "uint24",
-                    "name": "fee",
-                    "type": "uint24"
-                },
-                {
-                    "internalType": "address",
-                    "name": "recipient",
-                    "type": "address"
-                },
-                {
-                    "internalType": "uint256",
-                    "name": "deadline",
-                    "type": "uint256"
-                },
-                {
-                    "internalType": "uint256",
-                    "name": "amountIn",
-                    "type": "uint256"
-                },
-                {
-                    "internalType": "uint256",
-                    "name": "amountOutMinimum",
-                    "type": "uint256"
-                },
-                {
-                    "internalType": "uint160",
-                    "name": "sqrtPriceLimitX96",
-                    "type": "uint160"
-                }
-                ],
-                "internalType": "struct ISwapRouter.ExactInputSingleParams",
-                "name": "params",
-                "type": "tuple"
-            }
-            ],
-            "name": "exactInputSingle",
-            "outputs": [
-            {
-                "internalType": "uint256",
-                "name": "amountOut",
-                "type": "uint256"
-            }
-            ],
-            "stateMutability": "payable",
-            "type": "function"
-        }]
-
-        # token_abi = {
-        #     "wflr": WFLR_ABI,
-        #     "joule": JOULE_ABI,
-        #     "usdc": USDC_ABI
-        # }
-
-        token_in_address = token_address[token_in.lower()]
-        token_out_address = token_address[token_out.lower()]
-
-        # token_in_abi = token_abi[token_in.lower()]
-        # token_out_abi = token_abi[token_out.lower()]
-
-        #token_in_abi = self.flare_explorer.get_contract_abi(contract_address=token_address_abi[token_in.lower()])
-        #token_out_abi = self.flare_explorer.get_contract_abi(contract_address=token_address_abi[token_out.lower()])
-        
-        token_in_abi = ERC20_ABI
-        token_out_abi = ERC20_ABI
         
         base_fee = self.w3.eth.get_block('latest')['baseFeePerGas']
         priority_fee = self.w3.eth.max_priority_fee
         
-        universal_router = self.w3.eth.contract(address=universal_router_address, abi=SWAP_ROUTER_ABI)
-        contract_in = self.w3.eth.contract(address=token_in_address, abi=token_in_abi)
-        contract_out = self.w3.eth.contract(address=token_out_address, abi=token_out_abi)
+        universal_router = abi_registry.contract(self.w3, "swap_router", universal_router_address)
+        contract_in = abi_registry.contract(self.w3, "erc20", token_in_address)
+        contract_out = abi_registry.contract(self.w3, "erc20", token_out_address)
 
         token_in_decimals = contract_in.functions.decimals().call()
         token_out_decimals = contract_out.functions.decimals().call()
@@ -583,35 +311,30 @@ class SparkDEX:
             "token_out": token_out, "decimals_out": token_out_decimals
         })
 
-        amount_in_wei = int(amount_in * (10 ** token_in_decimals))
+        amount_in_wei = TokenAmount.from_decimal(amount_in, token_in_decimals).wei
         if amount_in_wei <= 0:
             raise ValueError(f"Invalid amount_in: {amount_in} for {token_in}")
 
-        fee_tier = 500  # Assuming 0.05% pool fee
-        amount_out_min = 1  # Fetch dynamically for slippage protection
         deadline = self.w3.eth.get_block("latest")["timestamp"] + 300  # 5 minutes from now
+        user_address = self.wallet_store.get_address(user)
+        # Read every allowance either execution path may need in one multicall
+        self.allowances.load(user_address,
+                             erc20=[(token_in_address, universal_router_address), (token_in_address, PERMIT2_ADDRESS)],
+                             permit2=[(token_in_address, self.SPARKDEX_ROUTER)])
 
-
-        # ---- Step 0.5: calculate amount_out_min
-        params = (
-            token_in_address,  # tokenIn
-            token_out_address,  # tokenOut
-            fee_tier,  # fee (e.g., 500 = 0.05%)
-            self.wallet_store.get_address(user),  # recipient (your address)
-            int(self.w3.eth.get_block("latest")["timestamp"]) + 300,  # deadline (5 min)
-            amount_in_wei,  # amountIn
-            1,  # amountOutMinimum (set to 0 for estimation)
-            0  # sqrtPriceLimitX96 (no limit)
-        )
-
-        amount_out_wei = 1
+        # ---- Step 0.5: find the best route (direct, multi-hop or split) and its output
         try:
-            amount_out_wei = universal_router.functions.exactInputSingle(params).call()
+            split = self.swap_legs(token_in_address, token_out_address, amount_in_wei, base_fee + priority_fee)
         except Exception as e:
-            self.logger.error(f"Failed to estimate amount out: {str(e)}", extra={"params": params})
-            raise  
-            
-        amount_out = amount_out_wei / (10 ** token_out_decimals)
+            self.logger.error(f"Failed to estimate amount out: {str(e)}", token_in=token_in, token_out=token_out)
+            raise
+        if len(split.legs) > 1:
+            return self.split_swap_txs(user, token_in_address, split, slippage, deadline, base_fee, priority_fee)
+        route = split.legs[0]
+        fee_tier = route.fees[0]
+        amount_out_wei = route.amount_out
+
+        amount_out = str(TokenAmount(amount_out_wei, token_out_decimals))
         amount_out_min = int(amount_out_wei * (1 - slippage))  # Keep in wei units
         self.logger.debug("Estimated swap output", extra={
             "amount_in_wei": amount_in_wei, "token_in": token_in,
@@ -619,37 +342,27 @@ class SparkDEX:
             "amount_out_min": amount_out_min
         })
 
-        # --- Step 1: Approve Universal Router to Spend wFLR ---
-        approval_tx = contract_in.functions.approve(universal_router_address, amount_in_wei).build_transaction({
-            'from': self.wallet_store.get_address(user),
-            'nonce': self.get_nonce(),
-            'gas': 500000,
-            "maxFeePerGas": 2*(base_fee + priority_fee),
-            "maxPriorityFeePerGas": 2*(priority_fee),
-            'chainId': self.w3.eth.chain_id,
-            "type": 2,
-        })
-
-        self.logger.debug(f"Approval transaction: {approval_tx}")
+        # --- Step 1: Approve Universal Router to Spend wFLR, unless it already can ---
+        txs = []
+        approval_amount = self.allowances.required_approval(user_address, token_in_address, universal_router_address,
+                                                            amount_in_wei, self.APPROVAL_MODE)
+        if approval_amount is not None:
+            approval_tx = contract_in.functions.approve(universal_router_address, approval_amount).build_transaction({
+                'from': user_address,
+                'nonce': self.get_nonce(),
+                'gas': 500000,
+                "maxFeePerGas": 2*(base_fee + priority_fee),
+                "maxPriorityFeePerGas": 2*(priority_fee),
+                'chainId': self.w3.eth.chain_id,
+                "type": 2,
+            })
+            self.logger.debug(f"Approval transaction: {approval_tx}")
+            txs.append(self.gas_model.fill(approval_tx))
+        else:
+            self.logger.debug("Allowance covers swap, skipping approval", token_in=token_in)
 
         # --- Step 3: Execute the swap ---
-        params = (
-            token_in_address,  # tokenIn
-            token_out_address,  # tokenOut
-            fee_tier,  # fee (e.g., 500 = 0.05%)
-            self.wallet_store.get_address(user),  # recipient (your address)
-            deadline,  # deadline (5 min)
-            amount_in_wei,  # amountIn
-            amount_out_min,  # amountOutMinimum (set to 0 for estimation)
-            0  # sqrtPriceLimitX96 (no limit)
-        )
-        
-        tx1 = self.flare_provider.create_contract_function_tx(user,
-            universal_router, "exactInputSingle", 0, 
-            params#, gas=gas_limit
-        )
-        
-        swap_tx = universal_router.functions.exactInputSingle(params).build_transaction({
+        tx_params = {
             'from': self.wallet_store.get_address(user),
             'nonce': self.get_nonce(),
             'gas': 500000,
@@ -657,15 +370,225 @@ class SparkDEX:
             "maxPriorityFeePerGas": 10*(priority_fee), #self.w3.eth.max_priority_fee,
             'chainId': self.w3.eth.chain_id,
             "type": 2,
-        })
+        }
+        if len(route.hops) > 1:
+            params = (
+                route.path,  # path (token, fee, token, ...)
+                self.wallet_store.get_address(user),  # recipient (your address)
+                deadline,  # deadline (5 min)
+                amount_in_wei,  # amountIn
+                amount_out_min,  # amountOutMinimum
+            )
+            swap_tx = universal_router.functions.exactInput(params).build_transaction(tx_params)
+        else:
+            params = (
+                token_in_address,  # tokenIn
+                token_out_address,  # tokenOut
+                fee_tier,  # fee (e.g., 500 = 0.05%)
+                self.wallet_store.get_address(user),  # recipient (your address)
+                deadline,  # deadline (5 min)
+                amount_in_wei,  # amountIn
+                amount_out_min,  # amountOutMinimum (set to 0 for estimation)
+                0  # sqrtPriceLimitX96 (no limit)
+            )
+            swap_tx = universal_router.functions.exactInputSingle(params).build_transaction(tx_params)
 
-        self.logger.debug(f"Approval transaction: {approval_tx}")
+        self.gas_model.fill(swap_tx)
         self.logger.debug(f"Swap transaction: {swap_tx}")
+        self.allowances.record_spend(user_address, token_in_address, universal_router_address, amount_in_wei)
         # --- Step 4: Check JOULE Balance ---
         # joule_balance = joule_contract.functions.balanceOf(self.wallet_store.get_address(user)).call()
         # print(f"New JOULE balance: {joule_balance / 10**6}")
 
-        return approval_tx, swap_tx
+        return [*txs, swap_tx]
+
+    def swap_legs(self, token_in_address: str, token_out_address: str, amount_in_wei: int,
+                  gas_price: int) -> SplitRoute:
+        """
+        Pick the V3 routes an order is executed over.
+
+        Uses the best single route unless splitting the order across several
+        pools gives more output net of gas. When no route can be simulated the
+        direct pools are quoted on-chain instead.
+
+        Args:
+            token_in_address (str): Address of the token sold
+            token_out_address (str): Address of the token bought
+            amount_in_wei (int): Input amount in token_in base units
+            gas_price (int): Gas price in wei used to cost each route
+
+        Returns:
+            SplitRoute: One leg, or several when splitting pays off
+
+        Raises:
+            ValueError: If no SparkDEX pool can fill the swap
+        """
+        try:
+            route = self.route_finder.best_route(token_in_address, token_out_address, amount_in_wei,
+                                                 gas_price=gas_price, v3_only=True)
+        except ValueError as e:
+            # No simulated route, fall back to quoting the direct pools on-chain
+            self.logger.debug("Route search failed, quoting direct pools", reason=str(e))
+            quote = self.quoter.best_quote(token_in_address, token_out_address, amount_in_wei, offline=False)
+            self.logger.debug("Best quote", fee=quote.fee, pool=quote.pool_address,
+                              price_impact=quote.price_impact, gas_estimate=quote.gas_estimate)
+            hop = Hop(token_in=quote.token_in, token_out=quote.token_out, protocol="v3", fee=quote.fee,
+                      pool=quote.pool_address, amount_in=quote.amount_in, amount_out=quote.amount_out,
+                      gas_estimate=quote.gas_estimate)
+            return SplitRoute(legs=(Route(hops=(hop,)),))
+        self.logger.debug("Best route", tokens=route.tokens, fees=route.fees,
+                          amount_out=route.amount_out, gas_cost_out=route.gas_cost_out)
+
+        # Large orders do better split across several pools
+        split = self.route_finder.find_split(token_in_address, token_out_address, amount_in_wei,
+                                             gas_price=gas_price)
+        if len(split.legs) > 1 and split.net_amount_out > route.net_amount_out:
+            self.logger.debug("Splitting order", legs=[(leg.tokens, leg.fees, leg.amount_in) for leg in split.legs],
+                              amount_out=split.amount_out, single_route_out=route.amount_out)
+            return split
+        return SplitRoute(legs=(route,))
+
+    def router_tx_params(self, user: UserInfo, base_fee: int, priority_fee: int, fee_multiplier: int,
+                         value: int = 0) -> TxParams:
+        """Transaction fields for the next transaction in the user's queue."""
+        tx_params: TxParams = {
+            'from': self.wallet_store.get_address(user),
+            'nonce': self.get_nonce(),
+            'gas': FALLBACK_GAS_LIMIT,  # replaced by the gas model once built
+            "maxFeePerGas": fee_multiplier*(base_fee + priority_fee),
+            "maxPriorityFeePerGas": fee_multiplier*(priority_fee),
+            'chainId': self.w3.eth.chain_id,
+            "type": 2,
+        }
+        if value:
+            tx_params["value"] = value
+        return tx_params
+
+    def split_swap_txs(self, user: UserInfo, token_in_address: str, split: SplitRoute, slippage: float,
+                       deadline: int, base_fee: int, priority_fee: int, *, unwrap: bool = False) -> list[TxParams]:
+        """
+        Build the transactions for an order executed through the Universal Router.
+
+        All legs run in one `execute`, one V3_SWAP_EXACT_IN command per leg.
+        The router pulls the input through Permit2, so the token has to be
+        approved to Permit2 and Permit2 has to allow the router to spend it;
+        either approval is skipped when the current allowance covers the order.
+
+        Args:
+            user (UserInfo): User whose wallet signs the transactions
+            token_in_address (str): Address of the token sold
+            split (SplitRoute): Legs to execute
+            slippage (float): Accepted shortfall per leg, e.g. 0.05 for 5%
+            deadline (int): Unix time after which the swap reverts
+            unwrap (bool): The legs end in WFLR, pay it out as native FLR
+
+        Returns:
+            list[TxParams]: Any approvals needed, then the swap
+        """
+        router_address = self.SPARKDEX_ROUTER
+        token_in = abi_registry.contract(self.w3, "erc20", token_in_address)
+        permit2 = abi_registry.contract(self.w3, "permit2", PERMIT2_ADDRESS)
+        router = abi_registry.contract(self.w3, "universal_router", router_address)
+
+        user_address = self.wallet_store.get_address(user)
+        self.allowances.load(user_address, erc20=[(token_in_address, PERMIT2_ADDRESS)],
+                             permit2=[(token_in_address, router_address)])
+        txs = []
+        approval_amount = self.allowances.required_approval(user_address, token_in_address, PERMIT2_ADDRESS,
+                                                            split.amount_in, self.APPROVAL_MODE)
+        if approval_amount is not None:
+            txs.append(self.gas_model.fill(token_in.functions.approve(PERMIT2_ADDRESS, approval_amount).build_transaction(
+                self.router_tx_params(user, base_fee, priority_fee, 2))))
+        permit2_grant = self.allowances.required_permit2_approval(user_address, token_in_address, router_address,
+                                                                  split.amount_in, deadline, self.APPROVAL_MODE)
+        if permit2_grant is not None:
+            txs.append(self.gas_model.fill(permit2.functions.approve(
+                token_in_address, router_address, *permit2_grant
+            ).build_transaction(self.router_tx_params(user, base_fee, priority_fee, 2))))
+
+        plan = RouterPlan()
+        recipient = ADDRESS_THIS if unwrap else MSG_SENDER
+        for leg in split.legs:
+            plan.v3_swap_exact_in(recipient, leg.amount_in, int(leg.amount_out * (1 - slippage)), leg.path)
+        if unwrap:
+            plan.unwrap_weth(MSG_SENDER, int(split.amount_out * (1 - slippage)))
+        commands, inputs = plan.encode()
+        swap_tx = self.gas_model.fill(router.functions.execute(commands, inputs, deadline).build_transaction(
+            self.router_tx_params(user, base_fee, priority_fee, 10)))
+
+        self.logger.debug(f"Universal Router swap transaction: {swap_tx}", approvals=len(txs))
+        self.allowances.record_spend(user_address, token_in_address, PERMIT2_ADDRESS, split.amount_in)
+        self.allowances.record_spend(user_address, token_in_address, router_address, split.amount_in,
+                                     via_permit2=True)
+        return [*txs, swap_tx]
+
+    def wrap_and_swap_tx(self, user: UserInfo, token_out: str, amount_in: float) -> TxParams:
+        """
+        Build one transaction that wraps FLR and swaps it to `token_out`.
+
+        The FLR is sent with the call, wrapped by the router into its own
+        WFLR balance and spent from there, so no approval is needed.
+
+        Args:
+            user (UserInfo): User whose wallet signs the transaction
+            token_out (str): Symbol of the token bought
+            amount_in (float): FLR to swap
+
+        Returns:
+            TxParams: The Universal Router `execute` transaction
+        """
+        slippage = 0.05
+        token_out_address = self.TOKEN_ADDRESSES[token_out.lower()]
+        amount_in_wei = TokenAmount.from_decimal(amount_in).wei
+        if amount_in_wei <= 0:
+            raise ValueError(f"Invalid amount_in: {amount_in} for FLR")
+
+        base_fee = self.w3.eth.get_block('latest')['baseFeePerGas']
+        priority_fee = self.w3.eth.max_priority_fee
+        deadline = self.w3.eth.get_block("latest")["timestamp"] + 300  # 5 minutes from now
+
+        split = self.swap_legs(self.WFLR_ADDRESS, token_out_address, amount_in_wei, base_fee + priority_fee)
+        plan = RouterPlan().wrap_eth(ADDRESS_THIS, amount_in_wei)
+        for leg in split.legs:
+            plan.v3_swap_exact_in(MSG_SENDER, leg.amount_in, int(leg.amount_out * (1 - slippage)), leg.path,
+                                  payer_is_user=False)
+        commands, inputs = plan.encode()
+
+        router = abi_registry.contract(self.w3, "universal_router", self.SPARKDEX_ROUTER)
+        swap_tx = self.gas_model.fill(router.functions.execute(commands, inputs, deadline).build_transaction(
+            self.router_tx_params(user, base_fee, priority_fee, 10, value=amount_in_wei)))
+        self.logger.debug("Wrap and swap", legs=len(split.legs), amount_out=split.amount_out, tx=swap_tx)
+        return swap_tx
+
+    def swap_and_unwrap_txs(self, user: UserInfo, token_in: str, amount_in: float) -> list[TxParams]:
+        """
+        Build the transactions that swap `token_in` to native FLR.
+
+        The swap pays out WFLR to the router, which unwraps it to the user in
+        the same `execute`.
+
+        Args:
+            user (UserInfo): User whose wallet signs the transactions
+            token_in (str): Symbol of the token sold
+            amount_in (float): Amount of token_in to swap
+
+        Returns:
+            list[TxParams]: Token approval, Permit2 approval and the swap
+        """
+        slippage = 0.05
+        token_in_address = self.TOKEN_ADDRESSES[token_in.lower()]
+        contract_in = abi_registry.contract(self.w3, "erc20", token_in_address)
+        amount_in_wei = TokenAmount.from_decimal(amount_in, contract_in.functions.decimals().call()).wei
+        if amount_in_wei <= 0:
+            raise ValueError(f"Invalid amount_in: {amount_in} for {token_in}")
+
+        base_fee = self.w3.eth.get_block('latest')['baseFeePerGas']
+        priority_fee = self.w3.eth.max_priority_fee
+        deadline = self.w3.eth.get_block("latest")["timestamp"] + 300  # 5 minutes from now
+
+        split = self.swap_legs(token_in_address, self.WFLR_ADDRESS, amount_in_wei, base_fee + priority_fee)
+        return self.split_swap_txs(user, token_in_address, split, slippage, deadline, base_fee, priority_fee,
+                                   unwrap=True)
 
 
     def wrap_flr_to_wflr(self, amount_in: float):
@@ -679,18 +602,8 @@ class SparkDEX:
             str: Transaction hash
         """
         
-        WFLR_ADDRESS = "0x1D80c49BbBCd1C0911346656B529DF9E5c2F783d" 
-        
-        WFLR_ABI = [{
-            "inputs": [],
-            "name": "deposit",
-            "outputs": [],
-            "stateMutability": "payable",
-            "type": "function"
-        }]
-        
         # Initialize WFLR contract
-        wflr_contract = self.w3.eth.contract(address=WFLR_ADDRESS, abi=WFLR_ABI)
+        wflr_contract = abi_registry.contract(self.w3, "wflr", self.WFLR_ADDRESS)
 
         base_fee = self.w3.eth.get_block('latest')['baseFeePerGas']
         priority_fee = self.w3.eth.max_priority_fee
@@ -734,18 +647,8 @@ class SparkDEX:
             str: Transaction hash
         """
         
-        WFLR_ADDRESS = "0x1D80c49BbBCd1C0911346656B529DF9E5c2F783d" 
-        
-        WFLR_ABI = [{
-            "inputs": [],
-            "name": "deposit",
-            "outputs": [],
-            "stateMutability": "payable",
-            "type": "function"
-        }]
-        
         # Initialize WFLR contract
-        wflr_contract = self.w3.eth.contract(address=WFLR_ADDRESS, abi=WFLR_ABI)
+        wflr_contract = abi_registry.contract(self.w3, "wflr", self.WFLR_ADDRESS)
 
         base_fee = self.w3.eth.get_block('latest')['baseFeePerGas']
         priority_fee = self.w3.eth.max_priority_fee
@@ -755,35 +658,41 @@ class SparkDEX:
             "from": self.wallet_store.get_address(user),
             "nonce": self.get_nonce(),
             "gas": 500000,
-            "value": self.w3.to_wei(amount_in, unit="ether"),  # Sending FLR directly
+            "value": TokenAmount.from_decimal(amount_in).wei,  # Sending FLR directly
             "maxFeePerGas": 2*(base_fee + priority_fee),  
             "maxPriorityFeePerGas": 2*(priority_fee),
             "chainId": self.w3.eth.chain_id,
             "type": 2,
         })
         
-        return wrap_tx
+        return self.gas_model.fill(wrap_tx)
 
     def add_swap_txs_to_queue(self, user: UserInfo, from_token: str, to_token: str, amount: float) -> str:
         self.reset_nonce(user)
         
         
         if from_token.lower() == "flr":
-            wrap_tx = self.wrap_flr_to_wflr_tx(user, amount)
             if (to_token.lower() == "wflr"):
+                wrap_tx = self.wrap_flr_to_wflr_tx(user, amount)
                 self.flare_provider.add_tx_to_queue(
                     f"Swap {amount} {from_token} to {to_token}", 
                     [wrap_tx])
             else:
-                approval_tx, swap_tx = self.swap_erc20_tokens_tx(user, "wflr", to_token, amount)
+                # Wrap and swap in a single Universal Router transaction
+                swap_tx = self.wrap_and_swap_tx(user, to_token, amount)
                 self.flare_provider.add_tx_to_queue(
                     f"Swap {amount} {from_token} to {to_token}", 
-                    [wrap_tx, approval_tx, swap_tx])
+                    [swap_tx])
+        elif to_token.lower() == "flr":
+            swap_txs = self.swap_and_unwrap_txs(user, from_token, amount)
+            self.flare_provider.add_tx_to_queue(
+                f"Swap {amount} {from_token} to {to_token}", 
+                swap_txs)
         else:    
-            approval_tx, swap_tx = self.swap_erc20_tokens_tx(user, from_token, to_token, amount)
+            swap_txs = self.swap_erc20_tokens_tx(user, from_token, to_token, amount)
             self.flare_provider.add_tx_to_queue(
                 f"Swap {amount} {from_token} to {to_token}", 
-                [approval_tx, swap_tx])
+                swap_txs)
         
         
         formatted_preview = (
@@ -0,0 +1,138 @@
+"""
+Universal Router Command Encoding
+
+Builds `execute(commands, inputs, deadline)` calls for the SparkDEX Universal
+Router. Each command is one byte in `commands` with its ABI-encoded arguments
+at the same index in `inputs`, laid out as the router's `Dispatcher` decodes
+them, so wrapping, several swaps and unwrapping can run in a single
+transaction.
+"""
+
+from enum import IntEnum
+from typing import Self
+
+from eth_abi import encode
+from web3 import Web3
+
+PERMIT2_ADDRESS = "0x000000000022D473030F116dDEE9F6B43aC78BA3"
+# Recipient placeholders the router resolves at execution time.
+MSG_SENDER = "0x0000000000000000000000000000000000000001"
+ADDRESS_THIS = "0x0000000000000000000000000000000000000002"
+# Amount placeholder for "the router's whole balance of the token".
+CONTRACT_BALANCE = 2**255
+
+
+class Command(IntEnum):
+    """Universal Router command bytes."""
+
+    V3_SWAP_EXACT_IN = 0x00
+    SWEEP = 0x04
+    WRAP_ETH = 0x0B
+    UNWRAP_WETH = 0x0C
+
+
+class RouterPlan:
+    """
+    Sequence of Universal Router commands.
+
+    Usage:
+        plan = RouterPlan().v3_swap_exact_in(MSG_SENDER, amount, min_out, path)
+        commands, inputs = plan.encode()
+    """
+
+    def __init__(self) -> None:
+        self.commands = bytearray()
+        self.inputs: list[bytes] = []
+
+    def __len__(self) -> int:
+        return len(self.commands)
+
+    def add(self, command: Command, types: list[str], args: list) -> Self:
+        """Append a command with its ABI-encoded arguments."""
+        self.commands.append(command)
+        self.inputs.append(encode(types, args))
+        return self
+
+    def v3_swap_exact_in(
+        self,
+        recipient: str,
+        amount_in: int,
+        amount_out_min: int,
+        path: bytes,
+        *,
+        payer_is_user: bool = True,
+    ) -> Self:
+        """
+        Swap an exact input along a V3 path.
+
+        Args:
+            recipient (str): Receiver of the output, or MSG_SENDER/ADDRESS_THIS
+            amount_in (int): Input amount
+            amount_out_min (int): Revert if the output is below this
+            path (bytes): Encoded V3 path
+            payer_is_user (bool): Pull input from the caller through Permit2
+                rather than from the router's own balance
+        """
+        return self.add(
+            Command.V3_SWAP_EXACT_IN,
+            ["address", "uint256", "uint256", "bytes", "bool"],
+            [
+                Web3.to_checksum_address(recipient),
+                amount_in,
+                amount_out_min,
+                path,
+                payer_is_user,
+            ],
+        )
+
+    def wrap_eth(self, recipient: str, amount: int) -> Self:
+        """
+        Wrap native FLR sent with the call into WFLR.
+
+        Args:
+            recipient (str): Receiver of the WFLR, usually ADDRESS_THIS so
+                later commands can spend it
+            amount (int): FLR to wrap, or CONTRACT_BALANCE for all of it
+        """
+        return self.add(
+            Command.WRAP_ETH,
+            ["address", "uint256"],
+            [Web3.to_checksum_address(recipient), amount],
+        )
+
+    def unwrap_weth(self, recipient: str, amount_min: int) -> Self:
+        """
+        Unwrap the router's whole WFLR balance and send it as native FLR.
+
+        Args:
+            recipient (str): Receiver of the FLR
+            amount_min (int): Revert if the router holds less WFLR than this
+        """
+        return self.add(
+            Command.UNWRAP_WETH,
+            ["address", "uint256"],
+            [Web3.to_checksum_address(recipient), amount_min],
+        )
+
+    def sweep(self, token: str, recipient: str, amount_min: int) -> Self:
+        """
+        Send the router's whole balance of a token to `recipient`.
+
+        Args:
+            token (str): Token to sweep
+            recipient (str): Receiver of the balance
+            amount_min (int): Revert if the balance is below this
+        """
+        return self.add(
+            Command.SWEEP,
+            ["address", "address", "uint256"],
+            [
+                Web3.to_checksum_address(token),
+                Web3.to_checksum_address(recipient),
+                amount_min,
+            ],
+        )
+
+    def encode(self) -> tuple[bytes, list[bytes]]:
+        """Return the `commands` and `inputs` arguments of `execute`."""
+        return bytes(self.commands), list(self.inputs)
@@ -0,0 +1,447 @@
+"""
+Uniswap V3 Swap Simulator
+
+Replays the V3 pool `swap` loop in Python integer arithmetic over a snapshot
+of a pool's price, in-range liquidity and initialized ticks. Every step uses
+the same rounding as the `TickMath`, `SqrtPriceMath` and `SwapMath` libraries
+and the same word-by-word tick bitmap walk as the pool contract, so results
+match QuoterV2 to the wei while running in microseconds and without an RPC.
+"""
+
+import bisect
+import math
+from dataclasses import dataclass, field
+
+MIN_TICK = -887272
+MAX_TICK = 887272
+MIN_SQRT_RATIO = 4295128739
+MAX_SQRT_RATIO = 1461446703485210103287273052203988822378723970342
+Q96 = 2**96
+MAX_UINT160 = 2**160 - 1
+MAX_UINT256 = 2**256 - 1
+FEE_DENOMINATOR = 1_000_000
+
+# Multipliers for each bit of |tick|, as Q128.128 values of 1/sqrt(1.0001)^(2^i).
+_TICK_RATIOS = (
+    (0x2, 0xFFF97272373D413259A46990580E213A),
+    (0x4, 0xFFF2E50F5F656932EF12357CF3C7FDCC),
+    (0x8, 0xFFE5CACA7E10E4E61C3624EAA0941CD0),
+    (0x10, 0xFFCB9843D60F6159C9DB58835C926644),
+    (0x20, 0xFF973B41FA98C081472E6896DFB254C0),
+    (0x40, 0xFF2EA16466C96A3843EC78B326B52861),
+    (0x80, 0xFE5DEE046A99A2A811C461F1969C3053),
+    (0x100, 0xFCBE86C7900A88AEDCFFC83B479AA3A4),
+    (0x200, 0xF987A7253AC413176F2B074CF7815E54),
+    (0x400, 0xF3392B0822B70005940C7A398E4B70F3),
+    (0x800, 0xE7159475A2C29B7443B29C7FA6E889D9),
+    (0x1000, 0xD097F3BDFD2022B8845AD8F792AA5825),
+    (0x2000, 0xA9F746462D870FDF8A65DC1F90E061E5),
+    (0x4000, 0x70D869A156D2A1B890BB3DF62BAF32F7),
+    (0x8000, 0x31BE135F97D08FD981231505542FCFA6),
+    (0x10000, 0x9AA508B5B7A84E1C677DE54F3E99BC9),
+    (0x20000, 0x5D6AF8DEDB81196699C329225EE604),
+    (0x40000, 0x2216E584F5FA1EA926041BEDFE98),
+    (0x80000, 0x48A170391F7DC42444E8FA2),
+)
+
+
+class SnapshotRangeError(ValueError):
+    """Raised when a swap walks past the ticks loaded into a snapshot."""
+
+
+def mul_div(a: int, b: int, denominator: int) -> int:
+    return a * b // denominator
+
+
+def mul_div_rounding_up(a: int, b: int, denominator: int) -> int:
+    return -(-a * b // denominator)
+
+
+def div_rounding_up(a: int, b: int) -> int:
+    return -(-a // b)
+
+
+def get_sqrt_ratio_at_tick(tick: int) -> int:
+    """Return sqrt(1.0001^tick) as a Q64.96, rounded up like `TickMath`."""
+    abs_tick = abs(tick)
+    if abs_tick > MAX_TICK:
+        msg = f"Tick {tick} out of range"
+        raise ValueError(msg)
+    ratio = (
+        0xFFFCB933BD6FAD37AA2D162D1A594001
+        if abs_tick & 0x1
+        else 0x100000000000000000000000000000000
+    )
+    for bit, multiplier in _TICK_RATIOS:
+        if abs_tick & bit:
+            ratio = (ratio * multiplier) >> 128
+    if tick > 0:
+        ratio = MAX_UINT256 // ratio
+    return (ratio >> 32) + (1 if ratio % (1 << 32) else 0)
+
+
+def get_tick_at_sqrt_ratio(sqrt_price_x96: int) -> int:
+    """Return the greatest tick whose sqrt ratio is <= `sqrt_price_x96`."""
+    if not MIN_SQRT_RATIO <= sqrt_price_x96 < MAX_SQRT_RATIO:
+        msg = f"sqrtPriceX96 {sqrt_price_x96} out of range"
+        raise ValueError(msg)
+    # A float estimate lands within a tick or two; settle it exactly.
+    tick = math.floor(2 * math.log(sqrt_price_x96 / Q96) / math.log(1.0001))
+    tick = max(MIN_TICK, min(MAX_TICK, tick))
+    while tick > MIN_TICK and get_sqrt_ratio_at_tick(tick) > sqrt_price_x96:
+        tick -= 1
+    while tick < MAX_TICK and get_sqrt_ratio_at_tick(tick + 1) <= sqrt_price_x96:
+        tick += 1
+    return tick
+
+
+def get_amount0_delta(
+    sqrt_a: int, sqrt_b: int, liquidity: int, *, round_up: bool
+) -> int:
+    """Token0 amount between two prices for a liquidity, as `SqrtPriceMath`."""
+    if sqrt_a > sqrt_b:
+        sqrt_a, sqrt_b = sqrt_b, sqrt_a
+    numerator1 = liquidity << 96
+    numerator2 = sqrt_b - sqrt_a
+    if round_up:
+        return div_rounding_up(
+            mul_div_rounding_up(numerator1, numerator2, sqrt_b), sqrt_a
+        )
+    return mul_div(numerator1, numerator2, sqrt_b) // sqrt_a
+
+
+def get_amount1_delta(
+    sqrt_a: int, sqrt_b: int, liquidity: int, *, round_up: bool
+) -> int:
+    """Token1 amount between two prices for a liquidity, as `SqrtPriceMath`."""
+    if sqrt_a > sqrt_b:
+        sqrt_a, sqrt_b = sqrt_b, sqrt_a
+    if round_up:
+        return mul_div_rounding_up(liquidity, sqrt_b - sqrt_a, Q96)
+    return mul_div(liquidity, sqrt_b - sqrt_a, Q96)
+
+
+def _next_sqrt_price_from_amount0(
+    sqrt_price: int, liquidity: int, amount: int, *, add: bool
+) -> int:
+    if amount == 0:
+        return sqrt_price
+    numerator1 = liquidity << 96
+    product = amount * sqrt_price
+    if add:
+        if product <= MAX_UINT256 and numerator1 + product <= MAX_UINT256:
+            return mul_div_rounding_up(numerator1, sqrt_price, numerator1 + product)
+        return div_rounding_up(numerator1, numerator1 // sqrt_price + amount)
+    if product > MAX_UINT256 or numerator1 <= product:
+        msg = "Insufficient token0 liquidity for output"
+        raise ValueError(msg)
+    return mul_div_rounding_up(numerator1, sqrt_price, numerator1 - product)
+
+
+def _next_sqrt_price_from_amount1(
+    sqrt_price: int, liquidity: int, amount: int, *, add: bool
+) -> int:
+    if add:
+        return sqrt_price + mul_div(amount, Q96, liquidity)
+    quotient = mul_div_rounding_up(amount, Q96, liquidity)
+    if sqrt_price <= quotient:
+        msg = "Insufficient token1 liquidity for output"
+        raise ValueError(msg)
+    return sqrt_price - quotient
+
+
+def get_next_sqrt_price_from_input(
+    sqrt_price: int, liquidity: int, amount_in: int, *, zero_for_one: bool
+) -> int:
+    if zero_for_one:
+        return _next_sqrt_price_from_amount0(sqrt_price, liquidity, amount_in, add=True)
+    return _next_sqrt_price_from_amount1(sqrt_price, liquidity, amount_in, add=True)
+
+
+def get_next_sqrt_price_from_output(
+    sqrt_price: int, liquidity: int, amount_out: int, *, zero_for_one: bool
+) -> int:
+    if zero_for_one:
+        return _next_sqrt_price_from_amount1(
+            sqrt_price, liquidity, amount_out, add=False
+        )
+    return _next_sqrt_price_from_amount0(sqrt_price, liquidity, amount_out, add=False)
+
+
+def _input_between(
+    sqrt_a: int,
+    sqrt_b: int,
+    liquidity: int,
+    *,
+    zero_for_one: bool,
+) -> int:
+    """Amount paid in to move between two prices, rounded up."""
+    if zero_for_one:
+        return get_amount0_delta(sqrt_a, sqrt_b, liquidity, round_up=True)
+    return get_amount1_delta(sqrt_a, sqrt_b, liquidity, round_up=True)
+
+
+def _output_between(
+    sqrt_a: int,
+    sqrt_b: int,
+    liquidity: int,
+    *,
+    zero_for_one: bool,
+) -> int:
+    """Amount paid out when moving between two prices, rounded down."""
+    if zero_for_one:
+        return get_amount1_delta(sqrt_a, sqrt_b, liquidity, round_up=False)
+    return get_amount0_delta(sqrt_a, sqrt_b, liquidity, round_up=False)
+
+
+def compute_swap_step(
+    sqrt_price_current: int,
+    sqrt_price_target: int,
+    liquidity: int,
+    amount_remaining: int,
+    fee: int,
+) -> tuple[int, int, int, int]:
+    """
+    One step of a swap towards a target price, as `SwapMath.computeSwapStep`.
+
+    Args:
+        sqrt_price_current (int): Price at the start of the step
+        sqrt_price_target (int): Price the step may not pass
+        liquidity (int): In-range liquidity
+        amount_remaining (int): Positive for exact input, negative for exact
+            output
+        fee (int): Fee in hundredths of a bip
+
+    Returns:
+        tuple[int, int, int, int]: (sqrt_price_next, amount_in, amount_out,
+            fee_amount)
+    """
+    zero_for_one = sqrt_price_current >= sqrt_price_target
+    exact_in = amount_remaining >= 0
+    amount_in = amount_out = 0
+
+    if exact_in:
+        remaining_less_fee = mul_div(
+            amount_remaining, FEE_DENOMINATOR - fee, FEE_DENOMINATOR
+        )
+        amount_in = _input_between(
+            sqrt_price_current, sqrt_price_target, liquidity, zero_for_one=zero_for_one
+        )
+        if remaining_less_fee >= amount_in:
+            sqrt_price_next = sqrt_price_target
+        else:
+            sqrt_price_next = get_next_sqrt_price_from_input(
+                sqrt_price_current,
+                liquidity,
+                remaining_less_fee,
+                zero_for_one=zero_for_one,
+            )
+    else:
+        amount_out = _output_between(
+            sqrt_price_current, sqrt_price_target, liquidity, zero_for_one=zero_for_one
+        )
+        if -amount_remaining >= amount_out:
+            sqrt_price_next = sqrt_price_target
+        else:
+            sqrt_price_next = get_next_sqrt_price_from_output(
+                sqrt_price_current,
+                liquidity,
+                -amount_remaining,
+                zero_for_one=zero_for_one,
+            )
+
+    # The side already computed towards the target is kept if it was reached.
+    reached_target = sqrt_price_target == sqrt_price_next
+    if not (reached_target and exact_in):
+        amount_in = _input_between(
+            sqrt_price_current, sqrt_price_next, liquidity, zero_for_one=zero_for_one
+        )
+    if not (reached_target and not exact_in):
+        amount_out = _output_between(
+            sqrt_price_current, sqrt_price_next, liquidity, zero_for_one=zero_for_one
+        )
+
+    if not exact_in and amount_out > -amount_remaining:
+        amount_out = -amount_remaining
+
+    if exact_in and sqrt_price_next != sqrt_price_target:
+        fee_amount = amount_remaining - amount_in
+    else:
+        fee_amount = mul_div_rounding_up(amount_in, fee, FEE_DENOMINATOR - fee)
+    return sqrt_price_next, amount_in, amount_out, fee_amount
+
+
+@dataclass(frozen=True)
+class PoolSnapshot:
+    """
+    The parts of a V3 pool's state a swap reads.
+
+    Attributes:
+        sqrt_price_x96 (int): Current price as Q64.96
+        tick (int): Current tick
+        liquidity (int): In-range liquidity
+        fee (int): Fee in hundredths of a bip
+        tick_spacing (int): Pool tick spacing
+        liquidity_net (dict[int, int]): liquidityNet of every initialized
+            tick inside the loaded words
+        min_word (int): Lowest tick bitmap word loaded
+        max_word (int): Highest tick bitmap word loaded
+    """
+
+    sqrt_price_x96: int
+    tick: int
+    liquidity: int
+    fee: int
+    tick_spacing: int
+    liquidity_net: dict[int, int]
+    min_word: int
+    max_word: int
+    _compressed: list[int] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        object.__setattr__(
+            self,
+            "_compressed",
+            sorted(tick // self.tick_spacing for tick in self.liquidity_net),
+        )
+
+    def next_initialized_tick_within_one_word(
+        self, tick: int, *, lte: bool
+    ) -> tuple[int, bool]:
+        """Next tick to stop at, as `TickBitmap.nextInitializedTickWithinOneWord`."""
+        compressed = tick // self.tick_spacing
+        if lte:
+            word = compressed >> 8
+            lowest = word << 8
+            i = bisect.bisect_right(self._compressed, compressed)
+            if i and self._compressed[i - 1] >= lowest:
+                next_compressed, initialized = self._compressed[i - 1], True
+            else:
+                next_compressed, initialized = lowest, False
+        else:
+            compressed += 1
+            word = compressed >> 8
+            highest = (word << 8) + 255
+            i = bisect.bisect_left(self._compressed, compressed)
+            if i < len(self._compressed) and self._compressed[i] <= highest:
+                next_compressed, initialized = self._compressed[i], True
+            else:
+                next_compressed, initialized = highest, False
+        if not self.min_word <= word <= self.max_word:
+            msg = f"Swap reached tick bitmap word {word} outside the snapshot"
+            raise SnapshotRangeError(msg)
+        return next_compressed * self.tick_spacing, initialized
+
+
+@dataclass(frozen=True)
+class SimulatedSwap:
+    """
+    Outcome of a simulated swap.
+
+    Attributes:
+        amount_in (int): Input consumed, including fees
+        amount_out (int): Output received
+        fee_amount (int): Fees paid to liquidity providers
+        sqrt_price_x96_after (int): Pool price after the swap
+        tick_after (int): Pool tick after the swap
+        liquidity_after (int): In-range liquidity after the swap
+        ticks_crossed (int): Initialized ticks crossed
+        steps (int): Swap loop iterations, i.e. bitmap words and ticks visited
+    """
+
+    amount_in: int
+    amount_out: int
+    fee_amount: int
+    sqrt_price_x96_after: int
+    tick_after: int
+    liquidity_after: int
+    ticks_crossed: int
+    steps: int
+
+
+def simulate_swap(
+    snapshot: PoolSnapshot,
+    *,
+    zero_for_one: bool,
+    amount_specified: int,
+    sqrt_price_limit_x96: int | None = None,
+) -> SimulatedSwap:
+    """
+    Run the pool's swap loop against a snapshot.
+
+    Args:
+        snapshot (PoolSnapshot): Pool state to swap against
+        zero_for_one (bool): True to sell token0 for token1
+        amount_specified (int): Positive for exact input, negative for exact
+            output
+        sqrt_price_limit_x96 (int | None): Price the swap may not pass,
+            defaults to the furthest price allowed
+
+    Returns:
+        SimulatedSwap: Amounts and the pool state after the swap
+
+    Raises:
+        SnapshotRangeError: If the swap needs ticks outside the snapshot
+    """
+    if amount_specified == 0:
+        msg = "amount_specified must be non-zero"
+        raise ValueError(msg)
+    if sqrt_price_limit_x96 is None:
+        sqrt_price_limit_x96 = (
+            MIN_SQRT_RATIO + 1 if zero_for_one else MAX_SQRT_RATIO - 1
+        )
+    exact_input = amount_specified > 0
+    remaining = amount_specified
+    calculated = 0
+    sqrt_price = snapshot.sqrt_price_x96
+    tick = snapshot.tick
+    liquidity = snapshot.liquidity
+    fees = crossed = steps = 0
+
+    while remaining != 0 and sqrt_price != sqrt_price_limit_x96:
+        steps += 1
+        start_price = sqrt_price
+        tick_next, initialized = snapshot.next_initialized_tick_within_one_word(
+            tick, lte=zero_for_one
+        )
+        tick_next = max(MIN_TICK, min(MAX_TICK, tick_next))
+        sqrt_price_next = get_sqrt_ratio_at_tick(tick_next)
+        if zero_for_one:
+            target = max(sqrt_price_next, sqrt_price_limit_x96)
+        else:
+            target = min(sqrt_price_next, sqrt_price_limit_x96)
+
+        sqrt_price, step_in, step_out, step_fee = compute_swap_step(
+            sqrt_price, target, liquidity, remaining, snapshot.fee
+        )
+        fees += step_fee
+        if exact_input:
+            remaining -= step_in + step_fee
+            calculated -= step_out
+        else:
+            remaining += step_out
+            calculated += step_in + step_fee
+
+        if sqrt_price == sqrt_price_next:
+            if initialized:
+                net = snapshot.liquidity_net[tick_next]
+                liquidity += -net if zero_for_one else net
+                crossed += 1
+            tick = tick_next - 1 if zero_for_one else tick_next
+        elif sqrt_price != start_price:
+            tick = get_tick_at_sqrt_ratio(sqrt_price)
+
+    if exact_input:
+        amount_in, amount_out = amount_specified - remaining, -calculated
+    else:
+        amount_in, amount_out = calculated, -(amount_specified - remaining)
+    return SimulatedSwap(
+        amount_in=amount_in,
+        amount_out=amount_out,
+        fee_amount=fees,
+        sqrt_price_x96_after=sqrt_price,
+        tick_after=tick,
+        liquidity_after=liquidity,
+        ticks_crossed=crossed,
+        steps=steps,
+    )
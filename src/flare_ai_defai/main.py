@@ -15,12 +15,18 @@ Dependencies:
 
 import structlog
 from fastapi import FastAPI
+from web3 import Web3
 from fastapi.middleware.cors import CORSMiddleware
 
-from flare_ai_defai.blockchain import KineticMarket
+from flare_ai_defai.blockchain import KineticMarket, RateLimiter
 from flare_ai_defai.blockchain import SparkDEX
+from flare_ai_defai.blockchain.block_watcher import BlockWatcher
+from flare_ai_defai.blockchain.history import HistoryIndexer
+from flare_ai_defai.blockchain.rpc_cache import RPCCache
+from flare_ai_defai.blockchain.rpc_pool import RPCPool
 
 from flare_ai_defai.storage.fake_storage import WalletStore
+from flare_ai_defai.storage.history_store import HistoryStore
 
 from flare_ai_defai import (
     ChatRouter,
@@ -58,7 +64,7 @@ def create_app() -> FastAPI:
         - cors_origins: List of allowed CORS origins
         - gemini_api_key: API key for Gemini AI service
         - gemini_model: Model identifier for Gemini AI
-        - web3_provider_url: URL for Web3 provider
+        - web3_provider_url, web3_fallback_urls: Flare RPC endpoints
         - simulate_attestation: Boolean flag for attestation simulation
     """
     app = FastAPI(
@@ -76,23 +82,54 @@ def create_app() -> FastAPI:
 
     # Initialize router with service providers
     wallet_store = WalletStore()
-    flare_explorer = FlareExplorer(base_url=settings.web3_explorer_url)
-    flare_provider = FlareProvider(web3_provider_url=settings.web3_provider_url, wallet_store=wallet_store)
-    
-    
+    flare_explorer = FlareExplorer(
+        base_url=settings.web3_explorer_url,
+        rate_limiter=RateLimiter(
+            rate=settings.web3_explorer_rate_limit,
+            burst=int(settings.web3_explorer_rate_limit),
+        ),
+    )
+    # One pool, so every component shares the endpoints' health scores
+    rpc = RPCPool([settings.web3_provider_url, *settings.web3_fallback_urls])
+    flare_provider = FlareProvider(web3_provider_url=rpc, wallet_store=wallet_store)
+    history_store = HistoryStore(settings.history_db_path)
+    history_indexer = HistoryIndexer(
+        flare_provider.w3, history_store, wallet_store, start_block=settings.history_start_block
+    )
+    kinetic_market = KineticMarket(rpc, flare_explorer, flare_provider, wallet_store)
+    sparkdex = SparkDEX(rpc, flare_explorer, flare_provider, wallet_store)
+
+    # One response cache shared by every component's Web3 instance
+    rpc_cache = RPCCache()
+    for w3 in (flare_provider.w3, kinetic_market.w3, sparkdex.w3):
+        rpc_cache.install(w3)
+
+    # One head subscription per process; caches re-read lazily after each head.
+    # The watcher polls uncached, and the response cache hears of a head first.
+    block_watcher = BlockWatcher(Web3(rpc), ws_url=settings.web3_ws_url)
+    block_watcher.subscribe(rpc_cache.on_block)
+    for subscriber in (flare_provider, sparkdex, kinetic_market, history_indexer):
+        block_watcher.subscribe(subscriber.on_block)
+    # The indexer backfills on a thread of its own, woken by each head.
+    for component in (history_indexer, block_watcher):
+        app.router.add_event_handler("startup", component.start)
+        app.router.add_event_handler("shutdown", component.stop)
+
     chat = ChatRouter(
         ai=GeminiProvider(api_key=settings.gemini_api_key, model=settings.gemini_model),
         blockchain=flare_provider,
         flareExplorer=flare_explorer,
         attestation=Vtpm(simulate=settings.simulate_attestation),
         prompts=PromptService(),
-        kinetic_market=KineticMarket(settings.web3_provider_url, flare_explorer, flare_provider, wallet_store),
-        sparkdex=SparkDEX(settings.web3_provider_url, flare_explorer, flare_provider, wallet_store),
-        wallet_store=wallet_store
+        kinetic_market=kinetic_market,
+        sparkdex=sparkdex,
+        wallet_store=wallet_store,
+        history=history_store
     )
 
     # Register chat routes with API
     app.include_router(chat.router, prefix="/api/routes/chat", tags=["chat"])
+    app.add_api_route("/api/metrics/rpc", rpc_cache.metrics, methods=["GET"])
     return app
 
 
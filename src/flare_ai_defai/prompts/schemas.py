@@ -80,9 +80,9 @@ class TokenStakeResponse(TypedDict):
     amount: float
     
 class TokenBorrowResponse(TypedDict):
-    token: str
-    collateral: str
-    amount: float  
+    borrow_token: str
+    collateral_token: str
+    borrow_amount: float  
     
 class TokenSupplyResponse(TypedDict):
     token: str
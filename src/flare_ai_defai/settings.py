@@ -34,9 +34,19 @@ class Settings(BaseSettings):
     # URL for the Flare Network RPC provider
     #web3_provider_url: str = "https://coston2-api.flare.network/ext/C/rpc"
     web3_provider_url: str = "https://flare-api.flare.network/ext/C/rpc"
+    # Further Flare RPC endpoints; reads go to the healthiest, with hedging
+    web3_fallback_urls: list[str] = []
+    # WebSocket endpoint for new-head subscriptions; empty to poll over HTTP
+    web3_ws_url: str = "wss://flare-api.flare.network/ext/bc/C/ws"
     # URL for the Flare Network block explorer
     #web3_explorer_url: str = "https://coston2-explorer.flare.network/"
     web3_explorer_url: str = "https://flare-explorer.flare.network/"
+    # Requests per second allowed against the block explorer API
+    web3_explorer_rate_limit: float = 5.0
+    # SQLite file holding the indexed transaction history
+    history_db_path: str = "history.db"
+    # Block to start indexing history from on a fresh database (default: head)
+    history_start_block: int | None = None
 
     model_config = SettingsConfigDict(
         # This enables .env file support
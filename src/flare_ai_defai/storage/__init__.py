@@ -1,3 +1,4 @@
 from .fake_storage import WalletStore
+from .history_store import HistoryEvent, HistoryStore
 
-__all__ = ["WalletStore"]
+__all__ = ["HistoryEvent", "HistoryStore", "WalletStore"]
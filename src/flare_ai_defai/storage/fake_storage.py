@@ -81,6 +81,15 @@ class WalletStore:
         user_id = user.user_id
         return self._wallets.get(user_id)
 
+    def addresses(self) -> list[str]:
+        """
+        List the addresses of all stored wallets.
+
+        Returns:
+            list[str]: Wallet addresses, one per user
+        """
+        return [wallet["address"] for wallet in self._wallets.values()]
+
 
 # Example usage
 if __name__ == "__main__":
@@ -0,0 +1,164 @@
+"""
+Transaction History Store
+
+SQLite tables for the events the history indexer has seen, one row per
+(wallet, log), plus the indexer's checkpoint. Events and the checkpoint
+are written in one transaction, so after a restart the indexer resumes
+exactly where the stored events end. Pages are read newest first with
+keyset pagination on (block number, log index), which the primary key
+serves directly.
+"""
+
+import sqlite3
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    account TEXT NOT NULL,
+    block_number INTEGER NOT NULL,
+    log_index INTEGER NOT NULL,
+    tx_hash TEXT NOT NULL,
+    contract TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    counterparty TEXT,
+    amount0 TEXT,
+    amount1 TEXT,
+    PRIMARY KEY (account, block_number, log_index)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS checkpoints (
+    name TEXT PRIMARY KEY,
+    block_number INTEGER NOT NULL
+);
+"""
+
+# Largest page `page` returns.
+MAX_PAGE_SIZE = 200
+
+
+@dataclass(frozen=True)
+class HistoryEvent:
+    """
+    An event touching a wallet.
+
+    Attributes:
+        account (str): Wallet the event belongs to
+        block_number (int): Block it was emitted in
+        log_index (int): Position of the log in the block
+        tx_hash (str): Transaction that emitted it
+        contract (str): Emitting contract
+        kind (str): "transfer_in", "transfer_out", "approval" or "swap"
+        counterparty (str | None): Other address, e.g. the sender or spender
+        amount0 (str | None): Amount in base units; token0 delta for a swap
+        amount1 (str | None): Token1 delta for a swap
+    """
+
+    account: str
+    block_number: int
+    log_index: int
+    tx_hash: str
+    contract: str
+    kind: str
+    counterparty: str | None = None
+    amount0: str | None = None
+    amount1: str | None = None
+
+    @property
+    def cursor(self) -> str:
+        """Keyset cursor that continues a page after this event."""
+        return f"{self.block_number}:{self.log_index}"
+
+
+class HistoryStore:
+    """
+    SQLite-backed event history with a resumable checkpoint.
+
+    Attributes:
+        path (str): Database file, ":memory:" for a throwaway store
+    """
+
+    def __init__(self, path: str | Path = ":memory:") -> None:
+        self.path = str(path)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def checkpoint(self, name: str) -> int | None:
+        """Return the last block indexed under `name`, None if never run."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT block_number FROM checkpoints WHERE name = ?", (name,)
+            ).fetchone()
+        return None if row is None else row[0]
+
+    def commit(self, name: str, block_number: int, events: list[HistoryEvent]) -> None:
+        """
+        Store events and move the checkpoint in one transaction.
+
+        Args:
+            name (str): Checkpoint name
+            block_number (int): Last block the events cover
+            events (list[HistoryEvent]): Events up to `block_number`
+        """
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO events VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        e.account,
+                        e.block_number,
+                        e.log_index,
+                        e.tx_hash,
+                        e.contract,
+                        e.kind,
+                        e.counterparty,
+                        e.amount0,
+                        e.amount1,
+                    )
+                    for e in events
+                ],
+            )
+            self._conn.execute(
+                "INSERT INTO checkpoints VALUES (?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET block_number = excluded.block_number",
+                (name, block_number),
+            )
+
+    def page(
+        self, account: str, limit: int = 50, cursor: str | None = None
+    ) -> list[HistoryEvent]:
+        """
+        Return a wallet's events, newest first.
+
+        Args:
+            account (str): Wallet address
+            limit (int): Page size, capped at MAX_PAGE_SIZE
+            cursor (str | None): `cursor` of the last event of the previous page
+
+        Returns:
+            list[HistoryEvent]: Up to `limit` events older than the cursor
+
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        query = "SELECT * FROM events WHERE account = ?"
+        params: list[object] = [account]
+        if cursor:
+            try:
+                block_number, log_index = (int(part) for part in cursor.split(":"))
+            except ValueError as e:
+                msg = f"Invalid history cursor: {cursor!r}"
+                raise ValueError(msg) from e
+            query += " AND (block_number, log_index) < (?, ?)"
+            params += [block_number, log_index]
+        query += " ORDER BY block_number DESC, log_index DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [HistoryEvent(*row) for row in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -1,8 +1,24 @@
+import base64
+import datetime
+import time
+from collections.abc import Callable
+from types import SimpleNamespace
+from typing import Any
+
+import jwt
 import pytest
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+from web3 import Web3
+from web3.providers.base import JSONBaseProvider
 
 from flare_ai_defai.ai import GeminiProvider
-from flare_ai_defai.attestation import Vtpm
-from flare_ai_defai.blockchain import FlareProvider
+from flare_ai_defai.attestation import Vtpm, VtpmValidation
+from flare_ai_defai.blockchain import FlareProvider, LocalFlare
+from flare_ai_defai.blockchain.multicall import Call, CallResult
+from flare_ai_defai.storage.fake_storage import WalletStore
 
 
 @pytest.fixture
@@ -11,10 +27,207 @@ def ai_service() -> GeminiProvider:
 
 
 @pytest.fixture
-def blockchain_service() -> FlareProvider:
-    return FlareProvider("http://localhost:8545")
+def local_flare() -> LocalFlare:
+    return LocalFlare.deploy()
+
+
+@pytest.fixture
+def blockchain_service(local_flare: LocalFlare) -> FlareProvider:
+    return FlareProvider(local_flare.chain, WalletStore())
 
 
 @pytest.fixture
 def attestation_service() -> Vtpm:
     return Vtpm(simulate=True)
+
+
+class StubRPC(JSONBaseProvider):
+    """
+    JSON-RPC provider answering from per-method handlers and recording calls.
+
+    Setting `delay` makes it a slow node and `error` a failing one, so
+    several stubs can stand in for the endpoints of an RPC pool.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.handlers: dict[str, Callable[..., Any]] = {
+            "eth_chainId": lambda: "0xe",
+        }
+        self.calls: list[tuple[str, tuple]] = []
+        self.batches = 0
+        self.delay = 0.0
+        self.error: dict | None = None
+
+    def make_request(self, method: str, params: Any) -> dict:
+        self.calls.append((method, tuple(params)))
+        if self.delay:
+            time.sleep(self.delay)
+        if self.error is not None:
+            return {"jsonrpc": "2.0", "id": len(self.calls), "error": self.error}
+        result = self.handlers[method](*params)
+        return {"jsonrpc": "2.0", "id": len(self.calls), "result": result}
+
+    def make_batch_request(self, requests: list[tuple[str, Any]]) -> list[dict]:
+        self.batches += 1
+        return [self.make_request(method, params) for method, params in requests]
+
+    def count(self, method: str) -> int:
+        return sum(1 for called, _ in self.calls if called == method)
+
+
+@pytest.fixture
+def stub_rpc() -> StubRPC:
+    return StubRPC()
+
+
+@pytest.fixture
+def stub_w3(stub_rpc: StubRPC) -> Web3:
+    return Web3(stub_rpc)
+
+
+class FakeMulticall:
+    """Multicall stand-in answering calls by (target, selector)."""
+
+    def __init__(self) -> None:
+        self.responses: dict[tuple[str, bytes], Any] = {}
+        self.batches: list[tuple[list[Call], object]] = []
+
+    def on(self, target: str, selector: bytes, value: Any) -> None:
+        """Answer with `value`, or `value(calldata)` if callable; None reverts."""
+        self.responses[(target.lower(), bytes(selector))] = value
+
+    def aggregate(
+        self, calls: list[Call], block_identifier: object = "latest"
+    ) -> list[CallResult]:
+        self.batches.append((list(calls), block_identifier))
+        results = []
+        for call in calls:
+            value = self.responses.get((call.target.lower(), bytes(call.data[:4])))
+            if callable(value):
+                value = value(bytes(call.data))
+            results.append(
+                CallResult(False) if value is None else CallResult(True, tuple(value))
+            )
+        return results
+
+
+@pytest.fixture
+def fake_multicall() -> FakeMulticall:
+    return FakeMulticall()
+
+
+class FakeIssuer:
+    """Confidential Space issuer stand-in with its own JWKS and x5c chain."""
+
+    def __init__(self) -> None:
+        self.kid = "test-kid"
+        self.key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        self.well_known_fetches = 0
+        self.jwks_fetches = 0
+        now = datetime.datetime.now(tz=datetime.UTC)
+        root_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        intermediate_key = rsa.generate_private_key(
+            public_exponent=65537, key_size=2048
+        )
+        self.root_cert = self._cert("root", root_key, "root", root_key, now, ca=True)
+        self.intermediate_cert = self._cert(
+            "intermediate", intermediate_key, "root", root_key, now, ca=True
+        )
+        self.leaf_cert = self._cert(
+            "leaf", self.key, "intermediate", intermediate_key, now, ca=False
+        )
+
+    @staticmethod
+    def _cert(  # noqa: PLR0913
+        subject: str,
+        key: rsa.RSAPrivateKey,
+        issuer: str,
+        issuer_key: rsa.RSAPrivateKey,
+        now: datetime.datetime,
+        *,
+        ca: bool,
+    ) -> x509.Certificate:
+        return (
+            x509.CertificateBuilder()
+            .subject_name(x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, subject)]))
+            .issuer_name(x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, issuer)]))
+            .public_key(key.public_key())
+            .serial_number(x509.random_serial_number())
+            .not_valid_before(now - datetime.timedelta(days=1))
+            .not_valid_after(now + datetime.timedelta(days=1))
+            .add_extension(
+                x509.BasicConstraints(ca=ca, path_length=None), critical=True
+            )
+            .sign(issuer_key, hashes.SHA256())
+        )
+
+    def jwk(self) -> dict[str, str]:
+        numbers = self.key.public_key().public_numbers()
+
+        def b64(value: int) -> str:
+            raw = value.to_bytes((value.bit_length() + 7) // 8, "big")
+            return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+        return {"kid": self.kid, "kty": "RSA", "n": b64(numbers.n), "e": b64(numbers.e)}
+
+    def oidc_token(self, **claims: object) -> str:
+        return jwt.encode(
+            {"exp": int(time.time()) + 3600, **claims},
+            self.key,
+            algorithm="RS256",
+            headers={"kid": self.kid},
+        )
+
+    def pki_token(self, **claims: object) -> str:
+        x5c = [
+            base64.b64encode(cert.public_bytes(serialization.Encoding.DER)).decode()
+            for cert in (self.leaf_cert, self.intermediate_cert, self.root_cert)
+        ]
+        return jwt.encode(
+            {"exp": int(time.time()) + 3600, **claims},
+            self.key,
+            algorithm="RS256",
+            headers={"x5c": x5c},
+        )
+
+    def install(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Serve this issuer's discovery document, JWKS and root certificate."""
+
+        def get_well_known_file(_issuer: str, path: str) -> SimpleNamespace:
+            self.well_known_fetches += 1
+            return SimpleNamespace(
+                json=lambda: {"jwks_uri": "https://issuer.test/jwks"},
+                content=self.root_cert.public_bytes(serialization.Encoding.PEM),
+                path=path,
+            )
+
+        def fetch_jwks(_uri: str) -> dict[str, list[dict[str, str]]]:
+            self.jwks_fetches += 1
+            return {"keys": [self.jwk()]}
+
+        monkeypatch.setattr(
+            VtpmValidation, "_get_well_known_file", staticmethod(get_well_known_file)
+        )
+        monkeypatch.setattr(VtpmValidation, "_fetch_jwks", staticmethod(fetch_jwks))
+        # The generated root cannot match Google's pinned fingerprint.
+        monkeypatch.setattr(
+            "flare_ai_defai.attestation.vtpm_validation.CERT_FINGERPRINT",
+            ":".join(
+                format(b, "02x")
+                for b in self.root_cert.fingerprint(hashes.SHA1())  # noqa: S303
+            ).upper(),
+        )
+
+
+@pytest.fixture(scope="session")
+def _issuer() -> FakeIssuer:
+    return FakeIssuer()
+
+
+@pytest.fixture
+def fake_issuer(_issuer: FakeIssuer, monkeypatch: pytest.MonkeyPatch) -> FakeIssuer:
+    _issuer.well_known_fetches = 0
+    _issuer.jwks_fetches = 0
+    _issuer.install(monkeypatch)
+    return _issuer
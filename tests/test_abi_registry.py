@@ -0,0 +1,65 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from web3 import Web3
+
+from flare_ai_defai.blockchain.abi_registry import AbiRegistry, abi_registry
+
+ROUTER = "0x8a1E35F5c98C4E85B36B7B253222eE17773b2781"
+
+
+def test_selectors_and_topics_are_precomputed() -> None:
+    assert abi_registry.selector("erc20", "approve").hex() == "095ea7b3"
+    assert abi_registry.selector("erc20", "approve(address,uint256)").hex() == (
+        "095ea7b3"
+    )
+    assert abi_registry.topic("erc20", "Transfer").hex() == (
+        "ddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef"
+    )
+
+
+def test_contracts_are_cached_per_web3_and_address() -> None:
+    w3 = Web3()
+    contract = abi_registry.contract(w3, "swap_router", ROUTER)
+    assert abi_registry.contract(w3, "swap_router", ROUTER.lower()) is contract
+    assert abi_registry.contract(Web3(), "swap_router", ROUTER) is not contract
+
+
+def test_lazy_abi_loaded_once() -> None:
+    registry = AbiRegistry()
+    calls = []
+
+    def loader() -> list[dict]:
+        calls.append(1)
+        return abi_registry.abi("erc20")
+
+    registry.register_lazy("remote", loader)
+    assert "remote" in registry
+    registry.selector("remote", "balanceOf")
+    registry.selector("remote", "decimals")
+    assert len(calls) == 1
+
+
+def test_concurrent_first_lookups_load_once() -> None:
+    registry = AbiRegistry()
+    calls = []
+    started = threading.Event()
+
+    def loader() -> list[dict]:
+        calls.append(1)
+        started.wait(timeout=1)
+        return abi_registry.abi("erc20")
+
+    registry.register_lazy("remote", loader)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        lookups = [pool.submit(registry.get, "remote") for _ in range(4)]
+        started.set()
+        parsed = {id(lookup.result()) for lookup in lookups}
+    assert len(calls) == 1
+    assert len(parsed) == 1
+
+
+def test_unknown_abi_raises() -> None:
+    with pytest.raises(KeyError, match="No ABI registered"):
+        AbiRegistry().get("missing")
@@ -0,0 +1,150 @@
+from eth_abi import encode
+from web3 import Web3
+
+from flare_ai_defai.blockchain.abi_registry import abi_registry
+from flare_ai_defai.blockchain.allowances import (
+    MAX_UINT256,
+    AllowanceTracker,
+)
+from flare_ai_defai.blockchain.block_watcher import HEAD_LAG_BLOCKS
+from flare_ai_defai.blockchain.universal_router import PERMIT2_ADDRESS
+
+from .conftest import FakeMulticall, StubRPC
+
+OWNER = "0x00000000000000000000000000000000000000aA"
+TOKEN = "0x0B38e83B86d491735fEaa0a791F65c2B99535396"
+ROUTER = "0x8a1E35F5c98C4E85B36B7B253222eE17773b2781"
+
+
+def _setup(stub_rpc: StubRPC, fake_multicall: FakeMulticall) -> dict:
+    chain = {"head": 100, "logs": []}
+    stub_rpc.handlers["eth_blockNumber"] = lambda: hex(chain["head"])
+    stub_rpc.handlers["eth_getLogs"] = lambda log_filter: [
+        log
+        for log in chain["logs"]
+        if int(log_filter["fromBlock"], 16)
+        <= log["blockNumber"]
+        <= int(log_filter["toBlock"], 16)
+    ]
+    fake_multicall.on(TOKEN, abi_registry.selector("erc20", "allowance"), (0,))
+    fake_multicall.on(
+        PERMIT2_ADDRESS, abi_registry.selector("permit2", "allowance"), (0, 0, 0)
+    )
+    return chain
+
+
+def _topic(address: str) -> str:
+    return "0x" + "00" * 12 + address[2:].lower()
+
+
+def _approval(amount: int, block: int) -> dict:
+    return {
+        "address": TOKEN,
+        "topics": [
+            Web3.to_hex(abi_registry.topic("erc20", "Approval")),
+            _topic(OWNER),
+            _topic(ROUTER),
+        ],
+        "data": Web3.to_hex(encode(["uint256"], [amount])),
+        "blockNumber": block,
+    }
+
+
+def test_allowances_load_in_one_multicall(
+    stub_w3: Web3, stub_rpc: StubRPC, fake_multicall: FakeMulticall
+) -> None:
+    _setup(stub_rpc, fake_multicall)
+    tracker = AllowanceTracker(stub_w3, fake_multicall)
+    tracker.load(
+        OWNER,
+        erc20=[(TOKEN, ROUTER), (TOKEN, PERMIT2_ADDRESS)],
+        permit2=[(TOKEN, ROUTER)],
+    )
+    assert len(fake_multicall.batches) == 1
+    assert len(fake_multicall.batches[0][0]) == 3  # noqa: PLR2004
+
+    assert tracker.required_approval(OWNER, TOKEN, ROUTER, 10) == 10  # noqa: PLR2004
+    assert tracker.required_approval(OWNER, TOKEN, ROUTER, 10, "max") == MAX_UINT256
+    assert tracker.required_permit2_approval(OWNER, TOKEN, ROUTER, 10, 5000) == (
+        10,
+        5000,
+    )
+    assert len(fake_multicall.batches) == 1
+
+
+def test_max_approval_event_skips_later_approvals(
+    stub_w3: Web3, stub_rpc: StubRPC, fake_multicall: FakeMulticall
+) -> None:
+    chain = _setup(stub_rpc, fake_multicall)
+    tracker = AllowanceTracker(stub_w3, fake_multicall)
+    assert tracker.required_approval(OWNER, TOKEN, ROUTER, 10, "max") == MAX_UINT256
+    tracker.record_spend(OWNER, TOKEN, ROUTER, 10)
+
+    chain["head"] = 101 + HEAD_LAG_BLOCKS
+    chain["logs"] = [_approval(MAX_UINT256, 101)]
+    assert tracker.required_approval(OWNER, TOKEN, ROUTER, 10**30) is None
+    tracker.record_spend(OWNER, TOKEN, ROUTER, 10**30)
+    assert tracker.allowance(OWNER, TOKEN, ROUTER) == MAX_UINT256
+    assert len(fake_multicall.batches) == 1
+
+
+def test_exact_approval_is_consumed_by_queued_spend(
+    stub_w3: Web3, stub_rpc: StubRPC, fake_multicall: FakeMulticall
+) -> None:
+    chain = _setup(stub_rpc, fake_multicall)
+    tracker = AllowanceTracker(stub_w3, fake_multicall)
+    assert tracker.required_approval(OWNER, TOKEN, ROUTER, 10) == 10  # noqa: PLR2004
+    tracker.record_spend(OWNER, TOKEN, ROUTER, 10)
+
+    # The approval the spend was queued behind confirms; nothing is left.
+    chain["head"] = 101 + HEAD_LAG_BLOCKS
+    chain["logs"] = [_approval(10, 101)]
+    assert tracker.allowance(OWNER, TOKEN, ROUTER) == 0
+    assert tracker.required_approval(OWNER, TOKEN, ROUTER, 10) == 10  # noqa: PLR2004
+
+
+def test_permit2_lockdown_revokes_cached_allowance(
+    stub_w3: Web3, stub_rpc: StubRPC, fake_multicall: FakeMulticall
+) -> None:
+    chain = _setup(stub_rpc, fake_multicall)
+    fake_multicall.on(
+        PERMIT2_ADDRESS, abi_registry.selector("permit2", "allowance"), (50, 9000, 0)
+    )
+    tracker = AllowanceTracker(stub_w3, fake_multicall)
+    assert tracker.required_permit2_approval(OWNER, TOKEN, ROUTER, 10, 5000) is None
+
+    chain["head"] = 101 + HEAD_LAG_BLOCKS
+    chain["logs"] = [
+        {
+            "address": PERMIT2_ADDRESS,
+            "topics": [
+                Web3.to_hex(abi_registry.topic("permit2", "Lockdown")),
+                _topic(OWNER),
+            ],
+            "data": Web3.to_hex(encode(["address", "address"], [TOKEN, ROUTER])),
+            "blockNumber": 101,
+        }
+    ]
+    assert tracker.permit2_allowance(OWNER, TOKEN, ROUTER) == (0, 9000)
+    assert tracker.required_permit2_approval(OWNER, TOKEN, ROUTER, 10, 5000) == (
+        10,
+        5000,
+    )
+
+
+def test_approvals_near_the_head_wait_for_a_later_sync(
+    stub_w3: Web3, stub_rpc: StubRPC, fake_multicall: FakeMulticall
+) -> None:
+    chain = _setup(stub_rpc, fake_multicall)
+    tracker = AllowanceTracker(stub_w3, fake_multicall)
+    assert tracker.required_approval(OWNER, TOKEN, ROUTER, 10) == 10  # noqa: PLR2004
+    assert tracker.block_number == 100 - HEAD_LAG_BLOCKS
+
+    # An approval at the tip could still be reorged out, so it is not cached.
+    chain["head"] = 101
+    chain["logs"] = [_approval(50, 101)]
+    assert tracker.allowance(OWNER, TOKEN, ROUTER) == 0
+    assert tracker.block_number == 101 - HEAD_LAG_BLOCKS
+
+    chain["head"] = 101 + HEAD_LAG_BLOCKS
+    assert tracker.allowance(OWNER, TOKEN, ROUTER) == 50  # noqa: PLR2004
@@ -0,0 +1,48 @@
+from decimal import Decimal
+
+import pytest
+
+from flare_ai_defai.blockchain.amounts import TokenAmount, format_amounts
+
+
+@pytest.mark.parametrize(
+    ("value", "decimals", "wei"),
+    [
+        (0.1, 18, 10**17),
+        ("1.5", 6, 1_500_000),
+        (Decimal("0.0000001"), 6, 0),
+        (Decimal("123456789.123456789123456789"), 18, 123456789123456789123456789),
+        (3, 0, 3),
+    ],
+)
+def test_from_decimal_is_exact(value: object, decimals: int, wei: int) -> None:
+    assert TokenAmount.from_decimal(value, decimals).wei == wei
+
+
+@pytest.mark.parametrize("value", ["-1", "abc", "NaN", "Infinity"])
+def test_from_decimal_rejects_invalid(value: str) -> None:
+    with pytest.raises(ValueError, match="Invalid token amount"):
+        TokenAmount.from_decimal(value)
+
+
+def test_conversions_and_arithmetic() -> None:
+    amount = TokenAmount(1_234_500, 6)
+    assert str(amount) == "1.2345"
+    assert amount.to_decimal() == Decimal("1.2345")
+    assert float(amount) == 1.2345  # noqa: PLR2004
+    assert str(TokenAmount(5 * 10**18)) == "5"
+    assert (amount + TokenAmount(500, 6)).wei == 1_235_000
+    with pytest.raises(TypeError):
+        amount + TokenAmount(1, 18)
+    with pytest.raises(ValueError, match="negative"):
+        amount - TokenAmount(2 * 10**6, 6)
+
+
+def test_format_amounts_aligns_column() -> None:
+    rows = format_amounts(
+        [TokenAmount(1234 * 10**18 + 5 * 10**17), TokenAmount(7, 6), TokenAmount(0)],
+        places=2,
+    )
+    assert rows == ["1,234.50", "    0.00", "    0.00"]
+    assert format_amounts([TokenAmount(19, 1)], places=3) == ["1.900"]
+    assert format_amounts([]) == []
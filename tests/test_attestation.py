@@ -0,0 +1,93 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from flare_ai_defai.attestation import FakeTeeServer, Vtpm, VtpmAttestationError
+
+NONCE = "0123456789abcdef"
+
+
+def test_token_is_cached_until_expiry() -> None:
+    with FakeTeeServer() as tee:
+        vtpm = Vtpm(unix_socket_path=tee.socket_path)
+        first = vtpm.get_token([NONCE])
+        assert vtpm.get_token([NONCE]) == first
+        vtpm.get_token([NONCE, "another-nonce-1"])
+        vtpm.close()
+    assert len(tee.requests) == 2
+    assert tee.requests[0]["nonces"] == [NONCE]
+
+
+def test_nearly_expired_token_is_refreshed() -> None:
+    with FakeTeeServer(token_lifetime=30) as tee:
+        vtpm = Vtpm(unix_socket_path=tee.socket_path, expiry_margin=60)
+        vtpm.get_token([NONCE])
+        vtpm.get_token([NONCE])
+        vtpm.close()
+    assert len(tee.requests) == 2
+
+
+def test_token_cache_is_bounded() -> None:
+    with FakeTeeServer() as tee:
+        vtpm = Vtpm(unix_socket_path=tee.socket_path, max_cached=2)
+        for i in range(5):
+            vtpm.get_token([f"{NONCE}-{i}"])
+        assert len(vtpm._token_cache) == 2  # noqa: SLF001, PLR2004
+        vtpm.get_token([f"{NONCE}-4"])
+        vtpm.close()
+    assert len(tee.requests) == 5  # noqa: PLR2004
+
+
+def test_stale_tokens_are_evicted() -> None:
+    with FakeTeeServer(token_lifetime=30) as tee:
+        vtpm = Vtpm(unix_socket_path=tee.socket_path, expiry_margin=60)
+        for i in range(5):
+            vtpm.get_token([f"{NONCE}-{i}"])
+        vtpm.close()
+    assert len(vtpm._token_cache) == 1  # noqa: SLF001
+
+
+def test_connection_is_kept_alive() -> None:
+    with FakeTeeServer(token_lifetime=0) as tee:
+        vtpm = Vtpm(unix_socket_path=tee.socket_path)
+        for i in range(5):
+            vtpm.get_token([f"{NONCE}-{i}"])
+        vtpm.close()
+    assert tee.connections == 1
+
+
+def test_concurrent_requests_are_coalesced() -> None:
+    with FakeTeeServer(delay=0.2) as tee:
+        vtpm = Vtpm(unix_socket_path=tee.socket_path)
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            tokens = list(pool.map(lambda _: vtpm.get_token([NONCE]), range(8)))
+        vtpm.close()
+    assert len(set(tokens)) == 1
+    assert len(tee.requests) == 1
+
+
+def test_get_token_async() -> None:
+    with FakeTeeServer() as tee:
+        vtpm = Vtpm(unix_socket_path=tee.socket_path)
+        token = asyncio.run(vtpm.get_token_async([NONCE], token_type="PKI"))
+        vtpm.close()
+    assert token
+    assert tee.requests[0]["token_type"] == "PKI"
+
+
+def test_error_status_raises_and_is_not_cached() -> None:
+    with FakeTeeServer(status=500) as tee:
+        vtpm = Vtpm(unix_socket_path=tee.socket_path)
+        with pytest.raises(VtpmAttestationError, match="500"):
+            vtpm.get_token([NONCE])
+        with pytest.raises(VtpmAttestationError):
+            vtpm.get_token([NONCE])
+        vtpm.close()
+    assert len(tee.requests) == 2
+
+
+def test_missing_socket_raises() -> None:
+    vtpm = Vtpm(unix_socket_path="/nonexistent/teeserver.sock")
+    with pytest.raises(VtpmAttestationError, match="Failed to reach"):
+        vtpm.get_token([NONCE])
@@ -0,0 +1,174 @@
+import requests
+from web3 import Web3
+
+from flare_ai_defai.blockchain.abi_registry import abi_registry
+from flare_ai_defai.blockchain.balances import TRANSFER_TOPIC, BalanceCache
+from flare_ai_defai.blockchain.block_watcher import HEAD_LAG_BLOCKS, BlockHeader
+from flare_ai_defai.blockchain.multicall import MULTICALL3_ADDRESS
+
+from .conftest import FakeMulticall, StubRPC
+
+WALLET = "0x00000000000000000000000000000000000000AA"
+OTHER = "0x00000000000000000000000000000000000000bb"
+USDC = "0xFbDa5F676cB37624f28265A144A48B0d6e87d3b6"
+
+
+def _header(number: int) -> BlockHeader:
+    return BlockHeader(number, "0x" + "00" * 32, 1_700_000_000 + number, 25 * 10**9)
+
+
+def _checking(number: int) -> BlockHeader:
+    """The head at which block `number` is checked for activity."""
+    return _header(number + HEAD_LAG_BLOCKS)
+
+
+def _topic(address: str) -> str:
+    return "0x" + "00" * 12 + address[2:].lower()
+
+
+def _chain(stub_rpc: StubRPC, logs: dict, txs: dict) -> None:
+    def get_logs(params: dict) -> list[dict]:
+        start, end = int(params["fromBlock"], 16), int(params["toBlock"], 16)
+        position = len(params["topics"]) - 1
+        return [
+            log
+            for number in range(start, end + 1)
+            for log in logs.get(number, [])
+            if log["topics"][position] in params["topics"][position]
+        ]
+
+    stub_rpc.handlers["eth_getLogs"] = get_logs
+    stub_rpc.handlers["eth_getBlockByNumber"] = lambda number, _: {
+        "number": number,
+        "hash": "0x" + "00" * 32,
+        "timestamp": "0x0",
+        "transactions": txs.get(int(number, 16), []),
+    }
+
+
+def _cache(stub_w3: Web3, fake_multicall: FakeMulticall) -> BalanceCache:
+    fake_multicall.on(
+        MULTICALL3_ADDRESS,
+        abi_registry.selector("multicall3", "getEthBalance"),
+        (3 * 10**18,),
+    )
+    fake_multicall.on(USDC, abi_registry.selector("erc20", "balanceOf"), (5 * 10**6,))
+    fake_multicall.on(USDC, abi_registry.selector("erc20", "decimals"), (6,))
+    return BalanceCache(stub_w3, {"usdc": USDC}, fake_multicall)
+
+
+def test_reads_once_until_a_transfer_touches_the_wallet(
+    stub_w3: Web3, stub_rpc: StubRPC, fake_multicall: FakeMulticall
+) -> None:
+    transfer = {
+        "address": USDC,
+        "topics": [Web3.to_hex(TRANSFER_TOPIC), _topic(OTHER), _topic(WALLET)],
+        "data": "0x" + "00" * 32,
+        "blockNumber": hex(12),
+        "logIndex": "0x0",
+        "transactionHash": "0x" + "12" * 32,
+        "transactionIndex": "0x0",
+        "blockHash": "0x" + "00" * 32,
+        "removed": False,
+    }
+    _chain(stub_rpc, logs={12: [transfer]}, txs={})
+    cache = _cache(stub_w3, fake_multicall)
+
+    balances = cache.balances(WALLET)
+    assert (balances["flr"].wei, balances["usdc"].wei) == (3 * 10**18, 5 * 10**6)
+    assert balances["usdc"].decimals == 6  # noqa: PLR2004
+    cache.balances(WALLET)
+    assert len(fake_multicall.batches) == 1
+
+    cache.on_block(_checking(10))
+    cache.on_block(_checking(11))
+    cache.balances(WALLET)
+    assert len(fake_multicall.batches) == 1
+
+    cache.on_block(_checking(12))
+    cache.balances(WALLET)
+    assert len(fake_multicall.batches) == 2  # noqa: PLR2004
+    # Decimals are only read the first time.
+    assert len(fake_multicall.batches[1][0]) == 2  # noqa: PLR2004
+
+
+def test_sent_transactions_invalidate_and_idle_wallets_cost_nothing(
+    stub_w3: Web3, stub_rpc: StubRPC, fake_multicall: FakeMulticall
+) -> None:
+    _chain(stub_rpc, logs={}, txs={21: [{"from": WALLET, "to": OTHER, "value": 0}]})
+    now = [0.0]
+    cache = _cache(stub_w3, fake_multicall)
+    cache.clock = lambda: now[0]
+    cache.on_block(_checking(20))
+    cache.balances(WALLET)
+
+    cache.on_block(_checking(21))
+    cache.balances(WALLET)
+    assert len(fake_multicall.batches) == 2  # noqa: PLR2004
+
+    now[0] = cache.idle_seconds + 1
+    calls = len(stub_rpc.calls)
+    cache.on_block(_checking(22))
+    assert len(stub_rpc.calls) == calls
+
+
+def test_read_racing_a_touching_block_is_not_kept(
+    stub_w3: Web3, stub_rpc: StubRPC, fake_multicall: FakeMulticall
+) -> None:
+    _chain(stub_rpc, logs={}, txs={31: [{"from": WALLET, "to": OTHER, "value": 0}]})
+    cache = _cache(stub_w3, fake_multicall)
+    cache.on_block(_checking(30))
+    arriving = [_checking(31)]
+
+    def native_balance(_data: bytes) -> tuple[int]:
+        # Block 31 is published while the first read is in flight.
+        if arriving:
+            cache.on_block(arriving.pop())
+        return (3 * 10**18,)
+
+    fake_multicall.on(
+        MULTICALL3_ADDRESS,
+        abi_registry.selector("multicall3", "getEthBalance"),
+        native_balance,
+    )
+    cache.balances(WALLET)
+    cache.balances(WALLET)
+    assert len(fake_multicall.batches) == 2  # noqa: PLR2004
+
+
+def test_failed_activity_check_drops_watched_wallets(
+    stub_w3: Web3, stub_rpc: StubRPC, fake_multicall: FakeMulticall
+) -> None:
+    _chain(stub_rpc, logs={}, txs={})
+    cache = _cache(stub_w3, fake_multicall)
+    cache.on_block(_checking(40))
+    cache.balances(WALLET)
+
+    def unreachable(_params: dict) -> list[dict]:
+        msg = "node unreachable"
+        raise requests.ConnectionError(msg)
+
+    stub_rpc.handlers["eth_getLogs"] = unreachable
+    cache.on_block(_checking(41))
+    cache.balances(WALLET)
+    assert len(fake_multicall.batches) == 2  # noqa: PLR2004
+
+
+def test_blocks_near_the_head_wait_and_reads_are_pinned(
+    stub_w3: Web3, stub_rpc: StubRPC, fake_multicall: FakeMulticall
+) -> None:
+    _chain(stub_rpc, logs={}, txs={51: [{"from": WALLET, "to": OTHER, "value": 0}]})
+    cache = _cache(stub_w3, fake_multicall)
+    cache.on_block(_checking(50))
+    cache.balances(WALLET)
+    assert cache.block_number == 50  # noqa: PLR2004
+    assert fake_multicall.batches[0][1] == 50  # noqa: PLR2004
+
+    # Block 51 is the head but could still be reorged out; it is not checked.
+    cache.on_block(_header(51))
+    cache.balances(WALLET)
+    assert len(fake_multicall.batches) == 1
+
+    cache.on_block(_checking(51))
+    cache.balances(WALLET)
+    assert fake_multicall.batches[1][1] == 51  # noqa: PLR2004
@@ -0,0 +1,88 @@
+import threading
+
+from web3 import Web3
+
+from flare_ai_defai.blockchain import FlareProvider
+from flare_ai_defai.blockchain.block_watcher import BlockHeader, BlockWatcher
+from flare_ai_defai.blockchain.kinetic_indexer import KineticIndexer
+from flare_ai_defai.models import UserInfo
+from flare_ai_defai.storage.fake_storage import WalletStore
+
+from .conftest import FakeMulticall, StubRPC
+
+ORACLE = "0x00000000000000000000000000000000000000fe"
+
+
+def _block(number: int) -> dict:
+    return {
+        "number": hex(number),
+        "hash": "0x" + f"{number:02x}" * 32,
+        "timestamp": hex(1_700_000_000 + number),
+        "baseFeePerGas": hex(25 * 10**9),
+        "transactions": [],
+    }
+
+
+def _header(number: int) -> BlockHeader:
+    return BlockHeader.from_rpc(_block(number))
+
+
+def test_publishes_each_head_once(stub_w3: Web3) -> None:
+    watcher = BlockWatcher(stub_w3)
+    seen: list[int] = []
+
+    def failing(_: BlockHeader) -> None:
+        msg = "subscriber bug"
+        raise RuntimeError(msg)
+
+    watcher.subscribe(failing)
+    unsubscribe = watcher.subscribe(lambda header: seen.append(header.number))
+    assert watcher.publish(_header(10))
+    assert not watcher.publish(_header(10))
+    assert not watcher.publish(_header(9))
+    assert watcher.publish(_header(12))
+    unsubscribe()
+    watcher.publish(_header(13))
+    assert seen == [10, 12]
+    assert watcher.head == _header(13)
+
+
+def test_falls_back_to_polling(stub_w3: Web3, stub_rpc: StubRPC) -> None:
+    stub_rpc.handlers["eth_getBlockByNumber"] = lambda *_: _block(42)
+    watcher = BlockWatcher(stub_w3, ws_url="ws://127.0.0.1:1", poll_interval=0.01)
+    arrived = threading.Event()
+    watcher.subscribe(lambda _: arrived.set())
+    watcher.start()
+    try:
+        assert arrived.wait(5)
+    finally:
+        watcher.stop()
+    assert watcher.head is not None
+    assert watcher.head.number == 42  # noqa: PLR2004
+
+
+def test_subscribers_skip_head_requests(
+    stub_w3: Web3, stub_rpc: StubRPC, fake_multicall: FakeMulticall
+) -> None:
+    indexer = KineticIndexer(stub_w3, fake_multicall, markets=[], oracle_address=ORACLE)
+    indexer.on_block(_header(120))
+    assert indexer.refresh() == 120  # noqa: PLR2004
+    assert indexer.block_number == 120  # noqa: PLR2004
+
+    user = UserInfo(user_id="watcher", email="watcher@example.com")
+    wallets = WalletStore()
+    wallets.store_wallet(user, "0x00000000000000000000000000000000000000AA", "0x")
+    provider = FlareProvider("http://localhost:8545", wallets)
+    provider.w3 = stub_w3
+    stub_rpc.handlers.update(
+        {
+            "eth_getTransactionCount": lambda *_: hex(3),
+            "eth_maxPriorityFeePerGas": lambda: hex(10**9),
+        }
+    )
+    provider.on_block(_header(120))
+    context = provider.chain_context(user)
+    assert (context.nonce, context.base_fee) == (3, 25 * 10**9)
+    assert context.timestamp == 1_700_000_120  # noqa: PLR2004
+    assert stub_rpc.count("eth_blockNumber") == 0
+    assert stub_rpc.count("eth_getBlockByNumber") == 0
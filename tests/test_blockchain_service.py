@@ -1,7 +1,10 @@
 from flare_ai_defai.blockchain import FlareProvider
+from flare_ai_defai.models import UserInfo
 
 
-def test_generate_account() -> None:
-    service = FlareProvider("http://localhost:8545")
-    address = service.generate_account()
+def test_generate_account(blockchain_service: FlareProvider) -> None:
+    user = UserInfo(user_id="user", email="user@example.com")
+    address, _ = blockchain_service.generate_account(user)
     assert address.startswith("0x")
+    assert blockchain_service.wallet_store.get_address(user) == address
+    assert blockchain_service.check_balance(user) == 0
@@ -0,0 +1,61 @@
+import asyncio
+import json
+from types import SimpleNamespace
+from typing import Any
+
+from flare_ai_defai.api.routes.chat import ChatRouter
+from flare_ai_defai.models import UserInfo
+from flare_ai_defai.prompts import PromptService
+from flare_ai_defai.prompts.schemas import TokenBorrowResponse
+
+USER = UserInfo(user_id="chat-test", email="chat@example.com")
+
+
+class StubKinetic:
+    def __init__(self) -> None:
+        self.calls: list[tuple[str, tuple, dict]] = []
+        self.risk = SimpleNamespace(health_factor=2.0)
+
+    def previewBorrow(self, *args: Any) -> SimpleNamespace:  # noqa: N802
+        self.calls.append(("previewBorrow", args, {}))
+        return self.risk
+
+    def borrowTx(self, *args: Any, **kwargs: Any) -> list[dict]:  # noqa: N802
+        self.calls.append(("borrowTx", args, kwargs))
+        return [{"to": "0x0"}]
+
+
+def _router(answer: dict, kinetic: StubKinetic, queued: list) -> ChatRouter:
+    ai = SimpleNamespace(generate=lambda **_: SimpleNamespace(text=json.dumps(answer)))
+    blockchain = SimpleNamespace(
+        tx_queue=queued,
+        add_tx_to_queue=lambda msg, txs: queued.append((msg, txs)),
+        preflight=lambda: None,
+    )
+    return ChatRouter(
+        ai=ai,
+        blockchain=blockchain,
+        flareExplorer=None,
+        attestation=None,
+        prompts=PromptService(),
+        kinetic_market=kinetic,
+        sparkdex=None,
+        wallet_store=None,
+    )
+
+
+def test_borrow_answer_in_schema_queues_a_bundle() -> None:
+    answer = {"borrow_token": "USDC", "collateral_token": "SFLR", "borrow_amount": 5.0}
+    assert set(answer) == set(TokenBorrowResponse.__annotations__)
+    kinetic, queued = StubKinetic(), []
+    router = _router(answer, kinetic, queued)
+
+    message = "borrow 5 usdc against sflr"
+    response = asyncio.run(router.handle_borrow(message, USER))
+
+    assert queued == [(message, [{"to": "0x0"}])]
+    assert "Health factor after borrowing: 2.00" in response["response"]
+    # The preview's risk is handed to borrowTx rather than computed twice.
+    assert [name for name, _, _ in kinetic.calls] == ["previewBorrow", "borrowTx"]
+    assert kinetic.calls[1][1][1:] == ("USDC", 5.0, "SFLR")
+    assert kinetic.calls[1][2] == {"risk": kinetic.risk}
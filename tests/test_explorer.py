@@ -0,0 +1,79 @@
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
+
+from flare_ai_defai.blockchain import AsyncFlareExplorer, FlareExplorer, RateLimiter
+
+ABI = [{"type": "function", "name": "decimals", "inputs": [], "outputs": []}]
+
+
+class FakeResponse:
+    def __init__(self, payload: dict) -> None:
+        self.text = json.dumps(payload)
+
+    def raise_for_status(self) -> None:
+        pass
+
+
+def test_rate_limiter_spaces_requests() -> None:
+    limiter = RateLimiter(rate=50, burst=1)
+    start = time.monotonic()
+    for _ in range(5):
+        limiter.acquire()
+    assert time.monotonic() - start >= 4 / 50 * 0.9
+
+
+def test_rate_limiter_rejects_non_positive_rate() -> None:
+    with pytest.raises(ValueError, match="Rate must be positive"):
+        RateLimiter(rate=0)
+
+
+def test_get_contract_abi_reuses_session(monkeypatch: pytest.MonkeyPatch) -> None:
+    explorer = FlareExplorer("https://explorer.test/api")
+    calls = []
+
+    def fake_get(url: str, **kwargs: object) -> FakeResponse:
+        calls.append((url, kwargs["params"]))
+        return FakeResponse({"result": json.dumps(ABI)})
+
+    monkeypatch.setattr(explorer.session, "get", fake_get)
+    assert explorer.get_contract_abi("0xabc") == ABI
+    assert explorer.get_contract_abi("0xdef") == ABI
+    assert [params["address"] for _, params in calls] == ["0xabc", "0xdef"]
+
+
+def test_malformed_response_raises(monkeypatch: pytest.MonkeyPatch) -> None:
+    explorer = FlareExplorer("https://explorer.test/api")
+    monkeypatch.setattr(
+        explorer.session, "get", lambda *_, **__: FakeResponse({"message": "NOTOK"})
+    )
+    with pytest.raises(ValueError, match="Malformed response"):
+        explorer.get_contract_abi("0xabc")
+
+
+def test_async_explorer_retries_on_throttling() -> None:
+    attempts = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        attempts.append(request)
+        if len(attempts) < 3:
+            return httpx.Response(429)
+        return httpx.Response(200, json={"result": json.dumps(ABI)})
+
+    async def run() -> list[dict]:
+        explorer = AsyncFlareExplorer(
+            "https://explorer.test/api",
+            backoff_factor=0.001,
+            rate_limiter=RateLimiter(rate=1000, burst=10),
+        )
+        explorer.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        try:
+            return await explorer.get_contract_abi("0xabc")
+        finally:
+            await explorer.close()
+
+    assert asyncio.run(run()) == ABI
+    assert len(attempts) == 3
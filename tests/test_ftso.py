@@ -0,0 +1,92 @@
+from decimal import Decimal
+
+import requests
+from eth_abi import decode, encode
+from hexbytes import HexBytes
+from web3 import Web3
+
+from flare_ai_defai.blockchain.abi_registry import abi_registry
+from flare_ai_defai.blockchain.amounts import TokenAmount
+from flare_ai_defai.blockchain.ftso import (
+    FIRST_VOTING_EPOCH_START,
+    VOTING_EPOCH_SECONDS,
+    PriceService,
+    feed_id,
+)
+
+from .conftest import StubRPC
+
+FTSO = "0x7BDE3Df0624114eDB3A67dFe6753e62f4e7c1d20"
+
+
+def _serve_feeds(stub_rpc: StubRPC) -> None:
+    selector = abi_registry.selector("ftso_v2", "getFeedsById")
+    prices = {
+        feed_id("FLR/USD"): (2_000_000, 8),
+        feed_id("USDC/USD"): (99_990, 5),
+    }
+
+    def eth_call(tx: dict, _block: str) -> str:
+        data = HexBytes(tx["data"])
+        assert data[:4] == selector
+        (ids,) = decode(["bytes21[]"], data[4:])
+        values, decimals = zip(*(prices[i] for i in ids), strict=True)
+        return Web3.to_hex(
+            encode(
+                ["uint256[]", "int8[]", "uint64"],
+                [list(values), list(decimals), 1_700_000_000],
+            )
+        )
+
+    stub_rpc.handlers["eth_call"] = eth_call
+
+
+def test_prices_read_once_per_voting_epoch(stub_w3: Web3, stub_rpc: StubRPC) -> None:
+    _serve_feeds(stub_rpc)
+    now = [FIRST_VOTING_EPOCH_START + 1000 * VOTING_EPOCH_SECONDS + 5]
+    service = PriceService(
+        stub_w3,
+        feeds={"flr": "FLR/USD", "wflr": "FLR/USD", "usdc": "USDC/USD"},
+        ftso_address=FTSO,
+        clock=lambda: now[0],
+    )
+
+    assert service.price("FLR") == Decimal("0.02")
+    assert service.price("wflr") == Decimal("0.02")
+    assert service.value("usdc", TokenAmount(2 * 10**6, 6)) == Decimal("1.99980")
+    assert service.price("joule") is None
+    assert stub_rpc.count("eth_call") == 1
+
+    now[0] += VOTING_EPOCH_SECONDS
+    service.prices()
+    assert stub_rpc.count("eth_call") == 2  # noqa: PLR2004
+
+
+def test_outage_serves_last_prices_and_retries_next_epoch(
+    stub_w3: Web3, stub_rpc: StubRPC
+) -> None:
+    _serve_feeds(stub_rpc)
+    now = [FIRST_VOTING_EPOCH_START + 1000 * VOTING_EPOCH_SECONDS]
+    service = PriceService(
+        stub_w3, feeds={"flr": "FLR/USD"}, ftso_address=FTSO, clock=lambda: now[0]
+    )
+    assert service.price("flr") == Decimal("0.02")
+
+    def unreachable(*_: object) -> str:
+        msg = "node unreachable"
+        raise requests.ConnectionError(msg)
+
+    stub_rpc.handlers["eth_call"] = unreachable
+    now[0] += VOTING_EPOCH_SECONDS
+    for _ in range(3):
+        assert service.price("flr") == Decimal("0.02")
+    assert stub_rpc.count("eth_call") == 2  # noqa: PLR2004
+
+    _serve_feeds(stub_rpc)
+    now[0] += VOTING_EPOCH_SECONDS
+    service.prices()
+    assert stub_rpc.count("eth_call") == 3  # noqa: PLR2004
+
+
+def test_feed_id_layout() -> None:
+    assert feed_id("FLR/USD").hex() == "01464c522f555344" + "00" * 13
@@ -0,0 +1,65 @@
+from web3 import Web3
+from web3.exceptions import ContractLogicError
+
+from flare_ai_defai.blockchain.gas_model import (
+    FALLBACK_GAS_LIMIT,
+    GasModel,
+    gas_key,
+)
+
+from .conftest import StubRPC
+
+SENDER = Web3.to_checksum_address("0x" + "00" * 19 + "aa")
+ROUTER = "0x8a1E35F5c98C4E85B36B7B253222eE17773b2781"
+
+
+def _tx(data: str, value: int = 0) -> dict:
+    return {"from": SENDER, "to": ROUTER, "data": data, "value": value, "gas": 0}
+
+
+def test_estimates_once_per_shape(stub_w3: Web3, stub_rpc: StubRPC) -> None:
+    stub_rpc.handlers["eth_estimateGas"] = lambda *_: hex(100_000)
+    model = GasModel(stub_w3, margin=1.2)
+    short, long = "0x12345678" + "00" * 64, "0x12345678" + "00" * 128
+
+    assert model.gas_limit(_tx(short)) == 120_000  # noqa: PLR2004
+    assert model.gas_limit(_tx(short.replace("00", "11", 8))) == 120_000  # noqa: PLR2004
+    assert stub_rpc.count("eth_estimateGas") == 1
+    model.gas_limit(_tx(long))
+    model.gas_limit(_tx(short, value=1))
+    assert stub_rpc.count("eth_estimateGas") == 3  # noqa: PLR2004
+    assert gas_key(_tx(short)) != gas_key(_tx(long))
+
+
+def test_receipts_decay_towards_actual_usage(stub_w3: Web3, stub_rpc: StubRPC) -> None:
+    stub_rpc.handlers["eth_estimateGas"] = lambda *_: hex(200_000)
+    model = GasModel(stub_w3, margin=1.0, decay=0.5)
+    tx = _tx("0xabcdef01")
+    assert model.expected_gas(tx) == 200_000  # noqa: PLR2004
+
+    model.observe(tx, {"gasUsed": 100_000, "status": 1})
+    assert model.expected_gas(tx) == 150_000  # noqa: PLR2004
+    model.observe(tx, {"gasUsed": 100_000, "status": 1})
+    assert model.expected_gas(tx) == 125_000  # noqa: PLR2004
+
+    # An early revert is ignored rather than averaged in.
+    model.observe({**tx, "gas": 150_000}, {"gasUsed": 30_000, "status": 0})
+    assert model.expected_gas(tx) == 125_000  # noqa: PLR2004
+
+    # Running out of gas forgets the key, so it is estimated afresh.
+    model.observe({**tx, "gas": 90_000}, {"gasUsed": 90_000, "status": 0})
+    assert model.expected_gas(tx) == 200_000  # noqa: PLR2004
+    assert stub_rpc.count("eth_estimateGas") == 2  # noqa: PLR2004
+
+
+def test_unestimatable_tx_gets_fallback(stub_w3: Web3, stub_rpc: StubRPC) -> None:
+    def revert(*_: object) -> str:
+        msg = "execution reverted: STF"
+        raise ContractLogicError(msg)
+
+    stub_rpc.handlers["eth_estimateGas"] = revert
+    model = GasModel(stub_w3)
+    tx = _tx("0xabcdef01")
+    assert model.gas_limit(tx) == FALLBACK_GAS_LIMIT
+    model.seed(tx, 150_000)
+    assert model.gas_limit(tx) == int(150_000 * model.margin)
@@ -0,0 +1,164 @@
+import time
+from pathlib import Path
+
+import pytest
+from web3 import Web3
+
+from flare_ai_defai.blockchain.block_watcher import HEAD_LAG_BLOCKS, BlockHeader
+from flare_ai_defai.blockchain.history import (
+    APPROVAL_TOPIC,
+    TRANSFER_TOPIC,
+    HistoryIndexer,
+)
+from flare_ai_defai.blockchain.pool_cache import SWAP_TOPIC
+from flare_ai_defai.models import UserInfo
+from flare_ai_defai.storage.fake_storage import WalletStore
+from flare_ai_defai.storage.history_store import HistoryStore
+
+from .conftest import StubRPC
+
+WALLET = "0x00000000000000000000000000000000000000AA"
+OTHER = "0x00000000000000000000000000000000000000bb"
+TOKEN = "0xFbDa5F676cB37624f28265A144A48B0d6e87d3b6"
+POOL = "0x00000000000000000000000000000000000000fe"
+
+
+def _topic(address: str) -> str:
+    return "0x" + "00" * 12 + address[2:].lower()
+
+
+def _log(block: int, index: int, topic: bytes, first: str, second: str, data: bytes):
+    return {
+        "address": TOKEN if topic != SWAP_TOPIC else POOL,
+        "topics": [Web3.to_hex(topic), _topic(first), _topic(second)],
+        "data": Web3.to_hex(data),
+        "blockNumber": hex(block),
+        "logIndex": hex(index),
+        "transactionHash": "0x" + f"{block:02x}" * 32,
+        "transactionIndex": "0x0",
+        "blockHash": "0x" + "00" * 32,
+        "removed": False,
+    }
+
+
+def _word(value: int) -> bytes:
+    return value.to_bytes(32, "big", signed=True)
+
+
+LOGS = [
+    _log(101, 0, TRANSFER_TOPIC, OTHER, WALLET, _word(5)),
+    _log(102, 3, APPROVAL_TOPIC, WALLET, OTHER, _word(7)),
+    _log(140, 1, TRANSFER_TOPIC, WALLET, OTHER, _word(2)),
+    _log(140, 2, SWAP_TOPIC, OTHER, WALLET, _word(-2) + _word(9) + bytes(96)),
+]
+
+
+def _chain(stub_rpc: StubRPC, head: int, max_range: int = 1000) -> None:
+    def get_logs(params: dict) -> list[dict]:
+        start, end = int(params["fromBlock"], 16), int(params["toBlock"], 16)
+        if end - start + 1 > max_range:
+            msg = "block range too large"
+            raise ValueError(msg)
+        topics = params["topics"]
+        position = len(topics) - 1
+        return [
+            log
+            for log in LOGS
+            if start <= int(log["blockNumber"], 16) <= end
+            and log["topics"][0] in topics[0]
+            and log["topics"][position] in topics[position]
+        ]
+
+    stub_rpc.handlers["eth_blockNumber"] = lambda: hex(head)
+    stub_rpc.handlers["eth_getLogs"] = get_logs
+
+
+def _wallets() -> WalletStore:
+    wallets = WalletStore()
+    wallets._wallets.clear()
+    wallets.store_wallet(UserInfo(user_id="u", email="u@example.com"), WALLET, "0x")
+    return wallets
+
+
+def test_indexes_and_pages_newest_first(stub_w3: Web3, stub_rpc: StubRPC) -> None:
+    _chain(stub_rpc, head=150)
+    store = HistoryStore()
+    indexer = HistoryIndexer(stub_w3, store, _wallets(), start_block=100)
+    assert indexer.sync() == 150 - HEAD_LAG_BLOCKS
+
+    events = store.page(WALLET, limit=3)
+    assert [e.kind for e in events] == ["swap", "transfer_out", "approval"]
+    assert (events[0].amount0, events[0].amount1) == ("-2", "9")
+    assert events[1].counterparty == OTHER
+    rest = store.page(WALLET, limit=3, cursor=events[-1].cursor)
+    assert [(e.kind, e.amount0) for e in rest] == [("transfer_in", "5")]
+    assert store.page(OTHER) == []
+    with pytest.raises(ValueError, match="Invalid history cursor"):
+        store.page(WALLET, cursor="latest")
+
+
+def test_range_shrinks_when_rejected(stub_w3: Web3, stub_rpc: StubRPC) -> None:
+    _chain(stub_rpc, head=150, max_range=8)
+    store = HistoryStore()
+    indexer = HistoryIndexer(stub_w3, store, _wallets(), start_block=100)
+    assert indexer.sync() == 150 - HEAD_LAG_BLOCKS
+    assert len(store.page(WALLET)) == len(LOGS)
+    assert all(
+        int(p[0]["toBlock"], 16) - int(p[0]["fromBlock"], 16) < 8  # noqa: PLR2004
+        for method, p in stub_rpc.calls[-2:]
+        if method == "eth_getLogs"
+    )
+
+
+def test_resumes_from_checkpoint(
+    stub_w3: Web3, stub_rpc: StubRPC, tmp_path: Path
+) -> None:
+    path = tmp_path / "history.db"
+    _chain(stub_rpc, head=120)
+    HistoryIndexer(stub_w3, HistoryStore(path), _wallets(), start_block=100).sync()
+
+    _chain(stub_rpc, head=150)
+    store = HistoryStore(path)
+    calls = len(stub_rpc.calls)
+    HistoryIndexer(stub_w3, store, _wallets(), start_block=0).sync()
+    first = min(
+        int(params[0]["fromBlock"], 16)
+        for method, params in stub_rpc.calls[calls:]
+        if method == "eth_getLogs"
+    )
+    assert first == 121 - HEAD_LAG_BLOCKS
+    assert store.checkpoint(HistoryIndexer.CHECKPOINT) == 150 - HEAD_LAG_BLOCKS
+    assert len(store.page(WALLET)) == len(LOGS)
+
+
+def test_blocks_near_the_head_wait_for_a_later_pass(
+    stub_w3: Web3, stub_rpc: StubRPC
+) -> None:
+    _chain(stub_rpc, head=141)
+    store = HistoryStore()
+    indexer = HistoryIndexer(stub_w3, store, _wallets(), start_block=100, head_lag=2)
+    # Block 140 could still be missing logs on a node trailing the head.
+    assert indexer.sync() == 139  # noqa: PLR2004
+    assert [e.kind for e in store.page(WALLET)] == ["approval", "transfer_in"]
+    assert indexer.sync(142) == 140  # noqa: PLR2004
+    assert len(store.page(WALLET)) == len(LOGS)
+
+
+def test_heads_wake_a_backfill_thread_that_stops_promptly(
+    stub_w3: Web3, stub_rpc: StubRPC
+) -> None:
+    _chain(stub_rpc, head=10_000)
+    stub_rpc.delay = 0.01
+    store = HistoryStore()
+    indexer = HistoryIndexer(stub_w3, store, _wallets(), start_block=0, max_range=10)
+    indexer.start()
+    try:
+        started = time.monotonic()
+        indexer.on_block(BlockHeader(10_000, "0x" + "00" * 32, 0, 0))
+        # The watcher thread is not held up by the backfill.
+        assert time.monotonic() - started < 1
+        while (store.checkpoint(HistoryIndexer.CHECKPOINT) or 0) < 10:  # noqa: PLR2004
+            time.sleep(0.01)
+    finally:
+        indexer.stop()
+    assert store.checkpoint(HistoryIndexer.CHECKPOINT) < 10_000 - HEAD_LAG_BLOCKS
@@ -0,0 +1,100 @@
+import pytest
+from web3 import Web3
+
+from flare_ai_defai.blockchain.abi_registry import abi_registry
+from flare_ai_defai.blockchain.kinetic_indexer import KineticIndexer, rate_to_apy
+
+from .conftest import FakeMulticall, StubRPC
+
+KSFLR = "0x291487beC339c2fE5D83DD45F0a15EFC9Ac45656"
+KUSDC = "0xDEeBaBe05BDA7e8C1740873abF715f16164C29B8"
+USER = "0x00000000000000000000000000000000000000aA"
+ORACLE = "0x00000000000000000000000000000000000000fe"
+EXCHANGE_RATE = 2 * 10**17
+
+
+def _setup(stub_rpc: StubRPC, fake_multicall: FakeMulticall) -> dict:
+    chain = {"head": 100}
+    stub_rpc.handlers["eth_blockNumber"] = lambda: hex(chain["head"])
+    for market in (KSFLR, KUSDC):
+        for getter, value in (
+            ("supplyRatePerBlock", 10**9),
+            ("borrowRatePerBlock", 3 * 10**9),
+            ("exchangeRateStored", EXCHANGE_RATE),
+            ("getCash", 5 * 10**18),
+        ):
+            fake_multicall.on(market, abi_registry.selector("ktoken", getter), (value,))
+    fake_multicall.on(
+        KSFLR,
+        abi_registry.selector("ktoken", "getAccountSnapshot"),
+        (0, 50 * 10**8, 0, EXCHANGE_RATE),
+    )
+    fake_multicall.on(
+        KUSDC, abi_registry.selector("ktoken", "getAccountSnapshot"), (0, 0, 0, 0)
+    )
+    fake_multicall.on(
+        KineticIndexer.COMPTROLLER,
+        abi_registry.selector("kinetic_comptroller", "getAssetsIn"),
+        ([KSFLR],),
+    )
+    return chain
+
+
+def _indexer(w3: Web3, fake_multicall: FakeMulticall) -> KineticIndexer:
+    return KineticIndexer(
+        w3, fake_multicall, markets=[KSFLR, KUSDC], oracle_address=ORACLE
+    )
+
+
+def test_one_multicall_per_block(
+    stub_w3: Web3, stub_rpc: StubRPC, fake_multicall: FakeMulticall
+) -> None:
+    chain = _setup(stub_rpc, fake_multicall)
+    indexer = _indexer(stub_w3, fake_multicall)
+    indexer.track(USER)
+
+    markets = indexer.all_markets()
+    positions = indexer.positions(USER)
+    assert indexer.market(KUSDC).cash == 5 * 10**18
+    assert len(fake_multicall.batches) == 1
+    calls, block = fake_multicall.batches[0]
+    assert block == 100  # noqa: PLR2004
+    assert len(calls) == 15  # noqa: PLR2004
+
+    assert [m.address for m in markets] == [KSFLR, KUSDC]
+    assert markets[0].supply_apy == pytest.approx(rate_to_apy(10**9))
+    assert markets[0].borrow_apy > markets[0].supply_apy
+    assert [p.market for p in positions] == [KSFLR]
+    assert positions[0].supplied == 10**9
+    assert positions[0].collateral
+    assert markets[0].price == 0
+
+    chain["head"] = 101
+    indexer.all_markets()
+    assert len(fake_multicall.batches) == 2  # noqa: PLR2004
+    assert fake_multicall.batches[1][1] == 101  # noqa: PLR2004
+
+
+def test_new_account_reads_only_its_snapshots(
+    stub_w3: Web3, stub_rpc: StubRPC, fake_multicall: FakeMulticall
+) -> None:
+    _setup(stub_rpc, fake_multicall)
+    indexer = _indexer(stub_w3, fake_multicall)
+    indexer.refresh()
+
+    assert len(indexer.positions(USER)) == 1
+    assert len(fake_multicall.batches) == 2  # noqa: PLR2004
+    calls, block = fake_multicall.batches[1]
+    assert block == 100  # noqa: PLR2004
+    assert len(calls) == 3  # noqa: PLR2004
+
+
+def test_failed_snapshot_is_dropped(
+    stub_w3: Web3, stub_rpc: StubRPC, fake_multicall: FakeMulticall
+) -> None:
+    _setup(stub_rpc, fake_multicall)
+    fake_multicall.on(
+        KSFLR, abi_registry.selector("ktoken", "getAccountSnapshot"), (3, 0, 0, 0)
+    )
+    indexer = _indexer(stub_w3, fake_multicall)
+    assert indexer.positions(USER) == []
@@ -0,0 +1,141 @@
+import pytest
+from eth_abi import decode
+from hexbytes import HexBytes
+from web3 import Web3
+
+from flare_ai_defai.blockchain import FlareProvider, KineticMarket
+from flare_ai_defai.blockchain.abi_registry import abi_registry
+from flare_ai_defai.blockchain.allowances import AllowanceTracker
+from flare_ai_defai.blockchain.gas_model import GasModel
+from flare_ai_defai.blockchain.kinetic_indexer import KineticIndexer
+from flare_ai_defai.blockchain.kinetic_risk import RiskEngine
+from flare_ai_defai.models import UserInfo
+from flare_ai_defai.storage.fake_storage import WalletStore
+
+from .conftest import FakeMulticall, StubRPC
+
+KSFLR = KineticMarket.SUPPLY_SFLR_ADDRESS
+KUSDC = KineticMarket.BORROW_ADDRESS
+SFLR = KineticMarket.SFLR_ADDRESS
+USDC = "0xFbDa5F676cB37624f28265A144A48B0d6e87d3b6"
+ORACLE = "0x00000000000000000000000000000000000000fe"
+WALLET = "0x00000000000000000000000000000000000000AA"
+# sFLR at $0.02 (18 decimals), USDC at $1 (6 decimals).
+PRICES = {KSFLR: 2 * 10**16, KUSDC: 10**30}
+COLLATERAL_FACTORS = {KSFLR: 5 * 10**17, KUSDC: 8 * 10**17}
+USER = UserInfo(user_id="kinetic-test", email="kinetic@example.com")
+
+
+def _market(
+    stub_w3: Web3,
+    stub_rpc: StubRPC,
+    fake_multicall: FakeMulticall,
+    borrowed: int = 0,
+) -> KineticMarket:
+    stub_rpc.handlers.update(
+        {
+            "eth_blockNumber": lambda: hex(100),
+            "eth_getTransactionCount": lambda *_: hex(7),
+            "eth_getBlockByNumber": lambda *_: {
+                "number": hex(100),
+                "hash": "0x" + "00" * 32,
+                "baseFeePerGas": hex(25 * 10**9),
+                "timestamp": hex(1_700_000_000),
+                "transactions": [],
+            },
+            "eth_maxPriorityFeePerGas": lambda: hex(10**9),
+            "eth_estimateGas": lambda *_: hex(150_000),
+        }
+    )
+    positions = {KSFLR: (1000 * 10**18, 0), KUSDC: (0, borrowed)}
+    for market, token, decimals in ((KSFLR, SFLR, 18), (KUSDC, USDC, 6)):
+        for getter, value in (
+            ("supplyRatePerBlock", 0),
+            ("borrowRatePerBlock", 0),
+            ("exchangeRateStored", 10**18),
+            ("getCash", 10**12),
+            ("underlying", token),
+        ):
+            fake_multicall.on(market, abi_registry.selector("ktoken", getter), (value,))
+        fake_multicall.on(
+            market,
+            abi_registry.selector("ktoken", "getAccountSnapshot"),
+            (0, *positions[market], 10**18),
+        )
+        fake_multicall.on(
+            token, abi_registry.selector("erc20", "decimals"), (decimals,)
+        )
+        fake_multicall.on(token, abi_registry.selector("erc20", "allowance"), (0,))
+    fake_multicall.on(
+        ORACLE,
+        abi_registry.selector("kinetic_oracle", "getUnderlyingPrice"),
+        lambda data: (PRICES[Web3.to_checksum_address(data[-20:])],),
+    )
+    fake_multicall.on(
+        KineticIndexer.COMPTROLLER,
+        abi_registry.selector("kinetic_comptroller", "markets"),
+        lambda data: (True, COLLATERAL_FACTORS[Web3.to_checksum_address(data[-20:])]),
+    )
+    fake_multicall.on(
+        KineticIndexer.COMPTROLLER,
+        abi_registry.selector("kinetic_comptroller", "getAssetsIn"),
+        ([],),
+    )
+
+    wallet_store = WalletStore()
+    wallet_store.store_wallet(USER, WALLET, "0x" + "11" * 32)
+    provider = FlareProvider("http://localhost:8545", wallet_store)
+    provider.w3 = stub_w3
+    provider.gas_model = GasModel(stub_w3)
+    market = KineticMarket("http://localhost:8545", None, provider, wallet_store)
+    market.w3 = stub_w3
+    market.indexer = KineticIndexer(
+        stub_w3, fake_multicall, markets=[KSFLR, KUSDC], oracle_address=ORACLE
+    )
+    market.risk = RiskEngine(market.indexer)
+    market.allowances = AllowanceTracker(stub_w3, fake_multicall)
+    return market
+
+
+def test_borrow_enters_collateral_market_first(
+    stub_w3: Web3, stub_rpc: StubRPC, fake_multicall: FakeMulticall
+) -> None:
+    market = _market(stub_w3, stub_rpc, fake_multicall)
+    txs = market.borrowTx(USER, "USDC", 5, "SFLR")
+
+    assert [tx["to"] for tx in txs] == [KineticIndexer.COMPTROLLER, KUSDC]
+    assert [tx["nonce"] for tx in txs] == [7, 8]
+    assert stub_rpc.batches == 1
+    assert stub_rpc.count("eth_getTransactionCount") == 1
+    data = HexBytes(txs[1]["data"])
+    assert data[:4] == abi_registry.selector("ktoken", "borrow")
+    assert decode(["uint256"], data[4:]) == (5 * 10**6,)
+    assert all(tx["gas"] == 180_000 for tx in txs)  # noqa: PLR2004
+
+    risk = market.previewBorrow(USER, "usdc", 5, "sflr")
+    assert risk.health_factor == pytest.approx(2.0)
+
+
+def test_borrow_beyond_collateral_is_rejected(
+    stub_w3: Web3, stub_rpc: StubRPC, fake_multicall: FakeMulticall
+) -> None:
+    market = _market(stub_w3, stub_rpc, fake_multicall)
+    with pytest.raises(ValueError, match="at most 10 can be borrowed"):
+        market.borrowTx(USER, "usdc", 11, "sflr")
+    assert stub_rpc.batches == 0
+
+
+def test_repay_approves_and_caps_at_debt(
+    stub_w3: Web3, stub_rpc: StubRPC, fake_multicall: FakeMulticall
+) -> None:
+    market = _market(stub_w3, stub_rpc, fake_multicall, borrowed=3 * 10**6)
+    txs = market.repayTx(USER, "usdc", 10)
+
+    assert [tx["to"] for tx in txs] == [USDC, KUSDC]
+    repay = HexBytes(txs[1]["data"])
+    assert repay[:4] == abi_registry.selector("ktoken", "repayBorrow")
+    assert decode(["uint256"], repay[4:]) == (3 * 10**6,)
+
+    with pytest.raises(ValueError, match="Only 1000 sflr is supplied"):
+        market.redeemTx(USER, "sflr", 1001)
+    assert len(market.redeemTx(USER, "sflr", 10)) == 1
@@ -0,0 +1,116 @@
+import math
+
+import pytest
+from web3 import Web3
+
+from flare_ai_defai.blockchain.abi_registry import abi_registry
+from flare_ai_defai.blockchain.kinetic_indexer import KineticIndexer
+from flare_ai_defai.blockchain.kinetic_risk import RiskEngine
+
+from .conftest import FakeMulticall, StubRPC
+
+KSFLR = "0x291487beC339c2fE5D83DD45F0a15EFC9Ac45656"
+KUSDC = "0xDEeBaBe05BDA7e8C1740873abF715f16164C29B8"
+ORACLE = "0x00000000000000000000000000000000000000fe"
+SAFE = "0x00000000000000000000000000000000000000AA"
+RISKY = "0x00000000000000000000000000000000000000bb"
+
+# sFLR at $0.02 (18 decimals), USDC at $1 (6 decimals).
+PRICES = {KSFLR: 2 * 10**16, KUSDC: 10**30}
+COLLATERAL_FACTORS = {KSFLR: 5 * 10**17, KUSDC: 8 * 10**17}
+# account -> market -> (kToken balance, borrow balance)
+POSITIONS = {
+    SAFE: {KSFLR: (1000 * 10**18, 0), KUSDC: (0, 5 * 10**6)},
+    RISKY: {KSFLR: (1000 * 10**18, 0), KUSDC: (0, 95 * 10**5)},
+}
+
+
+def _address(calldata: bytes) -> str:
+    return Web3.to_checksum_address(calldata[-20:])
+
+
+def _engine(
+    stub_w3: Web3, stub_rpc: StubRPC, fake_multicall: FakeMulticall
+) -> RiskEngine:
+    stub_rpc.handlers["eth_blockNumber"] = lambda: hex(100)
+    for market in (KSFLR, KUSDC):
+        for getter, value in (
+            ("supplyRatePerBlock", 0),
+            ("borrowRatePerBlock", 0),
+            ("exchangeRateStored", 10**18),
+            ("getCash", 10**12),
+        ):
+            fake_multicall.on(market, abi_registry.selector("ktoken", getter), (value,))
+        fake_multicall.on(
+            market,
+            abi_registry.selector("ktoken", "getAccountSnapshot"),
+            lambda data, market=market: (
+                0,
+                *POSITIONS[_address(data)][market],
+                10**18,
+            ),
+        )
+    comptroller = KineticIndexer.COMPTROLLER
+    fake_multicall.on(
+        comptroller,
+        abi_registry.selector("kinetic_comptroller", "markets"),
+        lambda data: (True, COLLATERAL_FACTORS[_address(data)]),
+    )
+    fake_multicall.on(
+        comptroller,
+        abi_registry.selector("kinetic_comptroller", "getAssetsIn"),
+        ([KSFLR],),
+    )
+    fake_multicall.on(
+        ORACLE,
+        abi_registry.selector("kinetic_oracle", "getUnderlyingPrice"),
+        lambda data: (PRICES[_address(data)],),
+    )
+    indexer = KineticIndexer(
+        stub_w3, fake_multicall, markets=[KSFLR, KUSDC], oracle_address=ORACLE
+    )
+    return RiskEngine(indexer)
+
+
+def test_health_factor_and_borrowing_power(
+    stub_w3: Web3, stub_rpc: StubRPC, fake_multicall: FakeMulticall
+) -> None:
+    engine = _engine(stub_w3, stub_rpc, fake_multicall)
+    risk = engine.assess(SAFE)
+    assert risk.collateral_value == 10 * 10**18
+    assert risk.borrow_value == 5 * 10**18
+    assert risk.health_factor == pytest.approx(2.0)
+    assert engine.max_borrow(SAFE, KUSDC) == 5 * 10**6
+
+    assert engine.check_borrow(SAFE, KUSDC, 5 * 10**6).health_factor == 1.0
+    assert engine.check_borrow(SAFE, KUSDC, 6 * 10**6).health_factor < 1
+    with pytest.raises(ValueError, match="only holds"):
+        engine.check_borrow(SAFE, KUSDC, 10**13)
+
+    # Previews are answered from the per-block book.
+    batches = len(fake_multicall.batches)
+    engine.check_borrow(SAFE, KUSDC, 10**6)
+    assert len(fake_multicall.batches) == batches
+
+
+def test_liquidation_prices(
+    stub_w3: Web3, stub_rpc: StubRPC, fake_multicall: FakeMulticall
+) -> None:
+    engine = _engine(stub_w3, stub_rpc, fake_multicall)
+    # Collateral halves in value, or the borrowed asset doubles.
+    assert engine.liquidation_price(SAFE, KSFLR) == 10**16
+    assert engine.liquidation_price(SAFE, KUSDC) == 2 * 10**30
+
+
+def test_scan_reports_wallets_near_liquidation(
+    stub_w3: Web3, stub_rpc: StubRPC, fake_multicall: FakeMulticall
+) -> None:
+    engine = _engine(stub_w3, stub_rpc, fake_multicall)
+    engine.assess(SAFE)
+    engine.assess(RISKY)
+    at_risk = engine.scan()
+    assert [risk.account for risk in at_risk] == [RISKY]
+    assert at_risk[0].health_factor < 1.1  # noqa: PLR2004
+    assert engine.scan(threshold=math.inf) == sorted(
+        [engine.assess(RISKY), engine.assess(SAFE)], key=lambda r: r.health_factor
+    )
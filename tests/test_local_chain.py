@@ -0,0 +1,169 @@
+import json
+
+import pytest
+from eth_account import Account
+from web3 import Web3
+from web3.exceptions import ContractLogicError, Web3RPCError
+
+from flare_ai_defai.blockchain import (
+    FlareExplorer,
+    FlareProvider,
+    KineticMarket,
+    LocalChain,
+    LocalFlare,
+    SparkDEX,
+)
+from flare_ai_defai.blockchain.abi_registry import abi_registry
+from flare_ai_defai.blockchain.bench_cli import main as bench_main
+from flare_ai_defai.blockchain.local_chain import storage_slot
+from flare_ai_defai.models import UserInfo
+
+USDC = SparkDEX.TOKEN_ADDRESSES["usdc"]
+RECIPIENT = Web3.to_checksum_address("0x" + "00" * 19 + "bb")
+USER = UserInfo(user_id="user", email="user@example.com")
+
+
+def _send(w3: Web3, account: Account, call: object) -> dict:
+    tx = call.build_transaction(
+        {
+            "from": account.address,
+            "nonce": w3.eth.get_transaction_count(account.address),
+            "gas": 100_000,
+            "maxFeePerGas": 2 * w3.eth.gas_price,
+            "maxPriorityFeePerGas": w3.eth.max_priority_fee,
+            "chainId": w3.eth.chain_id,
+        }
+    )
+    signed = account.sign_transaction(tx)
+    return w3.eth.wait_for_transaction_receipt(
+        w3.eth.send_raw_transaction(signed.raw_transaction)
+    )
+
+
+def _services(
+    local: LocalFlare, provider: FlareProvider
+) -> tuple[SparkDEX, KineticMarket]:
+    explorer = FlareExplorer("https://flare-explorer.flare.network/")
+    store = provider.wallet_store
+    return (
+        SparkDEX(local.chain, explorer, provider, store),
+        KineticMarket(local.chain, explorer, provider, store),
+    )
+
+
+def test_transactions_are_mined_with_receipts_and_logs(
+    local_flare: LocalFlare,
+) -> None:
+    w3 = local_flare.w3
+    account = Account.create()
+    local_flare.fund(account.address, flr=10, usdc=100)
+    usdc = abi_registry.contract(w3, "erc20", USDC)
+
+    receipt = _send(w3, account, usdc.functions.transfer(RECIPIENT, 40 * 10**6))
+    assert receipt["status"] == 1
+    assert receipt["blockNumber"] == w3.eth.block_number
+    (transfer,) = usdc.events.Transfer().process_receipt(receipt)
+    assert transfer["args"]["to"] == RECIPIENT
+    assert transfer["args"]["value"] == 40 * 10**6
+    assert usdc.functions.balanceOf(RECIPIENT).call() == 40 * 10**6
+
+    # A revert still mines, uses the nonce and pays for its gas.
+    balance = w3.eth.get_balance(account.address)
+    receipt = _send(w3, account, usdc.functions.transfer(RECIPIENT, 10**12))
+    assert receipt["status"] == 0
+    assert receipt["logs"] == []
+    assert w3.eth.get_transaction_count(account.address) == 2  # noqa: PLR2004
+    assert w3.eth.get_balance(account.address) < balance
+    with pytest.raises(ContractLogicError, match="exceeds balance"):
+        usdc.functions.transfer(RECIPIENT, 10**12).call({"from": account.address})
+
+
+def test_history_and_state_overrides() -> None:
+    local = LocalFlare.deploy(LocalChain(history_blocks=4))
+    w3 = local.w3
+    usdc = abi_registry.contract(w3, "erc20", USDC)
+    local.fund(RECIPIENT, usdc=1)
+    funded_at = w3.eth.block_number
+    local.fund(RECIPIENT, usdc=2)
+
+    assert usdc.functions.balanceOf(RECIPIENT).call() == 3 * 10**6
+    assert usdc.functions.balanceOf(RECIPIENT).call(block_identifier=funded_at) == 10**6
+    # Balances sit at slot 0, so a storage override can set one.
+    slot = storage_slot(0, RECIPIENT)
+    assert w3.eth.get_storage_at(USDC, slot) == (3 * 10**6).to_bytes(32, "big")
+    overridden = usdc.functions.balanceOf(RECIPIENT).call(
+        state_override={USDC: {"stateDiff": {hex(slot): "0x" + "00" * 31 + "07"}}}
+    )
+    assert overridden == 7  # noqa: PLR2004
+
+    for _ in range(4):
+        local.chain.mine()
+    with pytest.raises(Web3RPCError, match="missing trie node"):
+        usdc.functions.balanceOf(RECIPIENT).call(block_identifier=funded_at)
+    assert usdc.functions.balanceOf(RECIPIENT).call() == 3 * 10**6
+
+
+def test_sparkdex_swaps_run_end_to_end(
+    local_flare: LocalFlare, blockchain_service: FlareProvider
+) -> None:
+    sparkdex, _ = _services(local_flare, blockchain_service)
+    address, _ = blockchain_service.generate_account(USER)
+    local_flare.fund(address, flr=1_000)
+
+    # Wrap and swap in one Universal Router call: 100 FLR at $0.02.
+    sparkdex.add_swap_txs_to_queue(USER, "flr", "usdc", 100)
+    assert len(blockchain_service.send_tx_in_queue(USER)) == 1
+    usdc = local_flare.balance(address, "usdc")
+    assert 1.99 * 10**6 < usdc < 2 * 10**6
+
+    # Back to FLR through token and Permit2 approvals, unwrapped by the router.
+    flr = local_flare.balance(address)
+    sparkdex.add_swap_txs_to_queue(USER, "usdc", "flr", 1)
+    assert len(blockchain_service.send_tx_in_queue(USER)) == 3  # noqa: PLR2004
+    assert local_flare.balance(address, "usdc") == usdc - 10**6
+    assert 49 * 10**18 < local_flare.balance(address) - flr < 50 * 10**18
+    assert local_flare.balance(SparkDEX.SPARKDEX_ROUTER, "wflr") == 0
+
+
+def test_kinetic_supply_and_borrow_run_end_to_end(
+    local_flare: LocalFlare, blockchain_service: FlareProvider
+) -> None:
+    _, kinetic = _services(local_flare, blockchain_service)
+    address, _ = blockchain_service.generate_account(USER)
+    local_flare.fund(address, flr=10, sflr=1_000)
+    sflr = abi_registry.contract(blockchain_service.w3, "sflr", SparkDEX.SFLR_ADDRESS)
+    market = kinetic.getMarket("sflr")
+    # Each step is built once the one before it is mined, for its nonce.
+    for build in (
+        lambda: [
+            blockchain_service.create_contract_function_tx(
+                USER, sflr, "approve", 0, market, 1_000 * 10**18
+            )
+        ],
+        lambda: [kinetic.supplySFLR(USER, 1_000)],
+        lambda: kinetic.enterMarketsTx(USER, ["sflr"]),
+    ):
+        blockchain_service.add_tx_to_queue("setup", build())
+        blockchain_service.send_tx_in_queue(USER)
+
+    # 1000 sFLR at $0.022 with a 50% collateral factor backs $11 of debt.
+    with pytest.raises(ValueError, match="at most 11"):
+        kinetic.borrowTx(USER, "usdc", 12)
+    blockchain_service.add_tx_to_queue("borrow", kinetic.borrowTx(USER, "usdc", 10))
+    blockchain_service.send_tx_in_queue(USER)
+    assert local_flare.balance(address, "usdc") == 10 * 10**6
+    risk = kinetic.getAccountRisk(USER)
+    assert risk.borrow_value == 10 * 10**18
+    assert risk.collateral_value == 11 * 10**18
+
+
+def test_bench_cli_reports_latency_and_requests(
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    assert bench_main(["quote", "swap", "--iterations", "2"]) == 0
+    report = json.loads(capsys.readouterr().out)
+    assert set(report) == {"quote", "swap"}
+    swap = report["swap"]
+    assert swap["iterations"] == 2  # noqa: PLR2004
+    assert swap["p50_ms"] > 0
+    assert swap["rpc_methods_per_op"]["eth_sendRawTransaction"] == 1
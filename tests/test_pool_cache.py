@@ -0,0 +1,138 @@
+from eth_abi import decode, encode
+from web3 import Web3
+
+from flare_ai_defai.blockchain.abi_registry import abi_registry
+from flare_ai_defai.blockchain.pool_cache import PoolStateCache
+
+from .conftest import FakeMulticall, StubRPC
+
+WFLR = "0x1D80c49BbBCd1C0911346656B529DF9E5c2F783d"
+USDC = "0xFbDa5F676cB37624f28265A144A48B0d6e87d3b6"
+POOL = Web3.to_checksum_address("0x0000000000000000000000000000000000000500")
+Q96 = 2**96
+
+
+def _setup(stub_rpc: StubRPC, fake_multicall: FakeMulticall) -> dict:
+    chain = {"head": 100, "logs": []}
+    stub_rpc.handlers["eth_blockNumber"] = lambda: hex(chain["head"])
+    stub_rpc.handlers["eth_getLogs"] = lambda _filter: chain.pop("logs", [])
+
+    def get_pool(data: bytes) -> tuple:
+        _, _, fee = decode(["address", "address", "uint24"], data[4:])
+        return (POOL if fee == 500 else "0x" + "00" * 20,)  # noqa: PLR2004
+
+    fake_multicall.on(
+        PoolStateCache.FACTORY, abi_registry.selector("v3_factory", "getPool"), get_pool
+    )
+    fake_multicall.on(
+        POOL, abi_registry.selector("v3_pool", "slot0"), (Q96, 0, 0, 1, 1, 0, True)
+    )
+    fake_multicall.on(POOL, abi_registry.selector("v3_pool", "liquidity"), (10**18,))
+    return chain
+
+
+def _log(event: str, data: bytes, block: int) -> dict:
+    return {
+        "address": POOL,
+        "topics": [Web3.to_hex(abi_registry.topic("v3_pool", event))],
+        "data": Web3.to_hex(data),
+        "blockNumber": hex(block),
+        "blockHash": "0x" + "11" * 32,
+        "transactionHash": "0x" + "22" * 32,
+        "transactionIndex": "0x0",
+        "logIndex": "0x0",
+        "removed": False,
+    }
+
+
+def test_pool_addresses_are_looked_up_once(
+    stub_w3: Web3, stub_rpc: StubRPC, fake_multicall: FakeMulticall
+) -> None:
+    _setup(stub_rpc, fake_multicall)
+    cache = PoolStateCache(stub_w3, fake_multicall)
+    assert cache.pool_addresses(WFLR, USDC) == {500: POOL}
+    assert cache.pool_addresses(USDC, WFLR) == {500: POOL}
+    assert len(fake_multicall.batches) == 1
+
+
+def test_swap_log_updates_state_without_rereading(
+    stub_w3: Web3, stub_rpc: StubRPC, fake_multicall: FakeMulticall
+) -> None:
+    chain = _setup(stub_rpc, fake_multicall)
+    cache = PoolStateCache(stub_w3, fake_multicall)
+    state = cache.pool_states(WFLR, USDC)[500]
+    assert (state.sqrt_price_x96, state.liquidity, state.block_number) == (
+        Q96,
+        10**18,
+        100,
+    )
+    reads = len(fake_multicall.batches)
+
+    # Same block: served from memory, no getLogs.
+    cache.pool_states(WFLR, USDC)
+    assert stub_rpc.count("eth_getLogs") == 0
+
+    chain["head"] = 101
+    swap = encode(
+        ["int256", "int256", "uint160", "uint128", "int24"],
+        [10, -9, 2 * Q96, 5 * 10**17, 13863],
+    )
+    chain["logs"] = [_log("Swap", swap, 101)]
+    state = cache.pool_states(WFLR, USDC)[500]
+    assert (state.sqrt_price_x96, state.liquidity, state.tick) == (
+        2 * Q96,
+        5 * 10**17,
+        13863,
+    )
+    assert state.block_number == 101  # noqa: PLR2004
+    assert len(fake_multicall.batches) == reads
+
+
+def test_mint_and_large_gaps_trigger_reread(
+    stub_w3: Web3, stub_rpc: StubRPC, fake_multicall: FakeMulticall
+) -> None:
+    chain = _setup(stub_rpc, fake_multicall)
+    cache = PoolStateCache(stub_w3, fake_multicall, max_log_range=10)
+    cache.pool_states(WFLR, USDC)
+    reads = len(fake_multicall.batches)
+
+    chain["head"] = 102
+    mint = encode(["address", "uint128", "uint256", "uint256"], [POOL, 1, 1, 1])
+    chain["logs"] = [_log("Mint", mint, 102)]
+    cache.pool_states(WFLR, USDC)
+    assert len(fake_multicall.batches) == reads + 1
+    assert fake_multicall.batches[-1][1] == 102  # noqa: PLR2004
+
+    chain["head"] = 200
+    cache.pool_states(WFLR, USDC)
+    assert stub_rpc.count("eth_getLogs") == 1
+    assert fake_multicall.batches[-1][1] == 200  # noqa: PLR2004
+
+
+def test_logs_near_the_head_are_read_again(
+    stub_w3: Web3, stub_rpc: StubRPC, fake_multicall: FakeMulticall
+) -> None:
+    chain = _setup(stub_rpc, fake_multicall)
+    cache = PoolStateCache(stub_w3, fake_multicall)
+    cache.pool_states(WFLR, USDC)
+
+    def swap(sqrt_price_x96: int, block: int) -> dict:
+        data = encode(
+            ["int256", "int256", "uint160", "uint128", "int24"],
+            [10, -9, sqrt_price_x96, 10**18, 0],
+        )
+        return _log("Swap", data, block)
+
+    # A node trailing the head answers without block 101's swap.
+    chain["head"] = 101
+    assert cache.pool_states(WFLR, USDC)[500].sqrt_price_x96 == Q96
+    chain["head"] = 102
+    chain["logs"] = [swap(2 * Q96, 101)]
+    assert cache.pool_states(WFLR, USDC)[500].sqrt_price_x96 == 2 * Q96
+    (_, (log_filter,)) = stub_rpc.calls[-1]
+    assert int(log_filter["fromBlock"], 16) <= 101  # noqa: PLR2004
+
+    # A replayed log older than the state is not applied again.
+    chain["head"] = 103
+    chain["logs"] = [swap(3 * Q96, 100)]
+    assert cache.pool_states(WFLR, USDC)[500].sqrt_price_x96 == 2 * Q96
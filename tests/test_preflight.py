@@ -0,0 +1,80 @@
+import pytest
+from eth_abi import encode
+from hexbytes import HexBytes
+from web3 import Web3
+from web3.exceptions import ContractLogicError
+
+from flare_ai_defai.blockchain.abi_registry import abi_registry
+from flare_ai_defai.blockchain.preflight import BundleSimulator, mapping_slot
+
+from .conftest import StubRPC
+
+OWNER = Web3.to_checksum_address("0x" + "00" * 19 + "aa")
+TOKEN = "0x0B38e83B86d491735fEaa0a791F65c2B99535396"
+ROUTER = "0x8a1E35F5c98C4E85B36B7B253222eE17773b2781"
+ALLOWANCE_SLOT = 2
+APPROVE_GAS = 46_000
+SWAP_GAS = 140_000
+
+
+def _stub_token(stub_rpc: StubRPC) -> None:
+    """A token keeping allowances at slot 2 and a router that pulls 10**18."""
+    slot = Web3.to_hex(mapping_slot(ALLOWANCE_SLOT, OWNER, ROUTER).to_bytes(32, "big"))
+
+    def allowance(overrides: dict | None) -> int:
+        state = (overrides or {}).get(TOKEN, {}).get("stateDiff", {})
+        return int(state.get(slot, "0x0"), 16)
+
+    def eth_call(tx: dict, _block: str, overrides: dict | None = None) -> str:
+        assert HexBytes(tx["data"])[:4] == abi_registry.selector("erc20", "allowance")
+        return Web3.to_hex(encode(["uint256"], [allowance(overrides)]))
+
+    def estimate_gas(tx: dict, _block: str, overrides: dict | None = None) -> str:
+        if HexBytes(tx["data"])[:4] == abi_registry.selector("erc20", "approve"):
+            return hex(APPROVE_GAS)
+        if allowance(overrides) < 10**18:
+            msg = "execution reverted: STF"
+            raise ContractLogicError(msg)
+        return hex(SWAP_GAS)
+
+    stub_rpc.handlers["eth_call"] = eth_call
+    stub_rpc.handlers["eth_estimateGas"] = estimate_gas
+
+
+def _approve(w3: Web3, amount: int) -> dict:
+    data = abi_registry.contract(w3, "erc20", TOKEN).encode_abi(
+        "approve", [ROUTER, amount]
+    )
+    return {"from": OWNER, "to": TOKEN, "data": data, "value": 0}
+
+
+SWAP = {"from": OWNER, "to": ROUTER, "data": "0x12345678", "value": 0}
+
+
+def test_mapping_slot_matches_solidity_layout() -> None:
+    inner = Web3.solidity_keccak(["uint256", "uint256"], [int(OWNER, 16), 2])
+    expected = Web3.solidity_keccak(["uint256", "bytes32"], [int(ROUTER, 16), inner])
+    assert mapping_slot(2, OWNER, ROUTER) == int.from_bytes(expected, "big")
+
+
+def test_approval_is_carried_into_the_swap(stub_w3: Web3, stub_rpc: StubRPC) -> None:
+    _stub_token(stub_rpc)
+    simulator = BundleSimulator(stub_w3)
+    simulation = simulator.simulate([_approve(stub_w3, 10**18), SWAP])
+    assert simulation.ok
+    assert [r.gas_used for r in simulation.results] == [APPROVE_GAS, SWAP_GAS]
+
+    # The slot is found once per token and reused.
+    probes = stub_rpc.count("eth_call")
+    assert simulator.simulate([_approve(stub_w3, 10**18), SWAP]).ok
+    assert stub_rpc.count("eth_call") == probes
+
+
+@pytest.mark.parametrize("txs", ["short_approval", "no_approval"])
+def test_reverts_are_reported(stub_w3: Web3, stub_rpc: StubRPC, txs: str) -> None:
+    _stub_token(stub_rpc)
+    bundle = [_approve(stub_w3, 10**17), SWAP] if txs == "short_approval" else [SWAP]
+    simulation = BundleSimulator(stub_w3).simulate(bundle)
+    assert not simulation.ok
+    assert simulation.results[-1].index == len(bundle) - 1
+    assert "STF" in simulation.revert_reason
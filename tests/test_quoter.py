@@ -0,0 +1,116 @@
+import pytest
+from eth_abi import decode
+from web3 import Web3
+
+from flare_ai_defai.blockchain.abi_registry import abi_registry
+from flare_ai_defai.blockchain.pool_cache import PoolStateCache
+from flare_ai_defai.blockchain.quoter import SparkDEXQuoter, price_impact
+from flare_ai_defai.blockchain.v3_simulator import simulate_swap
+
+from .conftest import FakeMulticall, StubRPC
+
+WFLR = "0x1D80c49BbBCd1C0911346656B529DF9E5c2F783d"
+USDC = "0xFbDa5F676cB37624f28265A144A48B0d6e87d3b6"
+POOLS = {
+    500: Web3.to_checksum_address("0x0000000000000000000000000000000000000500"),
+    3000: Web3.to_checksum_address("0x0000000000000000000000000000000000003000"),
+}
+Q96 = 2**96
+
+
+def test_price_impact_zero_at_spot() -> None:
+    # 1:1 pool with a 0.05% fee: receiving exactly the fee-adjusted amount.
+    assert price_impact(Q96, 500, 10_000, 9_995, zero_for_one=True) == 0.0
+    assert price_impact(Q96, 500, 10_000, 8_995, zero_for_one=False) == pytest.approx(
+        0.1, rel=1e-3
+    )
+
+
+def _pools(stub_rpc: StubRPC, fake_multicall: FakeMulticall) -> None:
+    stub_rpc.handlers["eth_blockNumber"] = lambda: "0x64"
+    outputs = {500: 900, 3000: 990}
+
+    def get_pool(data: bytes) -> tuple:
+        _, _, fee = decode(["address", "address", "uint24"], data[4:])
+        return (POOLS.get(fee, "0x" + "00" * 20),)
+
+    def quote(data: bytes) -> tuple:
+        ((_, _, _, fee, _),) = decode(
+            ["(address,address,uint256,uint24,uint160)"], data[4:]
+        )
+        return (outputs[fee], Q96, 1, 70_000 + fee)
+
+    fake_multicall.on(
+        PoolStateCache.FACTORY, abi_registry.selector("v3_factory", "getPool"), get_pool
+    )
+    for pool in POOLS.values():
+        fake_multicall.on(
+            pool, abi_registry.selector("v3_pool", "slot0"), (Q96, 0, 0, 1, 1, 0, True)
+        )
+        fake_multicall.on(pool, abi_registry.selector("v3_pool", "liquidity"), (1,))
+    fake_multicall.on(
+        SparkDEXQuoter.QUOTER_V2,
+        abi_registry.selector("quoter_v2", "quoteExactInputSingle"),
+        quote,
+    )
+
+
+def test_best_quote_picks_highest_output_tier(
+    stub_w3: Web3, stub_rpc: StubRPC, fake_multicall: FakeMulticall
+) -> None:
+    _pools(stub_rpc, fake_multicall)
+    quoter = SparkDEXQuoter(stub_w3, multicall=fake_multicall)
+    best = quoter.best_quote(WFLR, USDC, 1_000, offline=False)
+    assert best.fee == 3000  # noqa: PLR2004
+    assert best.amount_out == 990  # noqa: PLR2004
+    assert best.pool_address == POOLS[3000]
+    assert best.gas_estimate == 73_000  # noqa: PLR2004
+
+    # Unchanged pools at the same block: the quote comes from memory.
+    batches = len(fake_multicall.batches)
+    assert quoter.best_quote(WFLR, USDC, 1_000, offline=False) == best
+    assert len(fake_multicall.batches) == batches
+
+
+def test_offline_quote_uses_tick_snapshots(
+    stub_w3: Web3, stub_rpc: StubRPC, fake_multicall: FakeMulticall
+) -> None:
+    _pools(stub_rpc, fake_multicall)
+    pool = POOLS[3000]
+    # Only the 0.3% pool exists for this test.
+    fake_multicall.on(
+        PoolStateCache.FACTORY,
+        abi_registry.selector("v3_factory", "getPool"),
+        lambda data: (
+            pool if data.endswith((3000).to_bytes(32)) else "0x" + "00" * 20,
+        ),
+    )
+    # One position between ticks -600 and 600 with 10**18 liquidity.
+    fake_multicall.on(pool, abi_registry.selector("v3_pool", "liquidity"), (10**18,))
+    fake_multicall.on(pool, abi_registry.selector("v3_pool", "tickSpacing"), (60,))
+
+    def tick_bitmap(data: bytes) -> tuple:
+        (word,) = decode(["int16"], data[4:])
+        return ({0: 1 << 10, -1: 1 << 246}.get(word, 0),)
+
+    def ticks(data: bytes) -> tuple:
+        (tick,) = decode(["int24"], data[4:])
+        net = {600: -(10**18), -600: 10**18}[tick]
+        return (10**18, net, 0, 0, 0, 0, 0, True)
+
+    fake_multicall.on(pool, abi_registry.selector("v3_pool", "tickBitmap"), tick_bitmap)
+    fake_multicall.on(pool, abi_registry.selector("v3_pool", "ticks"), ticks)
+
+    quoter = SparkDEXQuoter(stub_w3, multicall=fake_multicall)
+    snapshot = quoter.pool_cache.snapshots(WFLR, USDC)[3000]
+    assert snapshot.liquidity_net == {600: -(10**18), -600: 10**18}
+
+    amount_in = 10**15
+    zero_for_one = USDC.lower() < WFLR.lower()
+    expected = simulate_swap(
+        snapshot, zero_for_one=zero_for_one, amount_specified=amount_in
+    )
+    batches = len(fake_multicall.batches)
+    best = quoter.best_quote(USDC, WFLR, amount_in)
+    assert (best.fee, best.amount_out) == (3000, expected.amount_out)
+    assert len(fake_multicall.batches) == batches
@@ -0,0 +1,97 @@
+from eth_abi import decode
+from web3 import Web3
+
+from flare_ai_defai.blockchain.abi_registry import abi_registry
+from flare_ai_defai.blockchain.pool_cache import PoolStateCache, sort_pair
+from flare_ai_defai.blockchain.routing import (
+    WFLR_ADDRESS,
+    RouteFinder,
+    encode_v3_path,
+    v2_amount_out,
+)
+from flare_ai_defai.blockchain.v3_simulator import Q96
+
+from .conftest import FakeMulticall, StubRPC
+
+USDT = "0x0B38e83B86d491735fEaa0a791F65c2B99535396"
+WETH = "0x1502FA4be69d526124D453619276FacCab275d3D"
+WFLR = Web3.to_checksum_address(WFLR_ADDRESS)
+
+
+def _add_pools(
+    stub_rpc: StubRPC, fake_multicall: FakeMulticall, pools: dict[tuple, int]
+) -> dict[tuple, str]:
+    """Serve 1:1 pools with the given liquidity, keyed by (token, token, fee)."""
+    stub_rpc.handlers["eth_blockNumber"] = lambda: "0x64"
+    addresses = {}
+    for i, ((a, b, fee), liquidity) in enumerate(pools.items(), start=1):
+        address = Web3.to_checksum_address(f"0x{i:040x}")
+        addresses[(*sort_pair(a, b), fee)] = address
+        for name, value in (
+            ("slot0", (Q96, 0, 0, 1, 1, 0, True)),
+            ("liquidity", (liquidity,)),
+            ("tickSpacing", (60,)),
+            ("tickBitmap", (0,)),
+        ):
+            fake_multicall.on(address, abi_registry.selector("v3_pool", name), value)
+
+    def get_pool(data: bytes) -> tuple:
+        token0, token1, fee = decode(["address", "address", "uint24"], data[4:])
+        key = (Web3.to_checksum_address(token0), Web3.to_checksum_address(token1), fee)
+        return (addresses.get(key, "0x" + "00" * 20),)
+
+    fake_multicall.on(
+        PoolStateCache.FACTORY, abi_registry.selector("v3_factory", "getPool"), get_pool
+    )
+    return addresses
+
+
+def test_encode_v3_path() -> None:
+    path = encode_v3_path([USDT, WFLR, WETH], [500, 3000])
+    assert len(path) == 20 + 3 + 20 + 3 + 20
+    assert path[:20] == bytes.fromhex(USDT[2:])
+    assert path[20:23] == (500).to_bytes(3, "big")
+    assert path[-20:] == bytes.fromhex(WETH[2:])
+
+
+def test_v2_amount_out_matches_uniswap_formula() -> None:
+    amount_in, reserve_in, reserve_out = 10**18, 5 * 10**20, 7 * 10**20
+    expected = (amount_in * 997 * reserve_out) // (reserve_in * 1000 + amount_in * 997)
+    assert v2_amount_out(amount_in, reserve_in, reserve_out) == expected
+
+
+def test_multi_hop_beats_thin_direct_pool(
+    stub_w3: Web3, stub_rpc: StubRPC, fake_multicall: FakeMulticall
+) -> None:
+    deep = 10**24
+    pools = _add_pools(
+        stub_rpc,
+        fake_multicall,
+        {
+            (USDT, WFLR, 500): deep,
+            (WFLR, WETH, 3000): deep,
+            (USDT, WETH, 3000): 10**19,
+        },
+    )
+    finder = RouteFinder(PoolStateCache(stub_w3, fake_multicall), [USDT, WFLR, WETH])
+    assert finder.paths(USDT, WETH) == [(USDT, WETH), (USDT, WFLR, WETH)]
+
+    routes = finder.find_routes(USDT, WETH, 10**18, k=2, gas_price=25 * 10**9)
+    best = routes[0]
+    assert best.tokens == (
+        Web3.to_checksum_address(USDT),
+        WFLR,
+        Web3.to_checksum_address(WETH),
+    )
+    assert best.fees == (500, 3000)
+    assert best.hops[0].pool == pools[(*sort_pair(USDT, WFLR), 500)]
+    assert best.path == encode_v3_path(best.tokens, best.fees)
+    assert 0 < best.gas_cost_out < best.amount_out
+    assert best.net_amount_out == best.amount_out - best.gas_cost_out
+    assert len(routes) == 2  # noqa: PLR2004
+    assert routes[1].net_amount_out < best.net_amount_out
+
+    # The graph and candidate paths are reused across searches.
+    batches = len(fake_multicall.batches)
+    finder.find_routes(USDT, WETH, 2 * 10**18, gas_price=25 * 10**9)
+    assert len(fake_multicall.batches) == batches
@@ -0,0 +1,139 @@
+import threading
+
+from web3 import Web3
+
+from flare_ai_defai.blockchain.block_watcher import BlockHeader
+from flare_ai_defai.blockchain.rpc_cache import IMMUTABLE, PER_BLOCK, RPCCache
+
+from .conftest import StubRPC
+
+TOKEN = "0x00000000000000000000000000000000000000AA"
+
+
+def _header(number: int) -> BlockHeader:
+    return BlockHeader(number, "0x" + "00" * 32, 1_700_000_000 + number, 25 * 10**9)
+
+
+def _cached_w3(stub_rpc: StubRPC, cache: RPCCache) -> Web3:
+    w3 = Web3(stub_rpc)
+    cache.install(w3)
+    return w3
+
+
+def test_requests_are_classified_by_block_tag() -> None:
+    cache = RPCCache()
+    cache.on_block(_header(100))
+
+    assert cache.classify("eth_chainId", []) == IMMUTABLE
+    assert cache.classify("eth_call", [{}, "0x10"]) == IMMUTABLE
+    assert cache.classify("eth_call", [{}, "latest"]) == PER_BLOCK
+    assert cache.classify("eth_blockNumber", []) == PER_BLOCK
+    assert cache.classify("eth_call", [{}, "pending"]) is None
+    assert cache.classify("eth_sendRawTransaction", ["0x00"]) is None
+    assert cache.classify("eth_getTransactionCount", [TOKEN, "latest"]) is None
+    # A node trailing head 100 could still be missing logs from block 97 on.
+    logs = {"fromBlock": "0x50", "toBlock": "0x60"}
+    assert cache.classify("eth_getLogs", [logs]) == IMMUTABLE
+    assert cache.classify("eth_getLogs", [{**logs, "toBlock": "0x61"}]) is None
+    assert cache.classify("eth_getLogs", [{**logs, "toBlock": "latest"}]) is None
+
+
+def test_latest_reads_last_until_the_next_head(stub_rpc: StubRPC) -> None:
+    stub_rpc.handlers["eth_getBalance"] = lambda _address, _block: "0x5"
+    cache = RPCCache()
+    w3 = _cached_w3(stub_rpc, cache)
+
+    assert w3.eth.get_balance(TOKEN) == 5  # noqa: PLR2004
+    assert w3.eth.get_balance(TOKEN) == 5  # noqa: PLR2004
+    assert w3.eth.chain_id == w3.eth.chain_id == 14  # noqa: PLR2004
+    assert stub_rpc.count("eth_getBalance") == 1
+    assert stub_rpc.count("eth_chainId") == 1
+
+    cache.on_block(_header(1))
+    w3.eth.get_balance(TOKEN)
+    w3.eth.chain_id  # noqa: B018
+    assert stub_rpc.count("eth_getBalance") == 2  # noqa: PLR2004
+    assert stub_rpc.count("eth_chainId") == 1
+
+    metrics = cache.metrics()
+    assert metrics["eth_getBalance"]["hits"] == 1
+    assert metrics["eth_getBalance"]["misses"] == 2  # noqa: PLR2004
+    assert metrics["eth_chainId"]["hit_rate"] == 2 / 3
+
+
+def test_errors_and_missing_receipts_are_not_cached(stub_rpc: StubRPC) -> None:
+    stub_rpc.handlers["eth_getTransactionReceipt"] = lambda _hash: None
+    cache = RPCCache()
+
+    request = ("eth_getTransactionReceipt", ["0x" + "11" * 32])
+    for _ in range(2):
+        cache.request(stub_rpc.make_request, *request)
+    assert stub_rpc.count("eth_getTransactionReceipt") == 2  # noqa: PLR2004
+
+    stub_rpc.error = {"code": -32000, "message": "execution reverted"}
+    for _ in range(2):
+        cache.request(stub_rpc.make_request, "eth_call", [{}, "0x1"])
+    assert stub_rpc.count("eth_call") == 2  # noqa: PLR2004
+
+
+def test_empty_log_ranges_are_not_kept_past_the_head(stub_rpc: StubRPC) -> None:
+    stub_rpc.handlers["eth_getLogs"] = lambda _filter: []
+    cache = RPCCache()
+    cache.on_block(_header(100))
+
+    request = ("eth_getLogs", [{"fromBlock": "0x50", "toBlock": "0x60"}])
+    for _ in range(2):
+        cache.request(stub_rpc.make_request, *request)
+    assert stub_rpc.count("eth_getLogs") == 1
+    cache.on_block(_header(101))
+    cache.request(stub_rpc.make_request, *request)
+    assert stub_rpc.count("eth_getLogs") == 2  # noqa: PLR2004
+
+
+def test_concurrent_identical_requests_share_one_round_trip(
+    stub_rpc: StubRPC,
+) -> None:
+    stub_rpc.handlers["eth_getCode"] = lambda _address, _block: "0x6080"
+    stub_rpc.delay = 0.1
+    cache = RPCCache()
+    w3 = _cached_w3(stub_rpc, cache)
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(w3.eth.get_code(TOKEN)))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [bytes.fromhex("6080")] * 4
+    assert stub_rpc.count("eth_getCode") == 1
+    assert cache.metrics()["eth_getCode"]["coalesced"] == 3  # noqa: PLR2004
+    # Deployed code is kept across heads.
+    cache.on_block(_header(1))
+    w3.eth.get_code(TOKEN)
+    assert stub_rpc.count("eth_getCode") == 1
+
+
+def test_batches_only_send_the_misses(stub_rpc: StubRPC) -> None:
+    stub_rpc.handlers["eth_blockNumber"] = lambda: "0x7"
+    stub_rpc.handlers["eth_getBalance"] = lambda _address, _block: "0x5"
+    cache = RPCCache()
+    w3 = _cached_w3(stub_rpc, cache)
+    assert w3.eth.chain_id == 14  # noqa: PLR2004
+
+    with w3.batch_requests() as batch:
+        batch.add(w3.eth.get_balance(TOKEN))
+        batch.add(w3.eth.chain_id)
+        batch.add(w3.eth.block_number)
+        assert batch.execute() == [5, 14, 7]
+    assert stub_rpc.batches == 1
+    assert stub_rpc.count("eth_chainId") == 1
+
+    with w3.batch_requests() as batch:
+        batch.add(w3.eth.get_balance(TOKEN))
+        batch.add(w3.eth.block_number)
+        assert batch.execute() == [5, 7]
+    assert stub_rpc.batches == 1
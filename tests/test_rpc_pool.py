@@ -0,0 +1,74 @@
+import time
+
+from web3 import Web3
+
+from flare_ai_defai.blockchain.rpc_pool import RPCPool
+
+from .conftest import StubRPC
+
+
+def _node(block: int) -> StubRPC:
+    node = StubRPC()
+    node.handlers.update(
+        {
+            "eth_blockNumber": lambda: hex(block),
+            "eth_sendRawTransaction": lambda _: "0x" + "ab" * 32,
+        }
+    )
+    return node
+
+
+def _wait_for(condition, timeout: float = 2.0) -> bool:  # noqa: ANN001
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_slow_reads_are_hedged_and_demoted() -> None:
+    slow, fast = _node(1), _node(2)
+    slow.delay = 0.3
+    pool = RPCPool([slow, fast], hedge_after=0.05)
+    w3 = Web3(pool)
+
+    start = time.perf_counter()
+    assert w3.eth.block_number == 2  # noqa: PLR2004
+    assert time.perf_counter() - start < 0.25  # noqa: PLR2004
+    assert slow.count("eth_blockNumber") == 1
+
+    # Once the slow answer lands, the fast node ranks first.
+    assert _wait_for(lambda: pool.ranked()[0].provider is fast)
+    assert w3.eth.block_number == 2  # noqa: PLR2004
+    assert slow.count("eth_blockNumber") == 1
+    assert fast.count("eth_blockNumber") == 2  # noqa: PLR2004
+
+
+def test_failing_node_is_failed_over_and_penalised() -> None:
+    limited, healthy = _node(1), _node(2)
+    limited.error = {"code": -32005, "message": "rate limit exceeded"}
+    pool = RPCPool([limited, healthy], hedge_after=5)
+    w3 = Web3(pool)
+
+    assert w3.eth.block_number == 2  # noqa: PLR2004
+    assert pool.endpoints[0].error_rate > 0
+    assert pool.ranked()[0].provider is healthy
+
+    with w3.batch_requests() as batch:
+        batch.add(w3.eth.block_number)
+        batch.add(w3.eth.chain_id)
+        assert batch.execute() == [2, 14]
+    assert healthy.batches == 1
+
+
+def test_transactions_go_to_primary_and_are_rebroadcast() -> None:
+    primary, other = _node(1), _node(2)
+    pool = RPCPool([primary, other])
+    # The other node is healthier, but sends still start at the primary.
+    pool.endpoints[0].latency = 1.0
+
+    tx_hash = Web3(pool).eth.send_raw_transaction(b"\x02" + b"\x00" * 10)
+    assert tx_hash == bytes.fromhex("ab" * 32)
+    assert primary.count("eth_sendRawTransaction") == 1
+    assert _wait_for(lambda: other.count("eth_sendRawTransaction") == 1)
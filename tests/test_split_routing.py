@@ -0,0 +1,72 @@
+from eth_abi import decode
+from web3 import Web3
+
+from flare_ai_defai.blockchain.pool_cache import PoolStateCache
+from flare_ai_defai.blockchain.routing import RouteFinder, encode_v3_path
+from flare_ai_defai.blockchain.universal_router import (
+    MSG_SENDER,
+    Command,
+    RouterPlan,
+)
+
+from .conftest import FakeMulticall, StubRPC
+from .test_routing import USDT, WETH, WFLR, _add_pools
+
+
+def test_split_beats_single_route_on_equal_pools(
+    stub_w3: Web3, stub_rpc: StubRPC, fake_multicall: FakeMulticall
+) -> None:
+    liquidity = 10**21
+    _add_pools(
+        stub_rpc,
+        fake_multicall,
+        {(USDT, WETH, 500): liquidity, (USDT, WETH, 3000): liquidity},
+    )
+    finder = RouteFinder(PoolStateCache(stub_w3, fake_multicall), [USDT, WETH])
+    amount_in = 10**20
+
+    single = finder.best_route(USDT, WETH, amount_in, gas_price=0)
+    split = finder.find_split(USDT, WETH, amount_in, gas_price=0)
+
+    assert len(split.legs) == 2  # noqa: PLR2004
+    assert split.amount_in == amount_in
+    assert split.amount_out > single.amount_out
+    pools = [hop.pool for leg in split.legs for hop in leg.hops]
+    assert len(pools) == len(set(pools))
+
+
+def test_small_order_stays_on_one_leg_when_gas_dominates(
+    stub_w3: Web3, stub_rpc: StubRPC, fake_multicall: FakeMulticall
+) -> None:
+    deep = 10**24
+    _add_pools(
+        stub_rpc,
+        fake_multicall,
+        {
+            (USDT, WETH, 500): deep,
+            (USDT, WETH, 3000): deep,
+            (WFLR, WETH, 500): deep,
+        },
+    )
+    finder = RouteFinder(PoolStateCache(stub_w3, fake_multicall), [USDT, WETH, WFLR])
+    split = finder.find_split(USDT, WETH, 10**15, gas_price=25 * 10**9)
+    assert len(split.legs) == 1
+    assert split.legs[0].fees == (500,)
+
+
+def test_router_plan_encodes_v3_swaps() -> None:
+    path = encode_v3_path([USDT, WETH], [500])
+    plan = RouterPlan()
+    plan.v3_swap_exact_in(MSG_SENDER, 10**18, 99 * 10**16, path)
+    plan.v3_swap_exact_in(MSG_SENDER, 2 * 10**18, 0, path, payer_is_user=False)
+    commands, inputs = plan.encode()
+
+    assert commands == bytes([Command.V3_SWAP_EXACT_IN] * 2)
+    recipient, amount_in, amount_out_min, decoded_path, payer_is_user = decode(
+        ["address", "uint256", "uint256", "bytes", "bool"], inputs[0]
+    )
+    assert Web3.to_checksum_address(recipient) == MSG_SENDER
+    assert (amount_in, amount_out_min) == (10**18, 99 * 10**16)
+    assert decoded_path == path
+    assert payer_is_user
+    assert not decode(["address", "uint256", "uint256", "bytes", "bool"], inputs[1])[4]
@@ -0,0 +1,47 @@
+from eth_abi import decode
+from web3 import Web3
+
+from flare_ai_defai.blockchain.routing import WFLR_ADDRESS, encode_v3_path
+from flare_ai_defai.blockchain.universal_router import (
+    ADDRESS_THIS,
+    MSG_SENDER,
+    Command,
+    RouterPlan,
+)
+
+USDT = "0x0B38e83B86d491735fEaa0a791F65c2B99535396"
+
+
+def test_wrap_swap_bundle_encodes_in_order() -> None:
+    amount = 5 * 10**18
+    path = encode_v3_path([WFLR_ADDRESS, USDT], [500])
+    plan = (
+        RouterPlan()
+        .wrap_eth(ADDRESS_THIS, amount)
+        .v3_swap_exact_in(MSG_SENDER, amount, 1, path, payer_is_user=False)
+    )
+    commands, inputs = plan.encode()
+
+    assert commands == bytes([Command.WRAP_ETH, Command.V3_SWAP_EXACT_IN])
+    recipient, wrapped = decode(["address", "uint256"], inputs[0])
+    assert Web3.to_checksum_address(recipient) == ADDRESS_THIS
+    assert wrapped == amount
+    swap = decode(["address", "uint256", "uint256", "bytes", "bool"], inputs[1])
+    assert swap[1] == amount
+    assert swap[3] == path
+    assert swap[4] is False
+
+
+def test_unwrap_and_sweep_encoding() -> None:
+    commands, inputs = (
+        RouterPlan()
+        .unwrap_weth(MSG_SENDER, 10**18)
+        .sweep(USDT, MSG_SENDER, 99 * 10**6)
+        .encode()
+    )
+    assert commands == bytes([Command.UNWRAP_WETH, Command.SWEEP])
+    assert decode(["address", "uint256"], inputs[0])[1] == 10**18
+    token, recipient, amount_min = decode(["address", "address", "uint256"], inputs[1])
+    assert Web3.to_checksum_address(token) == USDT
+    assert Web3.to_checksum_address(recipient) == MSG_SENDER
+    assert amount_min == 99 * 10**6
@@ -0,0 +1,156 @@
+from decimal import Decimal, getcontext
+from math import isqrt
+
+import pytest
+
+from flare_ai_defai.blockchain.v3_simulator import (
+    MAX_SQRT_RATIO,
+    MAX_TICK,
+    MIN_SQRT_RATIO,
+    MIN_TICK,
+    Q96,
+    PoolSnapshot,
+    SnapshotRangeError,
+    compute_swap_step,
+    get_sqrt_ratio_at_tick,
+    get_tick_at_sqrt_ratio,
+    simulate_swap,
+)
+
+E18 = 10**18
+
+
+def encode_price_sqrt(reserve1: int, reserve0: int) -> int:
+    return isqrt(reserve1 * 2**192 // reserve0)
+
+
+def test_tick_math_bounds() -> None:
+    assert get_sqrt_ratio_at_tick(0) == Q96
+    assert get_sqrt_ratio_at_tick(MIN_TICK) == MIN_SQRT_RATIO
+    assert get_sqrt_ratio_at_tick(MAX_TICK) == MAX_SQRT_RATIO
+    assert get_tick_at_sqrt_ratio(MIN_SQRT_RATIO) == MIN_TICK
+    assert get_tick_at_sqrt_ratio(MAX_SQRT_RATIO - 1) == MAX_TICK - 1
+
+
+@pytest.mark.parametrize(
+    "tick", [2**i for i in range(20)] + [-(2**i) for i in range(20)]
+)
+def test_tick_math_matches_exact_power(tick: int) -> None:
+    getcontext().prec = 80
+    exact = Decimal("1.0001") ** tick
+    exact = exact.sqrt() * Q96
+    # TickMath rounds up, so small ratios may be off by one unit.
+    assert abs(get_sqrt_ratio_at_tick(tick) - exact) < 1 + exact * Decimal("1e-18")
+    assert get_tick_at_sqrt_ratio(get_sqrt_ratio_at_tick(tick)) == tick
+
+
+@pytest.mark.parametrize(
+    ("args", "expected"),
+    [
+        # Vectors from Uniswap v3-core SwapMath.spec.ts.
+        (
+            (Q96, encode_price_sqrt(101, 100), 2 * E18, E18, 600),
+            (
+                encode_price_sqrt(101, 100),
+                9975124224178055,
+                9925619580021728,
+                5988667735148,
+            ),
+        ),
+        (
+            (Q96, encode_price_sqrt(101, 100), 2 * E18, -E18, 600),
+            (
+                encode_price_sqrt(101, 100),
+                9975124224178055,
+                9925619580021728,
+                5988667735148,
+            ),
+        ),
+        (
+            (
+                417332158212080721273783715441582,
+                1452870262520218020823638996,
+                159344665391607089467575320103,
+                -1,
+                1,
+            ),
+            (417332158212080721273783715441581, 1, 1, 1),
+        ),
+        (
+            (2, 1, 1, 3915081100057732413702495386755767, 1),
+            (1, 39614081257132168796771975168, 0, 39614120871253040049813),
+        ),
+        (
+            (2413, 79887613182836312, 1985041575832132834610021537970, 10, 1872),
+            (2413, 0, 0, 10),
+        ),
+    ],
+)
+def test_compute_swap_step_vectors(args: tuple, expected: tuple) -> None:
+    assert compute_swap_step(*args) == expected
+
+
+def test_compute_swap_step_input_fully_spent() -> None:
+    price, amount_in, amount_out, fee = compute_swap_step(
+        Q96, encode_price_sqrt(1000, 100), 2 * E18, E18, 600
+    )
+    assert (amount_in, amount_out, fee) == (
+        999400000000000000,
+        666399946655997866,
+        600000000000000,
+    )
+    assert price < encode_price_sqrt(1000, 100)
+    assert amount_in + fee == E18
+
+
+def _snapshot(**overrides: object) -> PoolSnapshot:
+    fields = {
+        "sqrt_price_x96": Q96,
+        "tick": 0,
+        "liquidity": 2 * E18,
+        "fee": 3000,
+        "tick_spacing": 60,
+        # One extra position between ticks -600 and 600.
+        "liquidity_net": {-600: E18, 600: -E18, -887220: E18, 887220: -E18},
+        "min_word": -58,
+        "max_word": 57,
+    }
+    fields.update(overrides)
+    return PoolSnapshot(**fields)  # type: ignore[arg-type]
+
+
+def test_swap_within_range_matches_single_step() -> None:
+    snapshot = _snapshot()
+    result = simulate_swap(snapshot, zero_for_one=True, amount_specified=10**15)
+    price, amount_in, amount_out, fee = compute_swap_step(
+        Q96, get_sqrt_ratio_at_tick(-600), 2 * E18, 10**15, 3000
+    )
+    assert (result.amount_in, result.amount_out, result.fee_amount) == (
+        amount_in + fee,
+        amount_out,
+        fee,
+    )
+    assert result.sqrt_price_x96_after == price
+    assert result.ticks_crossed == 0
+
+
+def test_swap_crossing_tick_drops_liquidity() -> None:
+    snapshot = _snapshot()
+    result = simulate_swap(snapshot, zero_for_one=True, amount_specified=2 * 10**17)
+    assert result.ticks_crossed == 1
+    assert result.liquidity_after == E18
+    assert result.tick_after < -600  # noqa: PLR2004
+    assert result.amount_in == 2 * 10**17
+
+    # Exact output for what exact input produced needs no more input.
+    back = simulate_swap(
+        snapshot, zero_for_one=True, amount_specified=-result.amount_out
+    )
+    assert back.amount_out == result.amount_out
+    assert back.amount_in <= result.amount_in
+
+
+def test_swap_outside_snapshot_raises() -> None:
+    snapshot = _snapshot(min_word=0, max_word=0)
+    with pytest.raises(SnapshotRangeError):
+        simulate_swap(snapshot, zero_for_one=True, amount_specified=10**15)
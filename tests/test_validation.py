@@ -0,0 +1,93 @@
+import pytest
+import requests
+
+from flare_ai_defai.attestation import VtpmValidation, VtpmValidationError
+
+from .conftest import FakeIssuer
+
+
+def test_oidc_keys_fetched_once(fake_issuer: FakeIssuer) -> None:
+    validator = VtpmValidation()
+    for i in range(3):
+        claims = validator.validate_token(fake_issuer.oidc_token(n=i))
+        assert claims["n"] == i
+    assert fake_issuer.jwks_fetches == 1
+
+
+def test_unknown_kid_refreshes_jwks(fake_issuer: FakeIssuer) -> None:
+    validator = VtpmValidation()
+    validator.key_cache.min_refresh_interval = 0
+    validator.validate_token(fake_issuer.oidc_token())
+    fake_issuer.kid = "rotated-kid"
+    try:
+        validator.validate_token(fake_issuer.oidc_token())
+    finally:
+        fake_issuer.kid = "test-kid"
+    assert fake_issuer.jwks_fetches == 2
+
+
+def test_missing_kid_raises(fake_issuer: FakeIssuer) -> None:
+    validator = VtpmValidation()
+    fake_issuer.kid = "unknown"
+    token = fake_issuer.oidc_token()
+    fake_issuer.kid = "test-kid"
+    with pytest.raises(VtpmValidationError, match="kid"):
+        validator.validate_token(token)
+
+
+def test_pki_chain_verified_once(
+    fake_issuer: FakeIssuer, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    validator = VtpmValidation()
+    verifications = []
+    verify = VtpmValidation._verify_certificate_chain  # noqa: SLF001
+    monkeypatch.setattr(
+        VtpmValidation,
+        "_verify_certificate_chain",
+        staticmethod(lambda certs: verifications.append(verify(certs))),
+    )
+    for i in range(3):
+        assert validator.validate_token(fake_issuer.pki_token(n=i))["n"] == i
+    assert len(verifications) == 1
+    assert fake_issuer.well_known_fetches == 1
+
+
+def test_validate_many_groups_and_reports(fake_issuer: FakeIssuer) -> None:
+    tokens = [
+        fake_issuer.oidc_token(n=0),
+        fake_issuer.pki_token(n=1),
+        "not-a-token",
+        fake_issuer.oidc_token(n=3),
+        fake_issuer.pki_token(n=4),
+    ]
+    report = VtpmValidation().validate_many(tokens, max_workers=0)
+    assert [r.valid for r in report.results] == [True, True, False, True, True]
+    assert report.results[4].claims == {"n": 4, "exp": report.results[4].claims["exp"]}
+    assert report.unique_groups == 2
+    assert fake_issuer.jwks_fetches == 1
+    assert report.tokens_per_second > 0
+
+
+def test_validate_many_in_process_pool(fake_issuer: FakeIssuer) -> None:
+    tokens = [fake_issuer.oidc_token(n=i) for i in range(80)]
+    tokens[10] = tokens[10][:-4] + "AAAA"
+    report = VtpmValidation().validate_many(tokens, max_workers=2)
+    assert report.invalid_count == 1
+    assert not report.results[10].valid
+    assert [r.index for r in report.results] == list(range(80))
+
+
+def test_validate_many_reports_jwks_outage_per_token(
+    fake_issuer: FakeIssuer, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    validator = VtpmValidation()
+
+    def unreachable(*_: object) -> None:
+        msg = "issuer unreachable"
+        raise requests.ConnectionError(msg)
+
+    monkeypatch.setattr(validator.key_cache, "_refresh_keys", unreachable)
+    tokens = [fake_issuer.oidc_token(n=0), fake_issuer.pki_token(n=1)]
+    report = validator.validate_many(tokens, max_workers=0)
+    assert [r.valid for r in report.results] == [False, True]
+    assert "issuer unreachable" in report.results[0].error